@@ -0,0 +1,150 @@
+"""
+인덱싱 스케줄러 CLI
+여러 저장소의 인덱싱 작업을 큐에 등록하고, 채팅 앱과 별도 프로세스에서 실행합니다.
+
+사용 예:
+    python scheduler.py enqueue https://github.com/org/repo --priority 10
+    python scheduler.py enqueue --file repos.txt --limit 500
+    python scheduler.py enqueue https://github.com/org/big-repo --max-tokens 5000000
+    python scheduler.py enqueue https://github.com/org/big-repo --max-seconds 3600 --no-precheck
+    python scheduler.py run --concurrency 4
+    python scheduler.py run --until-idle
+    python scheduler.py status
+    python scheduler.py status 42
+    python scheduler.py cancel 42   # 대기 중이면 바로, 실행 중이면 진행 중인 요청이 끝난 뒤 중단
+"""
+
+import sys
+import json
+import signal
+import logging
+import argparse
+
+from dotenv import load_dotenv
+
+from src.index_estimator import estimate_indexing
+from src.index_scheduler import IndexJobQueue, IndexScheduler, build_indexer_factory
+
+
+def _read_repos(args) -> list:
+    repos = list(args.repos)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            repos.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return repos
+
+
+def cmd_enqueue(queue: IndexJobQueue, args) -> int:
+    repos = _read_repos(args)
+    if not repos:
+        print("저장소를 지정하세요 (인자 또는 --file)", file=sys.stderr)
+        return 2
+    params = {k: v for k, v in (("limit", args.limit), ("since", args.since), ("until", args.until)) if v}
+    if args.full:
+        params["skip_existing"] = False
+    # 예산은 실행 중에도 적용 (넘으면 업로드된 커밋을 남기고 중단)
+    budgets = {k: v for k, v in (("max_tokens", args.max_tokens), ("max_seconds", args.max_seconds)) if v}
+    for repo in repos:
+        if budgets and not args.no_precheck:
+            # 추정치가 예산을 넘는 작업은 할당량을 쓰기 전에 거부
+            estimate = estimate_indexing(repo, max_tokens=args.max_tokens, max_seconds=args.max_seconds, **params)
+            if not estimate["within_budget"]:
+                print(f"거부\t{repo}\t토큰 ~{estimate['embedding']['tokens']}, "
+                      f"~{estimate['wall_clock_seconds']}s ({', '.join(estimate['exceeds'])} 초과)", file=sys.stderr)
+                continue
+        job_id = queue.enqueue(repo, priority=args.priority, params={**params, **budgets},
+                               max_attempts=args.max_attempts)
+        print(f"#{job_id}\t{repo}")
+    return 0
+
+
+def cmd_run(queue: IndexJobQueue, args) -> int:
+    scheduler = IndexScheduler(
+        queue,
+        build_indexer_factory(),
+        max_concurrent=args.concurrency,
+        per_repo_concurrency=args.per_repo,
+    )
+    # Ctrl+C / SIGTERM: 새 작업은 가져오지 않고 실행 중인 작업이 끝나면 종료
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: scheduler.stop())
+    stats = scheduler.run(until_idle=args.until_idle)
+    print(json.dumps(stats, ensure_ascii=False))
+    return 0 if stats["failed"] == 0 else 1
+
+
+def cmd_status(queue: IndexJobQueue, args) -> int:
+    if args.job_id is not None:
+        job = queue.get(args.job_id)
+        if job is None:
+            print(f"작업 #{args.job_id}을(를) 찾을 수 없습니다.", file=sys.stderr)
+            return 1
+        print(json.dumps(job, ensure_ascii=False, indent=2))
+        return 0
+
+    jobs = queue.list_jobs(state=args.state, limit=args.limit)
+    if args.json:
+        print(json.dumps({"summary": queue.summary(), "jobs": jobs}, ensure_ascii=False, indent=2))
+        return 0
+    print("  ".join(f"{state}: {count}" for state, count in queue.summary().items()))
+    for job in jobs:
+        progress = job["progress"] or {}
+        detail = job["error"] or progress.get("message") or (job["result"] or {}).get("indexed", "")
+        print(f"#{job['id']:<6} {job['state']:<10} p{job['priority']:<4} "
+              f"{job['attempts']}/{job['max_attempts']}  {job['repo_path']}  {detail}")
+    return 0
+
+
+def cmd_cancel(queue: IndexJobQueue, args) -> int:
+    if queue.cancel(args.job_id):
+        print(f"작업 #{args.job_id} 취소됨")
+        return 0
+    print(f"작업 #{args.job_id}은(는) 대기 중이거나 실행 중이 아니어서 취소할 수 없습니다.", file=sys.stderr)
+    return 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Git 저장소 인덱싱 스케줄러")
+    parser.add_argument("--db", help="작업 큐 DB 경로 (기본값: INDEX_SCHEDULER_DB 또는 캐시 루트)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = sub.add_parser("enqueue", help="인덱싱 작업 등록")
+    enqueue.add_argument("repos", nargs="*", help="저장소 경로 또는 URL")
+    enqueue.add_argument("--file", help="저장소 목록 파일 (한 줄에 하나, #은 주석)")
+    enqueue.add_argument("--priority", type=int, default=0, help="우선순위 (클수록 먼저)")
+    enqueue.add_argument("--limit", type=int, help="인덱싱할 최대 커밋 수")
+    enqueue.add_argument("--since", help="시작 날짜 (ISO 8601)")
+    enqueue.add_argument("--until", help="종료 날짜 (ISO 8601)")
+    enqueue.add_argument("--full", action="store_true", help="이미 인덱싱된 커밋도 다시 인덱싱")
+    enqueue.add_argument("--max-attempts", type=int, help="최대 실행 횟수")
+    enqueue.add_argument("--max-tokens", type=int, help="임베딩 토큰 예산 (사전 추정이 넘으면 등록하지 않고, 실행 중 넘으면 중단)")
+    enqueue.add_argument("--max-seconds", type=float, help="소요 시간 예산 (사전 추정이 넘으면 등록하지 않고, 실행 중 넘으면 중단)")
+    enqueue.add_argument("--no-precheck", action="store_true", help="사전 추정 없이 등록 (예산은 실행 중에만 적용)")
+
+    run = sub.add_parser("run", help="스케줄러 실행")
+    run.add_argument("--concurrency", type=int, help="전체 동시 실행 작업 수")
+    run.add_argument("--per-repo", type=int, help="저장소별 동시 실행 작업 수")
+    run.add_argument("--until-idle", action="store_true", help="대기열이 비면 종료")
+
+    status = sub.add_parser("status", help="작업 상태 조회")
+    status.add_argument("job_id", type=int, nargs="?", help="작업 id (생략하면 목록)")
+    status.add_argument("--state", help="queued | running | succeeded | failed | cancelled")
+    status.add_argument("--limit", type=int, default=50)
+    status.add_argument("--json", action="store_true")
+
+    cancel = sub.add_parser("cancel", help="대기 중이거나 실행 중인 작업 취소")
+    cancel.add_argument("job_id", type=int)
+    return parser
+
+
+def main(argv=None) -> int:
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    args = build_parser().parse_args(argv)
+    queue = IndexJobQueue(args.db)
+    commands = {"enqueue": cmd_enqueue, "run": cmd_run, "status": cmd_status, "cancel": cmd_cancel}
+    return commands[args.command](queue, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""
+RepoCloneCache 오프라인 벤치마크
+GitHub 없이 합성 저장소를 만들어 로컬 원격(file:// / git daemon / smart HTTP)으로 제공하고
+콜드 클론, 웜 히트, deepen, 새 커밋 N개 후 fetch, 캐시 제거 시간을 측정합니다.
+결과는 JSON으로 출력하여 버전 간 회귀를 비교할 수 있습니다.
+
+사용 예:
+    python scripts/bench_repo_cache.py --commits 2000 --files 200 --branches 50 \\
+        --transports file,daemon,http --repeat 3 --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, make_server
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+SCENARIOS = ['cold_clone', 'warm_hit', 'warm_hit_fetch', 'deepen', 'fetch_after_new_commits', 'eviction']
+
+
+# ---------------------------------------------------------------------- 합성 저장소
+
+def _fast_import_stream(commits: int, files: int, blob_size: int, start_commit: int = 0,
+                        parent: Optional[str] = None, seed: int = 0) -> bytes:
+    """git fast-import 입력 생성 (커밋마다 일부 파일 수정)"""
+    rng = random.Random(seed + start_commit)
+    alphabet = b'abcdefghijklmnopqrstuvwxyz0123456789 \n'
+    out = []
+    timestamp = 1_600_000_000 + start_commit * 60
+
+    for i in range(start_commit, start_commit + commits):
+        touched = rng.sample(range(files), k=min(files, max(1, files // 20)))
+        out.append(b'commit refs/heads/main\n')
+        out.append(b'committer Bench <bench@example.com> %d +0000\n' % (timestamp + (i - start_commit) * 60))
+        message = f'bench commit {i}\n'.encode()
+        out.append(b'data %d\n%s' % (len(message), message))
+        if i == start_commit and parent:
+            out.append(f'from {parent}\n'.encode())
+        for f in touched:
+            content = bytes(rng.choice(alphabet) for _ in range(blob_size))
+            out.append(f'M 100644 inline src/file_{f:05d}.txt\n'.encode())
+            out.append(b'data %d\n%s\n' % (len(content), content))
+        out.append(b'\n')
+    return b''.join(out)
+
+
+def create_synthetic_repo(path: Path, commits: int, files: int, blob_size: int,
+                          branches: int, seed: int = 0) -> Path:
+    """
+    합성 bare 저장소 생성
+
+    Args:
+        path: 생성할 bare 저장소 경로
+        commits: main 브랜치 커밋 수
+        files: 파일 수
+        blob_size: 파일 크기 (바이트)
+        branches: 추가 브랜치 수 (main 히스토리의 임의 지점에서 분기)
+    """
+    subprocess.run(['git', 'init', '-q', '--bare', '-b', 'main', str(path)], check=True)
+    subprocess.run(['git', 'fast-import', '--quiet'], cwd=path, check=True,
+                   input=_fast_import_stream(commits, files, blob_size, seed=seed))
+
+    if branches:
+        shas = subprocess.run(['git', 'rev-list', 'main'], cwd=path, check=True,
+                              capture_output=True, text=True).stdout.split()
+        rng = random.Random(seed)
+        refs = ''.join(f'create refs/heads/branch-{b:04d} {rng.choice(shas)}\n' for b in range(branches))
+        subprocess.run(['git', 'update-ref', '--stdin'], cwd=path, check=True, input=refs, text=True)
+    return path
+
+
+def append_commits(path: Path, count: int, files: int, blob_size: int, seed: int = 0):
+    """원격 main 브랜치에 새 커밋 추가"""
+    head = subprocess.run(['git', 'rev-parse', 'main'], cwd=path, check=True,
+                          capture_output=True, text=True).stdout.strip()
+    total = int(subprocess.run(['git', 'rev-list', '--count', 'main'], cwd=path, check=True,
+                               capture_output=True, text=True).stdout)
+    subprocess.run(['git', 'fast-import', '--quiet'], cwd=path, check=True,
+                   input=_fast_import_stream(count, files, blob_size, start_commit=total, parent=head, seed=seed))
+
+
+# ---------------------------------------------------------------------- 로컬 원격
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class GitDaemon:
+    """`git daemon` (git:// 프로토콜) 로컬 원격"""
+
+    def __init__(self, base_path: Path):
+        self.base_path = base_path
+        self.port = _free_port()
+        self.proc = None
+
+    def __enter__(self):
+        self.proc = subprocess.Popen(
+            ['git', 'daemon', '--reuseaddr', '--export-all', f'--base-path={self.base_path}',
+             '--listen=127.0.0.1', f'--port={self.port}', str(self.base_path)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        _wait_for_port(self.port)
+        return self
+
+    def url(self, name: str) -> str:
+        return f'git://127.0.0.1:{self.port}/{name}'
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.wait(timeout=10)
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def git_http_backend_app(project_root: Path):
+    """`git http-backend` CGI를 감싼 smart HTTP WSGI 앱"""
+
+    def app(environ, start_response):
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else b''
+
+        env = {
+            'PATH': os.environ.get('PATH', ''),
+            'GIT_PROJECT_ROOT': str(project_root),
+            'GIT_HTTP_EXPORT_ALL': '1',
+            'REQUEST_METHOD': environ['REQUEST_METHOD'],
+            'PATH_INFO': environ.get('PATH_INFO', ''),
+            'QUERY_STRING': environ.get('QUERY_STRING', ''),
+            'CONTENT_TYPE': environ.get('CONTENT_TYPE', ''),
+            'CONTENT_LENGTH': str(len(body)),
+            'REMOTE_ADDR': environ.get('REMOTE_ADDR', '127.0.0.1'),
+        }
+        # Git-Protocol(v2), Content-Encoding(gzip) 등 HTTP 헤더 전달
+        env.update({k: v for k, v in environ.items() if k.startswith('HTTP_')})
+
+        result = subprocess.run(['git', 'http-backend'], input=body, env=env, capture_output=True)
+        header_blob, _, payload = result.stdout.partition(b'\r\n\r\n')
+        if not _:
+            header_blob, _, payload = result.stdout.partition(b'\n\n')
+
+        status = '200 OK'
+        headers = []
+        for line in header_blob.decode('latin-1').splitlines():
+            if not line.strip():
+                continue
+            key, _, value = line.partition(':')
+            if key.lower() == 'status':
+                status = value.strip()
+            else:
+                headers.append((key.strip(), value.strip()))
+        start_response(status, headers)
+        return [payload]
+
+    return app
+
+
+class SmartHttpServer:
+    """wsgiref 기반 smart HTTP 로컬 원격 (테스트/벤치마크 전용)"""
+
+    def __init__(self, project_root: Path):
+        self.project_root = project_root
+        self.port = _free_port()
+        self.server = None
+        self.thread = None
+
+    def __enter__(self):
+        self.server = make_server('127.0.0.1', self.port, git_http_backend_app(self.project_root),
+                                  server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def url(self, name: str) -> str:
+        return f'http://127.0.0.1:{self.port}/{name}'
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'Server did not start on port {port}')
+
+
+# ---------------------------------------------------------------------- 측정
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _fresh_cache(cache_dir: Path, fresh_seconds: float):
+    """격리된 캐시 디렉토리로 RepoCloneCache 재생성 (백그라운드 작업 비활성화)"""
+    from src.repo_cache import RepoCloneCache
+
+    os.environ.update({
+        'REPO_CACHE_DIR': str(cache_dir),
+        'REPO_CACHE_BACKGROUND_SWEEP': 'false',
+        'REPO_CACHE_MAINTENANCE': 'false',
+        'REPO_CACHE_REFRESH': 'false',
+        'REPO_CACHE_FRESH_SECONDS': str(fresh_seconds),
+    })
+    RepoCloneCache.reset_instance()
+    return RepoCloneCache()
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run_once(url: str, source: Path, work_dir: Path, args) -> Dict[str, float]:
+    """한 번의 시나리오 세트 실행 (원격 저장소는 호출자가 매번 새로 생성)"""
+    cache_dir = work_dir / 'cache'
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    timings = {}
+    sizes = {}
+
+    cache = _fresh_cache(cache_dir, fresh_seconds=3600)
+    path = None
+
+    def cold():
+        nonlocal path
+        path = cache.get_or_clone(url)
+
+    timings['cold_clone'] = _timed(cold)
+    sizes['cold_clone'] = _dir_size(path)
+    timings['warm_hit'] = _timed(lambda: cache.get_or_clone(url))
+
+    cache._fresh_seconds = 0
+    timings['warm_hit_fetch'] = _timed(lambda: cache.get_or_clone(url))
+    timings['deepen'] = _timed(lambda: cache.get_or_clone(url, depth=args.deepen))
+    sizes['deepen'] = _dir_size(path)
+
+    append_commits(source, args.new_commits, args.files, args.blob_size, seed=args.seed + 1)
+    timings['fetch_after_new_commits'] = _timed(lambda: cache.get_or_clone(url))
+
+    cache_key = cache._get_cache_key(url)
+    timings['eviction'] = _timed(lambda: cache._invalidate_cache(cache_key))
+    return {'timings': timings, 'sizes': sizes}
+
+
+def _summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'max': max(samples),
+        'samples': samples,
+    }
+
+
+def run_benchmark(args) -> Dict:
+    """벤치마크 실행 후 JSON 직렬화 가능한 결과 반환"""
+    transports = [t.strip() for t in args.transports.split(',') if t.strip()]
+    work_root = Path(tempfile.mkdtemp(prefix='bench_repo_cache_'))
+    results = []
+    saved_environ = dict(os.environ)
+
+    try:
+        for transport in transports:
+            raw = {s: [] for s in SCENARIOS}
+            sizes = {}
+            for run in range(args.repeat):
+                serve_root = work_root / transport / f'run{run}'
+                serve_root.mkdir(parents=True)
+                source = create_synthetic_repo(serve_root / 'bench.git', args.commits, args.files,
+                                               args.blob_size, args.branches, seed=args.seed)
+
+                if transport == 'file':
+                    outcome = run_once(source.as_uri(), source, serve_root, args)
+                elif transport == 'daemon':
+                    with GitDaemon(serve_root) as daemon:
+                        outcome = run_once(daemon.url('bench.git'), source, serve_root, args)
+                elif transport == 'http':
+                    with SmartHttpServer(serve_root) as server:
+                        outcome = run_once(server.url('bench.git'), source, serve_root, args)
+                else:
+                    raise ValueError(f'Unknown transport: {transport}')
+
+                for scenario, seconds in outcome['timings'].items():
+                    raw[scenario].append(seconds)
+                sizes = outcome['sizes']
+
+            for scenario in SCENARIOS:
+                results.append({
+                    'transport': transport,
+                    'scenario': scenario,
+                    'seconds': _summarize(raw[scenario]),
+                    'bytes_on_disk': sizes.get(scenario),
+                })
+    finally:
+        from src.repo_cache import RepoCloneCache
+        RepoCloneCache.reset_instance()
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        if not args.keep:
+            shutil.rmtree(work_root, ignore_errors=True)
+
+    git_version = subprocess.run(['git', '--version'], capture_output=True, text=True).stdout.strip()
+    head = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                          capture_output=True, text=True).stdout.strip()
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git': git_version,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'revision': head or None,
+            'params': {k: getattr(args, k) for k in (
+                'commits', 'files', 'blob_size', 'branches', 'new_commits', 'deepen', 'repeat', 'seed'
+            )},
+            'env': {k: v for k, v in saved_environ.items() if k.startswith('REPO_CACHE_FETCH')},
+        },
+        'results': results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='RepoCloneCache offline benchmark')
+    parser.add_argument('--commits', type=int, default=500, help='main 브랜치 커밋 수')
+    parser.add_argument('--files', type=int, default=100, help='파일 수')
+    parser.add_argument('--blob-size', type=int, default=2048, help='파일 크기 (바이트)')
+    parser.add_argument('--branches', type=int, default=20, help='추가 브랜치 수')
+    parser.add_argument('--new-commits', type=int, default=20, help='fetch 측정 전에 추가할 커밋 수')
+    parser.add_argument('--deepen', type=int, default=200, help='deepen 측정 depth (50 초과)')
+    parser.add_argument('--transports', default='file,daemon,http', help='file,daemon,http 중 선택')
+    parser.add_argument('--repeat', type=int, default=3, help='반복 횟수')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='결과 JSON 파일 (기본: stdout)')
+    parser.add_argument('--keep', action='store_true', help='작업 디렉토리 유지')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+    else:
+        print(text)
+    return report
+
+
+if __name__ == '__main__':
+    main()
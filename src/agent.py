@@ -6,6 +6,8 @@ from azure.search.documents import SearchClient
 from azure.search.documents.indexes import SearchIndexClient
 from azure.core.credentials import AzureKeyCredential
 from dotenv import load_dotenv
+from src.index_alias import resolve_index_name
+from src.shared_history import ensure_membership_fields
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -50,9 +52,10 @@ def initialize_models() -> Tuple[AzureOpenAI, SearchClient, SearchIndexClient]:
         search_endpoint = os.getenv("AZURE_SEARCH_ENDPOINT")
         search_credential = AzureKeyCredential(os.getenv("AZURE_SEARCH_API_KEY"))
 
+        index_name = resolve_index_name(os.getenv("AZURE_SEARCH_INDEX_NAME"))
         search_client = SearchClient(
             endpoint=search_endpoint,
-            index_name=os.getenv("AZURE_SEARCH_INDEX_NAME"),
+            index_name=index_name,
             credential=search_credential
         )
 
@@ -62,6 +65,9 @@ def initialize_models() -> Tuple[AzureOpenAI, SearchClient, SearchIndexClient]:
             credential=search_credential
         )
 
+        # 저장소 필터가 repo_ids를 사용하므로 이전 인덱스에는 소속 필드 추가
+        ensure_membership_fields(index_client, index_name)
+
         logger.info("✓ All clients initialized successfully")
         return openai_client, search_client, index_client
 
@@ -6,6 +6,8 @@ Git 저장소의 커밋 히스토리를 분석하고 검색하는 대화형 웹
 import streamlit as st
 import os
 import sys
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -21,6 +23,8 @@ from src.tools import (
     find_frequent_bug_commits
 )
 from src.indexer import CommitIndexer
+from src.index_alias import resolve_index_name
+from src.index_progress import STAGES, STAGE_LABELS, format_progress
 from src.repo_cache import RepoCloneCache
 import logging
 
@@ -30,6 +34,27 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+
+def run_indexing_with_progress(indexer: CommitIndexer, repo_path: str, **kwargs) -> int:
+    """
+    인덱싱을 백그라운드 스레드에서 실행하고, 진행 이벤트를 스크립트 스레드에서 받아 단계별 진행 바로 표시합니다.
+    (Streamlit 요소는 스크립트 스레드에서만 갱신할 수 있으므로 이벤트는 큐로 전달)
+    """
+    events = queue.Queue()
+    bars = {stage: st.progress(0.0, text=f"{STAGE_LABELS[stage]} 대기 중") for stage in STAGES}
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="streamlit-index") as pool:
+        future = pool.submit(indexer.index_repository, repo_path, on_progress=events.put, **kwargs)
+        while not (future.done() and events.empty()):
+            try:
+                event = events.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            for stage, metrics in event["stages"].items():
+                fraction = min(1.0, (metrics["percent"] or 0.0) / 100)
+                bars[stage].progress(fraction, text=format_progress({"stage": stage, **metrics}))
+        return future.result()
+
+
 # Page configuration
 st.set_page_config(
     page_title="Git History Generator",
@@ -92,7 +117,7 @@ with st.sidebar:
 
     # Index Management
     st.subheader("🔧 Index Management")
-    index_name = os.getenv("AZURE_SEARCH_INDEX_NAME", "git-commits")
+    index_name = resolve_index_name()
     st.info(f"Current Index: `{index_name}`")
 
     # 인덱싱 옵션
@@ -183,7 +208,8 @@ with st.sidebar:
 
                         st.info(f"📊 인덱싱 옵션: {', '.join(info_parts)}")
 
-                        count = indexer.index_repository(
+                        count = run_indexing_with_progress(
+                            indexer,
                             repo_path,
                             limit=commit_limit,
                             since=since_str,
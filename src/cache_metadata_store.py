@@ -0,0 +1,306 @@
+"""
+저장소 클론 캐시 메타데이터 저장소
+SQLite(WAL 모드)로 항목 단위 원자적 갱신을 제공하여, 같은 캐시 디렉토리를 공유하는
+여러 워커 프로세스(gunicorn/Chainlit)가 서로의 항목을 덮어쓰지 않도록 합니다.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+# 고정 컬럼 (나머지 필드는 extra JSON 컬럼에 저장)
+_CORE_FIELDS = ('url', 'path', 'created_at', 'last_accessed')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    cache_key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    path TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    last_accessed TEXT,
+    extra TEXT NOT NULL DEFAULT '{}'
+)
+"""
+
+
+class CacheMetadataStore:
+    """캐시 메타데이터 SQLite 저장소 (프로세스/스레드 안전)"""
+
+    def __init__(
+        self,
+        db_path: str,
+        legacy_json_path: Optional[str] = None,
+        access_flush_interval: float = 60.0,
+        busy_timeout: float = 30.0
+    ):
+        """
+        Args:
+            db_path: SQLite 데이터베이스 파일 경로
+            legacy_json_path: 이전 버전의 cache_metadata.json 경로 (있으면 1회 마이그레이션)
+            access_flush_interval: last_accessed 갱신을 모아서 기록하는 주기 (초)
+            busy_timeout: 다른 프로세스가 쓰기 잠금을 잡고 있을 때 대기할 최대 시간 (초)
+        """
+        self.db_path = db_path
+        self.access_flush_interval = access_flush_interval
+        self.busy_timeout = busy_timeout
+
+        self._local = threading.local()
+        self._pending_lock = threading.Lock()
+        self._pending_access: Dict[str, str] = {}
+        self._last_flush = time.monotonic()
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        with self._transaction() as conn:
+            conn.execute(_SCHEMA)
+
+        if legacy_json_path:
+            self._migrate_legacy_json(legacy_json_path)
+
+    # ------------------------------------------------------------------ 연결
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 SQLite 연결 반환 (WAL 모드)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: 트랜잭션은 _transaction()에서 명시적으로 관리
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """쓰기 트랜잭션 (BEGIN IMMEDIATE로 읽기-수정-쓰기 경합 방지)"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    @staticmethod
+    def _row_to_entry(row) -> Dict:
+        """DB 행을 메타데이터 딕셔너리로 변환"""
+        _, url, path, created_at, last_accessed, extra = row
+        entry = {}
+        try:
+            entry.update(json.loads(extra or '{}'))
+        except ValueError:
+            logger.debug("Corrupted extra column ignored")
+        entry.update({
+            'url': url,
+            'path': path,
+            'created_at': created_at,
+            'last_accessed': last_accessed,
+        })
+        return entry
+
+    @staticmethod
+    def _split_entry(entry: Dict):
+        """메타데이터 딕셔너리를 고정 컬럼 값과 extra JSON으로 분리"""
+        extra = {k: v for k, v in entry.items() if k not in _CORE_FIELDS}
+        return (
+            entry['url'],
+            entry['path'],
+            entry['created_at'],
+            entry.get('last_accessed'),
+            json.dumps(extra, ensure_ascii=False),
+        )
+
+    # ------------------------------------------------------------------ 조회
+
+    def load_all(self) -> Dict[str, Dict]:
+        """모든 캐시 항목 로드"""
+        rows = self._connect().execute('SELECT * FROM entries').fetchall()
+        entries = {row[0]: self._row_to_entry(row) for row in rows}
+        self._apply_pending(entries)
+        return entries
+
+    def get(self, cache_key: str) -> Optional[Dict]:
+        """단일 캐시 항목 조회 (없으면 None)"""
+        row = self._connect().execute(
+            'SELECT * FROM entries WHERE cache_key = ?', (cache_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        entries = {cache_key: self._row_to_entry(row)}
+        self._apply_pending(entries)
+        return entries[cache_key]
+
+    def _apply_pending(self, entries: Dict[str, Dict]):
+        """아직 기록되지 않은 접근 시간을 조회 결과에 반영"""
+        with self._pending_lock:
+            for key, accessed in self._pending_access.items():
+                entry = entries.get(key)
+                if entry and (entry.get('last_accessed') or '') < accessed:
+                    entry['last_accessed'] = accessed
+
+    # ------------------------------------------------------------------ 쓰기
+
+    def put(self, cache_key: str, entry: Dict):
+        """캐시 항목 저장 (전체 교체)"""
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO entries '
+                '(cache_key, url, path, created_at, last_accessed, extra) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (cache_key, *self._split_entry(entry))
+            )
+
+    def update(self, cache_key: str, **fields) -> Optional[Dict]:
+        """
+        캐시 항목의 일부 필드만 원자적으로 갱신합니다.
+
+        Args:
+            cache_key: 캐시 키
+            **fields: 갱신할 필드 (None 값은 해당 필드 삭제)
+
+        Returns:
+            Dict: 갱신된 항목 (항목이 없으면 None)
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT * FROM entries WHERE cache_key = ?', (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            entry = self._row_to_entry(row)
+            for key, value in fields.items():
+                if value is None and key not in _CORE_FIELDS:
+                    entry.pop(key, None)
+                else:
+                    entry[key] = value
+
+            conn.execute(
+                'UPDATE entries SET url = ?, path = ?, created_at = ?, last_accessed = ?, extra = ? '
+                'WHERE cache_key = ?',
+                (*self._split_entry(entry), cache_key)
+            )
+            return entry
+
+    def delete(self, cache_key: str):
+        """캐시 항목 삭제"""
+        with self._pending_lock:
+            self._pending_access.pop(cache_key, None)
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM entries WHERE cache_key = ?', (cache_key,))
+
+    def clear(self):
+        """모든 캐시 항목 삭제"""
+        with self._pending_lock:
+            self._pending_access.clear()
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM entries')
+
+    # ------------------------------------------------------------------ 접근 시간
+
+    def touch(self, cache_key: str, accessed_at: Optional[str] = None):
+        """
+        마지막 접근 시간 갱신 (즉시 기록하지 않고 모아서 기록)
+
+        Args:
+            cache_key: 캐시 키
+            accessed_at: 접근 시각 (ISO 8601, 기본값: 현재 시각)
+        """
+        accessed_at = accessed_at or datetime.now().isoformat()
+        with self._pending_lock:
+            if (self._pending_access.get(cache_key) or '') < accessed_at:
+                self._pending_access[cache_key] = accessed_at
+            due = time.monotonic() - self._last_flush >= self.access_flush_interval
+
+        if due:
+            self.flush_access()
+
+    def flush_access(self) -> int:
+        """
+        모아둔 접근 시간을 한 번의 트랜잭션으로 기록합니다.
+        다른 프로세스가 더 최근 시각을 기록했다면 덮어쓰지 않습니다.
+
+        Returns:
+            int: 기록된 항목 수
+        """
+        with self._pending_lock:
+            pending = self._pending_access
+            self._pending_access = {}
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return 0
+
+        try:
+            with self._transaction() as conn:
+                conn.executemany(
+                    'UPDATE entries SET last_accessed = ? '
+                    'WHERE cache_key = ? AND COALESCE(last_accessed, \'\') < ?',
+                    [(accessed, key, accessed) for key, accessed in pending.items()]
+                )
+            logger.debug(f"Flushed {len(pending)} access time updates")
+            return len(pending)
+        except sqlite3.Error as e:
+            # 실패 시 다음 flush에서 재시도
+            logger.warning(f"Failed to flush access times: {e}")
+            with self._pending_lock:
+                for key, accessed in pending.items():
+                    if (self._pending_access.get(key) or '') < accessed:
+                        self._pending_access[key] = accessed
+            return 0
+
+    # ------------------------------------------------------------------ 기타
+
+    def _migrate_legacy_json(self, json_path: str):
+        """이전 cache_metadata.json 내용을 1회 가져옵니다."""
+        if not os.path.exists(json_path):
+            return
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to read legacy cache metadata: {e}")
+            return
+
+        imported = 0
+        with self._transaction() as conn:
+            for cache_key, entry in (legacy or {}).items():
+                if not all(k in entry for k in ('url', 'path', 'created_at')):
+                    continue
+                # 이미 다른 워커가 기록한 항목은 유지
+                conn.execute(
+                    'INSERT OR IGNORE INTO entries '
+                    '(cache_key, url, path, created_at, last_accessed, extra) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (cache_key, *self._split_entry(entry))
+                )
+                imported += 1
+
+        try:
+            os.replace(json_path, json_path + '.migrated')
+        except OSError as e:
+            logger.debug(f"Could not rename legacy metadata file: {e}")
+
+        logger.info(f"Migrated {imported} entries from legacy cache metadata: {json_path}")
+
+    def close(self):
+        """대기 중인 접근 시간을 기록하고 현재 스레드의 연결을 닫습니다."""
+        self.flush_access()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            try:
+                conn.close()
+            finally:
+                self._local.conn = None
@@ -0,0 +1,90 @@
+"""
+협조적 취소 토큰과 인덱싱 예산
+클론, 커밋 추출, 임베딩 배치, 업로드 단계가 같은 토큰을 공유하며 작업 경계마다 확인합니다.
+취소되거나 시간/토큰 예산을 넘으면 새 작업을 시작하지 않고, 이미 끝난 작업(업로드된 문서, 체크포인트, 캐시)은 그대로 남깁니다.
+"""
+
+import time
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IndexingCancelled(Exception):
+    """취소 토큰이 취소되었거나 예산을 넘어 작업이 중단됨"""
+
+    def __init__(self, reason: str, indexed: Optional[int] = None):
+        """
+        Args:
+            reason: 중단 사유
+            indexed: 중단 전까지 인덱싱된 문서 수 (알 수 있는 경우)
+        """
+        super().__init__(reason)
+        self.reason = reason
+        self.indexed = indexed
+
+
+class CancellationToken:
+    """여러 스레드에서 공유하는 취소 토큰 (선택적으로 경과 시간/임베딩 토큰 예산 포함)"""
+
+    def __init__(self, max_seconds: Optional[float] = None, max_tokens: Optional[int] = None):
+        """
+        Args:
+            max_seconds: 생성 시점부터의 경과 시간 예산 (초, None이면 제한 없음)
+            max_tokens: 임베딩 요청에 쓸 수 있는 토큰 예산 (요청 전 추정치로 예약, 성공한 요청의 사용량으로 정산. None이면 제한 없음)
+        """
+        self.deadline = time.monotonic() + max_seconds if max_seconds else None
+        self.max_tokens = max_tokens or None
+        self.tokens_used = 0
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """취소 (처음 사유만 기록)"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+        logger.warning(f"⏹️ Indexing cancellation requested: {reason}")
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("time budget exceeded")
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise IndexingCancelled(self.reason)
+
+    def spend_tokens(self, tokens: int) -> None:
+        """
+        임베딩 요청 직전에 추정 토큰만큼 예산을 예약합니다. 예산을 넘으면 요청을 보내지 않도록 취소합니다.
+        요청이 끝나면 settle_tokens로 실제 사용량에 맞춰 정산합니다.
+
+        Raises:
+            IndexingCancelled: 이미 취소되었거나 예산을 넘는 경우
+        """
+        self.raise_if_cancelled()
+        with self._lock:
+            if self.max_tokens is None or self.tokens_used + tokens <= self.max_tokens:
+                self.tokens_used += tokens
+                return
+        self.cancel(f"token budget exceeded ({self.tokens_used} of {self.max_tokens} tokens used)")
+        raise IndexingCancelled(self.reason)
+
+    def settle_tokens(self, reserved: int, used: int) -> None:
+        """spend_tokens로 예약한 토큰을 실제 사용량으로 정산 (실패한 요청은 used=0으로 예약 반환)"""
+        with self._lock:
+            self.tokens_used += used - reserved
+
+    def wait(self, seconds: float) -> bool:
+        """최대 seconds초 대기 (백오프용, 도중에 취소되면 즉시 반환). 취소되었으면 True"""
+        if self.deadline is not None:
+            seconds = min(seconds, max(0.0, self.deadline - time.monotonic()))
+        self._event.wait(seconds)
+        return self.cancelled
@@ -17,7 +17,7 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 # 도구 레지스트리와 실행기(분리된 모듈)
-from src.tool_executor import initialize_clients, execute_tool
+from src.tool_executor import initialize_clients, execute_tool, cancel_indexing
 
 from datetime import datetime
 TODAY=datetime.today().strftime('%Y-%m-%d')
@@ -50,9 +50,10 @@ SYSTEM_PROMPT_PARTS = [
     "# 인덱싱 전략",
     f"1. 분석 요청시: list_indexed_repositories → get_commit_count 확인",
     f"2. 기본: 최근 {DEFAULT_INDEX_LIMIT}개, HEAD부터 시작, skip_existing=true",
-    "3. 증분: skip_offset으로 과거 커밋 추가",
+    "3. 증분: limit을 늘리면 인덱싱된 범위 아래로 과거 커밋만 추가 (새 커밋은 매번 자동 반영)",
     "4. **중요**: 인덱싱수 < 전체수 → 추가 필요. '전부' 요청시 100% 완료까지",
-    "5. 규모별: ~500(기본), 500~1000(skip_offset), 1000+(날짜범위)",
+    "5. 규모별: ~500(기본), 500~1000(limit 증가), 1000+(날짜범위)",
+    "6. 큰 작업(limit 1000+ 또는 '전체') 전: estimate_indexing으로 토큰/소요 시간 확인 후 사용자에게 알리고 진행",
     "",
     "# 증분 인덱싱 결과 해석",
     "- 로그에 'Skipped N already indexed commits' 표시 → **정상 동작**",
@@ -64,8 +65,9 @@ SYSTEM_PROMPT_PARTS = [
     "- **'전부', '다 해', '전체', '모든' 등의 요청 시**:",
     "  1. get_commit_count로 전체 커밋 개수(N) 확인",
     "  2. list_indexed_repositories로 이미 인덱싱된 개수(M) 확인",
-    "  3. index_repository 호출 시 limit=N 설정 (증분 인덱싱 자동 적용됨)",
-    "  4. 완료 후 실제 인덱싱된 개수 확인 및 검증",
+    "  3. estimate_indexing(limit=N)으로 임베딩 토큰/예상 시간 확인 (추측 금지)",
+    "  4. index_repository 호출 시 limit=N 설정 (증분 인덱싱 자동 적용됨)",
+    "  5. 완료 후 실제 인덱싱된 개수 확인 및 검증",
     "- **절대 limit 없이 호출하지 말 것** (기본값 500개만 처리됨)",
     "",
     "# 자연어 인덱싱 요청",
@@ -92,6 +94,7 @@ SYSTEM_PROMPT_PARTS = [
     "# 도구",
     "- search_commits: 자동 UI 확인",
     "- index_repository: 대용량시 자동 UI 확인",
+    "- estimate_indexing: 인덱싱 전 비용/시간 추정 (within_budget=false면 범위를 줄이도록 안내)",
     "- 날짜: YYYY-MM-DD 형식",
 ]
 
@@ -453,6 +456,10 @@ async def on_stop():
     """사용자가 중지 버튼을 클릭했을 때 - Chainlit chat life cycle의 on_stop 훅"""
     logger.info("User requested to stop the task")
     cl.user_session.set("is_processing", False)
+    if cancel_indexing("stopped by user"):
+        # 진행 중인 요청이 끝나면 인덱싱이 중단되고, 업로드된 커밋과 체크포인트는 유지됨
+        await cl.Message(content="⏸️ 인덱싱을 중지하는 중입니다. 완료된 커밋은 유지되며 다시 실행하면 이어서 진행합니다.").send()
+        return
     await cl.Message(content="⏸️ 작업이 중지되었습니다.").send()
 
 
@@ -462,6 +469,7 @@ async def on_chat_end():
     logger.info("Chat session ended")
     # 세션 정리 (필요시)
     cl.user_session.set("is_processing", False)
+    cancel_indexing("chat session ended")
     cl.user_session.set("conversation_history", None)
     cl.user_session.set("openai_client", None)
     cl.user_session.set("search_client", None)
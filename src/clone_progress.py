@@ -0,0 +1,150 @@
+"""
+Git 클론/fetch 진행 상황 이벤트
+워커 스레드에서 실행되는 git 작업의 진행 틱을 초당 최대 N개의 이벤트로 합쳐(coalesce)
+이벤트 루프 쪽 스트림으로 전달합니다.
+
+이벤트 형식 (dict):
+    {"stage": "Receiving objects", "current": 120, "total": 400,
+     "percent": 30.0, "message": "...", "elapsed": 1.2}
+stage 값 중 "start" / "done" / "error" 는 작업 시작/완료/실패를 나타냅니다.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, Optional
+
+import git
+
+from src.cancellation import CancellationToken, IndexingCancelled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_EVENTS_PER_SECOND = float(os.getenv("REPO_CLONE_PROGRESS_EVENTS_PER_SECOND", "2"))
+
+
+def make_event(stage: str, current: Optional[float] = None, total: Optional[float] = None,
+               message: str = '', elapsed: float = 0.0) -> Dict:
+    """진행 이벤트 dict 생성"""
+    percent = round(current / total * 100, 1) if current is not None and total else None
+    return {
+        "stage": stage,
+        "current": current,
+        "total": total,
+        "percent": percent,
+        "message": message,
+        "elapsed": round(elapsed, 2),
+    }
+
+
+class CoalescingCloneProgress(git.RemoteProgress):
+    """
+    GitPython 진행 콜백. 매 틱마다 호출되지만 이벤트는
+    단계가 바뀔 때와 최소 간격(1 / max_events_per_second)이 지났을 때만 내보냅니다.
+    """
+
+    def __init__(self, sink: Optional[Callable[[Dict], None]] = None,
+                 max_events_per_second: Optional[float] = None,
+                 cancel_token: Optional[CancellationToken] = None):
+        """
+        Args:
+            sink: 이벤트 수신 함수 (워커 스레드에서 호출되므로 스레드 안전해야 함)
+            max_events_per_second: 초당 최대 이벤트 수 (기본값: REPO_CLONE_PROGRESS_EVENTS_PER_SECOND)
+            cancel_token: 취소 토큰 (취소되면 진행 틱에서 예외를 내 출력 스트림을 닫고, git은 다음 쓰기에서 종료됨)
+        """
+        super().__init__()
+        self.sink = sink
+        self.cancel_token = cancel_token
+        rate = max_events_per_second or DEFAULT_MAX_EVENTS_PER_SECOND
+        self.min_interval = 1.0 / rate if rate > 0 else 0.0
+        self.start_time = time.monotonic()
+        self.last_emit_time = 0.0
+        self.last_log_time = self.start_time
+        self.current_stage = None
+        self.stage_start_time = self.start_time
+        self.ticks = 0
+        self.events_emitted = 0
+
+    def _get_stage_name(self, op_code):
+        """작업 코드에서 단계 이름 추출"""
+        if op_code & self.COUNTING:
+            return "Counting objects"
+        elif op_code & self.COMPRESSING:
+            return "Compressing objects"
+        elif op_code & self.RECEIVING:
+            return "Receiving objects"
+        elif op_code & self.RESOLVING:
+            return "Resolving deltas"
+        elif op_code & self.FINDING_SOURCES:
+            return "Finding sources"
+        elif op_code & self.CHECKING_OUT:
+            return "Checking out files"
+        else:
+            return "Processing"
+
+    def emit(self, event: Dict):
+        """이벤트를 sink로 전달 (sink 오류는 git 작업에 영향 주지 않음)"""
+        self.events_emitted += 1
+        self.last_emit_time = time.monotonic()
+        if self.sink:
+            try:
+                self.sink(event)
+            except Exception as e:
+                logger.debug(f"Progress sink failed: {e}")
+
+    def update(self, op_code, cur_count, max_count=None, message=''):
+        self.ticks += 1
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            raise IndexingCancelled(self.cancel_token.reason)
+        stage = self._get_stage_name(op_code)
+        now = time.monotonic()
+
+        stage_changed = stage != self.current_stage
+        if stage_changed:
+            if self.current_stage:
+                logger.info(f"✓ {self.current_stage} completed in {now - self.stage_start_time:.1f}s")
+            self.current_stage = stage
+            self.stage_start_time = now
+            logger.info(f"▶ {stage}...")
+
+        # 5초마다 진행 상황 로그
+        if now - self.last_log_time >= 5:
+            if max_count:
+                logger.info(f"  🔄 {stage}: {cur_count / max_count * 100:.1f}% ({int(cur_count):,}/{int(max_count):,})")
+            else:
+                logger.info(f"  🔄 {stage}: {int(cur_count):,} items")
+            self.last_log_time = now
+
+        if stage_changed or now - self.last_emit_time >= self.min_interval:
+            self.emit(make_event(stage, cur_count, max_count or None, message, now - self.start_time))
+
+
+class CloneProgressStream:
+    """
+    워커 스레드 → 이벤트 루프 진행 이벤트 스트림
+    `push` 는 어느 스레드에서나 호출할 수 있고, 소비자는 `async for` 로 읽습니다.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def push(self, event: Dict):
+        """이벤트 추가 (스레드 안전)"""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    def close(self):
+        """스트림 종료 (스레드 안전)"""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, self._CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict:
+        event = await self._queue.get()
+        if event is self._CLOSED:
+            raise StopAsyncIteration
+        return event
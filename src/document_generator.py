@@ -3,7 +3,7 @@ Git 저장소에서 커밋 히스토리를 추출하는 문서 생성기
 """
 
 import git
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable, Iterator, Sequence, Tuple
 from collections import defaultdict
 import logging
 import asyncio
@@ -14,6 +14,7 @@ import json
 import hashlib
 from pathlib import Path
 from src.repo_cache import RepoCloneCache
+from src.cancellation import CancellationToken, IndexingCancelled
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,10 +23,11 @@ logger = logging.getLogger(__name__)
 class DocumentGenerator:
     """Git 저장소에서 커밋 정보를 추출합니다."""
 
-    def __init__(self, repo_path: str):
+    def __init__(self, repo_path: str, cancel_token: Optional[CancellationToken] = None):
         """
         Args:
             repo_path: Git 저장소 경로 또는 URL (https://github.com/...)
+            cancel_token: 취소 토큰 (클론/fetch와 커밋 추출의 기본값)
 
         Raises:
             git.exc.InvalidGitRepositoryError: 유효한 Git 저장소가 아닌 경우
@@ -34,25 +36,25 @@ class DocumentGenerator:
         self.is_remote = False
         self.use_cache = False  # 캐시 사용 여부
         self.repo_path = repo_path
-
-        # 커밋 메타데이터 캐시 초기화
-        self._setup_commit_cache()
+        self.cancel_token = cancel_token
+        commit_cache_id = None  # 포크 패밀리가 확인되면 패밀리 단위로 커밋 캐시 공유
 
         try:
             # URL인지 확인
-            if repo_path.startswith(('http://', 'https://', 'git@', 'ssh://')):
+            if repo_path.startswith(('http://', 'https://', 'git@', 'ssh://', 'file://')):
                 self.is_remote = True
                 self.use_cache = True
                 logger.info(f"Detected remote repository: {repo_path}")
 
                 # 캐시에서 가져오거나 새로 클론 (shallow clone - depth=50)
                 cache = RepoCloneCache()
-                cached_path = cache.get_or_clone(repo_path, depth=None)  # None = shallow clone
+                cached_path = cache.get_or_clone(repo_path, depth=None, cancel_token=cancel_token)  # None = shallow clone
 
                 # 캐시된 경로 사용 (temp_dir는 설정하지 않음 - 캐시 매니저가 관리)
                 self.repo = git.Repo(cached_path)
                 self.cached_path = cached_path
                 self.repo_url = repo_path
+                commit_cache_id = cache.get_family_key(repo_path)
                 logger.info(f"Using repository from cache: {cached_path}")
             else:
                 # 로컬 저장소
@@ -69,15 +71,26 @@ class DocumentGenerator:
             logger.error(f"Git command failed: {e}")
             self._cleanup()
             raise
+        except IndexingCancelled:
+            self._cleanup()
+            raise
         except Exception as e:
             logger.error(f"Failed to initialize repository: {e}")
             self._cleanup()
             raise
 
-    def _setup_commit_cache(self):
-        """커밋 메타데이터 캐시 디렉토리 설정"""
-        # 저장소별 캐시 키 생성
-        repo_hash = hashlib.md5(self.repo_path.encode()).hexdigest()[:12]
+        # 커밋 메타데이터 캐시 초기화
+        self._setup_commit_cache(commit_cache_id)
+
+    def _setup_commit_cache(self, cache_id: Optional[str] = None):
+        """
+        커밋 메타데이터 캐시 디렉토리 설정
+
+        Args:
+            cache_id: 캐시 디렉토리 키 (포크 패밀리 키 등). 없으면 저장소 경로 해시 사용
+        """
+        # 저장소별 캐시 키 생성 (커밋 SHA 단위 캐시이므로 같은 패밀리의 포크끼리 공유 가능)
+        repo_hash = cache_id or hashlib.md5(self.repo_path.encode()).hexdigest()[:12]
 
         # 캐시 루트 디렉토리 결정
         if 'REPO_CACHE_DIR' in os.environ:
@@ -158,7 +171,8 @@ class DocumentGenerator:
         branch: str = "HEAD",
         since: Optional[str] = None,
         until: Optional[str] = None,
-        skip: int = 0
+        skip: int = 0,
+        cancel_token: Optional[CancellationToken] = None
     ) -> List[Dict]:
         """
         커밋 히스토리를 추출합니다.
@@ -169,10 +183,15 @@ class DocumentGenerator:
             since: 시작 날짜 (ISO 8601 형식, 예: '2024-01-01')
             until: 종료 날짜 (ISO 8601 형식, 예: '2024-12-31')
             skip: HEAD부터 건너뛸 커밋 수 (기본값: 0)
+            cancel_token: 취소 토큰 (기본값: 생성 시 지정한 토큰, 커밋마다 확인)
 
         Returns:
             List[Dict]: 커밋 정보 리스트 (변경 문맥 및 함수 분석 포함)
+
+        Raises:
+            IndexingCancelled: 추출 중 취소된 경우 (그때까지 분석한 커밋은 캐시에 저장됨)
         """
+        cancel_token = cancel_token or self.cancel_token
         try:
             commits = []
             new_commits_count = 0
@@ -180,97 +199,23 @@ class DocumentGenerator:
 
             logger.info(f"Extracting commits from {branch} (limit: {limit}, since: {since}, until: {until}, skip: {skip})")
 
-            # 날짜 범위 또는 skip이 지정된 경우 더 깊게 fetch 필요
-            if self.is_remote and self.cached_path and self.repo_url:
-                fetch_depth = None  # 기본값 (fetch 안 함)
-
-                if skip > 0:
-                    # skip offset이 있으면 충분한 depth 필요
-                    fetch_depth = skip + (limit if limit else 100)
-                    logger.info(f"Skip offset {skip} detected, ensuring depth >= {fetch_depth}")
-                elif since or until:
-                    # 날짜 범위가 지정된 경우, 충분히 깊게 fetch (최대 1000개)
-                    fetch_depth = 1000
-                    logger.info(f"Date range specified, fetching deeper (depth={fetch_depth})")
-
-                if fetch_depth:
-                    from src.repo_cache import RepoCloneCache
-                    cache = RepoCloneCache()
-                    # 필요한 만큼 깊게 fetch
-                    cache.get_or_clone(self.repo_url, depth=fetch_depth)
-                    # 저장소 reload
-                    self.repo = git.Repo(self.cached_path)
-
-            # 날짜 필터링 옵션 설정
-            kwargs = {'max_count': limit} if limit else {}
-            if since:
-                kwargs['since'] = since
-            if until:
-                kwargs['until'] = until
-            if skip > 0:
-                kwargs['skip'] = skip
-
-            commit_list = list(self.repo.iter_commits(branch, **kwargs))
+            rev, kwargs = self._prepare_history(limit, branch, since, until, skip)
+            commit_list = list(self.repo.iter_commits(rev, **kwargs))
 
             for idx, commit in enumerate(commit_list):
-                try:
-                    commit_sha = commit.hexsha
-
-                    # 캐시에서 먼저 확인
-                    cached_data = self._get_cached_commit(commit_sha)
-                    if cached_data:
-                        commits.append(cached_data)
-                        cached_commits_count += 1
-                        logger.debug(f"Using cached commit: {commit_sha[:8]}")
-                        continue
-
-                    # 캐시에 없으면 새로 생성
-                    commit_data = {
-                        "id": commit_sha,
-                        "message": commit.message.strip(),
-                        "author": commit.author.name,
-                        "author_email": commit.author.email,
-                        "date": commit.committed_datetime.isoformat(),
-                        "parents": [p.hexsha for p in commit.parents],
-                        "files": self.get_changed_files(commit)
-                    }
-
-                    # 커밋 간 변경사항 문맥 추가
-                    commit_data["change_context"] = self.get_change_context(commit)
-
-                    # 함수/기능 분석 메타데이터 추가
-                    commit_data["function_analysis"] = self.analyze_functions_in_commit(commit)
-
-                    # 이전 커밋과의 관계 분석 (첫 커밋이 아닌 경우)
-                    if idx < len(commit_list) - 1:
-                        previous_commit = commit_list[idx + 1]
-                        commit_data["relation_to_previous"] = self.get_commit_relation(
-                            commit, previous_commit
-                        )
-                    else:
-                        commit_data["relation_to_previous"] = None
-
-                    # 캐시에 저장
-                    self._cache_commit(commit_sha, commit_data)
-                    commits.append(commit_data)
-                    new_commits_count += 1
-
-                except git.exc.GitCommandError as e:
-                    # shallow clone에서 커밋이 없는 경우 더 fetch
-                    if 'does not have' in str(e) or 'unknown revision' in str(e):
-                        logger.warning(f"Commit not in shallow clone, fetching more history...")
-                        if self.is_remote and self.cached_path and self.repo_url:
-                            from src.repo_cache import RepoCloneCache
-                            cache = RepoCloneCache()
-                            # 더 깊게 fetch (depth=1000)
-                            cache.get_or_clone(self.repo_url, depth=1000, ensure_commit=commit.hexsha)
-                            # 재시도
-                            continue
-                    logger.warning(f"Failed to process commit {commit.hexsha[:8]}: {e}")
-                    continue
-                except Exception as e:
-                    logger.warning(f"Failed to process commit {commit.hexsha[:8]}: {e}")
+                if cancel_token is not None and cancel_token.cancelled:
+                    if new_commits_count > 0:
+                        self._save_commit_cache()
+                    raise IndexingCancelled(cancel_token.reason)
+                previous_commit = commit_list[idx + 1] if idx < len(commit_list) - 1 else None
+                commit_data, from_cache = self._extract_commit(commit, previous_commit)
+                if commit_data is None:
                     continue
+                commits.append(commit_data)
+                if from_cache:
+                    cached_commits_count += 1
+                else:
+                    new_commits_count += 1
 
             # 주기적으로 캐시 저장 (메모리 절약)
             if new_commits_count > 0:
@@ -279,10 +224,275 @@ class DocumentGenerator:
             logger.info(f"✓ Extracted {len(commits)} commits (cached: {cached_commits_count}, new: {new_commits_count})")
             return commits
 
+        except IndexingCancelled:
+            logger.info("Commit extraction cancelled")
+            raise
         except Exception as e:
             logger.error(f"Failed to get commits: {e}")
             raise
 
+    def iter_commit_batches(
+        self,
+        batch_size: int = 100,
+        limit: Optional[int] = None,
+        branch: str = "HEAD",
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        skip: int = 0,
+        shas: Optional[Sequence[str]] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Iterator[List[Dict]]:
+        """
+        커밋 히스토리를 batch_size 단위로 스트리밍 추출합니다.
+        전체 목록을 메모리에 올리지 않고 iter_commits를 그대로 따라가며, 배치마다 커밋 캐시를 저장합니다.
+        shas가 주어지면 히스토리 대신 해당 커밋들을 주어진 순서대로 추출합니다 (워터마크 범위).
+
+        Args:
+            batch_size: 배치당 커밋 수
+            limit: 추출할 최대 커밋 수 (None이면 전체)
+            branch: 추출할 브랜치 (기본값: HEAD)
+            since: 시작 날짜 (ISO 8601 형식)
+            until: 종료 날짜 (ISO 8601 형식)
+            skip: HEAD부터 건너뛸 커밋 수
+            shas: 추출할 커밋 SHA 목록 (지정 시 limit/branch/since/until/skip 무시)
+            cancel_token: 취소 토큰 (기본값: 생성 시 지정한 토큰, 커밋마다 확인)
+
+        Yields:
+            List[Dict]: 커밋 정보 배치 (get_commits와 같은 형식)
+
+        Raises:
+            IndexingCancelled: 추출 중 취소된 경우 (이미 내보낸 배치는 그대로, 분석한 커밋은 캐시에 저장됨)
+        """
+        cancel_token = cancel_token or self.cancel_token
+        batch_size = max(1, batch_size)
+        logger.info(f"Streaming commits from {branch} (batch: {batch_size}, limit: {limit}, since: {since}, until: {until}, skip: {skip})")
+
+        if shas is not None:
+            history = (self.repo.commit(sha) for sha in shas)
+        else:
+            rev, kwargs = self._prepare_history(limit, branch, since, until, skip)
+            history = self.repo.iter_commits(rev, **kwargs)
+        batch: List[Dict] = []
+        total = new_total = 0
+        has_new = False
+
+        # 이전 커밋과의 관계 분석에 다음 커밋이 필요하므로 한 개씩 앞서 읽음
+        current = next(history, None)
+        while current is not None:
+            if cancel_token is not None and cancel_token.cancelled:
+                if has_new:
+                    self._save_commit_cache()
+                raise IndexingCancelled(cancel_token.reason)
+            following = next(history, None)
+            commit_data, from_cache = self._extract_commit(current, following)
+            current = following
+            if commit_data is None:
+                continue
+            batch.append(commit_data)
+            if not from_cache:
+                has_new = True
+                new_total += 1
+            if len(batch) >= batch_size:
+                if has_new:
+                    self._save_commit_cache()
+                    has_new = False
+                total += len(batch)
+                yield batch
+                batch = []
+
+        if has_new:
+            self._save_commit_cache()
+        if batch:
+            total += len(batch)
+            yield batch
+        logger.info(f"✓ Streamed {total} commits (new: {new_total})")
+
+    def extract_commits_by_sha(self, shas: Iterable[str], reanalyze: bool = False) -> Dict[str, Dict]:
+        """
+        지정한 SHA의 커밋 정보를 추출합니다 (캐시 우선, 새로 분석한 커밋은 캐시에 저장).
+
+        Args:
+            shas: 커밋 SHA 목록
+            reanalyze: 캐시를 쓰지 않고 다시 분석 (캐시도 새 결과로 교체)
+
+        Returns:
+            Dict[str, Dict]: {SHA: 커밋 정보} (저장소에 없거나 처리에 실패한 커밋은 제외)
+        """
+        commits: Dict[str, Dict] = {}
+        new_count = 0
+        following: Optional[Dict[str, str]] = None
+        for sha in shas:
+            commit_data = None if reanalyze else self._get_cached_commit(sha)
+            if commit_data is None:
+                # 캐시에 없거나 다시 분석: 커밋 객체가 필요 (shallow clone 밖이면 건너뜀)
+                # 이전 커밋은 인덱싱(워터마크 범위)과 같이 HEAD 기준 topo 순서의 다음 커밋
+                if following is None:
+                    following = self._history_neighbours()
+                try:
+                    commit = self.repo.commit(sha)
+                    previous_commit = self.repo.commit(following[sha]) if sha in following else None
+                except Exception:
+                    continue
+                if reanalyze:
+                    self._commit_cache.pop(sha, None)
+                commit_data, from_cache = self._extract_commit(commit, previous_commit)
+                if commit_data is None:
+                    continue
+                if not from_cache:
+                    new_count += 1
+            commits[sha] = commit_data
+
+        if new_count > 0:
+            self._save_commit_cache()
+        return commits
+
+    def _history_neighbours(self) -> Dict[str, str]:
+        """HEAD 기준 topo 순서에서 {커밋 SHA: 다음(이전 시점) 커밋 SHA} (인덱싱 시 관계 분석 대상)"""
+        try:
+            history = self.repo.git.rev_list('--topo-order', 'HEAD').split()
+        except git.exc.GitCommandError as e:
+            logger.warning(f"Failed to list history for commit neighbours: {e}")
+            return {}
+        return dict(zip(history, history[1:]))
+
+    def fetch_full_history(self) -> None:
+        """원격 저장소의 캐시 클론을 전체 히스토리로 확장 (shallow 경계 제거, 전체 히스토리가 필요한 경우만)"""
+        if not (self.is_remote and self.cached_path and self.repo_url):
+            return
+        logger.info("Fetching full history for watermark range")
+        RepoCloneCache().get_or_clone(self.repo_url, depth=0, cancel_token=self.cancel_token)
+        self.repo = git.Repo(self.cached_path)
+
+    def deepen_history(self, commits: int) -> bool:
+        """
+        원격 저장소의 shallow 캐시 클론을 경계에서 commits개만큼 더 받습니다.
+
+        Returns:
+            bool: 히스토리를 더 받았으면 True (로컬 저장소이거나 이미 전체 클론이면 False)
+        """
+        if not (self.is_remote and self.cached_path and self.repo_url):
+            return False
+        if not RepoCloneCache().deepen(self.repo_url, commits, cancel_token=self.cancel_token):
+            return False
+        self.repo = git.Repo(self.cached_path)
+        return True
+
+    def _prepare_history(
+        self,
+        limit: Optional[int],
+        branch: str,
+        since: Optional[str],
+        until: Optional[str],
+        skip: int
+    ) -> Tuple[str, Dict]:
+        """
+        히스토리 순회 전에 필요한 만큼 fetch하고 iter_commits 인자를 만듭니다.
+
+        Returns:
+            Tuple[str, Dict]: (리비전, iter_commits kwargs)
+        """
+        # 날짜 범위 또는 skip이 지정된 경우 더 깊게 fetch 필요
+        if self.is_remote and self.cached_path and self.repo_url:
+            fetch_depth = None  # 기본값 (fetch 안 함)
+
+            if skip > 0:
+                # skip offset이 있으면 충분한 depth 필요
+                fetch_depth = skip + (limit if limit else 100)
+                logger.info(f"Skip offset {skip} detected, ensuring depth >= {fetch_depth}")
+            elif since or until:
+                # 날짜 범위가 지정된 경우, 충분히 깊게 fetch (최대 1000개)
+                fetch_depth = 1000
+                logger.info(f"Date range specified, fetching deeper (depth={fetch_depth})")
+
+            if fetch_depth:
+                cache = RepoCloneCache()
+                # 필요한 만큼 깊게 fetch
+                cache.get_or_clone(self.repo_url, depth=fetch_depth, cancel_token=self.cancel_token)
+                # 저장소 reload
+                self.repo = git.Repo(self.cached_path)
+
+        # 날짜 필터링 옵션 설정
+        kwargs = {'max_count': limit} if limit else {}
+        if since:
+            kwargs['since'] = since
+        if until:
+            kwargs['until'] = until
+        if skip > 0:
+            kwargs['skip'] = skip
+
+        # 캐시 클론은 기본 브랜치만 fetch하므로 다른 브랜치는 명시적으로 요청
+        if self.is_remote and self.repo_url and branch != "HEAD":
+            RepoCloneCache().get_or_clone(self.repo_url, extra_refs=[branch], cancel_token=self.cancel_token)
+            self.repo = git.Repo(self.cached_path)
+            try:
+                self.repo.rev_parse(branch)
+            except (git.exc.BadName, ValueError):
+                branch = f"origin/{branch}"
+
+        return branch, kwargs
+
+    def _extract_commit(self, commit: git.Commit, previous_commit: Optional[git.Commit]) -> Tuple[Optional[Dict], bool]:
+        """
+        커밋 하나의 메타데이터를 캐시에서 가져오거나 새로 생성합니다.
+
+        Args:
+            commit: 대상 커밋
+            previous_commit: 히스토리상 바로 이전 커밋 (없으면 관계 분석 생략)
+
+        Returns:
+            Tuple[Optional[Dict], bool]: (커밋 정보, 캐시 사용 여부). 처리 실패 시 커밋 정보는 None
+        """
+        try:
+            commit_sha = commit.hexsha
+
+            # 캐시에서 먼저 확인
+            cached_data = self._get_cached_commit(commit_sha)
+            if cached_data:
+                logger.debug(f"Using cached commit: {commit_sha[:8]}")
+                return cached_data, True
+
+            # 캐시에 없으면 새로 생성
+            commit_data = {
+                "id": commit_sha,
+                "message": commit.message.strip(),
+                "author": commit.author.name,
+                "author_email": commit.author.email,
+                "date": commit.committed_datetime.isoformat(),
+                "parents": [p.hexsha for p in commit.parents],
+                "files": self.get_changed_files(commit)
+            }
+
+            # 커밋 간 변경사항 문맥 추가
+            commit_data["change_context"] = self.get_change_context(commit)
+
+            # 함수/기능 분석 메타데이터 추가
+            commit_data["function_analysis"] = self.analyze_functions_in_commit(commit)
+
+            # 이전 커밋과의 관계 분석 (첫 커밋이 아닌 경우)
+            if previous_commit is not None:
+                commit_data["relation_to_previous"] = self.get_commit_relation(commit, previous_commit)
+            else:
+                commit_data["relation_to_previous"] = None
+
+            # 캐시에 저장
+            self._cache_commit(commit_sha, commit_data)
+            return commit_data, False
+
+        except git.exc.GitCommandError as e:
+            # shallow clone에서 커밋이 없는 경우 더 fetch
+            if 'does not have' in str(e) or 'unknown revision' in str(e):
+                logger.warning(f"Commit not in shallow clone, fetching more history...")
+                if self.is_remote and self.cached_path and self.repo_url:
+                    cache = RepoCloneCache()
+                    # 더 깊게 fetch (depth=1000)
+                    cache.get_or_clone(self.repo_url, depth=1000, ensure_commit=commit.hexsha)
+                    return None, False
+            logger.warning(f"Failed to process commit {commit.hexsha[:8]}: {e}")
+            return None, False
+        except Exception as e:
+            logger.warning(f"Failed to process commit {commit.hexsha[:8]}: {e}")
+            return None, False
+
     def get_changed_files(self, commit: git.Commit, context_lines: int = 50) -> List[Dict]:
         """
         커밋에서 변경된 파일 목록과 변경 통계를 추출합니다.
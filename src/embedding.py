@@ -1,28 +1,55 @@
 import os
 import asyncio
-from typing import List
+from typing import Callable, List, Optional
 from openai import AzureOpenAI
 import logging
+from src.cancellation import CancellationToken
+from src.embedding_engine import EmbeddingEngine
+from src.embedding_cache import get_embedding_cache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "20"))
+# 요청당 최대 텍스트 수 (실제 배치 크기는 EmbeddingEngine이 토큰 예산으로 결정)
+BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "2048"))
 EMBEDDING_MODEL = os.getenv("AZURE_OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
 VECTOR_DIMENSIONS = int(os.getenv("AZURE_EMBEDDING_DIMENSIONS", "1536"))
 
+# text-embedding-3 모델의 기본 차원 (이보다 작은 VECTOR_DIMENSIONS는 API의 dimensions 파라미터로 줄여서 받음)
+NATIVE_DIMENSIONS = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072}
+
+
+def request_dimensions(model: str = EMBEDDING_MODEL, dimensions: int = VECTOR_DIMENSIONS) -> Optional[int]:
+    """
+    임베딩 요청에 보낼 dimensions 값 (보내지 않으면 None)
+    EMBEDDING_SEND_DIMENSIONS=auto(기본)이면 text-embedding-3 모델에서 기본 차원보다 작을 때만 보냄
+    """
+    mode = os.getenv("EMBEDDING_SEND_DIMENSIONS", "auto").lower()
+    if mode == "true":
+        return dimensions
+    if mode == "false":
+        return None
+    native = next((d for name, d in NATIVE_DIMENSIONS.items() if name in model), None)
+    return dimensions if native and dimensions < native else None
+
+
 # 임베딩 모델 로드 확인
-logger.info(f"Using embedding model: {EMBEDDING_MODEL} (dimensions: {VECTOR_DIMENSIONS})")
+logger.info(f"Using embedding model: {EMBEDDING_MODEL} (dimensions: {VECTOR_DIMENSIONS}"
+            f"{', reduced via API' if request_dimensions() else ''})")
 
 
-async def embed_texts_async(texts: List[str], openai_client: AzureOpenAI) -> List[List[float]]:
+async def embed_texts_async(texts: List[str], openai_client: AzureOpenAI,
+                            cancel_token: Optional[CancellationToken] = None,
+                            on_progress: Optional[Callable[[int], None]] = None) -> List[List[float]]:
     """
     텍스트 리스트를 비동기로 임베딩합니다.
-    배치 단위로 처리하여 API 호출을 최소화합니다.
+    배치 요청은 EmbeddingEngine 워커 스레드에서 동시에 처리되며, 이벤트 루프는 막지 않습니다.
 
     Args:
         texts: 임베딩할 텍스트 리스트
         openai_client: Azure OpenAI 클라이언트
+        cancel_token: 취소 토큰 (embed_texts와 동일)
+        on_progress: 진행 콜백 (embed_texts와 동일)
 
     Returns:
         List[List[float]]: 임베딩 벡터 리스트
@@ -32,84 +59,50 @@ async def embed_texts_async(texts: List[str], openai_client: AzureOpenAI) -> Lis
     """
     if not texts:
         return []
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, embed_texts, texts, openai_client, cancel_token, on_progress)
 
-    embeddings: List[List[float]] = []
-    total_batches = (len(texts) + BATCH_SIZE - 1) // BATCH_SIZE
-
-    logger.info(f"Embedding {len(texts)} texts in {total_batches} batches (batch size: {BATCH_SIZE})")
-
-    for i in range(0, len(texts), BATCH_SIZE):
-        batch = texts[i:i+BATCH_SIZE]
-        batch_num = i // BATCH_SIZE + 1
-
-        try:
-            logger.debug(f"Processing batch {batch_num}/{total_batches}")
-
-            # 비동기 실행을 위해 run_in_executor 사용
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: openai_client.embeddings.create(
-                    input=batch,
-                    model=EMBEDDING_MODEL
-                )
-            )
-
-            batch_embeddings = [data.embedding for data in response.data]
-            embeddings.extend(batch_embeddings)
-
-            logger.debug(f"✓ Batch {batch_num}/{total_batches} completed ({len(batch_embeddings)} embeddings)")
 
-        except Exception as e:
-            logger.error(f"Error embedding batch {batch_num}: {e}")
-            # 실패한 배치에 대해 빈 임베딩 추가
-            embeddings.extend([[] for _ in batch])
-
-    logger.info(f"✓ Embedding completed: {len(embeddings)} vectors")
-    return embeddings
-
-
-def embed_texts(texts: List[str], openai_client: AzureOpenAI) -> List[List[float]]:
+def embed_texts(texts: List[str], openai_client: AzureOpenAI,
+                cancel_token: Optional[CancellationToken] = None,
+                on_progress: Optional[Callable[[int], None]] = None) -> List[List[float]]:
     """
     텍스트 리스트를 임베딩합니다 (동기 버전).
-    배치 단위로 처리하여 API 호출을 최소화합니다.
+    영구 임베딩 캐시에 없는 텍스트만 배치 단위로 동시에 요청하되 TPM/RPM 할당량과 429 Retry-After를 지키며,
+    결과는 입력 순서대로 반환합니다.
 
     Args:
         texts: 임베딩할 텍스트 리스트
         openai_client: Azure OpenAI 클라이언트
+        cancel_token: 취소 토큰 (요청마다 토큰 예산 차감, 취소 후에는 요청하지 않음, 끝난 배치는 캐시에 저장)
+        on_progress: 처리한 텍스트 수로 호출되는 진행 콜백 (캐시 적중은 한 번에, 요청은 배치마다)
 
     Returns:
-        List[List[float]]: 임베딩 벡터 리스트
+        List[List[float]]: 임베딩 벡터 리스트 (실패했거나 취소되어 요청하지 않은 배치는 빈 리스트)
     """
     if not texts:
         return []
 
-    embeddings: List[List[float]] = []
-    total_batches = (len(texts) + BATCH_SIZE - 1) // BATCH_SIZE
-
-    logger.info(f"Embedding {len(texts)} texts in {total_batches} batches (batch size: {BATCH_SIZE})")
-
-    for i in range(0, len(texts), BATCH_SIZE):
-        batch = texts[i:i+BATCH_SIZE]
-        batch_num = i // BATCH_SIZE + 1
-
-        try:
-            logger.debug(f"Processing batch {batch_num}/{total_batches}")
-
-            response = openai_client.embeddings.create(
-                input=batch,
-                model=EMBEDDING_MODEL
-            )
-
-            batch_embeddings = [data.embedding for data in response.data]
-            embeddings.extend(batch_embeddings)
-
-            logger.debug(f"✓ Batch {batch_num}/{total_batches} completed ({len(batch_embeddings)} embeddings)")
-
-        except Exception as e:
-            logger.error(f"Error embedding batch {batch_num}: {e}")
-            # 실패한 배치에 대해 빈 임베딩 추가
-            embeddings.extend([[] for _ in batch])
+    # 같은 텍스트는 모델/차원이 같으면 같은 벡터이므로 영구 캐시에서 먼저 찾음
+    cache = get_embedding_cache(EMBEDDING_MODEL, VECTOR_DIMENSIONS)
+    embeddings = cache.get_many(texts) if cache else [None] * len(texts)
+    missing = list(dict.fromkeys(t for t, e in zip(texts, embeddings) if e is None))
+    hits = sum(1 for e in embeddings if e is not None)
+    if hits:
+        logger.info(f"💾 Embedding cache hit: {hits}/{len(texts)} texts")
+        if on_progress is not None:
+            on_progress(hits)
+
+    if missing:
+        engine = EmbeddingEngine(openai_client, EMBEDDING_MODEL, batch_size=BATCH_SIZE,
+                                 dimensions=request_dimensions(EMBEDDING_MODEL, VECTOR_DIMENSIONS),
+                                 cancel_token=cancel_token, on_progress=on_progress)
+        computed = dict(zip(missing, engine.embed(missing)))
+        if cache:
+            try:
+                cache.put_many(missing, [computed[t] for t in missing])
+            except Exception as e:
+                logger.warning(f"Failed to store embeddings in cache: {e}")
+        embeddings = [e if e is not None else computed[t] for t, e in zip(texts, embeddings)]
 
-    logger.info(f"✓ Embedding completed: {len(embeddings)} vectors")
     return embeddings
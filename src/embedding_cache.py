@@ -0,0 +1,226 @@
+"""
+영구 임베딩 캐시
+(모델, 차원, 텍스트 SHA-256)을 키로 임베딩 벡터를 디스크에 보관합니다.
+벡터는 고정 크기 레코드로 vectors.bin에 덧붙여 쓰고 메모리 맵으로 읽으며,
+키 → 슬롯 색인은 SQLite(WAL 모드)로 관리하여 여러 워커 프로세스가 함께 사용할 수 있습니다.
+같은 텍스트를 다시 인덱싱(새 인덱스, 포크, 스키마 변경 후 재구축)할 때 임베딩 API 호출을 생략합니다.
+"""
+
+import os
+import mmap
+import struct
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from src.index_checkpoint import default_cache_root
+
+logger = logging.getLogger(__name__)
+
+# 저장 형식: float32(정확) 또는 float16(절반 크기, 코사인 유사도 오차 약 1e-3)
+_DTYPES = {'float32': 'f', 'float16': 'e'}
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, slot INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+)
+
+
+def text_key(text: str) -> str:
+    """텍스트 내용 해시 (캐시 키)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """모델/차원별 메모리 맵 임베딩 캐시 (프로세스/스레드 안전)"""
+
+    def __init__(self, cache_dir: str, model: str, dimensions: int, dtype: str = 'float32',
+                 busy_timeout: float = 30.0):
+        """
+        Args:
+            cache_dir: 캐시 루트 디렉토리 (모델/차원/형식별 하위 디렉토리 생성)
+            model: 임베딩 모델(배포) 이름
+            dimensions: 벡터 차원 (다른 길이의 벡터는 저장하지 않음)
+            dtype: 저장 형식 ('float32' 또는 'float16')
+            busy_timeout: SQLite 잠금 대기 시간 (초)
+        """
+        if dtype not in _DTYPES:
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+        self.model = model
+        self.dimensions = dimensions
+        self.dtype = dtype
+        self._format = _DTYPES[dtype]
+        self.record_size = dimensions * struct.calcsize(self._format)
+        self.busy_timeout = busy_timeout
+
+        safe_model = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in model)
+        self.path = Path(cache_dir) / f"{safe_model}-{dimensions}-{dtype}"
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.vectors_file = self.path / 'vectors.bin'
+        self.index_file = self.path / 'index.db'
+
+        self._local = threading.local()
+        self._map_lock = threading.Lock()
+        self._fd = os.open(self.vectors_file, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        self._map: Optional[mmap.mmap] = None
+        self.stats = {"hits": 0, "misses": 0, "stored": 0}
+
+        with self._transaction() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    # ------------------------------------------------------------------ 저장소
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.index_file), timeout=self.busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    def _read(self, slots: List[int]) -> Dict[int, List[float]]:
+        """슬롯의 벡터를 메모리 맵에서 읽음 (다른 프로세스가 덧붙인 만큼 필요 시 다시 매핑)"""
+        required_size = (max(slots) + 1) * self.record_size
+        vectors = {}
+        with self._map_lock:
+            if self._map is None or len(self._map) < required_size:
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+            for slot in slots:
+                offset = slot * self.record_size
+                record = self._map[offset:offset + self.record_size]
+                vectors[slot] = memoryview(record).cast(self._format).tolist()
+        return vectors
+
+    # ------------------------------------------------------------------ 조회/저장
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        텍스트별 캐시된 벡터 (없으면 None)
+
+        Returns:
+            List[Optional[List[float]]]: 입력 순서와 같은 목록
+        """
+        keys = [text_key(t) for t in texts]
+        slots: Dict[str, int] = {}
+        conn = self._connect()
+        unique = list(dict.fromkeys(keys))
+        for i in range(0, len(unique), 500):
+            chunk = unique[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for key, slot in conn.execute(f'SELECT key, slot FROM vectors WHERE key IN ({placeholders})', chunk):
+                slots[key] = slot
+
+        vectors = self._read(sorted(set(slots.values()))) if slots else {}
+        results = [vectors[slots[key]] if key in slots else None for key in keys]
+
+        hits = sum(1 for r in results if r is not None)
+        self.stats["hits"] += hits
+        self.stats["misses"] += len(results) - hits
+        return results
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[List[float]]) -> int:
+        """
+        벡터 저장 (차원이 맞지 않거나 비어 있는 벡터, 이미 있는 키는 건너뜀)
+
+        Returns:
+            int: 새로 저장된 벡터 수
+        """
+        pending: Dict[str, List[float]] = {}
+        for text, vector in zip(texts, vectors):
+            if vector and len(vector) == self.dimensions:
+                pending.setdefault(text_key(text), vector)
+        if not pending:
+            return 0
+
+        with self._transaction() as conn:
+            keys = list(pending)
+            existing = set()
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                existing.update(r[0] for r in conn.execute(
+                    f'SELECT key FROM vectors WHERE key IN ({placeholders})', chunk))
+            new_keys = [k for k in keys if k not in existing]
+            if not new_keys:
+                return 0
+
+            row = conn.execute("SELECT value FROM meta WHERE name = 'next_slot'").fetchone()
+            next_slot = row[0] if row else 0
+
+            # 레코드를 먼저 기록하고 색인을 커밋 (색인에 있는 슬롯은 항상 데이터가 있음)
+            data = b''.join(struct.pack(f'{self.dimensions}{self._format}', *pending[k]) for k in new_keys)
+            self._write_at(next_slot * self.record_size, data)
+            conn.executemany('INSERT INTO vectors (key, slot) VALUES (?, ?)',
+                             [(k, next_slot + i) for i, k in enumerate(new_keys)])
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('next_slot', ?)",
+                         (next_slot + len(new_keys),))
+
+        self.stats["stored"] += len(new_keys)
+        return len(new_keys)
+
+    def _write_at(self, offset: int, data: bytes):
+        if hasattr(os, 'pwrite'):
+            os.pwrite(self._fd, data, offset)
+            return
+        # Windows: pwrite 없음 (쓰기는 SQLite 쓰기 잠금 안에서만 일어나므로 프로세스 간 경합 없음)
+        with self._map_lock:
+            os.lseek(self._fd, offset, os.SEEK_SET)
+            os.write(self._fd, data)
+
+    def count(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM vectors').fetchone()[0]
+
+    def close(self):
+        with self._map_lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+_caches: Dict[tuple, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model: str, dimensions: int) -> Optional[EmbeddingCache]:
+    """
+    환경 설정 기반 공용 임베딩 캐시 반환 (EMBEDDING_CACHE=false이거나 열 수 없으면 None)
+    """
+    if os.getenv("EMBEDDING_CACHE", "true").lower() != "true":
+        return None
+    cache_dir = os.getenv("EMBEDDING_CACHE_DIR") or str(default_cache_root() / 'embeddings')
+    dtype = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")
+    key = (cache_dir, model, dimensions, dtype)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            try:
+                cache = EmbeddingCache(cache_dir, model, dimensions, dtype)
+            except Exception as e:
+                logger.warning(f"Embedding cache disabled: {e}")
+                return None
+            _caches[key] = cache
+        return cache
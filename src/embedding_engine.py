@@ -0,0 +1,519 @@
+"""
+동시 실행 임베딩 엔진
+여러 배치 요청을 동시에 보내되, 배포 할당량(TPM/RPM)을 토큰 버킷으로 지키고
+429 응답의 Retry-After를 모든 워커가 함께 따르도록 합니다. 실패한 요청은 지터가 있는 지수 백오프로 재시도하며,
+결과는 입력 순서대로 다시 조립합니다.
+배치는 항목 수가 아니라 추정 토큰 예산으로 묶고, 모델 입력 한도를 넘는 텍스트는 잘라서 보냅니다.
+여러 저장소를 동시에 인덱싱할 때는 quota_tenant로 저장소별 몫을 나눠 한 저장소가 할당량을 독점하지 않도록 합니다.
+할당량을 설정하면 버킷 상태는 SQLite(quota_store)에 두어 여러 프로세스가 같은 TPM/RPM을 함께 지킵니다.
+"""
+
+import os
+import time
+import socket
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+import openai
+
+from src.cancellation import CancellationToken, IndexingCancelled
+from src.quota_store import QuotaStore
+
+logger = logging.getLogger(__name__)
+
+# 토크나이저 없이 쓰는 보수적인 토큰 추정치 (ASCII는 약 4자당 1토큰이지만 3자로 계산, 비ASCII는 문자당 1토큰)
+CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """텍스트의 토큰 수 추정 (실제보다 크게 잡음)"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii) // CHARS_PER_TOKEN + non_ascii + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """추정 토큰 수가 max_tokens 이하가 되도록 텍스트 뒷부분을 잘라냄"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # 추정치는 접두사 길이에 단조 증가하므로 이분 탐색
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+
+class TokenBucket:
+    """분당 허용량 기반 토큰 버킷 (rate_per_minute <= 0이면 무제한)"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def set_rate(self, rate_per_minute: float):
+        """허용량 변경 (용량도 같은 값으로 맞추고, 남은 토큰은 새 용량을 넘지 않게 자름. 무제한이던 버킷은 가득 채움)"""
+        with self._lock:
+            was_unlimited = self.unlimited
+            self._refill(time.monotonic())
+            self.rate = rate_per_minute / 60.0
+            self.capacity = rate_per_minute
+            self._tokens = self.capacity if was_unlimited else min(self._tokens, self.capacity)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        amount만큼 예약하고 사용 가능해질 때까지 기다려야 하는 시간(초)을 반환합니다.
+        버킷 용량보다 큰 요청은 용량만큼으로 취급합니다.
+        """
+        if self.unlimited:
+            return 0.0
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """
+    TPM/RPM 토큰 버킷과 429 대기 시간을 함께 관리하는 프로세스 공용 제한기
+    Retry-After를 받으면 그 시각까지 모든 요청이 대기합니다.
+    """
+
+    def __init__(self, tokens_per_minute: float = 0, requests_per_minute: float = 0):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.requests = TokenBucket(requests_per_minute)
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+        # 테넌트(저장소)별 몫: {이름: [참조 수, TPM 버킷, RPM 버킷]}
+        self._tenants: Dict[str, list] = {}
+        self.metrics = {"throttled": 0, "waited_seconds": 0.0}
+
+    def register_tenant(self, name: str):
+        """테넌트 등록. 등록된 테넌트끼리 TPM/RPM을 균등하게 나눔"""
+        with self._lock:
+            entry = self._tenants.get(name)
+            if entry:
+                entry[0] += 1
+                return
+            self._tenants[name] = [1, TokenBucket(0), TokenBucket(0)]
+            self._rebalance()
+
+    def release_tenant(self, name: str):
+        with self._lock:
+            entry = self._tenants.get(name)
+            if not entry:
+                return
+            entry[0] -= 1
+            if entry[0] <= 0:
+                del self._tenants[name]
+                self._rebalance()
+
+    def _rebalance(self):
+        count = len(self._tenants)
+        for _, token_bucket, request_bucket in self._tenants.values():
+            token_bucket.set_rate(self.tokens_per_minute / count if self.tokens_per_minute > 0 else 0)
+            request_bucket.set_rate(self.requests_per_minute / count if self.requests_per_minute > 0 else 0)
+
+    def tenant_share(self, name: str) -> Optional[Dict[str, float]]:
+        """테넌트의 현재 분당 몫 (등록되지 않았으면 None)"""
+        with self._lock:
+            entry = self._tenants.get(name)
+            if not entry:
+                return None
+            return {"tokens_per_minute": entry[1].rate * 60.0, "requests_per_minute": entry[2].rate * 60.0}
+
+    def acquire(self, tokens: int, tenant: Optional[str] = None):
+        """요청 1건과 tokens 만큼의 할당량을 확보할 때까지 대기 (tenant가 있으면 그 몫 안에서)"""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        with self._lock:
+            share = self._tenants.get(tenant) if tenant else None
+        if share:
+            wait = max(wait, share[2].reserve(1), share[1].reserve(tokens))
+        with self._lock:
+            wait = max(wait, self._pause_until - time.monotonic())
+        if wait > 0:
+            self.metrics["waited_seconds"] += wait
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """서버가 요청한 대기 시간 동안 모든 요청 보류"""
+        with self._lock:
+            self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+            self.metrics["throttled"] += 1
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    버킷 상태를 QuotaStore(SQLite)에 두는 프로세스 간 공유 제한기
+    여러 스케줄러 프로세스가 함께 실행되어도 전체 TPM/RPM과 저장소별 몫을 모든 프로세스 합계로 지킵니다.
+    """
+
+    def __init__(self, tokens_per_minute: float = 0, requests_per_minute: float = 0,
+                 store: Optional[QuotaStore] = None):
+        super().__init__(tokens_per_minute, requests_per_minute)
+        self.store = store or QuotaStore()
+        self.holder = f"{socket.gethostname()}-{os.getpid()}-{id(self):x}"
+
+    def register_tenant(self, name: str):
+        self.store.register_tenant(name, self.holder)
+
+    def release_tenant(self, name: str):
+        self.store.release_tenant(name, self.holder)
+
+    def tenant_share(self, name: str) -> Optional[Dict[str, float]]:
+        return self.store.tenant_share(name, self.tokens_per_minute, self.requests_per_minute)
+
+    def acquire(self, tokens: int, tenant: Optional[str] = None):
+        wait = self.store.reserve(tokens, self.tokens_per_minute, self.requests_per_minute,
+                                  tenant=tenant, holder=self.holder)
+        if wait > 0:
+            self.metrics["waited_seconds"] += wait
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        self.store.pause(seconds)
+        with self._lock:
+            self.metrics["throttled"] += 1
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    환경 변수(EMBEDDING_TPM, EMBEDDING_RPM) 기반 공용 제한기 반환
+
+    할당량이 설정되어 있으면 EMBEDDING_SHARED_QUOTA(기본값 true)에 따라 프로세스 간 공유 제한기를 씁니다.
+    false면 프로세스마다 따로 할당량 전체를 쓰므로 여러 프로세스를 함께 실행할 때는 할당량을 프로세스 수로 나눠 설정해야 합니다.
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            tokens_per_minute = float(os.getenv("EMBEDDING_TPM", "0"))
+            requests_per_minute = float(os.getenv("EMBEDDING_RPM", "0"))
+            shared = os.getenv("EMBEDDING_SHARED_QUOTA", "true").lower() == "true"
+            if shared and (tokens_per_minute > 0 or requests_per_minute > 0):
+                _limiter = SharedRateLimiter(tokens_per_minute, requests_per_minute)
+            else:
+                _limiter = RateLimiter(tokens_per_minute, requests_per_minute)
+        return _limiter
+
+
+def reset_rate_limiter():
+    """공용 제한기 초기화 (설정 변경 후 또는 테스트용)"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
+
+
+_current_tenant: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("embedding_tenant", default=None)
+
+
+@contextmanager
+def quota_tenant(name: str, limiter: Optional[RateLimiter] = None) -> Iterator[str]:
+    """
+    블록 안에서 만든 EmbeddingEngine의 요청을 name 테넌트 몫으로 제한
+
+    동시에 등록된 테넌트 수로 TPM/RPM을 나누므로 여러 저장소를 함께 인덱싱해도 한 저장소가 할당량을 독점하지 않습니다.
+    """
+    limiter = limiter or get_rate_limiter()
+    limiter.register_tenant(name)
+    token = _current_tenant.set(name)
+    try:
+        yield name
+    finally:
+        _current_tenant.reset(token)
+        limiter.release_tenant(name)
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """응답 헤더의 retry-after-ms / retry-after 값 (초)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def _usage_tokens(response) -> Optional[int]:
+    """응답에 보고된 사용 토큰 수 (usage.total_tokens, 없으면 None)"""
+    usage = getattr(response, "usage", None)
+    used = getattr(usage, "total_tokens", None) if usage is not None else None
+    return used if isinstance(used, int) else None
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def _is_input_error(error: Exception) -> bool:
+    """요청 내용(텍스트) 문제로 거부된 경우"""
+    return isinstance(error, openai.APIStatusError) and error.status_code in (400, 413, 422)
+
+
+class EmbeddingEngine:
+    """배치 요청을 동시에 보내고 입력 순서대로 결과를 돌려주는 임베딩 클라이언트"""
+
+    def __init__(
+        self,
+        openai_client,
+        model: str,
+        batch_size: int = 2048,
+        max_batch_tokens: Optional[int] = None,
+        max_input_tokens: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        limiter: Optional[RateLimiter] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        dimensions: Optional[int] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ):
+        """
+        Args:
+            openai_client: Azure OpenAI 클라이언트
+            model: 임베딩 모델(배포) 이름
+            batch_size: 요청당 최대 텍스트 수
+            max_batch_tokens: 요청당 추정 토큰 예산 (기본값: EMBEDDING_BATCH_MAX_TOKENS)
+            max_input_tokens: 텍스트당 모델 입력 한도, 넘으면 잘라냄 (기본값: EMBEDDING_MAX_INPUT_TOKENS)
+            concurrency: 동시 요청 수 (기본값: EMBEDDING_CONCURRENCY)
+            limiter: 할당량 제한기 (기본값: 프로세스 공용 제한기)
+            max_retries: 재시도 가능한 오류의 최대 재시도 횟수 (기본값: EMBEDDING_MAX_RETRIES)
+            backoff_base: 지수 백오프 시작 값 (초)
+            backoff_max: 백오프 상한 (초)
+            dimensions: 요청할 출력 차원 (text-embedding-3 모델, None이면 모델 기본 차원)
+            cancel_token: 취소 토큰 (요청마다 토큰 예산을 차감, 취소 후에는 새 요청을 보내지 않음)
+            on_progress: 배치가 끝날 때마다 처리한 텍스트 수로 호출 (워커 스레드에서 호출됨, 실패한 배치 포함)
+        """
+        self.client = openai_client
+        self.model = model
+        self.dimensions = dimensions
+        self.cancel_token = cancel_token
+        self.on_progress = on_progress
+        self.batch_size = max(1, batch_size)
+        self.max_batch_tokens = max_batch_tokens or int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))
+        self.max_input_tokens = max_input_tokens or int(os.getenv("EMBEDDING_MAX_INPUT_TOKENS", "8191"))
+        self.concurrency = max(1, concurrency or int(os.getenv("EMBEDDING_CONCURRENCY", "4")))
+        self.limiter = limiter or get_rate_limiter()
+        # 워커 스레드는 컨텍스트를 물려받지 않으므로 생성 시점의 테넌트를 보관
+        self.tenant = _current_tenant.get()
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+        self.backoff_base = backoff_base if backoff_base is not None else float(os.getenv("EMBEDDING_BACKOFF_BASE_SECONDS", "1"))
+        self.backoff_max = backoff_max if backoff_max is not None else float(os.getenv("EMBEDDING_BACKOFF_MAX_SECONDS", "60"))
+        self.stats = {"requests": 0, "retries": 0, "failed_batches": 0, "tokens": 0,
+                      "truncated": 0, "bisections": 0, "failed_texts": 0, "cancelled_texts": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def _backoff(self, attempt: int) -> float:
+        """지수 백오프 (full jitter)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _request(self, batch: List[str], label: str) -> List[List[float]]:
+        """
+        배치 1건 요청 (재시도 가능한 오류는 백오프 후 재시도)
+        토큰 예산은 보내기 전에 추정치로 예약하고, 성공하면 API가 보고한 사용량으로 정산하며 실패하면 돌려줍니다.
+
+        Raises:
+            IndexingCancelled: 취소되었거나 토큰 예산을 넘는 경우 (요청을 보내지 않음)
+            Exception: 재시도할 수 없는 오류 또는 재시도 횟수 초과
+        """
+        tokens = sum(estimate_tokens(t) for t in batch)
+        if self.cancel_token is not None:
+            self.cancel_token.spend_tokens(tokens)
+        try:
+            response = self._send(batch, label, tokens)
+        except Exception:
+            # 실패한 요청은 예산을 쓰지 않음 (이분 재시도가 같은 텍스트를 다시 차감하지 않도록)
+            if self.cancel_token is not None:
+                self.cancel_token.settle_tokens(tokens, 0)
+            raise
+        used = _usage_tokens(response)
+        used = tokens if used is None else used
+        if self.cancel_token is not None:
+            self.cancel_token.settle_tokens(tokens, used)
+        self._count(tokens=used)
+        embeddings = [data.embedding for data in response.data]
+        logger.debug(f"✓ Batch {label} completed ({len(embeddings)} embeddings, {used} tokens)")
+        return embeddings
+
+    def _send(self, batch: List[str], label: str, tokens: int):
+        """요청 전송 (재시도 가능한 오류는 백오프 후 재시도). 성공한 응답 반환"""
+        attempt = 0
+        while True:
+            if self.cancel_token is not None:
+                self.cancel_token.raise_if_cancelled()
+            self.limiter.acquire(tokens, tenant=self.tenant)
+            try:
+                logger.debug(f"Processing batch {label}")
+                extra = {"dimensions": self.dimensions} if self.dimensions else {}
+                response = self.client.embeddings.create(input=batch, model=self.model, **extra)
+                self._count(requests=1)
+                return response
+            except Exception as e:
+                self._count(requests=1)
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    raise
+
+                retry_after = _retry_after_seconds(e)
+                if retry_after is not None:
+                    # 서버 지정 대기 시간은 모든 워커가 함께 따름
+                    self.limiter.pause(retry_after)
+                    delay = random.uniform(0, self.backoff_base)
+                else:
+                    delay = self._backoff(attempt)
+                attempt += 1
+                self._count(retries=1)
+                logger.warning(f"Embedding batch {label} failed ({type(e).__name__}), "
+                               f"retry {attempt}/{self.max_retries} in {delay + (retry_after or 0):.1f}s")
+                if self.cancel_token is not None:
+                    self.cancel_token.wait(delay)
+                else:
+                    time.sleep(delay)
+
+    def _embed_batch(self, batch: List[str], label: str) -> List[List[float]]:
+        """
+        배치를 임베딩하고, 입력 문제로 실패하면 반으로 나눠 다시 시도합니다.
+        문제 텍스트 하나 때문에 같은 배치의 다른 텍스트가 빈 벡터가 되지 않도록 합니다.
+        """
+        try:
+            return self._request(batch, label)
+        except IndexingCancelled:
+            raise
+        except Exception as e:
+            if not _is_input_error(e):
+                # 할당량/서버/클라이언트 문제는 나눠도 해결되지 않음
+                logger.error(f"Error embedding batch {label}: {e}")
+                self._count(failed_batches=1, failed_texts=len(batch))
+                return [[] for _ in batch]
+
+            if len(batch) > 1:
+                self._count(bisections=1)
+                mid = len(batch) // 2
+                logger.warning(f"Embedding batch {label} rejected ({e}), retrying halves of {mid} and {len(batch) - mid}")
+                return self._embed_batch(batch[:mid], f"{label}a") + self._embed_batch(batch[mid:], f"{label}b")
+
+            # 단일 텍스트: 입력 한도 추정이 빗나갔을 수 있으므로 절반 길이로 한 번 더 시도
+            shorter = truncate_to_tokens(batch[0], max(1, estimate_tokens(batch[0]) // 2))
+            if shorter and shorter != batch[0]:
+                try:
+                    self._count(truncated=1)
+                    return self._request([shorter], f"{label}-truncated")
+                except IndexingCancelled:
+                    raise
+                except Exception as retry_error:
+                    e = retry_error
+            logger.error(f"Error embedding text in batch {label}: {e}")
+            self._count(failed_batches=1, failed_texts=1)
+            return [[]]
+
+    def _embed_unless_cancelled(self, batch: List[str], label: str) -> List[List[float]]:
+        """취소/예산 초과로 보내지 못한 배치는 빈 벡터 (이미 끝난 배치 결과는 그대로 반환됨)"""
+        try:
+            vectors = self._embed_batch(batch, label)
+        except IndexingCancelled:
+            self._count(cancelled_texts=len(batch))
+            return [[] for _ in batch]
+        if self.on_progress is not None:
+            try:
+                self.on_progress(len(batch))
+            except Exception as e:
+                logger.debug(f"Embedding progress callback failed: {e}")
+        return vectors
+
+    def _make_batches(self, texts: List[str]) -> List[List[str]]:
+        """토큰 예산과 최대 항목 수를 넘지 않도록 순서대로 묶음"""
+        batches: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if current and (len(current) >= self.batch_size or current_tokens + tokens > self.max_batch_tokens):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        텍스트 리스트를 임베딩합니다.
+
+        Returns:
+            List[List[float]]: 입력 순서와 같은 임베딩 벡터 리스트 (끝내 실패했거나 취소되어 보내지 않은 텍스트는 빈 리스트)
+        """
+        if not texts:
+            return []
+
+        # 모델 입력 한도를 넘는 텍스트는 잘라서 전송
+        prepared = []
+        for text in texts:
+            clipped = truncate_to_tokens(text, self.max_input_tokens)
+            if clipped is not text:
+                self._count(truncated=1)
+            prepared.append(clipped)
+
+        batches = self._make_batches(prepared)
+        total_batches = len(batches)
+        workers = min(self.concurrency, total_batches)
+
+        logger.info(f"Embedding {len(texts)} texts in {total_batches} batches "
+                    f"(max {self.batch_size} items / {self.max_batch_tokens} tokens, concurrency: {workers})")
+
+        labels = [f"{i + 1}/{total_batches}" for i in range(total_batches)]
+        if workers == 1:
+            results = [self._embed_unless_cancelled(b, label) for b, label in zip(batches, labels)]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedding") as pool:
+                futures = [pool.submit(self._embed_unless_cancelled, b, label) for b, label in zip(batches, labels)]
+                results = [f.result() for f in futures]
+
+        embeddings = [vector for batch in results for vector in batch]
+        if self.stats["failed_texts"]:
+            logger.warning(f"⚠️ {self.stats['failed_texts']} texts could not be embedded")
+        if self.stats["cancelled_texts"]:
+            logger.info(f"⏹️ {self.stats['cancelled_texts']} texts not embedded (cancelled: {self.cancel_token.reason})")
+        logger.info(f"✓ Embedding completed: {len(embeddings)} vectors")
+        return embeddings
@@ -0,0 +1,218 @@
+"""
+Git safe.directory 레지스트리
+프로세스 단위로 등록된 디렉토리를 메모리에 보관하여, 캐시 히트마다
+`git config --global` 을 실행하지 않도록 합니다.
+
+모드 (GIT_SAFE_DIRECTORY_MODE):
+- command_line (기본값): 전역 gitconfig를 건드리지 않고, 프로세스 환경 변수
+  (GIT_CONFIG_COUNT/GIT_CONFIG_KEY_n/GIT_CONFIG_VALUE_n = `git -c safe.directory=...` 과 동일)로
+  등록합니다. 이 프로세스에서 실행되는 모든 git 명령(GitPython 포함)에 적용됩니다.
+- global: 기존 방식대로 ~/.gitconfig 에 기록하되, 기존 목록은 1회만 읽고 추가분은 모아서 기록합니다.
+- off: 아무것도 하지 않습니다.
+"""
+
+import os
+import logging
+import subprocess
+import threading
+from typing import List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+SAFE_DIRECTORY_KEY = 'safe.directory'
+
+
+def _normalize(path: str) -> str:
+    """경로 정규화로 중복 방지 (Windows 대소문자/슬래시 차이 보정)"""
+    if path == '*':
+        return '*'
+    return os.path.normcase(os.path.normpath(path))
+
+
+class SafeDirectoryRegistry:
+    """프로세스 단위 safe.directory 레지스트리 (싱글톤)"""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, mode: Optional[str] = None):
+        """
+        Args:
+            mode: 'command_line' | 'global' | 'off' (기본값: GIT_SAFE_DIRECTORY_MODE 환경 변수)
+        """
+        self.mode = (mode or os.getenv('GIT_SAFE_DIRECTORY_MODE', 'command_line')).lower()
+        self._lock = threading.Lock()
+        self._registered: Set[str] = set()
+        self._pending: List[str] = []
+        self._loaded = False
+        self.shell_outs = 0  # git config 실행 횟수 (진단용)
+
+    @classmethod
+    def get(cls) -> 'SafeDirectoryRegistry':
+        """프로세스 전역 레지스트리 반환"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls):
+        """레지스트리 리셋 (테스트 용)"""
+        with cls._instance_lock:
+            cls._instance = None
+
+    # ------------------------------------------------------------------ 로드
+
+    def _run_git_config(self, *args: str) -> subprocess.CompletedProcess:
+        self.shell_outs += 1
+        return subprocess.run(
+            ['git', 'config', '--global', *args],
+            capture_output=True,
+            timeout=5,
+            text=True,
+            check=False,
+        )
+
+    def _ensure_loaded(self):
+        """기존 등록 목록을 프로세스당 1회만 로드 (self._lock 보유 상태에서 호출)"""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        if self.mode == 'global':
+            try:
+                result = self._run_git_config('--get-all', SAFE_DIRECTORY_KEY)
+                if result.returncode == 0 and result.stdout:
+                    for line in result.stdout.splitlines():
+                        if line.strip():
+                            self._registered.add(_normalize(line.strip()))
+            except FileNotFoundError:
+                logger.warning("Git command not found, skipping safe.directory configuration")
+            except Exception as e:
+                logger.debug(f"Failed to read safe.directory: {e}")
+        elif self.mode == 'command_line':
+            for _, value in self._command_line_entries():
+                self._registered.add(_normalize(value))
+
+        logger.debug(f"Loaded {len(self._registered)} safe.directory entries (mode={self.mode})")
+
+    @staticmethod
+    def _command_line_entries() -> List[tuple]:
+        """현재 프로세스 환경의 GIT_CONFIG_* safe.directory 항목 목록"""
+        entries = []
+        try:
+            count = int(os.environ.get('GIT_CONFIG_COUNT', '0'))
+        except ValueError:
+            count = 0
+        for i in range(count):
+            key = os.environ.get(f'GIT_CONFIG_KEY_{i}', '')
+            if key.lower() == SAFE_DIRECTORY_KEY:
+                entries.append((i, os.environ.get(f'GIT_CONFIG_VALUE_{i}', '')))
+        return entries
+
+    # ------------------------------------------------------------------ 등록
+
+    def is_registered(self, path: str) -> bool:
+        """경로가 이미 안전한 디렉토리로 등록되었는지 (메모리 조회만 수행)"""
+        with self._lock:
+            self._ensure_loaded()
+            return '*' in self._registered or _normalize(path) in self._registered
+
+    def register(self, path: str) -> bool:
+        """
+        디렉토리를 safe.directory로 등록합니다.
+        command_line 모드는 즉시 프로세스 환경에 반영되고, global 모드는 flush() 시 기록됩니다.
+
+        Args:
+            path: 저장소 경로 또는 '*'
+
+        Returns:
+            bool: 새로 등록되었으면 True
+        """
+        if self.mode == 'off':
+            return False
+
+        with self._lock:
+            self._ensure_loaded()
+            key = _normalize(path)
+            if '*' in self._registered or key in self._registered:
+                return False
+
+            self._registered.add(key)
+            if self.mode == 'command_line':
+                self._append_command_line(path)
+                logger.debug(f"✓ Registered safe.directory for this process: {path}")
+            else:
+                self._pending.append(path)
+            return True
+
+    def _append_command_line(self, path: str):
+        """GIT_CONFIG_COUNT 방식으로 `-c safe.directory=<path>` 추가 (self._lock 보유 상태)"""
+        try:
+            index = int(os.environ.get('GIT_CONFIG_COUNT', '0'))
+        except ValueError:
+            index = 0
+        os.environ[f'GIT_CONFIG_KEY_{index}'] = SAFE_DIRECTORY_KEY
+        os.environ[f'GIT_CONFIG_VALUE_{index}'] = path
+        os.environ['GIT_CONFIG_COUNT'] = str(index + 1)
+
+    def flush(self) -> int:
+        """
+        global 모드에서 모아둔 항목을 ~/.gitconfig 에 기록합니다.
+
+        Returns:
+            int: 기록된 항목 수
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        written = 0
+        for path in pending:
+            try:
+                result = self._run_git_config('--add', SAFE_DIRECTORY_KEY, path)
+                if result.returncode == 0:
+                    written += 1
+                    logger.info(f"✓ Added safe.directory: {path}")
+                else:
+                    logger.debug(f"Failed to add safe.directory (non-critical): {result.stderr}")
+            except FileNotFoundError:
+                logger.debug("Git command not found")
+                break
+            except Exception as e:
+                logger.debug(f"Failed to add safe.directory (non-critical): {e}")
+        return written
+
+    @staticmethod
+    def git_config_args(path: str) -> List[str]:
+        """단일 git 명령에 붙일 `-c safe.directory=<path>` 인자"""
+        return ['-c', f'{SAFE_DIRECTORY_KEY}={path}']
+
+    def deduplicate_global(self):
+        """~/.gitconfig 의 safe.directory 중복 항목 정리 (명시적으로 호출할 때만 수행)"""
+        try:
+            result = self._run_git_config('--get-all', SAFE_DIRECTORY_KEY)
+            if result.returncode != 0 or not result.stdout:
+                return
+            entries = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+
+            unique = []
+            seen = set()
+            for e in entries:
+                key = _normalize(e)
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(e)
+
+            if unique == entries:
+                return  # 이미 중복 없음
+
+            # 전체 항목 제거 후 유니크 항목만 재등록
+            self._run_git_config('--unset-all', SAFE_DIRECTORY_KEY)
+            for e in unique:
+                self._run_git_config('--add', SAFE_DIRECTORY_KEY, e)
+            logger.info(f"✓ Deduplicated safe.directory entries: {len(entries)} -> {len(unique)}")
+        except FileNotFoundError:
+            logger.debug("Git not found while deduplicating safe.directory")
+        except Exception as e:
+            logger.debug(f"Failed to deduplicate safe.directory: {e}")
@@ -0,0 +1,106 @@
+"""
+인덱스 별칭(alias) 관리
+앱이 사용하는 논리 인덱스 이름(AZURE_SEARCH_INDEX_NAME)이 가리키는 실제 인덱스를 원자적으로 바꿉니다.
+Azure AI Search 별칭(SearchAlias)을 우선 사용하고, 논리 이름이 이미 실제 인덱스 이름이라 별칭을 만들 수 없으면
+로컬 포인터 파일(index_aliases.json)로 대체합니다.
+"""
+
+import os
+import json
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from azure.search.documents.indexes.models import SearchAlias
+
+from src.index_checkpoint import default_cache_root
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_NAME = "git-commits"
+MODE_ALIAS = "alias"        # 서비스 별칭 (모든 인스턴스에 즉시 적용, 클라이언트는 논리 이름 사용)
+MODE_POINTER = "pointer"    # 로컬 포인터 (이 호스트에서 새로 만드는 클라이언트부터 적용)
+
+_lock = threading.Lock()
+
+
+def alias_file_path() -> Path:
+    """포인터 파일 경로 (INDEX_ALIAS_FILE 또는 캐시 루트)"""
+    if os.getenv("INDEX_ALIAS_FILE"):
+        return Path(os.environ["INDEX_ALIAS_FILE"])
+    return default_cache_root() / "index_aliases.json"
+
+
+def _load() -> Dict[str, Dict]:
+    path = alias_file_path()
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Failed to read index alias file {path}: {e}")
+        return {}
+
+
+def _save(aliases: Dict[str, Dict]):
+    path = alias_file_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 임시 파일에 쓰고 교체하여 읽는 쪽이 항상 완전한 파일을 보도록 함
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=".index_aliases.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(aliases, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def get_alias(logical_name: str) -> Optional[Dict]:
+    """논리 이름의 현재 대상 ({"index", "mode", "previous", "swapped_at"}, 없으면 None)"""
+    return _load().get(logical_name)
+
+
+def resolve_index_name(logical_name: Optional[str] = None) -> str:
+    """
+    클라이언트를 만들 때 사용할 인덱스 이름
+
+    서비스 별칭이면 논리 이름을 그대로 쓰고(서비스가 대상 인덱스로 연결), 로컬 포인터면 실제 인덱스 이름을 반환합니다.
+    """
+    logical_name = logical_name or os.getenv("AZURE_SEARCH_INDEX_NAME", DEFAULT_INDEX_NAME)
+    entry = get_alias(logical_name)
+    if entry and entry.get("mode") == MODE_POINTER:
+        return entry["index"]
+    return logical_name
+
+
+def swap_index_alias(index_client, logical_name: str, target_index: str) -> Dict:
+    """
+    논리 이름이 target_index를 가리키도록 원자적으로 전환합니다.
+
+    Returns:
+        Dict: {"index": target_index, "mode": "alias" | "pointer", "previous": 이전 대상, "swapped_at": str}
+    """
+    with _lock:
+        aliases = _load()
+        previous = aliases.get(logical_name, {}).get("index", logical_name)
+        try:
+            index_client.create_or_update_alias(SearchAlias(name=logical_name, indexes=[target_index]))
+            mode = MODE_ALIAS
+        except Exception as e:
+            # 같은 이름의 인덱스가 있거나 별칭을 지원하지 않는 서비스 → 로컬 포인터
+            logger.info(f"Search alias unavailable for '{logical_name}' ({type(e).__name__}); using local pointer")
+            mode = MODE_POINTER
+
+        entry = {"index": target_index, "mode": mode, "previous": previous,
+                 "swapped_at": datetime.now().isoformat()}
+        aliases[logical_name] = entry
+        _save(aliases)
+
+    logger.info(f"🔀 '{logical_name}' now points to '{target_index}' ({mode}, previous: '{previous}')")
+    return entry
@@ -0,0 +1,325 @@
+"""
+인덱싱 체크포인트 저장소
+(인덱스, 저장소)별로 커밋 처리 상태(추출됨 → 임베딩됨 → 업로드됨)를 SQLite(WAL 모드)에 기록하여,
+index_repository가 중간에 중단되어도 다음 실행에서 업로드된 커밋은 건너뛰고
+임베딩까지 끝난 문서는 다시 임베딩하지 않고 바로 업로드하도록 합니다.
+같은 저장소라도 인덱스가 다르거나 임베딩 모델/차원, 날짜 범위, skip_offset이 바뀌면 이어받지 않습니다.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 커밋 처리 상태
+STATE_PENDING = 'pending'      # 추출됨, 임베딩 전
+STATE_EMBEDDED = 'embedded'    # 임베딩됨, 업로드 전 (문서와 벡터 보관)
+STATE_UPLOADED = 'uploaded'    # 업로드 완료
+
+# 이 값이 이전 실행과 다르면 보관된 상태/벡터를 버리고 새로 시작 (limit 등은 달라도 이어받음)
+RESUME_PARAM_KEYS = ('embedding_model', 'vector_dimensions', 'since', 'until', 'skip_offset')
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS runs (
+        index_name TEXT NOT NULL,
+        repo_id TEXT NOT NULL,
+        params TEXT NOT NULL DEFAULT '{}',
+        started_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        last_uploaded_seq INTEGER,
+        uploaded_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (index_name, repo_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS commits (
+        index_name TEXT NOT NULL,
+        repo_id TEXT NOT NULL,
+        sha TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        state TEXT NOT NULL,
+        document TEXT,
+        vector BLOB,
+        PRIMARY KEY (index_name, repo_id, sha)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_commits_state ON commits (index_name, repo_id, state, seq)",
+)
+
+
+def default_cache_root() -> Path:
+    """저장소 캐시와 같은 캐시 루트 디렉토리 (REPO_CACHE_DIR 또는 환경별 기본값)"""
+    if 'REPO_CACHE_DIR' in os.environ:
+        return Path(os.environ['REPO_CACHE_DIR'])
+    if os.path.exists('/home/site/wwwroot'):
+        return Path(os.environ.get('HOME', '/home')) / '.cache'
+    if os.name == 'posix' and 'HOME' in os.environ:
+        return Path(os.environ['HOME']) / '.cache' / 'git_history_gen'
+    if os.name == 'posix':
+        return Path(tempfile.gettempdir()) / 'git_history_gen_cache'
+    return Path(__file__).parent.parent.resolve() / '.cache'
+
+
+def default_checkpoint_path() -> str:
+    """체크포인트 DB 기본 경로 (INDEX_CHECKPOINT_DIR 또는 캐시 루트)"""
+    root = Path(os.environ['INDEX_CHECKPOINT_DIR']) if 'INDEX_CHECKPOINT_DIR' in os.environ else default_cache_root()
+    return str(root / 'index_checkpoints.db')
+
+
+def _pack_vector(vector: Optional[List[float]]) -> Optional[bytes]:
+    if vector is None:
+        return None
+    return array('f', vector).tobytes()
+
+
+def _unpack_vector(blob: Optional[bytes]) -> Optional[List[float]]:
+    if blob is None:
+        return None
+    values = array('f')
+    values.frombytes(blob)
+    return values.tolist()
+
+
+def _params_mismatch(previous: Dict, params: Dict) -> List[str]:
+    """이어받을 수 없게 만드는 실행 파라미터 차이 (RESUME_PARAM_KEYS 기준)"""
+    return [key for key in RESUME_PARAM_KEYS if previous.get(key) != params.get(key)]
+
+
+class IndexCheckpointStore:
+    """(인덱스, 저장소)별 인덱싱 체크포인트 SQLite 저장소 (프로세스/스레드 안전)"""
+
+    def __init__(self, db_path: Optional[str] = None, busy_timeout: float = 30.0):
+        """
+        Args:
+            db_path: SQLite 데이터베이스 파일 경로 (기본값: default_checkpoint_path())
+            busy_timeout: 다른 프로세스가 쓰기 잠금을 잡고 있을 때 대기할 최대 시간 (초)
+        """
+        self.db_path = db_path or default_checkpoint_path()
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._transaction() as conn:
+            self._drop_legacy_schema(conn)
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    @staticmethod
+    def _drop_legacy_schema(conn: sqlite3.Connection):
+        """저장소만으로 키를 잡던 이전 스키마는 어느 인덱스의 실행인지 알 수 없으므로 삭제"""
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(runs)').fetchall()]
+        if columns and 'index_name' not in columns:
+            logger.warning("Dropping legacy indexing checkpoints without index name")
+            conn.execute('DROP TABLE IF EXISTS commits')
+            conn.execute('DROP TABLE IF EXISTS runs')
+
+    # ------------------------------------------------------------------ 연결
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 SQLite 연결 반환 (WAL 모드)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """쓰기 트랜잭션"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    # ------------------------------------------------------------------ 실행 단위
+
+    def begin(self, index_name: str, repo_id: str, params: Optional[Dict] = None) -> Dict:
+        """
+        인덱싱 실행을 시작하거나, 끝나지 않은 이전 실행을 이어받습니다.
+        이전 실행과 RESUME_PARAM_KEYS 값이 다르면 보관된 커밋 상태를 버리고 새로 시작합니다.
+
+        Args:
+            index_name: 대상 인덱스 이름
+            repo_id: 정규화된 저장소 식별자
+            params: 실행 파라미터 (embedding_model, vector_dimensions, since, until, skip_offset 등)
+
+        Returns:
+            Dict: 실행 정보 (resumed, discarded, next_seq, uploaded_count, embedded_count, pending_count 등)
+        """
+        params = params or {}
+        now = datetime.now().isoformat()
+        key = (index_name, repo_id)
+        discarded: List[str] = []
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT params, started_at, last_uploaded_seq, uploaded_count FROM runs '
+                'WHERE index_name = ? AND repo_id = ?', key
+            ).fetchone()
+            if row is not None:
+                discarded = _params_mismatch(json.loads(row[0] or '{}'), params)
+                if discarded:
+                    logger.info(f"Discarding indexing checkpoint for {repo_id} -> {index_name} "
+                                f"(changed: {', '.join(discarded)})")
+                    conn.execute('DELETE FROM commits WHERE index_name = ? AND repo_id = ?', key)
+                    conn.execute('DELETE FROM runs WHERE index_name = ? AND repo_id = ?', key)
+                    row = None
+            if row is None:
+                conn.execute(
+                    'INSERT INTO runs (index_name, repo_id, params, started_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                    (index_name, repo_id, json.dumps(params, ensure_ascii=False), now, now)
+                )
+                started_at, last_uploaded_seq, uploaded_count = now, None, 0
+            else:
+                _, started_at, last_uploaded_seq, uploaded_count = row
+                conn.execute(
+                    'UPDATE runs SET params = ?, updated_at = ? WHERE index_name = ? AND repo_id = ?',
+                    (json.dumps(params, ensure_ascii=False), now, *key)
+                )
+            counts = dict(conn.execute(
+                'SELECT state, COUNT(*) FROM commits WHERE index_name = ? AND repo_id = ? GROUP BY state', key
+            ).fetchall())
+            max_seq = conn.execute(
+                'SELECT MAX(seq) FROM commits WHERE index_name = ? AND repo_id = ?', key
+            ).fetchone()[0]
+
+        return {
+            'index_name': index_name,
+            'repo_id': repo_id,
+            'resumed': row is not None,
+            'discarded': discarded,
+            'started_at': started_at,
+            'last_uploaded_seq': last_uploaded_seq,
+            'uploaded_count': uploaded_count,
+            'pending_count': counts.get(STATE_PENDING, 0),
+            'embedded_count': counts.get(STATE_EMBEDDED, 0),
+            'next_seq': (max_seq + 1) if max_seq is not None else 0,
+        }
+
+    def get(self, index_name: str, repo_id: str) -> Optional[Dict]:
+        """진행 중인 실행 정보 조회 (없으면 None)"""
+        row = self._connect().execute(
+            'SELECT params, started_at, updated_at, last_uploaded_seq, uploaded_count FROM runs '
+            'WHERE index_name = ? AND repo_id = ?', (index_name, repo_id)
+        ).fetchone()
+        if row is None:
+            return None
+        params, started_at, updated_at, last_uploaded_seq, uploaded_count = row
+        return {
+            'index_name': index_name,
+            'repo_id': repo_id,
+            'params': json.loads(params or '{}'),
+            'started_at': started_at,
+            'updated_at': updated_at,
+            'last_uploaded_seq': last_uploaded_seq,
+            'uploaded_count': uploaded_count,
+        }
+
+    def finish(self, index_name: str, repo_id: str) -> int:
+        """
+        실행 완료 처리. 업로드에 실패해 남은 임베딩 문서는 다음 실행을 위해 유지합니다.
+
+        Returns:
+            int: 남아 있는 임베딩 문서 수 (0이면 체크포인트 전체 삭제)
+        """
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM commits WHERE index_name = ? AND repo_id = ? AND state != ?',
+                         (index_name, repo_id, STATE_EMBEDDED))
+            remaining = conn.execute('SELECT COUNT(*) FROM commits WHERE index_name = ? AND repo_id = ?',
+                                     (index_name, repo_id)).fetchone()[0]
+            if remaining == 0:
+                conn.execute('DELETE FROM runs WHERE index_name = ? AND repo_id = ?', (index_name, repo_id))
+        return remaining
+
+    def discard(self, index_name: str, repo_id: str):
+        """저장소 체크포인트 전체 삭제"""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM commits WHERE index_name = ? AND repo_id = ?', (index_name, repo_id))
+            conn.execute('DELETE FROM runs WHERE index_name = ? AND repo_id = ?', (index_name, repo_id))
+
+    # ------------------------------------------------------------------ 커밋 상태
+
+    def shas_in_state(self, index_name: str, repo_id: str, state: str) -> Set[str]:
+        rows = self._connect().execute(
+            'SELECT sha FROM commits WHERE index_name = ? AND repo_id = ? AND state = ?',
+            (index_name, repo_id, state)
+        ).fetchall()
+        return {r[0] for r in rows}
+
+    def mark_pending(self, index_name: str, repo_id: str, seq: int, shas: Iterable[str]):
+        """청크의 커밋을 추출됨으로 기록 (이미 임베딩/업로드된 커밋은 유지)"""
+        with self._transaction() as conn:
+            conn.executemany(
+                'INSERT INTO commits (index_name, repo_id, sha, seq, state) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (index_name, repo_id, sha) DO UPDATE SET seq = excluded.seq WHERE state = ?',
+                [(index_name, repo_id, sha, seq, STATE_PENDING, STATE_PENDING) for sha in shas]
+            )
+            self._touch_run(conn, index_name, repo_id)
+
+    def save_embedded(self, index_name: str, repo_id: str, seq: int, documents: List[Dict]):
+        """임베딩까지 끝난 문서(content_vector 포함)를 보관"""
+        rows = []
+        for doc in documents:
+            body = {k: v for k, v in doc.items() if k != 'content_vector'}
+            rows.append((index_name, repo_id, doc['id'], seq, STATE_EMBEDDED,
+                         json.dumps(body, ensure_ascii=False), _pack_vector(doc.get('content_vector'))))
+        with self._transaction() as conn:
+            conn.executemany('INSERT OR REPLACE INTO commits (index_name, repo_id, sha, seq, state, document, vector) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self._touch_run(conn, index_name, repo_id)
+
+    def load_embedded(self, index_name: str, repo_id: str) -> List[Tuple[int, List[Dict]]]:
+        """
+        업로드되지 않은 임베딩 문서를 청크 순서대로 반환
+
+        Returns:
+            List[Tuple[int, List[Dict]]]: (청크 번호, content_vector가 복원된 문서 목록)
+        """
+        rows = self._connect().execute(
+            'SELECT seq, document, vector FROM commits WHERE index_name = ? AND repo_id = ? AND state = ? '
+            'ORDER BY seq, rowid',
+            (index_name, repo_id, STATE_EMBEDDED)
+        ).fetchall()
+        chunks: Dict[int, List[Dict]] = {}
+        for seq, document, vector in rows:
+            doc = json.loads(document)
+            doc['content_vector'] = _unpack_vector(vector)
+            chunks.setdefault(seq, []).append(doc)
+        return sorted(chunks.items())
+
+    def mark_uploaded(self, index_name: str, repo_id: str, seq: int, shas: Iterable[str]):
+        """업로드 성공한 커밋 기록 (보관하던 문서/벡터 해제)"""
+        shas = list(shas)
+        with self._transaction() as conn:
+            conn.executemany(
+                'UPDATE commits SET state = ?, document = NULL, vector = NULL '
+                'WHERE index_name = ? AND repo_id = ? AND sha = ?',
+                [(STATE_UPLOADED, index_name, repo_id, sha) for sha in shas]
+            )
+            conn.execute(
+                'UPDATE runs SET last_uploaded_seq = MAX(COALESCE(last_uploaded_seq, -1), ?), '
+                'uploaded_count = uploaded_count + ?, updated_at = ? WHERE index_name = ? AND repo_id = ?',
+                (seq, len(shas), datetime.now().isoformat(), index_name, repo_id)
+            )
+
+    @staticmethod
+    def _touch_run(conn: sqlite3.Connection, index_name: str, repo_id: str):
+        conn.execute('UPDATE runs SET updated_at = ? WHERE index_name = ? AND repo_id = ?',
+                     (datetime.now().isoformat(), index_name, repo_id))
@@ -0,0 +1,257 @@
+"""
+인덱싱 사전 비용/시간 추정
+index_repository와 같은 방식으로 대상 커밋 범위를 계산하고, 범위에서 고르게 뽑은 표본 커밋을 실제 추출 경로
+(DocumentGenerator → 인덱스 문서)로 처리해 전체 임베딩 토큰, 추출 시간, 업로드 크기, 예상 소요 시간을 외삽합니다.
+큰 작업을 할당량을 쓰기 전에 예약하거나 거부하는 데 사용합니다.
+
+- 임베딩/업로드 요청은 보내지 않음 (임베딩 캐시와 인덱스 소속은 읽기만 함)
+- 처리 속도는 현재 설정(EMBEDDING_TPM/RPM/CONCURRENCY, UPLOAD_* 등)과 요청당 가정 지연으로 계산
+"""
+
+import os
+import math
+import time
+import logging
+from typing import Dict, List, Optional
+
+from src.document_generator import DocumentGenerator
+from src.embedding import EMBEDDING_MODEL, VECTOR_DIMENSIONS, BATCH_SIZE
+from src.embedding_cache import get_embedding_cache
+from src.embedding_engine import estimate_tokens
+from src.index_manifest import open_index_manifest
+from src.index_watermark import plan_watermark_range
+from src.indexer import CommitIndexer, normalize_repo_identifier, PIPELINE_CHUNK_SIZE
+from src.shared_history import shared_history_enabled, lookup_memberships, membership_update
+from src.upload_engine import document_size
+
+logger = logging.getLogger(__name__)
+
+# 업로드 크기 추정용 벡터 원소 (JSON 직렬화 시 실제 임베딩 값과 비슷한 자릿수)
+_SAMPLE_VECTOR_VALUE = -0.012345678901234567
+
+
+def _target_shas(generator: DocumentGenerator, index_name: str, repo_id: str, limit: Optional[int],
+                 since: Optional[str], until: Optional[str], skip_existing: bool, skip_offset: int,
+                 manifest) -> Dict:
+    """index_repository가 순회할 커밋 SHA 목록 (워터마크는 읽기만 하고 고아 삭제/전진은 하지 않음)"""
+    if (skip_existing and not (since or until or skip_offset) and manifest is not None
+            and os.getenv("INDEX_WATERMARK", "true").lower() == "true"):
+        try:
+            head = generator.repo.head.commit.hexsha
+            plan = plan_watermark_range(generator.repo, head, manifest.get_watermark(index_name, repo_id), limit)
+            return {"shas": plan["shas"], "mode": "watermark", "rewritten": plan["rewritten"],
+                    "truncated": plan["truncated"]}
+        except Exception as e:
+            logger.warning(f"Watermark planning failed, estimating from history listing: {e}")
+
+    rev, kwargs = generator._prepare_history(limit, "HEAD", since, until, skip_offset)
+    output = generator.repo.git.rev_list(rev, **kwargs)
+    return {"shas": output.split(), "mode": "history", "rewritten": False, "truncated": False}
+
+
+def _sample(items: List[str], size: int) -> List[str]:
+    """범위 전체에서 고르게 size개 선택 (최근/과거 커밋의 크기 차이를 반영)"""
+    if len(items) <= size:
+        return list(items)
+    return [items[(i * len(items)) // size] for i in range(size)]
+
+
+def _ratio(part: float, whole: float) -> float:
+    return part / whole if whole else 0.0
+
+
+def estimate_indexing(
+    repo_path: str,
+    limit: Optional[int] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    skip_existing: bool = True,
+    skip_offset: int = 0,
+    search_client=None,
+    index_name: Optional[str] = None,
+    sample_size: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    max_seconds: Optional[float] = None,
+) -> Dict:
+    """
+    인덱싱 작업의 비용과 소요 시간을 추정합니다 (index_repository와 같은 인자).
+
+    Args:
+        repo_path: Git 저장소 경로 또는 URL
+        limit / since / until / skip_existing / skip_offset: index_repository와 같음
+        search_client: Azure AI Search 클라이언트 (지정 시 표본의 기존/공유 커밋을 인덱스에서 확인)
+        index_name: 인덱스 이름 (매니페스트/워터마크 조회, 기본값: AZURE_SEARCH_INDEX_NAME의 현재 대상)
+        sample_size: 추출할 표본 커밋 수 (기본값: INDEX_ESTIMATE_SAMPLE_SIZE)
+        max_tokens: 임베딩 토큰 예산 (넘으면 exceeds에 "tokens")
+        max_seconds: 소요 시간 예산 (넘으면 exceeds에 "time")
+
+    Returns:
+        Dict: {"commits", "embedding", "extraction", "upload", "wall_clock_seconds", "exceeds", "within_budget",
+               "sample", "assumptions", ...}
+    """
+    if index_name is None:
+        from src.index_alias import resolve_index_name
+        index_name = resolve_index_name()
+    sample_size = max(1, sample_size or int(os.getenv("INDEX_ESTIMATE_SAMPLE_SIZE", "50")))
+    repo_id = normalize_repo_identifier(repo_path)
+    manifest = open_index_manifest()
+    share_history = shared_history_enabled()
+
+    generator = DocumentGenerator(repo_path)
+    try:
+        target = _target_shas(generator, index_name, repo_id, limit, since, until,
+                              skip_existing, skip_offset, manifest)
+        shas = target["shas"]
+
+        # 매니페스트로 확인되는 기존 커밋은 추출 후 건너뛰므로 임베딩/업로드 대상에서 제외
+        indexed_ids = manifest.load(index_name, repo_id) if (skip_existing and manifest is not None) else set()
+        known_indexed = sum(1 for sha in shas if sha in indexed_ids)
+        remaining = [sha for sha in shas if sha not in indexed_ids]
+
+        # 표본 추출 (실제 추출 경로, 커밋 캐시에 있으면 캐시 사용 - 실제 실행과 같음)
+        sampled = _sample(remaining, sample_size)
+        commits, extract_seconds, cached = [], 0.0, 0
+        for sha in sampled:
+            commit = generator.repo.commit(sha)
+            previous = commit.parents[0] if commit.parents else None
+            started = time.perf_counter()
+            commit_data, from_cache = generator._extract_commit(commit, previous)
+            extract_seconds += time.perf_counter() - started
+            if commit_data is None:
+                continue
+            commits.append(commit_data)
+            cached += int(from_cache)
+        if len(commits) > cached:
+            generator._save_commit_cache()
+    finally:
+        generator.close()
+
+    # 표본 중 이미 인덱싱된(인덱스 조회) 커밋과 다른 저장소에서 인덱싱된 공유 커밋
+    memberships = {}
+    if search_client is not None and (share_history or (skip_existing and manifest is None)) and commits:
+        memberships = lookup_memberships(search_client, [c["id"] for c in commits]) or {}
+    sample_indexed = sum(1 for c in commits if skip_existing and repo_id in memberships.get(c["id"], {}).get("repo_ids", ()))
+    sample_shared = sum(1 for c in commits if skip_existing and c["id"] in memberships
+                        and repo_id not in memberships[c["id"]]["repo_ids"])
+
+    # 새로 임베딩할 표본 문서의 토큰/크기와 임베딩 캐시 적중
+    max_input_tokens = int(os.getenv("EMBEDDING_MAX_INPUT_TOKENS", "8191"))
+    vector = [_SAMPLE_VECTOR_VALUE] * VECTOR_DIMENSIONS
+    new_docs, texts = [], []
+    link_bytes = 0
+    for commit in commits:
+        membership = memberships.get(commit["id"])
+        if membership and skip_existing:
+            if repo_id not in membership["repo_ids"]:
+                link_bytes += document_size(membership_update(commit["id"], membership, repo_id, repo_path))
+            continue
+        doc, text = CommitIndexer._build_document(commit, repo_id, repo_path)
+        if share_history:
+            doc.update(membership_update(doc["id"], {"repo_ids": set(), "repository_paths": set()}, repo_id, repo_path))
+        new_docs.append(doc)
+        texts.append(text)
+    cache = get_embedding_cache(EMBEDDING_MODEL, VECTOR_DIMENSIONS)
+    hits = [v is not None for v in cache.get_many(texts)] if (cache and texts) else [False] * len(texts)
+    text_tokens = [min(estimate_tokens(t), max_input_tokens) for t in texts]
+    uncached_tokens = sum(tokens for tokens, hit in zip(text_tokens, hits) if not hit)
+    doc_bytes = sum(document_size({**doc, "content_vector": vector}) for doc in new_docs)
+
+    # 표본 비율로 전체 외삽
+    n_sample = len(commits)
+    n_remaining = len(remaining)
+    scale = _ratio(n_remaining, n_sample)
+    new_commits = round(len(new_docs) * scale)
+    linked_commits = round(sample_shared * scale)
+    skipped_commits = known_indexed + round(sample_indexed * scale)
+    embed_texts_count = round((len(texts) - sum(hits)) * scale)
+    tokens = round(uncached_tokens * scale)
+    upload_bytes = round((doc_bytes + link_bytes) * scale)
+    upload_docs = new_commits + linked_commits
+
+    # 처리 속도 가정 (현재 설정 + 요청당 지연)
+    tpm = float(os.getenv("EMBEDDING_TPM", "0"))
+    rpm = float(os.getenv("EMBEDDING_RPM", "0"))
+    batch_tokens = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))
+    embed_concurrency = max(1, int(os.getenv("EMBEDDING_CONCURRENCY", "4")))
+    embed_latency = float(os.getenv("INDEX_ESTIMATE_EMBED_LATENCY_SECONDS", "1.5"))
+    upload_batch_docs = max(1, int(os.getenv("UPLOAD_BATCH_MAX_DOCS", "1000")))
+    upload_batch_bytes = int(float(os.getenv("UPLOAD_BATCH_MAX_MB", "12")) * 1024 * 1024)
+    upload_concurrency = max(1, int(os.getenv("UPLOAD_CONCURRENCY", "4")))
+    upload_latency = float(os.getenv("INDEX_ESTIMATE_UPLOAD_LATENCY_SECONDS", "2"))
+    price = os.getenv("EMBEDDING_PRICE_PER_1M_TOKENS")
+
+    # 파이프라인은 청크 단위로 임베딩/업로드하므로 요청 수는 청크마다 올림
+    chunks = math.ceil(n_remaining / PIPELINE_CHUNK_SIZE) if n_remaining else 0
+    embed_chunks = min(chunks, embed_texts_count)
+    embed_requests = max(math.ceil(tokens / batch_tokens), math.ceil(embed_texts_count / BATCH_SIZE), embed_chunks)
+    embed_seconds = max(
+        embed_requests * embed_latency / embed_concurrency,
+        tokens / tpm * 60 if tpm > 0 else 0.0,
+        embed_requests / rpm * 60 if rpm > 0 else 0.0,
+    )
+    upload_chunks = min(chunks, upload_docs)
+    upload_requests = max(math.ceil(upload_bytes / upload_batch_bytes), math.ceil(upload_docs / upload_batch_docs),
+                          upload_chunks)
+    upload_seconds = upload_requests * upload_latency / upload_concurrency
+    extraction_seconds = _ratio(extract_seconds, len(sampled)) * len(shas)
+
+    # 추출 → 임베딩 → 업로드는 청크 단위로 겹쳐 실행: 가장 느린 단계 + 나머지 단계의 청크 하나 분량
+    stages = [extraction_seconds, embed_seconds, upload_seconds]
+    slowest = max(stages)
+    wall_clock = slowest + (sum(stages) - slowest) / max(1, chunks)
+
+    exceeds = []
+    if max_tokens is not None and tokens > max_tokens:
+        exceeds.append("tokens")
+    if max_seconds is not None and wall_clock > max_seconds:
+        exceeds.append("time")
+
+    result = {
+        "repo_path": repo_path,
+        "repo_id": repo_id,
+        "index_name": index_name,
+        "range": {"mode": target["mode"], "limit": limit, "since": since, "until": until,
+                  "skip_offset": skip_offset, "history_rewritten": target["rewritten"],
+                  "truncated": target["truncated"]},
+        "commits": {
+            "in_range": len(shas),
+            "skipped_existing": skipped_commits,
+            "linked_shared": linked_commits,
+            "to_embed": new_commits,
+        },
+        "embedding": {
+            "model": EMBEDDING_MODEL,
+            "tokens": tokens,
+            "texts": embed_texts_count,
+            "cache_hit_ratio": round(_ratio(sum(hits), len(hits)), 3),
+            "avg_tokens_per_commit": round(_ratio(sum(text_tokens), len(text_tokens)), 1),
+            "requests": embed_requests,
+            "seconds": round(embed_seconds, 1),
+            "cost": round(tokens / 1_000_000 * float(price), 4) if price else None,
+        },
+        "extraction": {
+            "seconds": round(extraction_seconds, 1),
+            "avg_ms_per_commit": round(_ratio(extract_seconds, len(sampled)) * 1000, 1),
+            "commit_cache_hit_ratio": round(_ratio(cached, n_sample), 3),
+        },
+        "upload": {
+            "documents": upload_docs,
+            "bytes": upload_bytes,
+            "mb": round(upload_bytes / (1024 * 1024), 2),
+            "requests": upload_requests,
+            "seconds": round(upload_seconds, 1),
+        },
+        "wall_clock_seconds": round(wall_clock, 1),
+        "exceeds": exceeds,
+        "within_budget": not exceeds,
+        "sample": {"size": len(sampled), "extracted": n_sample, "indexed": sample_indexed, "shared": sample_shared},
+        "assumptions": {
+            "embedding_tpm": tpm, "embedding_rpm": rpm, "embedding_concurrency": embed_concurrency,
+            "embedding_latency_seconds": embed_latency, "upload_concurrency": upload_concurrency,
+            "upload_latency_seconds": upload_latency, "chunk_size": PIPELINE_CHUNK_SIZE,
+        },
+    }
+    logger.info(f"🧮 Indexing estimate for {repo_id}: {len(shas)} commits in range, {new_commits} to embed, "
+                f"~{tokens} tokens, ~{result['upload']['mb']} MB, ~{result['wall_clock_seconds']}s"
+                + (f" (exceeds: {', '.join(exceeds)})" if exceeds else ""))
+    return result
@@ -8,6 +8,13 @@ from typing import Dict, List, Optional, Any
 from azure.search.documents import SearchClient
 from azure.search.documents.indexes import SearchIndexClient
 from azure.core.exceptions import ResourceNotFoundError
+from src.index_manifest import open_index_manifest
+from src.indexer import normalize_repo_identifier
+from src.shared_history import (
+    repo_filter, repository_document_counts, repository_path_for, detach_repository,
+    REPO_IDS_FIELD, REPO_PATHS_FIELD,
+)
+from src.upload_engine import DocumentUploader
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -81,25 +88,9 @@ class IndexManager:
             }
 
     def _get_repository_statistics(self) -> Dict[str, int]:
-        """저장소별 커밋 수 조회"""
+        """저장소별 커밋 수 조회 (포크와 공유하는 커밋은 저장소마다 집계)"""
         try:
-            results = self.search_client.search(
-                search_text="*",
-                facets=["repo_id,count:1000"],
-                top=0
-            )
-
-            repo_facets = results.get_facets()
-            if not repo_facets or "repo_id" not in repo_facets:
-                return {}
-
-            repo_stats = {}
-            for facet in repo_facets["repo_id"]:
-                repo_id = facet.get("value", "unknown")
-                count = facet.get("count", 0)
-                repo_stats[repo_id] = count
-
-            return repo_stats
+            return repository_document_counts(self.search_client, limit=1000)
 
         except Exception as e:
             logger.warning(f"Failed to get repository statistics: {e}")
@@ -179,37 +170,50 @@ class IndexManager:
         try:
             logger.info("Listing indexed repositories")
 
+            counts = repository_document_counts(self.search_client, limit=1000)
+
+            # 표본 문서의 저장소 경로로 repo_id → 경로 매핑
             results = self.search_client.search(
                 search_text="*",
-                select=["repo_id", "repository_path"],
+                select=["repo_id", "repository_path", REPO_PATHS_FIELD],
                 top=1000
             )
-
-            # repo_id별로 그룹화
-            repos = {}
+            paths = {}
             for result in results:
-                repo_id = result.get("repo_id")
-                repo_path = result.get("repository_path")
-
-                if repo_id and repo_id not in repos:
-                    repos[repo_id] = {
-                        "repo_id": repo_id,
-                        "repository_path": repo_path,
-                        "commit_count": 0
-                    }
-
-                if repo_id:
-                    repos[repo_id]["commit_count"] += 1
-
-            return list(repos.values())
+                for path in (result.get(REPO_PATHS_FIELD) or []) + [result.get("repository_path")]:
+                    if path:
+                        paths.setdefault(normalize_repo_identifier(path), path)
+
+            repos = []
+            for repo_id, count in counts.items():
+                repo_path = paths.get(repo_id)
+                if repo_path is None:
+                    first = next(iter(self.search_client.search(
+                        search_text="*", filter=repo_filter(repo_id),
+                        select=["repo_id", "repository_path", REPO_PATHS_FIELD], top=1
+                    )), None)
+                    repo_path = repository_path_for(first, repo_id) if first else None
+                repos.append({"repo_id": repo_id, "repository_path": repo_path, "commit_count": count})
+
+            return repos
 
         except Exception as e:
             logger.error(f"Failed to list repositories: {e}")
             return []
 
+    def _clear_manifest(self, repo_id: Optional[str] = None):
+        """삭제한 문서를 로컬 인덱싱 매니페스트에서도 제거"""
+        manifest = open_index_manifest()
+        if manifest:
+            try:
+                manifest.clear(self.index_name, repo_id)
+            except Exception as e:
+                logger.warning(f"Failed to clear index manifest: {e}")
+
     def delete_repository_commits(self, repo_id: str) -> int:
         """
         특정 저장소의 모든 커밋을 삭제합니다.
+        다른 저장소(업스트림/포크)와 공유하는 커밋은 삭제하지 않고 소속에서만 제거합니다.
 
         Args:
             repo_id: 저장소 식별자
@@ -220,18 +224,25 @@ class IndexManager:
         try:
             logger.info(f"Deleting commits for repository: {repo_id}")
 
-            # 해당 저장소의 모든 커밋 ID 조회
+            # 해당 저장소의 모든 커밋 조회
             results = self.search_client.search(
                 search_text="*",
-                filter=f"repo_id eq '{repo_id}'",
-                select=["id"],
+                filter=repo_filter(repo_id),
+                select=["id", "repo_id", "repository_path", REPO_IDS_FIELD, REPO_PATHS_FIELD],
                 top=10000
             )
 
-            commit_ids = [result["id"] for result in results]
+            plan = detach_repository(results, repo_id)
+            commit_ids = plan["delete"]
+
+            if plan["merge"]:
+                DocumentUploader(self.search_client, action="merge").upload(plan["merge"])
+                logger.info(f"Detached {len(plan['merge'])} shared commits from repo_id: {repo_id}")
 
             if not commit_ids:
-                logger.info(f"No commits found for repo_id: {repo_id}")
+                if not plan["merge"]:
+                    logger.info(f"No commits found for repo_id: {repo_id}")
+                self._clear_manifest(repo_id)
                 return 0
 
             # 배치 삭제
@@ -247,6 +258,7 @@ class IndexManager:
 
                 logger.info(f"Deleted batch {i//batch_size + 1}: {len(batch)} documents")
 
+            self._clear_manifest(repo_id)
             logger.info(f"✓ Deleted {deleted_count} commits for repo_id: {repo_id}")
             return deleted_count
 
@@ -284,6 +296,7 @@ class IndexManager:
                 documents_to_delete = [{"id": doc_id} for doc_id in batch]
                 self.search_client.delete_documents(documents_to_delete)
 
+            self._clear_manifest()
             logger.info(f"✓ Cleared {len(all_ids)} documents from index")
             return True
 
@@ -307,7 +320,7 @@ class IndexManager:
             # 커밋 수 조회
             results = self.search_client.search(
                 search_text="*",
-                filter=f"repo_id eq '{repo_id}'",
+                filter=repo_filter(repo_id),
                 include_total_count=True,
                 top=0
             )
@@ -321,20 +334,20 @@ class IndexManager:
             # 샘플 커밋 조회
             sample_results = self.search_client.search(
                 search_text="*",
-                filter=f"repo_id eq '{repo_id}'",
-                select=["repository_path", "author", "date"],
+                filter=repo_filter(repo_id),
+                select=["repo_id", "repository_path", REPO_PATHS_FIELD, "author", "date"],
                 top=1
             )
 
             repo_path = None
             for result in sample_results:
-                repo_path = result.get("repository_path")
+                repo_path = repository_path_for(result, repo_id)
                 break
 
             # 기여자 조회
             author_results = self.search_client.search(
                 search_text="*",
-                filter=f"repo_id eq '{repo_id}'",
+                filter=repo_filter(repo_id),
                 facets=["author,count:100"],
                 top=0
             )
@@ -345,7 +358,7 @@ class IndexManager:
             # 날짜 범위
             oldest = self.search_client.search(
                 search_text="*",
-                filter=f"repo_id eq '{repo_id}'",
+                filter=repo_filter(repo_id),
                 order_by=["date asc"],
                 select=["date"],
                 top=1
@@ -353,7 +366,7 @@ class IndexManager:
 
             newest = self.search_client.search(
                 search_text="*",
-                filter=f"repo_id eq '{repo_id}'",
+                filter=repo_filter(repo_id),
                 order_by=["date desc"],
                 select=["date"],
                 top=1
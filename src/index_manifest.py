@@ -0,0 +1,283 @@
+"""
+인덱싱된 커밋 매니페스트
+인덱스/저장소별로 이미 업로드된 커밋 SHA 목록을 로컬 SQLite(WAL 모드)에 보관합니다.
+증분 인덱싱 시 "이미 인덱싱됨" 여부를 Azure AI Search 조회 없이 로컬에서 판단하고,
+주기적으로 인덱스와 대조(reconcile)하여 외부 삭제 등으로 생긴 차이를 바로잡습니다.
+저장소별 워터마크(인덱싱된 범위의 tip SHA와 아래쪽 경계)도 함께 보관합니다 (index_watermark 참고).
+공유 커밋이 어느 저장소에 속하는지도 여기서 알 수 있으므로, 동시에 merge하다 잃어버린 소속을 복구하는 기준이 됩니다.
+벡터를 만든 임베딩 텍스트는 인덱스에 저장하지 않고 content_hash를 키로 여기에 보관합니다 (인덱스 이전 시 재임베딩).
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from src.index_checkpoint import default_cache_root
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS manifests (
+        index_name TEXT NOT NULL,
+        repo_id TEXT NOT NULL,
+        reconciled_at TEXT,
+        repo_path TEXT,
+        PRIMARY KEY (index_name, repo_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS indexed_commits (
+        index_name TEXT NOT NULL,
+        repo_id TEXT NOT NULL,
+        sha TEXT NOT NULL,
+        PRIMARY KEY (index_name, repo_id, sha)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_indexed_commits_sha ON indexed_commits (index_name, sha)",
+    """
+    CREATE TABLE IF NOT EXISTS watermarks (
+        index_name TEXT NOT NULL,
+        repo_id TEXT NOT NULL,
+        tips TEXT NOT NULL,
+        frontier TEXT NOT NULL,
+        covered INTEGER NOT NULL DEFAULT 0,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (index_name, repo_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS embedding_texts (
+        content_hash TEXT PRIMARY KEY,
+        text TEXT NOT NULL
+    ) WITHOUT ROWID
+    """,
+)
+
+
+def default_manifest_path() -> str:
+    """매니페스트 DB 기본 경로 (체크포인트와 같은 디렉토리)"""
+    root = Path(os.environ['INDEX_CHECKPOINT_DIR']) if 'INDEX_CHECKPOINT_DIR' in os.environ else default_cache_root()
+    return str(root / 'index_manifest.db')
+
+
+class IndexManifest:
+    """인덱스/저장소별 인덱싱된 커밋 SHA 집합 (프로세스/스레드 안전)"""
+
+    def __init__(self, db_path: Optional[str] = None, busy_timeout: float = 30.0):
+        """
+        Args:
+            db_path: SQLite 데이터베이스 파일 경로 (기본값: default_manifest_path())
+            busy_timeout: 다른 프로세스가 쓰기 잠금을 잡고 있을 때 대기할 최대 시간 (초)
+        """
+        self.db_path = db_path or default_manifest_path()
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._transaction() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            # 이전 스키마: 저장소 경로 열 추가
+            if 'repo_path' not in {r[1] for r in conn.execute('PRAGMA table_info(manifests)')}:
+                conn.execute('ALTER TABLE manifests ADD COLUMN repo_path TEXT')
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 SQLite 연결 반환 (WAL 모드)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """쓰기 트랜잭션"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    # ------------------------------------------------------------------ 조회
+
+    def reconciled_at(self, index_name: str, repo_id: str) -> Optional[datetime]:
+        """마지막으로 인덱스와 대조한 시각 (대조한 적 없으면 None = 매니페스트를 신뢰할 수 없음)"""
+        row = self._connect().execute(
+            'SELECT reconciled_at FROM manifests WHERE index_name = ? AND repo_id = ?', (index_name, repo_id)
+        ).fetchone()
+        if not row or not row[0]:
+            return None
+        return datetime.fromisoformat(row[0])
+
+    def load(self, index_name: str, repo_id: str) -> Set[str]:
+        """저장소의 인덱싱된 SHA 집합"""
+        rows = self._connect().execute(
+            'SELECT sha FROM indexed_commits WHERE index_name = ? AND repo_id = ?', (index_name, repo_id)
+        ).fetchall()
+        return {r[0] for r in rows}
+
+    def count(self, index_name: str, repo_id: str) -> int:
+        return self._connect().execute(
+            'SELECT COUNT(*) FROM indexed_commits WHERE index_name = ? AND repo_id = ?', (index_name, repo_id)
+        ).fetchone()[0]
+
+    def memberships(self, index_name: str, shas: Iterable[str],
+                    chunk_size: int = 500) -> Dict[str, Dict[str, Optional[str]]]:
+        """SHA별로 그 커밋을 인덱싱(또는 연결)한 저장소 {sha: {repo_id: repo_path}} (경로를 모르면 None)"""
+        shas = list(dict.fromkeys(shas))
+        found: Dict[str, Dict[str, Optional[str]]] = {}
+        conn = self._connect()
+        for i in range(0, len(shas), chunk_size):
+            chunk = shas[i:i + chunk_size]
+            rows = conn.execute(
+                'SELECT c.sha, c.repo_id, m.repo_path FROM indexed_commits c '
+                'LEFT JOIN manifests m ON m.index_name = c.index_name AND m.repo_id = c.repo_id '
+                f'WHERE c.index_name = ? AND c.sha IN ({",".join("?" * len(chunk))})',
+                [index_name, *chunk]
+            ).fetchall()
+            for sha, repo_id, repo_path in rows:
+                found.setdefault(sha, {})[repo_id] = repo_path
+        return found
+
+    # ------------------------------------------------------------------ 갱신
+
+    def add(self, index_name: str, repo_id: str, shas: Iterable[str], repo_path: Optional[str] = None):
+        """업로드 성공한 SHA 추가 (repo_path를 주면 저장소 경로도 기록)"""
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO manifests (index_name, repo_id, repo_path) VALUES (?, ?, ?) '
+                'ON CONFLICT (index_name, repo_id) DO UPDATE SET repo_path = COALESCE(excluded.repo_path, repo_path)',
+                (index_name, repo_id, repo_path)
+            )
+            conn.executemany(
+                'INSERT OR IGNORE INTO indexed_commits (index_name, repo_id, sha) VALUES (?, ?, ?)',
+                [(index_name, repo_id, sha) for sha in shas]
+            )
+
+    def replace(self, index_name: str, repo_id: str, shas: Iterable[str]) -> Dict[str, int]:
+        """
+        인덱스에서 읽은 전체 SHA 목록으로 매니페스트를 교체 (전체 대조)
+
+        Returns:
+            Dict[str, int]: {"added": 매니페스트에 없던 수, "removed": 인덱스에 없어 제거된 수}
+        """
+        actual = set(shas)
+        with self._transaction() as conn:
+            current = {r[0] for r in conn.execute(
+                'SELECT sha FROM indexed_commits WHERE index_name = ? AND repo_id = ?', (index_name, repo_id))}
+            added = actual - current
+            removed = current - actual
+            conn.executemany('DELETE FROM indexed_commits WHERE index_name = ? AND repo_id = ? AND sha = ?',
+                             [(index_name, repo_id, sha) for sha in removed])
+            conn.executemany('INSERT INTO indexed_commits (index_name, repo_id, sha) VALUES (?, ?, ?)',
+                             [(index_name, repo_id, sha) for sha in added])
+            self._mark_reconciled(conn, index_name, repo_id)
+        return {"added": len(added), "removed": len(removed)}
+
+    def mark_reconciled(self, index_name: str, repo_id: str):
+        """인덱스와 일치함을 확인한 시각 기록"""
+        with self._transaction() as conn:
+            self._mark_reconciled(conn, index_name, repo_id)
+
+    @staticmethod
+    def _mark_reconciled(conn: sqlite3.Connection, index_name: str, repo_id: str):
+        conn.execute(
+            'INSERT INTO manifests (index_name, repo_id, reconciled_at) VALUES (?, ?, ?) '
+            'ON CONFLICT (index_name, repo_id) DO UPDATE SET reconciled_at = excluded.reconciled_at',
+            (index_name, repo_id, datetime.now().isoformat())
+        )
+
+    def remove(self, index_name: str, repo_id: str, shas: Iterable[str]):
+        """인덱스에서 삭제한 SHA 제거"""
+        with self._transaction() as conn:
+            conn.executemany('DELETE FROM indexed_commits WHERE index_name = ? AND repo_id = ? AND sha = ?',
+                             [(index_name, repo_id, sha) for sha in shas])
+
+    def clear(self, index_name: str, repo_id: Optional[str] = None):
+        """인덱스(또는 인덱스의 저장소 하나) 매니페스트와 워터마크 삭제"""
+        with self._transaction() as conn:
+            for table in ('indexed_commits', 'manifests', 'watermarks'):
+                if repo_id is None:
+                    conn.execute(f'DELETE FROM {table} WHERE index_name = ?', (index_name,))
+                else:
+                    conn.execute(f'DELETE FROM {table} WHERE index_name = ? AND repo_id = ?', (index_name, repo_id))
+
+    # ------------------------------------------------------------------ 워터마크
+
+    def get_watermark(self, index_name: str, repo_id: str) -> Optional[Dict]:
+        """
+        저장소 워터마크 조회
+
+        Returns:
+            Optional[Dict]: {"tips": 인덱싱된 범위의 tip SHA 목록, "frontier": 아직 인덱싱되지 않은 경계 커밋 목록,
+                             "covered": 범위에 포함된 커밋 수, "updated_at": str} (없으면 None)
+        """
+        row = self._connect().execute(
+            'SELECT tips, frontier, covered, updated_at FROM watermarks WHERE index_name = ? AND repo_id = ?',
+            (index_name, repo_id)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"tips": json.loads(row[0]), "frontier": json.loads(row[1]), "covered": row[2], "updated_at": row[3]}
+
+    def set_watermark(self, index_name: str, repo_id: str, tips: List[str], frontier: List[str], covered: int):
+        """저장소 워터마크 저장"""
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO watermarks (index_name, repo_id, tips, frontier, covered, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (index_name, repo_id, json.dumps(tips), json.dumps(frontier), covered, datetime.now().isoformat())
+            )
+
+    def clear_watermark(self, index_name: str, repo_id: str):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM watermarks WHERE index_name = ? AND repo_id = ?', (index_name, repo_id))
+
+    # ------------------------------------------------------------------ 임베딩 텍스트
+
+    def put_texts(self, texts: Dict[str, str]):
+        """{content_hash: 임베딩 텍스트} 보관 (인덱스/저장소와 무관, 같은 해시는 같은 텍스트)"""
+        if not texts:
+            return
+        with self._transaction() as conn:
+            conn.executemany('INSERT OR IGNORE INTO embedding_texts (content_hash, text) VALUES (?, ?)',
+                             list(texts.items()))
+
+    def get_texts(self, hashes: Iterable[str], chunk_size: int = 500) -> Dict[str, str]:
+        """보관된 {content_hash: 임베딩 텍스트} (없는 해시는 제외)"""
+        hashes = [h for h in dict.fromkeys(hashes) if h]
+        found: Dict[str, str] = {}
+        conn = self._connect()
+        for i in range(0, len(hashes), chunk_size):
+            chunk = hashes[i:i + chunk_size]
+            rows = conn.execute(
+                f'SELECT content_hash, text FROM embedding_texts WHERE content_hash IN ({",".join("?" * len(chunk))})',
+                chunk
+            ).fetchall()
+            found.update(rows)
+        return found
+
+
+def open_index_manifest() -> Optional[IndexManifest]:
+    """환경 설정 기반 매니페스트 (INDEX_MANIFEST=false이거나 열 수 없으면 None)"""
+    if os.getenv("INDEX_MANIFEST", "true").lower() != "true":
+        return None
+    try:
+        return IndexManifest()
+    except Exception as e:
+        logger.warning(f"Index manifest disabled: {e}")
+        return None
@@ -0,0 +1,251 @@
+"""
+백그라운드 인덱스 이전 (재임베딩 + 별칭 전환)
+기존 인덱스를 그대로 서비스하면서 새 벡터 설정(모델/차원/압축)의 인덱스를 옆에 만들고,
+문서를 id 접두사 범위로 나눠 병렬로 읽어 재임베딩 → 업로드한 뒤 문서 수를 검증하고 논리 인덱스 이름을 새 인덱스로 전환합니다.
+
+- 읽기: id(커밋 SHA) 접두사 범위 필터로 페이지를 나누며, 한 범위가 page_size를 넘으면 하위 접두사 16개로 분할
+  (skip 기반 페이지 한도 없이 수백만 문서도 순회, 동시 읽기 수를 제한해 검색 지연에 주는 영향을 줄임)
+- 재임베딩: 인덱싱 시 매니페스트에 보관한 임베딩 텍스트(content_hash 키, 없으면 저장된 필드로 복원)를 embed_texts로
+  (영구 캐시 + TPM/RPM 제한 엔진)
+- 업로드: DocumentUploader (크기 기준 배치, 실패 키 재시도)
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.embedding import embed_texts
+from src.embedding_cache import text_key
+from src.index_alias import swap_index_alias
+from src.indexer import CommitIndexer, CONTENT_HASH_FIELD, stored_fields_text
+from src.index_manifest import IndexManifest, open_index_manifest
+from src.index_pipeline import StreamingPipeline
+from src.upload_engine import DocumentUploader
+from src.vector_config import VECTOR_FIELD
+
+logger = logging.getLogger(__name__)
+
+# 문서 id는 커밋 SHA(16진수 소문자)이므로 접두사 p의 범위는 [p, p + 'g')
+ID_ALPHABET = "0123456789abcdef"
+
+
+def document_text(doc: Dict, texts: Optional[Dict[str, str]] = None) -> str:
+    """
+    문서 벡터를 만든 임베딩 텍스트.
+    인덱싱 시 매니페스트에 보관한 텍스트(content_hash 키)를 쓰고, 없으면 저장된 필드로 다시 구성합니다.
+
+    Args:
+        doc: 인덱스 문서
+        texts: 매니페스트에서 읽은 {content_hash: 임베딩 텍스트}
+    """
+    text = (texts or {}).get(doc.get(CONTENT_HASH_FIELD))
+    return text if text is not None else stored_fields_text(doc)
+
+
+def _count(search_client) -> int:
+    return search_client.search(search_text="*", include_total_count=True, top=0).get_count() or 0
+
+
+class IndexMigration:
+    """기존 인덱스를 새 인덱스로 복사/재임베딩하고 별칭을 전환하는 작업"""
+
+    def __init__(
+        self,
+        index_client,
+        openai_client,
+        source_index: str,
+        target_index: str,
+        logical_name: Optional[str] = None,
+        re_embed: bool = True,
+        page_size: Optional[int] = None,
+        read_concurrency: Optional[int] = None,
+        verify_timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            index_client: Azure AI Search 인덱스 클라이언트
+            openai_client: Azure OpenAI 클라이언트 (재임베딩)
+            source_index: 현재 인덱스 이름
+            target_index: 새 인덱스 이름 (현재 벡터 설정으로 생성)
+            logical_name: 검증 후 target_index로 전환할 논리 이름 (None이면 전환하지 않음)
+            re_embed: 재임베딩 여부 (False면 기존 벡터를 그대로 복사, 벡터가 검색 결과로 반환되어야 함)
+            page_size: 범위당 최대 문서 수 (기본값: INDEX_MIGRATION_PAGE_SIZE)
+            read_concurrency: 동시 읽기 요청 수 (기본값: INDEX_MIGRATION_READ_CONCURRENCY)
+            verify_timeout: 문서 수 검증 대기 시간 (초, 기본값: INDEX_MIGRATION_VERIFY_TIMEOUT)
+        """
+        if source_index == target_index:
+            raise ValueError("Target index must differ from the source index")
+        self.index_client = index_client
+        self.openai_client = openai_client
+        self.source_index = source_index
+        self.target_index = target_index
+        self.logical_name = logical_name
+        self.re_embed = re_embed
+        self.page_size = page_size or int(os.getenv("INDEX_MIGRATION_PAGE_SIZE", "1000"))
+        self.read_concurrency = max(1, read_concurrency or int(os.getenv("INDEX_MIGRATION_READ_CONCURRENCY", "2")))
+        self.verify_timeout = verify_timeout if verify_timeout is not None else float(
+            os.getenv("INDEX_MIGRATION_VERIFY_TIMEOUT", "300"))
+
+        self.source = index_client.get_search_client(source_index)
+        self.target = index_client.get_search_client(target_index)
+        self.select: List[str] = []
+        self.manifest: Optional[IndexManifest] = None  # 인덱싱 시 보관한 임베딩 텍스트 (run에서 열기)
+        self.status = {
+            "state": "pending", "stage": None, "source_index": source_index, "target_index": target_index,
+            "read": 0, "embed_failed": 0, "uploaded": 0, "source_count": None, "target_count": None,
+            "alias": None, "error": None, "started_at": None, "finished_at": None,
+        }
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------ 실행
+
+    def start(self) -> threading.Thread:
+        """백그라운드 스레드에서 실행 (진행 상황은 status로 확인)"""
+        if self._thread and self._thread.is_alive():
+            return self._thread
+        self._thread = threading.Thread(target=self._run_safely, name=f"migrate-{self.target_index}", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def wait(self, timeout: Optional[float] = None) -> Dict:
+        if self._thread:
+            self._thread.join(timeout)
+        return self.status
+
+    def _run_safely(self):
+        try:
+            self.run()
+        except Exception as e:
+            logger.error(f"Index migration to '{self.target_index}' failed: {e}")
+
+    def run(self) -> Dict:
+        """
+        이전 실행 (생성 → 복사/재임베딩 → 검증 → 전환)
+
+        Returns:
+            Dict: 최종 status
+
+        Raises:
+            Exception: 복사 실패 또는 문서 수 검증 실패 (이 경우 별칭은 바뀌지 않음)
+        """
+        self.status.update(state="running", started_at=datetime.now().isoformat())
+        try:
+            self._stage("create")
+            CommitIndexer(self.target, self.index_client, self.openai_client, self.target_index).create_index_if_not_exists()
+            source_definition = self.index_client.get_index(self.source_index)
+            self.select = [f.name for f in source_definition.fields
+                           if self.re_embed is False or f.name != VECTOR_FIELD]
+            self.status["source_count"] = _count(self.source)
+            self.manifest = open_index_manifest()
+
+            self._stage("copy")
+            uploader = DocumentUploader(self.target)
+            pipeline = StreamingPipeline(
+                [("embed", self._embed_page), ("upload", lambda docs: self._upload_page(uploader, docs))],
+                queue_size=int(os.getenv("INDEX_PIPELINE_QUEUE_SIZE", "2")),
+            )
+            pipeline.run(self._iter_pages())
+
+            self._stage("verify")
+            self._verify()
+
+            if self.logical_name:
+                self._stage("swap")
+                self.status["alias"] = swap_index_alias(self.index_client, self.logical_name, self.target_index)
+                if self.manifest:
+                    # 논리 이름의 매니페스트는 이전 인덱스 기준이므로 다음 인덱싱에서 다시 대조
+                    self.manifest.clear(self.logical_name)
+
+            self.status.update(state="completed", stage=None)
+            logger.info(f"✅ Index migration completed: {self.status['uploaded']} documents in '{self.target_index}'")
+            return self.status
+        except Exception as e:
+            self.status.update(state="failed", error=str(e))
+            raise
+        finally:
+            self.status["finished_at"] = datetime.now().isoformat()
+
+    def _stage(self, stage: str):
+        self.status["stage"] = stage
+        logger.info(f"🚚 Index migration {self.source_index} → {self.target_index}: {stage}")
+
+    # ------------------------------------------------------------------ 단계
+
+    def _read_prefix(self, prefix: str) -> Tuple[List[Dict], List[str]]:
+        """접두사 범위 한 페이지 읽기. 범위가 page_size보다 크면 (빈 목록, 하위 접두사)"""
+        results = self.source.search(
+            search_text="*",
+            filter=f"id ge '{prefix}' and id lt '{prefix}g'",
+            select=self.select,
+            top=self.page_size,
+            include_total_count=True,
+        )
+        if (results.get_count() or 0) > self.page_size and len(prefix) < 40:
+            return [], [prefix + c for c in ID_ALPHABET]
+        docs = [{k: v for k, v in r.items() if not k.startswith("@search.")} for r in results]
+        return docs, []
+
+    def _iter_pages(self) -> Iterator[List[Dict]]:
+        """접두사 범위를 read_concurrency개씩 동시에 읽어 페이지 단위로 반환"""
+        pending = list(ID_ALPHABET)
+        with ThreadPoolExecutor(max_workers=self.read_concurrency, thread_name_prefix="migrate-read") as pool:
+            running = set()
+            while pending or running:
+                while pending and len(running) < self.read_concurrency:
+                    running.add(pool.submit(self._read_prefix, pending.pop(0)))
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    docs, children = future.result()
+                    pending.extend(children)
+                    if docs:
+                        self.status["read"] += len(docs)
+                        yield docs
+
+    def _embed_page(self, docs: List[Dict]) -> List[Dict]:
+        if not self.re_embed:
+            return docs
+        stored = {}
+        if self.manifest is not None:
+            try:
+                stored = self.manifest.get_texts(d.get(CONTENT_HASH_FIELD) for d in docs)
+            except Exception as e:
+                logger.warning(f"Failed to read stored embedding texts, rebuilding from fields: {e}")
+        texts = [document_text(d, stored) for d in docs]
+        vectors = embed_texts(texts, self.openai_client)
+        embedded, remembered = [], {}
+        for doc, text, vector in zip(docs, texts, vectors):
+            if vector:
+                # 벡터를 만든 텍스트가 바뀌었을 수 있으므로 해시도 갱신 (재보강 시 원래 문서 텍스트로 다시 임베딩)
+                embedded.append({**doc, VECTOR_FIELD: vector, CONTENT_HASH_FIELD: text_key(text)})
+                remembered[text_key(text)] = text
+            else:
+                self.status["embed_failed"] += 1
+        if self.manifest is not None and remembered:
+            try:
+                self.manifest.put_texts(remembered)
+            except Exception as e:
+                logger.warning(f"Failed to store embedding texts: {e}")
+        return embedded
+
+    def _upload_page(self, uploader: DocumentUploader, docs: List[Dict]) -> int:
+        succeeded = uploader.upload(docs)
+        self.status["uploaded"] += len(succeeded)
+        return len(succeeded)
+
+    def _verify(self):
+        """새 인덱스 문서 수가 현재 인덱스와 같아질 때까지 대기 (인덱싱 반영 지연 고려)"""
+        deadline = time.monotonic() + self.verify_timeout
+        while True:
+            source_count = _count(self.source)
+            target_count = _count(self.target)
+            self.status.update(source_count=source_count, target_count=target_count)
+            if target_count >= source_count:
+                return
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"Document count mismatch after migration: "
+                                   f"source {source_count}, target {target_count}")
+            time.sleep(min(2.0, max(0.0, deadline - time.monotonic())))
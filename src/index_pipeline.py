@@ -0,0 +1,153 @@
+"""
+스트리밍 인덱싱 파이프라인
+추출 → 임베딩 → 업로드 단계를 크기 제한 큐로 연결하여 청크 단위로 동시에 처리합니다.
+큐가 가득 차면 앞 단계가 대기하므로(backpressure) 메모리 사용량이 청크 몇 개 분량으로 유지되고,
+첫 청크는 전체 추출이 끝나기 전에 업로드되어 바로 검색 가능해집니다.
+"""
+
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SENTINEL = object()
+
+
+class StreamingPipeline:
+    """
+    단계별 워커 스레드와 크기 제한 큐로 구성된 파이프라인
+    소스 순회는 호출 스레드에서 수행하므로 GitPython 저장소처럼 스레드 안전하지 않은 객체를 그대로 쓸 수 있습니다.
+    각 단계는 스레드 하나로 실행되어 청크 순서가 유지됩니다.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any]]], queue_size: int = 2):
+        """
+        Args:
+            stages: (단계 이름, 처리 함수) 목록. 각 함수는 앞 단계 출력을 받아 다음 단계 입력을 반환
+            queue_size: 단계 사이 큐에 대기할 수 있는 최대 청크 수
+        """
+        if not stages:
+            raise ValueError("At least one stage is required")
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self._queues: List[queue.Queue] = []
+        self._results: List[Any] = []
+        self._error: Optional[BaseException] = None
+        self._error_stage: Optional[str] = None
+        self._lock = threading.Lock()
+        self._started = 0.0
+        self.stats: Dict = {}
+
+    def _reset(self):
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self._results = []
+        self._error = None
+        self._error_stage = None
+        self._started = time.monotonic()
+        self.stats = {
+            "produced": 0,
+            "completed": 0,
+            "first_result_seconds": None,
+            "elapsed_seconds": 0.0,
+            "stages": {name: {"items": 0, "busy_seconds": 0.0, "max_queue": 0} for name, _ in self.stages},
+        }
+
+    def _worker(self, index: int):
+        name, func = self.stages[index]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self._queues) else None
+        stage_stats = self.stats["stages"][name]
+
+        while True:
+            item = inbox.get()
+            if item is _SENTINEL:
+                if outbox is not None:
+                    outbox.put(_SENTINEL)
+                return
+
+            # 다른 단계가 실패하면 남은 청크는 버리고 큐만 비움 (앞 단계가 막히지 않도록)
+            if self._error is not None:
+                continue
+
+            started = time.monotonic()
+            try:
+                output = func(item)
+            except BaseException as e:
+                with self._lock:
+                    if self._error is None:
+                        self._error = e
+                        self._error_stage = name
+                logger.error(f"Pipeline stage '{name}' failed: {e}")
+                continue
+            finally:
+                stage_stats["busy_seconds"] += time.monotonic() - started
+
+            stage_stats["items"] += 1
+            if outbox is not None:
+                outbox.put(output)
+                stage_stats["max_queue"] = max(stage_stats["max_queue"], outbox.qsize())
+            else:
+                with self._lock:
+                    self._results.append(output)
+                    self.stats["completed"] += 1
+                    if self.stats["first_result_seconds"] is None:
+                        self.stats["first_result_seconds"] = round(time.monotonic() - self._started, 3)
+
+    def run(self, source: Iterable[Any], on_progress: Optional[Callable[[Dict], None]] = None) -> List[Any]:
+        """
+        소스의 청크를 파이프라인에 흘려보내고 마지막 단계 출력 목록을 반환합니다.
+
+        Args:
+            source: 첫 단계에 넣을 청크 이터러블 (호출 스레드에서 순회)
+            on_progress: 청크를 넣을 때마다 호출 스레드에서 통계 dict와 함께 호출되는 콜백
+
+        Returns:
+            List[Any]: 마지막 단계 출력 (청크 순서 유지)
+
+        Raises:
+            단계 또는 소스에서 발생한 첫 예외를 그대로 다시 발생
+        """
+        self._reset()
+        threads = [
+            threading.Thread(target=self._worker, args=(i,), name=f"index-pipeline-{name}", daemon=True)
+            for i, (name, _) in enumerate(self.stages)
+        ]
+        for thread in threads:
+            thread.start()
+
+        source_error: Optional[BaseException] = None
+        try:
+            for chunk in source:
+                if self._error is not None:
+                    break
+                # 큐가 가득 차면 여기서 대기 (backpressure)
+                self._queues[0].put(chunk)
+                self.stats["produced"] += 1
+                self._notify(on_progress)
+        except BaseException as e:
+            source_error = e
+        finally:
+            self._queues[0].put(_SENTINEL)
+            for thread in threads:
+                thread.join()
+            self.stats["elapsed_seconds"] = round(time.monotonic() - self._started, 3)
+            for stage in self.stats["stages"].values():
+                stage["busy_seconds"] = round(stage["busy_seconds"], 3)
+
+        if source_error is not None:
+            raise source_error
+        if self._error is not None:
+            raise self._error
+        self._notify(on_progress)
+        return list(self._results)
+
+    def _notify(self, on_progress: Optional[Callable[[Dict], None]]):
+        if not on_progress:
+            return
+        try:
+            on_progress(self.stats)
+        except Exception as e:
+            logger.debug(f"Progress callback failed: {e}")
@@ -0,0 +1,170 @@
+"""
+인덱싱 진행 이벤트
+추출 → 임베딩 → 업로드 단계의 진행 상황을 구조화된 이벤트로 만들어 초당 최대 N개로 합쳐(coalesce) 전달합니다.
+단계 처리 함수는 건수만 더하고(잠금 + 시각 비교), UI 코드는 제한된 빈도로만 호출되므로 추출 속도에 영향을 주지 않습니다.
+
+이벤트 형식 (dict):
+    {"stage": "embed", "done": 120, "total": 400, "percent": 30.0, "rate": 85.2, "eta_seconds": 3.3,
+     "message": "임베딩 120/400", "elapsed": 1.4,
+     "stages": {"extract": {"done": ..., "total": ..., "percent": ..., "rate": ..., "eta_seconds": ...}, ...}}
+stage 값 중 "done" / "cancelled" / "error" 는 실행 종료를 나타내며 빈도 제한 없이 항상 전달됩니다.
+rate는 실행 시작부터의 단계 처리 속도(항목/초), total/percent/eta_seconds는 전체 수를 모르면 None입니다.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_EVENTS_PER_SECOND = float(os.getenv("INDEX_PROGRESS_EVENTS_PER_SECOND", "2"))
+
+# 인덱싱 단계 (이벤트의 stages 순서)
+STAGES = ("extract", "embed", "upload")
+FINAL_STAGES = ("done", "cancelled", "error")
+
+STAGE_LABELS = {
+    "extract": "커밋 추출",
+    "embed": "임베딩",
+    "upload": "업로드",
+    "re_enrich": "재보강",
+    "migrate": "인덱스 이전",
+    "done": "완료",
+    "cancelled": "중단",
+    "error": "실패",
+}
+
+
+def _metrics(done: int, total: Optional[int], elapsed: float) -> Dict:
+    """처리 수로 진행률/속도/남은 시간 계산"""
+    if total is not None:
+        total = max(total, done)
+    rate = done / elapsed if elapsed > 0 else 0.0
+    eta = None
+    if total is not None and rate > 0:
+        eta = round((total - done) / rate, 1)
+    return {
+        "done": done,
+        "total": total,
+        "percent": round(done / total * 100, 1) if total else None,
+        "rate": round(rate, 1),
+        "eta_seconds": eta,
+    }
+
+
+def format_progress(event: Dict) -> str:
+    """이벤트 한 줄 요약 (예: '임베딩 120/400 (30.0%, 85.2/s, 약 3초 남음)')"""
+    label = STAGE_LABELS.get(event["stage"], event["stage"])
+    if event["stage"] in FINAL_STAGES:
+        return f"{label}: {event['message']}" if event.get("message") else label
+    if event["total"] is None:
+        return f"{label} {event['done']:,} ({event['rate']}/s)"
+    text = f"{label} {event['done']:,}/{event['total']:,} ({event['percent']}%, {event['rate']}/s"
+    if event["eta_seconds"] is not None:
+        text += f", 약 {event['eta_seconds']:.0f}초 남음"
+    return text + ")"
+
+
+def format_stages(event: Dict) -> str:
+    """단계별 진행 상황 여러 줄 요약 (Chainlit 메시지/스텝 출력용)"""
+    lines = []
+    for stage, metrics in event["stages"].items():
+        lines.append(format_progress({"stage": stage, **metrics}))
+    if event["stage"] in FINAL_STAGES:
+        lines.append(format_progress(event))
+    return "\n".join(lines)
+
+
+def legacy_progress_sink(callback: Callable[[int, int, str], None]) -> Callable[[Dict], None]:
+    """이전 형식의 progress_callback(current, total, message)을 이벤트 수신 함수로 변환"""
+    def sink(event: Dict):
+        callback(event["done"], event["total"] or event["done"], event["message"] or format_progress(event))
+    return sink
+
+
+class IndexProgress:
+    """
+    단계별 처리 수를 모아 구조화된 진행 이벤트를 내보내는 보고기 (스레드 안전).
+    단계가 처음 보고될 때와 최소 간격(1 / max_events_per_second)이 지났을 때만 이벤트를 내보냅니다.
+    """
+
+    def __init__(self, sinks: Iterable[Optional[Callable[[Dict], None]]] = (),
+                 max_events_per_second: Optional[float] = None,
+                 stages: Iterable[str] = STAGES):
+        """
+        Args:
+            sinks: 이벤트 수신 함수 목록 (처리 스레드에서 호출되므로 빠르고 스레드 안전해야 함, None은 무시)
+            max_events_per_second: 초당 최대 이벤트 수 (기본값: INDEX_PROGRESS_EVENTS_PER_SECOND, 0이면 제한 없음)
+            stages: 보고할 단계 (이벤트의 stages에 이 순서로 포함)
+        """
+        self.sinks = [sink for sink in sinks if sink is not None]
+        rate = DEFAULT_MAX_EVENTS_PER_SECOND if max_events_per_second is None else max_events_per_second
+        self.min_interval = 1.0 / rate if rate > 0 else 0.0
+        self.start_time = time.monotonic()
+        self.last_emit_time = 0.0
+        self.done: Dict[str, int] = {stage: 0 for stage in stages}
+        self.totals: Dict[str, Optional[int]] = {stage: None for stage in stages}
+        self.events_emitted = 0
+        self._started = set()
+        self._lock = threading.Lock()
+
+    def set_total(self, stage: str, total: Optional[int]):
+        """단계 전체 수 설정 (모르면 None, 추출 중에는 추정치로 갱신 가능)"""
+        with self._lock:
+            self.totals[stage] = total
+
+    def advance(self, stage: str, count: int = 1, message: str = ''):
+        """단계 처리 수 증가 (빈도 제한에 걸리지 않으면 이벤트 전달)"""
+        with self._lock:
+            self.done[stage] = self.done.get(stage, 0) + count
+            self.totals.setdefault(stage, None)
+            now = time.monotonic()
+            first = stage not in self._started
+            self._started.add(stage)
+            if not self.sinks or not (first or now - self.last_emit_time >= self.min_interval):
+                return
+            event = self._event(stage, message, now)
+            self._emit(event, now)
+
+    def finish(self, stage: str = "done", message: str = '') -> Dict:
+        """실행 종료 이벤트 (done / cancelled / error, 빈도 제한 없이 전달)"""
+        with self._lock:
+            now = time.monotonic()
+            event = self._event(stage, message, now)
+            self._emit(event, now)
+        return event
+
+    def snapshot(self) -> Dict:
+        """현재 단계별 진행 상황"""
+        with self._lock:
+            return self._stages(time.monotonic())
+
+    def _stages(self, now: float) -> Dict[str, Dict]:
+        elapsed = now - self.start_time
+        return {stage: _metrics(self.done[stage], self.totals.get(stage), elapsed) for stage in self.done}
+
+    def _event(self, stage: str, message: str, now: float) -> Dict:
+        stages = self._stages(now)
+        if stage in stages:
+            metrics = stages[stage]
+        else:
+            # 종료 이벤트: 마지막 단계(업로드) 기준
+            last = stages[list(stages)[-1]] if stages else _metrics(0, None, 0.0)
+            metrics = {**last, "eta_seconds": None}
+        event = {"stage": stage, **metrics, "message": message, "elapsed": round(now - self.start_time, 2),
+                 "stages": stages}
+        if not message:
+            event["message"] = format_progress(event) if stage not in FINAL_STAGES else ''
+        return event
+
+    def _emit(self, event: Dict, now: float):
+        """이벤트를 수신 함수로 전달 (수신 오류는 인덱싱에 영향 주지 않음)"""
+        self.events_emitted += 1
+        self.last_emit_time = now
+        for sink in self.sinks:
+            try:
+                sink(event)
+            except Exception as e:
+                logger.debug(f"Progress sink failed: {e}")
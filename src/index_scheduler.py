@@ -0,0 +1,486 @@
+"""
+다중 저장소 인덱싱 스케줄러
+채팅 요청 경로 밖에서 여러 저장소를 최신 상태로 유지하기 위한 영구 작업 큐(SQLite, WAL 모드)와 실행기입니다.
+
+- 우선순위: 높은 priority부터, 같은 우선순위에서는 가장 오래 전에 실행된 저장소부터 (저장소 간 공정성)
+- 동시 실행 제한: 전체 실행 수와 저장소별 실행 수를 큐 DB에서 원자적으로 확인하므로 여러 프로세스가 함께 지킴
+- 임베딩 할당량: 실행 중인 저장소끼리 TPM/RPM을 나눔 (embedding_engine.quota_tenant, 버킷 상태는 같은 DB에 두어 여러 프로세스가 공유)
+- 실패한 작업은 지연 후 max_attempts까지 재시도하고, 하트비트가 끊긴 실행 중 작업은 다시 대기열로 돌림
+- 실행 중인 작업도 취소할 수 있고 (하트비트 주기에 취소 토큰 전달), 시간/토큰 예산을 넘은 작업은 재시도하지 않고 취소로 기록
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src.cancellation import CancellationToken, IndexingCancelled
+from src.embedding_engine import quota_tenant
+from src.index_checkpoint import default_cache_root
+from src.indexer import normalize_repo_identifier, TIME_BUDGET_SECONDS, TOKEN_BUDGET
+
+logger = logging.getLogger(__name__)
+
+# 작업 상태
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        repo_path TEXT NOT NULL,
+        repo_id TEXT NOT NULL,
+        priority INTEGER NOT NULL DEFAULT 0,
+        params TEXT NOT NULL DEFAULT '{}',
+        state TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 3,
+        not_before REAL NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT,
+        heartbeat_at REAL,
+        worker TEXT,
+        progress TEXT,
+        result TEXT,
+        error TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (state, priority DESC, id)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_repo ON jobs (repo_id, state)",
+)
+
+_JOB_COLUMNS = ('id', 'repo_path', 'repo_id', 'priority', 'params', 'state', 'attempts', 'max_attempts',
+                'not_before', 'created_at', 'started_at', 'finished_at', 'heartbeat_at', 'worker',
+                'progress', 'result', 'error')
+
+
+def default_scheduler_path() -> str:
+    """작업 큐 DB 기본 경로 (INDEX_SCHEDULER_DB 또는 캐시 루트)"""
+    if os.getenv('INDEX_SCHEDULER_DB'):
+        return os.environ['INDEX_SCHEDULER_DB']
+    return str(default_cache_root() / 'index_jobs.db')
+
+
+def _row_to_job(row) -> Dict:
+    job = dict(zip(_JOB_COLUMNS, row))
+    for key in ('params', 'progress', 'result'):
+        job[key] = json.loads(job[key]) if job[key] else ({} if key == 'params' else None)
+    return job
+
+
+class IndexJobQueue:
+    """인덱싱 작업 SQLite 큐 (프로세스/스레드 안전)"""
+
+    def __init__(self, db_path: Optional[str] = None, busy_timeout: float = 30.0):
+        """
+        Args:
+            db_path: SQLite 데이터베이스 파일 경로 (기본값: default_scheduler_path())
+            busy_timeout: 다른 프로세스가 쓰기 잠금을 잡고 있을 때 대기할 최대 시간 (초)
+        """
+        self.db_path = db_path or default_scheduler_path()
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._transaction() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    # ------------------------------------------------------------------ 연결
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 SQLite 연결 반환 (WAL 모드)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """쓰기 트랜잭션"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    # ------------------------------------------------------------------ 등록/조회
+
+    def enqueue(self, repo_path: str, priority: int = 0, params: Optional[Dict] = None,
+                max_attempts: Optional[int] = None) -> int:
+        """
+        작업 등록. 같은 저장소/파라미터의 작업이 이미 대기 중이면 새로 만들지 않고 우선순위만 높입니다.
+
+        Args:
+            repo_path: Git 저장소 경로 또는 URL
+            priority: 우선순위 (클수록 먼저 실행)
+            params: index_repository 인자 (limit, since, until, skip_existing 등)
+            max_attempts: 최대 실행 횟수 (기본값: INDEX_SCHEDULER_MAX_ATTEMPTS)
+
+        Returns:
+            int: 작업 id
+        """
+        repo_id = normalize_repo_identifier(repo_path)
+        params_json = json.dumps(params or {}, ensure_ascii=False, sort_keys=True)
+        max_attempts = max_attempts or int(os.getenv('INDEX_SCHEDULER_MAX_ATTEMPTS', '3'))
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT id FROM jobs WHERE repo_id = ? AND params = ? AND state = ? ORDER BY id LIMIT 1',
+                (repo_id, params_json, JOB_QUEUED)
+            ).fetchone()
+            if row:
+                conn.execute('UPDATE jobs SET priority = MAX(priority, ?) WHERE id = ?', (priority, row[0]))
+                return row[0]
+            cursor = conn.execute(
+                'INSERT INTO jobs (repo_path, repo_id, priority, params, state, max_attempts, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (repo_path, repo_id, priority, params_json, JOB_QUEUED, max_attempts, datetime.now().isoformat())
+            )
+            return cursor.lastrowid
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        """작업 조회 (없으면 None)"""
+        row = self._connect().execute(
+            f'SELECT {", ".join(_JOB_COLUMNS)} FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        return _row_to_job(row) if row else None
+
+    def list_jobs(self, state: Optional[str] = None, repo_path: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """작업 목록 (최근 등록 순)"""
+        clauses, args = [], []
+        if state:
+            clauses.append('state = ?')
+            args.append(state)
+        if repo_path:
+            clauses.append('repo_id = ?')
+            args.append(normalize_repo_identifier(repo_path))
+        where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+        rows = self._connect().execute(
+            f'SELECT {", ".join(_JOB_COLUMNS)} FROM jobs {where} ORDER BY id DESC LIMIT ?', (*args, limit)
+        ).fetchall()
+        return [_row_to_job(r) for r in rows]
+
+    def summary(self) -> Dict[str, int]:
+        """상태별 작업 수"""
+        counts = dict(self._connect().execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+        return {state: counts.get(state, 0)
+                for state in (JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)}
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        대기 중이거나 실행 중인 작업 취소 (끝난 작업은 False).
+        실행 중인 작업은 실행기가 다음 하트비트에 취소 토큰을 보내고, 진행 중인 요청이 끝나면 중단됩니다.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE jobs SET state = ?, finished_at = ?, error = ? WHERE id = ? AND state IN (?, ?)',
+                (JOB_CANCELLED, datetime.now().isoformat(), 'cancel requested', job_id, JOB_QUEUED, JOB_RUNNING)
+            )
+            return cursor.rowcount > 0
+
+    def cancelled_ids(self, job_ids: List[int]) -> List[int]:
+        """주어진 작업 중 취소된 작업 id (실행 중 취소 요청 확인용)"""
+        if not job_ids:
+            return []
+        rows = self._connect().execute(
+            f'SELECT id FROM jobs WHERE state = ? AND id IN ({", ".join("?" * len(job_ids))})',
+            (JOB_CANCELLED, *job_ids)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def mark_cancelled(self, job_id: int, reason: str, result: Optional[Dict] = None):
+        """실행 중 중단된 작업 기록 (취소 요청/예산 초과, 재시도하지 않음)"""
+        with self._transaction() as conn:
+            conn.execute(
+                'UPDATE jobs SET state = ?, finished_at = ?, error = ?, result = ? WHERE id = ?',
+                (JOB_CANCELLED, datetime.now().isoformat(), reason,
+                 json.dumps(result or {}, ensure_ascii=False), job_id)
+            )
+
+    # ------------------------------------------------------------------ 실행
+
+    def claim(self, worker: str, max_running: int, per_repo_limit: int = 1) -> Optional[Dict]:
+        """
+        실행할 작업 하나를 원자적으로 가져옵니다.
+
+        전체 실행 수가 max_running 이상이면 None. 저장소별 실행 수가 per_repo_limit 미만인 작업 중
+        우선순위가 높고, 같은 우선순위면 가장 오래 전에 실행된 저장소의 작업을 고릅니다.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            running = conn.execute('SELECT COUNT(*) FROM jobs WHERE state = ?', (JOB_RUNNING,)).fetchone()[0]
+            if running >= max_running:
+                return None
+            row = conn.execute(
+                """
+                SELECT j.id FROM jobs j
+                WHERE j.state = ? AND j.not_before <= ?
+                  AND (SELECT COUNT(*) FROM jobs r WHERE r.repo_id = j.repo_id AND r.state = ?) < ?
+                ORDER BY j.priority DESC,
+                         COALESCE((SELECT MAX(s.started_at) FROM jobs s WHERE s.repo_id = j.repo_id), '') ASC,
+                         j.id ASC
+                LIMIT 1
+                """,
+                (JOB_QUEUED, now, JOB_RUNNING, per_repo_limit)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                'UPDATE jobs SET state = ?, worker = ?, attempts = attempts + 1, started_at = ?, '
+                'heartbeat_at = ?, finished_at = NULL, error = NULL WHERE id = ?',
+                (JOB_RUNNING, worker, datetime.now().isoformat(), now, row[0])
+            )
+        return self.get(row[0])
+
+    def heartbeat(self, job_ids: List[int]):
+        """실행 중인 작업이 살아 있음을 기록"""
+        if not job_ids:
+            return
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany('UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND state = ?',
+                             [(now, job_id, JOB_RUNNING) for job_id in job_ids])
+
+    def update_progress(self, job_id: int, progress: Dict):
+        with self._transaction() as conn:
+            conn.execute('UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ?',
+                         (json.dumps(progress, ensure_ascii=False), time.time(), job_id))
+
+    def complete(self, job_id: int, result: Optional[Dict] = None):
+        with self._transaction() as conn:
+            conn.execute(
+                'UPDATE jobs SET state = ?, finished_at = ?, result = ? WHERE id = ?',
+                (JOB_SUCCEEDED, datetime.now().isoformat(), json.dumps(result or {}, ensure_ascii=False), job_id)
+            )
+
+    def fail(self, job_id: int, error: str, retry_delay: float = 0.0) -> bool:
+        """
+        실패 기록. 실행 횟수가 남았으면 retry_delay 후 다시 대기열로 돌립니다.
+
+        Returns:
+            bool: 재시도 예정이면 True
+        """
+        with self._transaction() as conn:
+            row = conn.execute('SELECT attempts, max_attempts, state FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None or row[2] == JOB_CANCELLED:
+                # 실행 중 취소된 작업은 다시 대기열로 돌리지 않음
+                return False
+            retry = row[0] < row[1]
+            if retry:
+                conn.execute(
+                    'UPDATE jobs SET state = ?, error = ?, not_before = ?, worker = NULL WHERE id = ?',
+                    (JOB_QUEUED, error, time.time() + retry_delay, job_id)
+                )
+            else:
+                conn.execute('UPDATE jobs SET state = ?, error = ?, finished_at = ? WHERE id = ?',
+                             (JOB_FAILED, error, datetime.now().isoformat(), job_id))
+            return retry
+
+    def recover_stale(self, stale_after: float) -> int:
+        """
+        하트비트가 stale_after초 넘게 끊긴 실행 중 작업(중단된 프로세스)을 다시 대기열로 돌립니다.
+        인덱싱은 체크포인트에서 이어지므로 재실행해도 업로드된 커밋은 반복하지 않습니다.
+
+        Returns:
+            int: 되돌린 작업 수
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE jobs SET state = ?, worker = NULL, error = ? WHERE state = ? AND heartbeat_at < ?',
+                (JOB_QUEUED, 'worker heartbeat lost', JOB_RUNNING, time.time() - stale_after)
+            )
+            recovered = cursor.rowcount
+        if recovered:
+            logger.warning(f"⚠️ Requeued {recovered} stale indexing jobs")
+        return recovered
+
+    def purge(self, older_than_days: float) -> int:
+        """끝난 작업(성공/실패/취소) 중 오래된 기록 삭제"""
+        cutoff = datetime.fromtimestamp(time.time() - older_than_days * 86400).isoformat()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'DELETE FROM jobs WHERE state IN (?, ?, ?) AND finished_at < ?',
+                (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED, cutoff)
+            )
+            return cursor.rowcount
+
+
+def build_indexer_factory() -> Callable:
+    """환경 설정으로 클라이언트를 한 번 만들고, 작업마다 새 CommitIndexer를 반환하는 팩토리"""
+    from src.index_alias import resolve_index_name
+    from src.indexer import CommitIndexer
+    from src.tool_executor import initialize_clients
+
+    openai_client, search_client, index_client = initialize_clients()
+    index_name = resolve_index_name()
+    CommitIndexer(search_client, index_client, openai_client, index_name).create_index_if_not_exists()
+
+    def factory():
+        return CommitIndexer(search_client, index_client, openai_client, index_name)
+
+    return factory
+
+
+class IndexScheduler:
+    """작업 큐에서 작업을 가져와 동시에 인덱싱하는 실행기"""
+
+    def __init__(
+        self,
+        queue: IndexJobQueue,
+        indexer_factory: Callable,
+        max_concurrent: Optional[int] = None,
+        per_repo_concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        retry_delay: Optional[float] = None,
+        stale_after: Optional[float] = None,
+    ):
+        """
+        Args:
+            queue: 작업 큐
+            indexer_factory: 작업마다 호출되어 CommitIndexer를 반환하는 함수
+            max_concurrent: 전체 동시 실행 작업 수 (모든 프로세스 합계, 기본값: INDEX_SCHEDULER_CONCURRENCY)
+            per_repo_concurrency: 저장소별 동시 실행 작업 수 (기본값: INDEX_SCHEDULER_PER_REPO_CONCURRENCY)
+            poll_interval: 대기열 확인 주기 (초, 기본값: INDEX_SCHEDULER_POLL_SECONDS)
+            retry_delay: 실패한 작업 재시도 지연 (초, 기본값: INDEX_SCHEDULER_RETRY_DELAY_SECONDS)
+            stale_after: 하트비트가 끊긴 작업을 되돌리는 기준 (초, 기본값: INDEX_SCHEDULER_STALE_SECONDS)
+        """
+        self.queue = queue
+        self.indexer_factory = indexer_factory
+        self.max_concurrent = max(1, max_concurrent or int(os.getenv('INDEX_SCHEDULER_CONCURRENCY', '2')))
+        self.per_repo_concurrency = max(1, per_repo_concurrency or int(os.getenv('INDEX_SCHEDULER_PER_REPO_CONCURRENCY', '1')))
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv('INDEX_SCHEDULER_POLL_SECONDS', '5'))
+        self.retry_delay = retry_delay if retry_delay is not None else float(os.getenv('INDEX_SCHEDULER_RETRY_DELAY_SECONDS', '300'))
+        self.stale_after = stale_after if stale_after is not None else float(os.getenv('INDEX_SCHEDULER_STALE_SECONDS', '900'))
+        self.progress_interval = float(os.getenv('INDEX_SCHEDULER_PROGRESS_SECONDS', '2'))
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.stats = {'succeeded': 0, 'failed': 0, 'retried': 0, 'cancelled': 0, 'documents': 0}
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._tokens: Dict[int, CancellationToken] = {}
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def stop(self):
+        """새 작업을 더 가져오지 않고, 실행 중인 작업이 끝나면 run을 종료"""
+        self._stop.set()
+
+    def run(self, until_idle: bool = False) -> Dict:
+        """
+        스케줄러 실행
+
+        Args:
+            until_idle: True면 대기/실행 중인 작업이 모두 끝났을 때 종료 (False면 stop()까지 계속)
+
+        Returns:
+            Dict: 이번 실행 통계 (succeeded, failed, retried, cancelled, documents)
+        """
+        logger.info(f"🗓️ Index scheduler {self.worker_id} started "
+                    f"(concurrency: {self.max_concurrent}, per repo: {self.per_repo_concurrency})")
+        self.queue.recover_stale(self.stale_after)
+        running: Dict = {}
+        last_heartbeat = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='index-job') as pool:
+            while True:
+                while not self._stop.is_set() and len(running) < self.max_concurrent:
+                    job = self.queue.claim(self.worker_id, self.max_concurrent, self.per_repo_concurrency)
+                    if job is None:
+                        break
+                    logger.info(f"▶️ Job {job['id']} started: {job['repo_path']} "
+                                f"(priority {job['priority']}, attempt {job['attempts']}/{job['max_attempts']})")
+                    running[pool.submit(self._execute, job)] = job['id']
+
+                if not running and (self._stop.is_set() or (until_idle and not self._has_pending())):
+                    break
+
+                if running:
+                    done, _ = wait(list(running), timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        running.pop(future)
+                else:
+                    self._stop.wait(self.poll_interval)
+
+                if time.monotonic() - last_heartbeat >= min(self.poll_interval, self.stale_after / 3):
+                    self.queue.heartbeat(list(running.values()))
+                    # 다른 프로세스(CLI)에서 취소된 실행 중 작업에 취소 전달
+                    for job_id in self.queue.cancelled_ids(list(running.values())):
+                        token = self._tokens.get(job_id)
+                        if token is not None:
+                            token.cancel('cancelled by request')
+                    last_heartbeat = time.monotonic()
+
+        logger.info(f"🗓️ Index scheduler {self.worker_id} stopped: {self.stats}")
+        return dict(self.stats)
+
+    def _has_pending(self) -> bool:
+        """대기 중(재시도 대기 포함)이거나 다른 프로세스에서 실행 중인 작업이 있는지"""
+        summary = self.queue.summary()
+        return summary[JOB_QUEUED] > 0 or summary[JOB_RUNNING] > 0
+
+    def _execute(self, job: Dict):
+        """작업 1건 실행 (예외는 작업 실패로, 취소/예산 초과는 취소로 기록)"""
+        job_id = job['id']
+        params = dict(job['params'])
+        token = CancellationToken(max_seconds=params.pop('max_seconds', None) or TIME_BUDGET_SECONDS,
+                                  max_tokens=params.pop('max_tokens', None) or TOKEN_BUDGET)
+        self._tokens[job_id] = token
+
+        def on_progress(event):
+            # 진행 이벤트(단계별 처리 수/속도/ETA)를 그대로 기록, 빈도는 인덱서가 progress_interval로 제한
+            try:
+                self.queue.update_progress(job_id, event)
+            except Exception as e:
+                logger.debug(f"Failed to record progress for job {job_id}: {e}")
+
+        started = time.monotonic()
+        try:
+            indexer = self.indexer_factory()
+            with quota_tenant(job['repo_id']):
+                count = indexer.index_repository(
+                    job['repo_path'], on_progress=on_progress, cancel_token=token,
+                    progress_events_per_second=1.0 / self.progress_interval if self.progress_interval > 0 else 0,
+                    **params
+                )
+            result = {'indexed': count, 'seconds': round(time.monotonic() - started, 1)}
+            self.queue.complete(job_id, result)
+            self._count(succeeded=1, documents=count or 0)
+            logger.info(f"✅ Job {job_id} completed: {count} documents from {job['repo_path']}")
+        except IndexingCancelled as e:
+            # 업로드된 커밋과 체크포인트는 남아 있어 다시 등록하면 이어서 진행
+            result = {'indexed': e.indexed or 0, 'seconds': round(time.monotonic() - started, 1)}
+            self.queue.mark_cancelled(job_id, e.reason, result)
+            self._count(cancelled=1, documents=e.indexed or 0)
+            logger.warning(f"⏹️ Job {job_id} stopped ({e.reason}): {e.indexed or 0} documents from {job['repo_path']}")
+        except Exception as e:
+            if self.queue.fail(job_id, str(e), self.retry_delay):
+                self._count(retried=1)
+                logger.warning(f"⚠️ Job {job_id} failed, retrying in {self.retry_delay:.0f}s: {e}")
+            else:
+                self._count(failed=1)
+                logger.error(f"❌ Job {job_id} failed: {e}")
+        finally:
+            self._tokens.pop(job_id, None)
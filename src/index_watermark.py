@@ -0,0 +1,159 @@
+"""
+워터마크 기반 증분 인덱싱 범위 계산
+저장소별로 인덱싱된 범위를 tip SHA 집합(위쪽 경계)과 frontier(아직 인덱싱되지 않은 가장 최근 조상, 아래쪽 경계)로 기록하고,
+다음 실행에서는 old_tip..new_tip 구간(새 커밋)과 frontier 아래 구간(과거 커밋 보강)만 순회합니다.
+강제 푸시로 tip이 새 HEAD의 조상이 아니게 되면, 더 이상 도달할 수 없는 커밋을 고아로 돌려줍니다.
+
+인덱싱된 집합은 항상 "HEAD 기준 topo 순서의 앞부분"이 되도록 유지합니다.
+(어떤 커밋이 인덱싱되었으면 그 자손도 모두 인덱싱됨 → frontier의 조상은 모두 아직 인덱싱되지 않음)
+"""
+
+import os
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+import git
+
+logger = logging.getLogger(__name__)
+
+
+def _rev_list(repo: git.Repo, *args: str) -> List[Tuple[str, List[str]]]:
+    """rev-list --topo-order --parents 결과 (자식이 항상 부모보다 먼저)"""
+    output = repo.git.rev_list('--topo-order', '--parents', *args)
+    entries = []
+    for line in output.splitlines():
+        shas = line.split()
+        if shas:
+            entries.append((shas[0], shas[1:]))
+    return entries
+
+
+def _has_commit(repo: git.Repo, sha: str) -> bool:
+    try:
+        repo.git.cat_file('-e', f'{sha}^{{commit}}')
+        return True
+    except git.exc.GitCommandError:
+        return False
+
+
+def _is_ancestor(repo: git.Repo, ancestor: str, rev: str) -> bool:
+    try:
+        return repo.is_ancestor(ancestor, rev)
+    except git.exc.GitCommandError:
+        return False
+
+
+def _shallow_commits(repo: git.Repo) -> Set[str]:
+    """shallow clone의 경계 커밋 (부모 정보가 잘려 있음)"""
+    path = os.path.join(repo.git_dir, 'shallow')
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def _frontier_of(entries: List[Tuple[str, List[str]]], frontier: List[str] = ()) -> List[str]:
+    """기존 frontier와 새로 인덱싱할 커밋들의 부모 중 아직 인덱싱되지 않은 커밋"""
+    taken = {sha for sha, _ in entries}
+    candidates = list(frontier) + [p for _, parents in entries for p in parents]
+    return [sha for sha in dict.fromkeys(candidates) if sha not in taken]
+
+
+def plan_watermark_range(repo: git.Repo, head: str, watermark: Optional[Dict], limit: Optional[int]) -> Dict:
+    """
+    이번 실행에서 인덱싱할 커밋과 실행 후 워터마크를 계산합니다.
+
+    - 워터마크 없음: HEAD부터 topo 순서로 최대 limit개
+    - 새 커밋: head --not tips 구간 전체 (limit보다 많으면 오래된 쪽 limit개만, 남은 구간은 다음 실행에서 이어감)
+    - 과거 보강: 범위가 limit개보다 작으면 frontier부터 부족한 만큼 (limit=None이면 남은 히스토리 전체)
+
+    Args:
+        repo: Git 저장소
+        head: 새 tip SHA
+        watermark: IndexManifest.get_watermark 결과 (없으면 None)
+        limit: 인덱싱 범위로 유지할 최근 커밋 수 (None이면 전체 히스토리)
+
+    Returns:
+        Dict: {"shas": 새로 인덱싱할 커밋 (최신순), "forward": 새 커밋 수, "backfill": 과거 보강 커밋 수,
+               "orphans": 강제 푸시로 도달할 수 없게 된 커밋, "rewritten": 강제 푸시 감지 여부,
+               "truncated": shallow 경계 때문에 범위가 잘렸을 수 있음,
+               "tips", "frontier", "covered": 실행 성공 후 저장할 워터마크}
+    """
+    shallow = _shallow_commits(repo)
+    plan = {"forward": 0, "backfill": 0, "orphans": [], "rewritten": False, "truncated": False}
+
+    if watermark is None:
+        entries = _rev_list(repo, f'--max-count={limit}', head) if limit else _rev_list(repo, head)
+        plan.update({
+            "shas": [sha for sha, _ in entries],
+            "forward": len(entries),
+            "tips": [head],
+            "frontier": _frontier_of(entries),
+            "covered": len(entries),
+            "truncated": any(sha in shallow for sha, _ in entries),
+        })
+        return plan
+
+    # 강제 푸시 감지: tip이 새 HEAD의 조상이 아니면 tip..head 밖의 커밋은 고아
+    tips: List[str] = []
+    orphans: List[str] = []
+    for tip in watermark["tips"]:
+        if tip == head or _is_ancestor(repo, tip, head):
+            tips.append(tip)
+            continue
+        plan["rewritten"] = True
+        if shallow:
+            plan["truncated"] = True
+        if not _has_commit(repo, tip):
+            logger.warning(f"Indexed tip {tip[:8]} is no longer available; orphaned commits cannot be identified")
+            continue
+        orphans.extend(sha for sha, _ in _rev_list(repo, tip, '--not', head))
+        tips.extend(repo.git.merge_base('--all', tip, head).split())
+
+    frontier = list(watermark["frontier"])
+    covered = watermark.get("covered", 0)
+    if plan["rewritten"]:
+        orphans = list(dict.fromkeys(orphans))
+        orphan_set = set(orphans)
+        frontier = [f for f in frontier if f not in orphan_set and _is_ancestor(repo, f, head)]
+        covered = max(0, covered - len(orphans))
+        plan["orphans"] = orphans
+    tips = list(dict.fromkeys(tips))
+
+    if not tips:
+        # 남은 공통 조상이 없으면 새 히스토리로 처음부터
+        fresh = plan_watermark_range(repo, head, None, limit)
+        fresh.update({"orphans": plan["orphans"], "rewritten": plan["rewritten"],
+                      "truncated": plan["truncated"] or fresh["truncated"]})
+        return fresh
+
+    # 새 커밋: old_tip..new_tip (부모보다 자식이 먼저이므로 끝부분이 가장 오래된 커밋)
+    forward = _rev_list(repo, head, '--not', *tips)
+    if limit and len(forward) > limit:
+        forward = forward[-limit:]
+        parents_in_range = {p for _, parents in forward for p in parents}
+        tips = tips + [sha for sha, _ in forward if sha not in parents_in_range]
+    else:
+        tips = [head]
+    covered += len(forward)
+
+    # 과거 보강: frontier의 조상은 모두 아직 인덱싱되지 않았으므로 제외 조건 없이 순회
+    backfill: List[Tuple[str, List[str]]] = []
+    budget = None if limit is None else max(0, limit - covered)
+    if frontier and budget != 0:
+        args = [f'--max-count={budget}'] if budget else []
+        backfill = _rev_list(repo, *args, *frontier)
+        frontier = _frontier_of(backfill, frontier)
+    covered += len(backfill)
+
+    plan.update({
+        "shas": [sha for sha, _ in forward] + [sha for sha, _ in backfill],
+        "forward": len(forward),
+        "backfill": len(backfill),
+        "tips": tips,
+        "frontier": frontier,
+        "covered": covered,
+    })
+    if any(sha in shallow for sha, _ in forward + backfill):
+        plan["truncated"] = True
+    return plan
@@ -3,9 +3,11 @@ Azure AI Search 인덱싱 모듈
 커밋 데이터를 Azure AI Search에 인덱싱하여 검색 가능하게 합니다.
 """
 
+import os
 import logging
 import hashlib
-from typing import Optional, List, Set
+from datetime import datetime, timedelta
+from typing import Callable, Optional, List, Set, Tuple, Dict
 from urllib.parse import urlparse
 from pathlib import Path
 from azure.search.documents import SearchClient
@@ -14,18 +16,76 @@ from azure.search.documents.indexes.models import (
     SearchIndex,
     SimpleField,
     SearchableField,
-    SearchField,
-    VectorSearch,
-    VectorSearchProfile,
-    HnswAlgorithmConfiguration,
 )
 from openai import AzureOpenAI
+from src.cancellation import CancellationToken, IndexingCancelled
 from src.document_generator import DocumentGenerator
-from src.embedding import embed_texts, VECTOR_DIMENSIONS
+from src.embedding import embed_texts, EMBEDDING_MODEL, VECTOR_DIMENSIONS
+from src.embedding_cache import text_key
+from src.index_pipeline import StreamingPipeline
+from src.index_progress import IndexProgress, legacy_progress_sink
+from src.index_checkpoint import IndexCheckpointStore, STATE_PENDING, STATE_UPLOADED
+from src.index_manifest import IndexManifest, open_index_manifest
+from src.index_watermark import plan_watermark_range
+from src.shared_history import (
+    shared_history_enabled, repo_filter, membership_fields, ensure_membership_fields, lookup_memberships,
+    membership_update, repository_document_counts, repository_path_for, detach_repository,
+    restore_memberships, MembershipLookup, REPO_IDS_FIELD, REPO_PATHS_FIELD,
+)
+from src.upload_engine import DocumentUploader
+from src.vector_config import vector_settings, build_vector_field, build_vector_search, vector_config_diff
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 스트리밍 인덱싱: 청크당 커밋 수와 단계 사이 대기 가능한 청크 수 (메모리 상한 = 약 청크 크기 x (큐 크기 + 단계 수))
+PIPELINE_CHUNK_SIZE = int(os.getenv("INDEX_PIPELINE_CHUNK_SIZE", "100"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("INDEX_PIPELINE_QUEUE_SIZE", "2"))
+
+# 인덱싱 실행당 기본 예산 (0 = 제한 없음): 경과 시간(초)과 임베딩 추정 토큰 수
+TIME_BUDGET_SECONDS = float(os.getenv("INDEX_TIME_BUDGET_SECONDS", "0"))
+TOKEN_BUDGET = int(os.getenv("INDEX_TOKEN_BUDGET", "0"))
+
+# 워터마크 범위가 shallow 경계에 걸렸을 때 클론을 더 깊게 받는 최대 횟수 (limit개부터 두 배씩)
+WATERMARK_DEEPEN_ROUNDS = int(os.getenv("INDEX_WATERMARK_DEEPEN_ROUNDS", "4"))
+
+# 재보강: 한 번에 조회/merge할 커밋 수
+REENRICH_BATCH_SIZE = int(os.getenv("INDEX_REENRICH_BATCH_SIZE", "1000"))
+
+# 벡터를 만든 임베딩 텍스트의 해시 (재보강 시 텍스트가 바뀐 문서만 다시 임베딩)
+CONTENT_HASH_FIELD = "content_hash"
+
+# 재보강에서 갱신하지 않는 필드 (문서 식별/소속은 인덱싱 시점 값을 유지)
+_IDENTITY_FIELDS = ("repo_id", "repository_path", REPO_IDS_FIELD, REPO_PATHS_FIELD)
+
+# stored_fields_text가 임베딩 텍스트를 복원하는 저장 필드 (content_hash가 없는 이전 문서 비교용)
+_TEXT_SOURCE_FIELDS = ("message", "author", "files_summary", "change_context_summary", "modified_functions")
+
+
+def _embedding_text(message: str, author: str, files_summary: str, context_summary: str, functions: str) -> str:
+    """임베딩 텍스트 형식 (인덱싱과 인덱스 이전이 같은 형식을 쓰도록 한 곳에서 정의)"""
+    return f"""Commit: {message}
+Author: {author}
+Files: {files_summary}
+Context: {context_summary}
+Functions: {functions}"""
+
+
+def stored_fields_text(doc: Dict) -> str:
+    """
+    인덱스에 저장된 필드로 임베딩 텍스트를 다시 구성합니다 (보관된 텍스트가 없는 이전 문서용).
+    modified_functions('name (file)' 최대 10개)는 앞의 3개를 'name in file' 형식으로 바꾸고,
+    추가된 함수 목록은 인덱스에 저장되지 않으므로 'Added: ...' 부분은 복원되지 않습니다.
+    """
+    modified = doc.get("modified_functions") or ''
+    entries = []
+    for entry in modified.split(', ')[:3] if modified else []:
+        name, sep, file = entry.rpartition(' (')
+        entries.append(f"{name} in {file[:-1]}" if sep and file.endswith(')') else entry)
+    functions = "Modified: " + ", ".join(entries) if entries else "No function changes"
+    return _embedding_text(doc.get('message', ''), doc.get('author', ''), doc.get('files_summary', ''),
+                           doc.get('change_context_summary', ''), functions)
+
 
 def normalize_repo_identifier(repo_path: str) -> str:
     """
@@ -76,7 +136,9 @@ class CommitIndexer:
         search_client: SearchClient,
         index_client: SearchIndexClient,
         openai_client: AzureOpenAI,
-        index_name: str
+        index_name: str,
+        checkpoint_store: Optional[IndexCheckpointStore] = None,
+        manifest: Optional[IndexManifest] = None
     ):
         """
         Args:
@@ -84,11 +146,200 @@ class CommitIndexer:
             index_client: Azure AI Search 인덱스 클라이언트
             openai_client: Azure OpenAI 클라이언트
             index_name: 인덱스 이름
+            checkpoint_store: 인덱싱 체크포인트 저장소 (기본값: INDEX_CHECKPOINTS 설정 시 기본 경로에 생성)
+            manifest: 인덱싱된 커밋 매니페스트 (기본값: INDEX_MANIFEST 설정 시 기본 경로에 생성)
         """
         self.search_client = search_client
         self.index_client = index_client
         self.openai_client = openai_client
         self.index_name = index_name
+        self.checkpoint_store = checkpoint_store
+        self.manifest = manifest
+        self.upload_stats: Dict = {}
+
+    def _get_checkpoint_store(self) -> Optional[IndexCheckpointStore]:
+        """체크포인트 저장소 반환 (비활성화되었거나 열 수 없으면 None)"""
+        if self.checkpoint_store is None and os.getenv("INDEX_CHECKPOINTS", "true").lower() == "true":
+            try:
+                self.checkpoint_store = IndexCheckpointStore()
+            except Exception as e:
+                logger.warning(f"Indexing checkpoints disabled: {e}")
+                return None
+        return self.checkpoint_store
+
+    def _get_manifest(self) -> Optional[IndexManifest]:
+        """인덱싱된 커밋 매니페스트 반환 (비활성화되었거나 열 수 없으면 None)"""
+        if self.manifest is None:
+            self.manifest = open_index_manifest()
+        return self.manifest
+
+    def reconcile_manifest(self, repo_id: str, full: bool = False) -> Dict:
+        """
+        로컬 매니페스트를 인덱스와 대조합니다.
+        이전에 대조한 적이 있으면 먼저 문서 수만 비교하고(쿼리 1회), 다를 때만 전체 id 목록을 읽어 교체합니다.
+
+        Args:
+            repo_id: 저장소 식별자
+            full: 문서 수 비교 없이 항상 전체 대조
+
+        Returns:
+            Dict: {"mode": "count" | "full", "indexed": 인덱스 문서 수, "added": int, "removed": int}
+        """
+        manifest = self._get_manifest()
+        if manifest is None:
+            return {"mode": "disabled", "indexed": 0, "added": 0, "removed": 0}
+
+        if not full and manifest.reconciled_at(self.index_name, repo_id) is not None:
+            results = self.search_client.search(search_text="*", filter=repo_filter(repo_id),
+                                                include_total_count=True, top=0)
+            remote_count = results.get_count()
+            if remote_count == manifest.count(self.index_name, repo_id):
+                manifest.mark_reconciled(self.index_name, repo_id)
+                return {"mode": "count", "indexed": remote_count, "added": 0, "removed": 0}
+            logger.info(f"Manifest drift detected for {repo_id}: index has {remote_count} documents")
+
+        results = self.search_client.search(search_text="*", filter=repo_filter(repo_id), select=["id"])
+        indexed_ids = [r["id"] for r in results]
+        diff = manifest.replace(self.index_name, repo_id, indexed_ids)
+        logger.info(f"📒 Manifest reconciled for {repo_id}: {len(indexed_ids)} indexed "
+                    f"(+{diff['added']}, -{diff['removed']})")
+        return {"mode": "full", "indexed": len(indexed_ids), **diff}
+
+    def _load_indexed_ids(self, repo_id: str) -> Optional[Set[str]]:
+        """
+        이미 인덱싱된 커밋 id 집합을 로컬 매니페스트에서 반환합니다.
+        대조한 적이 없거나 주기가 지났으면 먼저 대조하며, 실패하면 None (search.in 조회로 대체).
+        """
+        manifest = self._get_manifest()
+        if manifest is None:
+            return None
+        reconciled_at = manifest.reconciled_at(self.index_name, repo_id)
+        interval = timedelta(hours=float(os.getenv("INDEX_MANIFEST_RECONCILE_HOURS", "24")))
+        if reconciled_at is None or datetime.now() - reconciled_at >= interval:
+            try:
+                self.reconcile_manifest(repo_id)
+            except Exception as e:
+                logger.warning(f"Failed to reconcile index manifest, falling back to index queries: {e}")
+                return None
+        return manifest.load(self.index_name, repo_id)
+
+    def _plan_watermark(self, generator: DocumentGenerator, repo_id: str, limit: Optional[int]) -> Optional[Dict]:
+        """
+        저장소 워터마크로 이번 실행의 인덱싱 범위를 계산하고, 강제 푸시로 고아가 된 문서를 삭제합니다.
+        계산할 수 없으면 None (기존 히스토리 나열 방식으로 대체).
+        """
+        manifest = self._get_manifest()
+        if manifest is None or os.getenv("INDEX_WATERMARK", "true").lower() != "true":
+            return None
+        watermark = manifest.get_watermark(self.index_name, repo_id)
+        try:
+            head = generator.repo.head.commit.hexsha
+            plan = plan_watermark_range(generator.repo, head, watermark, limit)
+            if plan["truncated"] and generator.is_remote:
+                if limit is None or plan["rewritten"]:
+                    # 전체 히스토리 요청이거나 강제 푸시(고아 커밋 판별): 전체 히스토리로 다시 계산
+                    generator.fetch_full_history()
+                    plan = plan_watermark_range(generator.repo, head, watermark, limit)
+                else:
+                    # shallow 경계에서 범위가 잘림: 경계 아래를 limit개부터 두 배씩 필요한 만큼만 받음
+                    step = max(limit, 1)
+                    for _ in range(WATERMARK_DEEPEN_ROUNDS):
+                        if not plan["truncated"] or not generator.deepen_history(step):
+                            break
+                        plan = plan_watermark_range(generator.repo, head, watermark, limit)
+                        step *= 2
+        except Exception as e:
+            logger.warning(f"Watermark planning failed, falling back to history listing: {e}")
+            return None
+
+        if plan["rewritten"]:
+            logger.warning(f"⚠️ History rewritten (force push) for {repo_id}: "
+                           f"{len(plan['orphans'])} indexed commits are no longer reachable")
+        if plan["orphans"]:
+            if plan["truncated"]:
+                logger.warning("Shallow history; orphaned documents are kept until the next full reconciliation")
+            else:
+                try:
+                    self._detach_documents(repo_id, plan["orphans"])
+                    manifest.remove(self.index_name, repo_id, plan["orphans"])
+                    logger.info(f"🗑️ Removed {len(plan['orphans'])} orphaned documents")
+                except Exception as e:
+                    logger.warning(f"Failed to remove orphaned documents, falling back to history listing: {e}")
+                    return None
+
+        logger.info(f"🔖 Watermark range: {plan['forward']} new, {plan['backfill']} backfill "
+                    f"(covered after run: {plan['covered']})")
+        return plan
+
+    def _delete_documents(self, ids: List[str], batch_size: int = 1000) -> None:
+        for i in range(0, len(ids), batch_size):
+            self.search_client.delete_documents([{"id": doc_id} for doc_id in ids[i:i + batch_size]])
+
+    def _detach_documents(self, repo_id: str, ids: List[str]) -> None:
+        """저장소에서 커밋 제거 (다른 저장소와 공유하는 커밋은 삭제하지 않고 소속에서만 제거)"""
+        if not shared_history_enabled():
+            self._delete_documents(ids)
+            return
+        memberships = lookup_memberships(self.search_client, ids)
+        if memberships is None:
+            raise RuntimeError("Failed to look up commit memberships")
+        plan = detach_repository(
+            [{"id": sha, REPO_IDS_FIELD: sorted(m["repo_ids"]), REPO_PATHS_FIELD: sorted(m["repository_paths"])}
+             for sha, m in memberships.items()],
+            repo_id,
+        )
+        self._delete_documents(plan["delete"])
+        if plan["merge"]:
+            DocumentUploader(self.search_client, action="merge").upload(plan["merge"])
+
+    def _restore_memberships(self, manifest: Optional[IndexManifest], shas: List[str]) -> int:
+        """
+        동시에 같은 커밋을 연결하다 덮어써진 저장소 소속을 매니페스트 기준으로 다시 merge합니다.
+        매니페스트에 여러 저장소가 기록된 커밋만 인덱스에서 다시 조회합니다.
+
+        Returns:
+            int: 소속을 복구한 문서 수
+        """
+        if not manifest or not shas:
+            return 0
+        try:
+            expected = {sha: repos for sha, repos in manifest.memberships(self.index_name, shas).items()
+                        if len(repos) > 1}
+            if not expected:
+                return 0
+            memberships = lookup_memberships(self.search_client, list(expected))
+            updates = restore_memberships(memberships, expected) if memberships is not None else []
+            if not updates:
+                return 0
+            restored = DocumentUploader(self.search_client, action="merge").upload(updates)
+            logger.warning(f"🔗 Restored repository membership of {len(restored)} shared commits "
+                           f"overwritten by concurrent indexing")
+            return len(restored)
+        except Exception as e:
+            logger.warning(f"Failed to verify shared commit memberships: {e}")
+            return 0
+
+    def _ensure_content_hash_field(self, index=None) -> None:
+        """기존 인덱스에 content_hash 필드가 없으면 추가 (필드 추가는 재색인 없이 가능)"""
+        try:
+            index = index or self.index_client.get_index(self.index_name)
+            if any(f.name == CONTENT_HASH_FIELD for f in (index.fields or [])):
+                return
+            index.fields = list(index.fields) + [SimpleField(name=CONTENT_HASH_FIELD, type="Edm.String")]
+            self.index_client.create_or_update_index(index)
+            logger.info(f"✓ Added {CONTENT_HASH_FIELD} to index '{self.index_name}'")
+        except Exception as e:
+            logger.warning(f"Failed to check {CONTENT_HASH_FIELD} field of index '{self.index_name}': {e}")
+
+    def _remember_texts(self, texts: Dict[str, str]) -> None:
+        """임베딩한 텍스트를 content_hash 키로 매니페스트에 보관 (인덱스 이전 시 같은 텍스트로 재임베딩)"""
+        manifest = self._get_manifest()
+        if manifest is None or not texts:
+            return
+        try:
+            manifest.put_texts(texts)
+        except Exception as e:
+            logger.warning(f"Failed to store embedding texts: {e}")
 
     def create_index_if_not_exists(self, vector_dimensions: int = None) -> None:
         """
@@ -97,16 +348,27 @@ class CommitIndexer:
         Args:
             vector_dimensions: 임베딩 벡터 차원 (기본값: VECTOR_DIMENSIONS from embedding.py)
         """
-        if vector_dimensions is None:
-            vector_dimensions = VECTOR_DIMENSIONS
+        settings = vector_settings(vector_dimensions)
         try:
             # 인덱스가 이미 존재하는지 확인
             try:
-                self.index_client.get_index(self.index_name)
+                existing = self.index_client.get_index(self.index_name)
+            except:
+                existing = None
+            if existing is not None:
                 logger.info(f"Index '{self.index_name}' already exists")
+                ensure_membership_fields(self.index_client, self.index_name, existing)
+                self._ensure_content_hash_field(existing)
+                try:
+                    diff = vector_config_diff(existing, settings)
+                except Exception:
+                    diff = {}
+                if diff:
+                    # 벡터 필드 정의는 바꿀 수 없으므로 새 인덱스로 이전해야 설정이 적용됨
+                    logger.warning(f"⚠️ Index '{self.index_name}' vector configuration differs from settings: "
+                                   + ", ".join(f"{k} {a} → {b}" for k, (a, b) in diff.items())
+                                   + " (run migrate_vector_index to rebuild)")
                 return
-            except:
-                pass
 
             # 인덱스 생성
             logger.info(f"Creating index '{self.index_name}'...")
@@ -133,27 +395,17 @@ class CommitIndexer:
                 SimpleField(name="relationship_type", type="Edm.String", filterable=True),
                 SimpleField(name="same_author_as_prev", type="Edm.Boolean", filterable=True),
 
-                SearchField(
-                    name="content_vector",
-                    type="Collection(Edm.Single)",
-                    searchable=True,
-                    vector_search_dimensions=vector_dimensions,
-                    vector_search_profile_name="default-vector-profile"
-                ),
+                # 포크 간 공유 커밋의 소속 저장소
+                *membership_fields(),
+
+                # 벡터를 만든 임베딩 텍스트 해시 (텍스트 원문은 로컬 매니페스트에 보관)
+                SimpleField(name=CONTENT_HASH_FIELD, type="Edm.String"),
+
+                build_vector_field(settings),
             ]
 
-            # Vector search configuration
-            vector_search = VectorSearch(
-                profiles=[
-                    VectorSearchProfile(
-                        name="default-vector-profile",
-                        algorithm_configuration_name="default-hnsw"
-                    )
-                ],
-                algorithms=[
-                    HnswAlgorithmConfiguration(name="default-hnsw")
-                ]
-            )
+            # Vector search configuration (설정 시 양자화 압축 + 원본 벡터 재채점)
+            vector_search = build_vector_search(settings)
 
             index = SearchIndex(
                 name=self.index_name,
@@ -162,12 +414,72 @@ class CommitIndexer:
             )
 
             self.index_client.create_index(index)
-            logger.info(f"✓ Index '{self.index_name}' created successfully")
+            logger.info(f"✓ Index '{self.index_name}' created successfully "
+                        f"(vector: {settings['dimensions']} dims, compression: {settings['compression']}, "
+                        f"stored: {settings['stored']})")
 
         except Exception as e:
             logger.error(f"Failed to create index: {e}")
             raise
 
+    def migrate_vector_index(self, target_index_name: str, progress_callback: Optional[callable] = None,
+                             on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        현재 벡터 설정(차원/압축/stored)으로 새 인덱스를 만들고, 현재 인덱스의 저장소들을 다시 인덱싱합니다.
+        저장소마다 현재 인덱스에 있는 문서 수만큼 최근 커밋을 인덱싱하며, 커밋 메타데이터 캐시를 재사용합니다.
+        완료 후 swap_index_alias로 논리 인덱스 이름을 새 인덱스로 전환하면 검색에 적용됩니다.
+        (인덱스 내용만 옮기며 다시 임베딩하는 백그라운드 이전은 index_migration.IndexMigration 참고)
+
+        Args:
+            target_index_name: 새 인덱스 이름
+            progress_callback: 이전 형식의 진행 콜백 (current, total, message)
+            on_progress: 진행 이벤트 수신 함수 (migrate 단계, 저장소 단위)
+
+        Returns:
+            Dict: {"index_name", "repositories", "documents", "failed": 실패한 repo_id 목록}
+        """
+        if target_index_name == self.index_name:
+            raise ValueError("Target index must differ from the source index")
+
+        repo_counts = list(repository_document_counts(self.search_client).items())
+
+        target = CommitIndexer(
+            self.index_client.get_search_client(target_index_name),
+            self.index_client,
+            self.openai_client,
+            target_index_name,
+        )
+        target.create_index_if_not_exists()
+
+        progress = IndexProgress(
+            [on_progress, legacy_progress_sink(progress_callback) if progress_callback else None],
+            stages=("migrate",),
+        )
+        progress.set_total("migrate", len(repo_counts))
+        documents = 0
+        failed = []
+        for repo_id, count in repo_counts:
+            first = next(iter(self.search_client.search(
+                search_text="*", filter=repo_filter(repo_id),
+                select=["repo_id", "repository_path", REPO_PATHS_FIELD], top=1
+            )), None)
+            repo_path = repository_path_for(first, repo_id) if first else None
+            if not repo_path:
+                failed.append(repo_id)
+            else:
+                try:
+                    documents += target.index_repository(repo_path, limit=count)
+                except Exception as e:
+                    logger.error(f"Failed to migrate {repo_id}: {e}")
+                    failed.append(repo_id)
+            progress.advance("migrate", 1, f"{repo_path or repo_id} 이전 완료")
+        progress.finish("done", f"{len(repo_counts) - len(failed)}/{len(repo_counts)}개 저장소 이전")
+
+        logger.info(f"✓ Migrated {len(repo_counts) - len(failed)}/{len(repo_counts)} repositories "
+                    f"({documents} documents) to '{target_index_name}'")
+        return {"index_name": target_index_name, "repositories": len(repo_counts),
+                "documents": documents, "failed": failed}
+
     def _get_existing_ids_for_candidates(self, repo_id: str, candidate_ids: List[str], chunk_size: int = 800) -> Set[str]:
         """
         주어진 후보 커밋 id 집합에 대해, 인덱스에 이미 존재하는 id만 배치로 조회하여 반환합니다.
@@ -181,7 +493,7 @@ class CommitIndexer:
             for i in range(0, len(candidate_ids), chunk_size):
                 chunk = candidate_ids[i:i + chunk_size]
                 ids_joined = ",".join(chunk)
-                filter_expr = f"repo_id eq '{repo_id}' and search.in(id, '{ids_joined}', ',')"
+                filter_expr = f"{repo_filter(repo_id)} and search.in(id, '{ids_joined}', ',')"
                 results = self.search_client.search(
                     search_text="*",
                     filter=filter_expr,
@@ -197,6 +509,83 @@ class CommitIndexer:
             logger.warning(f"Failed to batch-check existing ids: {e}")
         return existing
 
+    @staticmethod
+    def _build_document(commit: dict, repo_id: str, repo_path: str) -> Tuple[dict, str]:
+        """
+        커밋 정보로 인덱스 문서와 임베딩할 텍스트를 만듭니다.
+
+        Returns:
+            Tuple[dict, str]: (content_vector를 제외한 문서, 임베딩할 텍스트)
+        """
+        # 임베딩할 텍스트 생성 (향상된 문맥 포함)
+        files_info = [f"{f['file']} ({f['change_type']})" for f in commit['files']]
+
+        # 변경 문맥 포함
+        change_context = commit.get('change_context', {})
+        function_analysis = commit.get('function_analysis', {})
+
+        # 함수 변경 정보 추가
+        func_changes = []
+        if function_analysis.get('modified_functions'):
+            func_changes.append("Modified: " + ", ".join(
+                [f"{f['name']} in {f['file']}" for f in function_analysis['modified_functions'][:3]]
+            ))
+        if function_analysis.get('added_functions'):
+            func_changes.append("Added: " + ", ".join(
+                [f['name'] for f in function_analysis['added_functions'][:3]]
+            ))
+
+        text_content = _embedding_text(commit['message'], commit['author'], ', '.join(files_info),
+                                       change_context.get('summary', ''),
+                                       '; '.join(func_changes) if func_changes else 'No function changes')
+
+        # 통계 계산
+        lines_added = sum(f.get('lines_added', 0) for f in commit['files'])
+        lines_deleted = sum(f.get('lines_deleted', 0) for f in commit['files'])
+
+        # 기본 문서 데이터
+        doc = {
+            "id": commit['id'],
+            "repo_id": repo_id,
+            "repository_path": repo_path,
+            "message": commit['message'],
+            "author": commit['author'],
+            "date": commit['date'],
+            "files_summary": ', '.join(files_info),
+            "parent_ids": commit.get('parents', []),
+            "files_changed_count": len(commit['files']),
+            "lines_added": lines_added,
+            "lines_deleted": lines_deleted,
+        }
+
+        # 새로운 메타데이터 추가
+        doc["change_context_summary"] = change_context.get('summary', '')
+        doc["impact_scope"] = '; '.join(change_context.get('impact_scope', [])[:5])
+
+        # 함수 분석 메타데이터
+        modified_funcs = [f"{f['name']} ({f['file']})"
+                          for f in function_analysis.get('modified_functions', [])[:10]]
+        doc["modified_functions"] = ', '.join(modified_funcs) if modified_funcs else ''
+
+        modified_classes = [f"{c['name']} ({c['file']})"
+                            for c in function_analysis.get('modified_classes', [])[:10]]
+        doc["modified_classes"] = ', '.join(modified_classes) if modified_classes else ''
+
+        doc["code_complexity"] = function_analysis.get('code_complexity_hint', 'unknown')
+
+        # 커밋 관계 메타데이터
+        relation = commit.get('relation_to_previous')
+        if relation:
+            doc["relationship_type"] = relation.get('relationship_type', 'sequential')
+            doc["same_author_as_prev"] = relation.get('same_author', False)
+        else:
+            doc["relationship_type"] = 'initial'
+            doc["same_author_as_prev"] = False
+
+        doc[CONTENT_HASH_FIELD] = text_key(text_content)
+
+        return doc, text_content
+
     def index_repository(
         self,
         repo_path: str,
@@ -205,10 +594,17 @@ class CommitIndexer:
         until: Optional[str] = None,
         skip_existing: bool = True,
         skip_offset: int = 0,
-        progress_callback: Optional[callable] = None
+        progress_callback: Optional[callable] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        max_seconds: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        on_progress: Optional[Callable[[Dict], None]] = None,
+        progress_events_per_second: Optional[float] = None
     ) -> int:
         """
         Git 저장소의 커밋 데이터를 인덱싱합니다.
+        취소되거나 예산을 넘으면 새 청크를 시작하지 않고, 진행 중인 요청이 끝난 뒤 업로드된 문서와 체크포인트를
+        남긴 채 IndexingCancelled를 발생시킵니다 (다음 실행에서 이어서 진행).
 
         Args:
             repo_path: Git 저장소 경로 또는 URL
@@ -217,11 +613,30 @@ class CommitIndexer:
             until: 종료 날짜 (ISO 8601 형식, 예: '2024-12-31')
             skip_existing: 이미 인덱싱된 커밋 건너뛰기 (증분 인덱싱, 기본값: True)
             skip_offset: HEAD부터 건너뛸 커밋 수 (과거 커밋 추가 시 사용, 기본값: 0)
-            progress_callback: 진행 상황 콜백 함수 (current, total, message)
+            progress_callback: 이전 형식의 진행 콜백 (current, total, message), on_progress 이벤트에서 변환되어 호출
+            cancel_token: 외부에서 취소할 수 있는 토큰 (사용자 중지, 스케줄러 취소)
+            max_seconds: 경과 시간 예산 (초, 기본값: INDEX_TIME_BUDGET_SECONDS, 토큰을 넘기면 토큰의 예산 사용)
+            max_tokens: 임베딩 추정 토큰 예산 (기본값: INDEX_TOKEN_BUDGET, 토큰을 넘기면 토큰의 예산 사용)
+            on_progress: 진행 이벤트 수신 함수 (추출/임베딩/업로드 단계별 처리 수, 속도, ETA - index_progress 참고).
+                처리 스레드에서 호출되므로 빠르고 스레드 안전해야 하며, 오류는 인덱싱에 영향 주지 않음
+            progress_events_per_second: 초당 최대 진행 이벤트 수 (기본값: INDEX_PROGRESS_EVENTS_PER_SECOND)
 
         Returns:
             int: 인덱싱된 문서 수
+
+        Raises:
+            IndexingCancelled: 취소되었거나 예산을 넘은 경우 (indexed에 중단 전까지 인덱싱된 문서 수)
         """
+        if cancel_token is None:
+            max_seconds = TIME_BUDGET_SECONDS if max_seconds is None else max_seconds
+            max_tokens = TOKEN_BUDGET if max_tokens is None else max_tokens
+            if max_seconds or max_tokens:
+                cancel_token = CancellationToken(max_seconds=max_seconds, max_tokens=max_tokens)
+        progress = IndexProgress(
+            [on_progress, legacy_progress_sink(progress_callback) if progress_callback else None],
+            max_events_per_second=progress_events_per_second,
+        )
+
         try:
             # 저장소 식별자 생성
             repo_id = normalize_repo_identifier(repo_path)
@@ -238,7 +653,7 @@ class CommitIndexer:
             logger.info("=" * 80)
 
             # 이미 인덱싱된 커밋 ID 확인 전략:
-            # 1) 전체 스캔 대신, 후보 커밋 목록을 먼저 수집한 뒤 해당 id들만 배치 조회(search.in)로 존재 여부 확인
+            # 1) 전체 스캔 대신, 추출된 청크의 후보 커밋 id들만 배치 조회(search.in)로 존재 여부 확인
             # 2) 그 결과를 기반으로 새 커밋만 필터링 (정확/저비용)
 
             # skip_offset이 크면 미리 충분한 depth로 fetch (원격 저장소만)
@@ -248,168 +663,430 @@ class CommitIndexer:
 
                 from src.repo_cache import RepoCloneCache
                 cache = RepoCloneCache()
-                cache.get_or_clone(repo_path, depth=required_depth)
+                cache.get_or_clone(repo_path, depth=required_depth, cancel_token=cancel_token)
 
-            # 커밋 데이터 추출
-            generator = DocumentGenerator(repo_path)
-            try:
-                commits = generator.get_commits(limit=limit, since=since, until=until, skip=skip_offset)
-            finally:
-                generator.close()  # 파일 핸들 해제
+            counters = {"extracted": 0, "skipped": 0, "queued": 0, "resumed": 0, "embed_failed": 0, "linked": 0,
+                        "uploaded": 0, "to_embed": 0}
+            share_history = shared_history_enabled()
+            total_hint = limit
 
-            if not commits:
-                if skip_offset > 0:
-                    logger.warning(f"No commits found with skip_offset={skip_offset}. Shallow clone may not have enough commits.")
-                    logger.warning(f"Try with smaller skip_offset or ensure repository is fully fetched.")
-                else:
-                    logger.warning("No commits found")
-                return 0
+            # 체크포인트: 중단된 이전 실행이 있으면 업로드된 커밋은 건너뛰고 임베딩된 문서는 재사용
+            checkpoints = self._get_checkpoint_store()
+            run = None
+            uploaded_shas: Set[str] = set()
+            pending_shas: Set[str] = set()
+            if checkpoints:
+                # 인덱스별로 이어받고, 임베딩 모델/차원이나 범위가 바뀌었으면 보관된 상태를 버림
+                run = checkpoints.begin(self.index_name, repo_id, {
+                    "repo_path": repo_path, "limit": limit, "since": since, "until": until,
+                    "skip_offset": skip_offset, "embedding_model": EMBEDDING_MODEL,
+                    "vector_dimensions": VECTOR_DIMENSIONS,
+                })
+                if run["resumed"]:
+                    uploaded_shas = checkpoints.shas_in_state(self.index_name, repo_id, STATE_UPLOADED)
+                    pending_shas = checkpoints.shas_in_state(self.index_name, repo_id, STATE_PENDING)
+                    logger.info(f"♻️ Resuming interrupted indexing run: {run['uploaded_count']} uploaded, "
+                                f"{run['embedded_count']} embedded, {run['pending_count']} pending")
+            next_seq = run["next_seq"] if run else 0
 
-            # 증분 스킵: 후보 집합에 대해서만 존재 여부 확인
-            if skip_existing:
-                candidate_ids = [c['id'] for c in commits]
-                existing_commit_ids = self._get_existing_ids_for_candidates(repo_id, candidate_ids)
-                original_count = len(commits)
-                commits = [c for c in commits if c['id'] not in existing_commit_ids]
-                skipped = original_count - len(commits)
-                if skipped > 0:
-                    logger.info(f"Skipped {skipped} already indexed commits")
-
-            if not commits:
-                logger.info("All commits are already indexed")
-                return 0
+            manifest = self._get_manifest()
+            indexed_ids = self._load_indexed_ids(repo_id) if skip_existing else None
 
-            logger.info(f"Found {len(commits)} commits to index")
+            # 워터마크: 날짜 범위/skip_offset 없는 증분 인덱싱은 old_tip..new_tip과 과거 보강 구간만 순회
+            generator = DocumentGenerator(repo_path, cancel_token=cancel_token)
+            plan = None
+            if skip_existing and not (since or until or skip_offset):
+                plan = self._plan_watermark(generator, repo_id, limit)
+                if plan:
+                    total_hint = len(plan["shas"]) + (run["embedded_count"] if run else 0)
+            progress.set_total("extract", total_hint)
 
-            # 문서 준비
-            documents = []
-            texts_to_embed = []
+            def update_totals(final: bool = False):
+                # 임베딩/업로드 전체 수: 추출이 끝나기 전에는 지금까지의 비율로 외삽한 추정치
+                scale = 1.0
+                if not final:
+                    if not total_hint or not counters["extracted"]:
+                        return
+                    scale = max(1.0, total_hint / counters["extracted"])
+                progress.set_total("extract", counters["extracted"] if final else total_hint)
+                progress.set_total("embed", round(counters["to_embed"] * scale))
+                progress.set_total("upload", counters["resumed"]
+                                   + round((counters["queued"] - counters["resumed"]) * scale))
 
-            total_commits = len(commits)
+            # 추출 단계: 호출 스레드에서 청크 단위로 커밋을 읽고 기존 커밋을 걸러 문서를 만듦
+            # 공유 히스토리 소속 조회: 워터마크 계획이 있으면 청크마다 조회하지 않고 다음 커밋까지 묶어서 조회
+            membership_lookup = MembershipLookup(
+                self.search_client, upcoming=plan["shas"] if plan else None,
+                skip=lambda sha: sha in uploaded_shas or (indexed_ids is not None and sha in indexed_ids),
+            ) if share_history else None
+            written_ids: List[str] = []
 
-            for idx, commit in enumerate(commits):
-                # 진행 상황 콜백
-                if progress_callback:
-                    try:
-                        progress_callback(idx, total_commits, "문서 준비 중")
-                    except:
-                        pass
-
-                # 임베딩할 텍스트 생성 (향상된 문맥 포함)
-                files_info = [f"{f['file']} ({f['change_type']})" for f in commit['files']]
-
-                # 변경 문맥 포함
-                change_context = commit.get('change_context', {})
-                function_analysis = commit.get('function_analysis', {})
-
-                # 함수 변경 정보 추가
-                func_changes = []
-                if function_analysis.get('modified_functions'):
-                    func_changes.append("Modified: " + ", ".join(
-                        [f"{f['name']} in {f['file']}" for f in function_analysis['modified_functions'][:3]]
-                    ))
-                if function_analysis.get('added_functions'):
-                    func_changes.append("Added: " + ", ".join(
-                        [f['name'] for f in function_analysis['added_functions'][:3]]
-                    ))
-
-                text_content = f"""Commit: {commit['message']}
-Author: {commit['author']}
-Files: {', '.join(files_info)}
-Context: {change_context.get('summary', '')}
-Functions: {'; '.join(func_changes) if func_changes else 'No function changes'}"""
-
-                texts_to_embed.append(text_content)
-
-                # 통계 계산
-                lines_added = sum(f.get('lines_added', 0) for f in commit['files'])
-                lines_deleted = sum(f.get('lines_deleted', 0) for f in commit['files'])
-
-                # 기본 문서 데이터
-                doc = {
-                    "id": commit['id'],
-                    "repo_id": repo_id,
-                    "repository_path": repo_path,
-                    "message": commit['message'],
-                    "author": commit['author'],
-                    "date": commit['date'],
-                    "files_summary": ', '.join(files_info),
-                    "parent_ids": commit.get('parents', []),
-                    "files_changed_count": len(commit['files']),
-                    "lines_added": lines_added,
-                    "lines_deleted": lines_deleted,
-                }
-
-                # 새로운 메타데이터 추가
-                doc["change_context_summary"] = change_context.get('summary', '')
-                doc["impact_scope"] = '; '.join(change_context.get('impact_scope', [])[:5])
-
-                # 함수 분석 메타데이터
-                modified_funcs = [f"{f['name']} ({f['file']})"
-                                 for f in function_analysis.get('modified_functions', [])[:10]]
-                doc["modified_functions"] = ', '.join(modified_funcs) if modified_funcs else ''
-
-                modified_classes = [f"{c['name']} ({c['file']})"
-                                   for c in function_analysis.get('modified_classes', [])[:10]]
-                doc["modified_classes"] = ', '.join(modified_classes) if modified_classes else ''
-
-                doc["code_complexity"] = function_analysis.get('code_complexity_hint', 'unknown')
-
-                # 커밋 관계 메타데이터
-                relation = commit.get('relation_to_previous')
-                if relation:
-                    doc["relationship_type"] = relation.get('relationship_type', 'sequential')
-                    doc["same_author_as_prev"] = relation.get('same_author', False)
+            def extract_chunks():
+                nonlocal next_seq
+                resumed_ids: Set[str] = set()
+
+                # 임베딩까지 끝났지만 업로드되지 않은 문서를 먼저 업로드 (재임베딩 없음)
+                if run and run["embedded_count"]:
+                    for seq, documents in checkpoints.load_embedded(self.index_name, repo_id):
+                        resumed_ids.update(doc["id"] for doc in documents)
+                        counters["resumed"] += len(documents)
+                        counters["queued"] += len(documents)
+                        update_totals()
+                        yield {"seq": seq, "documents": documents, "texts": None}
+
+                for batch in generator.iter_commit_batches(
+                    batch_size=PIPELINE_CHUNK_SIZE, limit=limit, since=since, until=until, skip=skip_offset,
+                    shas=plan["shas"] if plan else None, cancel_token=cancel_token
+                ):
+                    counters["extracted"] += len(batch)
+                    progress.advance("extract", len(batch))
+                    batch = [c for c in batch if c['id'] not in uploaded_shas and c['id'] not in resumed_ids]
+
+                    # 증분 스킵: 로컬 매니페스트로 판단하고, 쓸 수 없으면 청크의 후보 id만 인덱스에 조회
+                    # (이전 실행에서 새 커밋으로 확인된 것은 제외)
+                    # 공유 히스토리: 다른 저장소(업스트림/포크)가 이미 인덱싱한 커밋은 소속만 추가
+                    memberships = None
+                    if skip_existing or share_history:
+                        candidate_ids = [c['id'] for c in batch if c['id'] not in pending_shas]
+                        existing_commit_ids: Set[str] = set()
+                        if skip_existing and indexed_ids is not None:
+                            existing_commit_ids = {cid for cid in candidate_ids if cid in indexed_ids}
+                        lookup_ids = [cid for cid in candidate_ids if cid not in existing_commit_ids]
+                        if share_history and lookup_ids:
+                            memberships = membership_lookup.get(lookup_ids)
+                        if memberships is not None:
+                            if skip_existing:
+                                existing_commit_ids |= {sha for sha, m in memberships.items() if repo_id in m["repo_ids"]}
+                        elif skip_existing and indexed_ids is None:
+                            existing_commit_ids = self._get_existing_ids_for_candidates(repo_id, lookup_ids)
+                        if skip_existing and existing_commit_ids:
+                            batch = [c for c in batch if c['id'] not in existing_commit_ids]
+                            counters["skipped"] += len(existing_commit_ids)
+                    memberships = memberships or {}
+
+                    if skip_existing and memberships:
+                        shared = [c for c in batch if c['id'] in memberships]
+                        if shared:
+                            batch = [c for c in batch if c['id'] not in memberships]
+                            counters["linked"] += len(shared)
+                            counters["queued"] += len(shared)
+                            update_totals()
+                            yield {"seq": None, "merge": True, "texts": None, "documents": [
+                                membership_update(c['id'], memberships[c['id']], repo_id, repo_path) for c in shared
+                            ]}
+
+                    if not batch:
+                        update_totals()
+                        continue
+
+                    documents, texts = [], []
+                    for commit in batch:
+                        doc, text = self._build_document(commit, repo_id, repo_path)
+                        if share_history:
+                            # 전체 재인덱싱에서도 다른 저장소의 소속은 유지
+                            doc.update(membership_update(doc["id"], memberships.get(doc["id"], {
+                                "repo_ids": set(), "repository_paths": set()}), repo_id, repo_path))
+                        documents.append(doc)
+                        texts.append(text)
+
+                    seq = next_seq
+                    next_seq += 1
+                    if checkpoints:
+                        checkpoints.mark_pending(self.index_name, repo_id, seq, [doc["id"] for doc in documents])
+                    counters["queued"] += len(documents)
+                    counters["to_embed"] += len(texts)
+                    update_totals()
+                    yield {"seq": seq, "documents": documents, "texts": texts}
+                update_totals(final=True)
+
+            def embed_chunk(chunk):
+                if chunk["texts"] is None:
+                    return chunk
+                embedded_before = progress.done["embed"]
+                embeddings = embed_texts(chunk["texts"], self.openai_client, cancel_token=cancel_token,
+                                         on_progress=lambda count: progress.advance("embed", count))
+                if not (cancel_token and cancel_token.cancelled):
+                    # 청크 안의 중복 텍스트는 한 번만 요청되므로 청크 단위로 맞춤
+                    progress.advance("embed", max(0, embedded_before + len(chunk["texts"]) - progress.done["embed"]))
+                documents, texts = [], {}
+                for doc, text, embedding in zip(chunk["documents"], chunk["texts"], embeddings):
+                    if not embedding:
+                        continue
+                    doc["content_vector"] = embedding
+                    documents.append(doc)
+                    texts[doc[CONTENT_HASH_FIELD]] = text
+                self._remember_texts(texts)
+
+                # 벡터 없는 문서는 업로드하지 않음 (체크포인트에 추출 상태로 남아 다음 실행에서 재시도)
+                # 취소로 요청하지 않은 배치는 실패로 세지 않음
+                failed = len(chunk["documents"]) - len(documents)
+                if failed and not (cancel_token and cancel_token.cancelled):
+                    counters["embed_failed"] += failed
+                    logger.warning(f"⚠️ {failed} commits in chunk {chunk['seq']} have no embedding; not uploaded")
+                if checkpoints and documents:
+                    checkpoints.save_embedded(self.index_name, repo_id, chunk["seq"], documents)
+                return {**chunk, "documents": documents}
+
+            # 업로드 단계: 문서 수/요청 크기 한도로 배치를 나눠 동시에 올리고, 실패한 키만 재시도
+            uploader = DocumentUploader(self.search_client, cancel_token=cancel_token)
+            linker = DocumentUploader(self.search_client, action="merge", cancel_token=cancel_token)
+            self.upload_stats = uploader.stats
+
+            def upload_chunk(chunk):
+                documents = chunk["documents"]
+                if not documents:
+                    return 0
+                if chunk.get("merge"):
+                    # 공유 커밋: 임베딩/업로드 없이 소속만 merge (체크포인트 없이 다음 실행에서 다시 조회)
+                    logger.info(f"Linking {len(documents)} commits already indexed from other repositories...")
+                    succeeded = linker.upload(documents)
                 else:
-                    doc["relationship_type"] = 'initial'
-                    doc["same_author_as_prev"] = False
+                    logger.info(f"Uploading {len(documents)} documents to Azure AI Search...")
+                    succeeded = uploader.upload(documents)
+                if checkpoints and not chunk.get("merge"):
+                    checkpoints.mark_uploaded(self.index_name, repo_id, chunk["seq"], succeeded)
+                if manifest:
+                    try:
+                        manifest.add(self.index_name, repo_id, succeeded, repo_path=repo_path)
+                    except Exception as e:
+                        logger.warning(f"Failed to update index manifest: {e}")
+                if share_history:
+                    written_ids.extend(succeeded)
+                counters["uploaded"] += len(succeeded)
+                progress.advance("upload", len(succeeded))
+                return len(succeeded)
 
-                documents.append(doc)
+            pipeline = StreamingPipeline(
+                [("embed", embed_chunk), ("upload", upload_chunk)],
+                queue_size=PIPELINE_QUEUE_SIZE,
+            )
 
-            # 임베딩 생성
-            if progress_callback:
-                try:
-                    progress_callback(total_commits, total_commits, "임베딩 생성 중")
-                except:
-                    pass
+            # 커밋 데이터 추출 → 임베딩 → 업로드 (청크 단위 동시 처리)
+            # 실패 시 체크포인트가 남아 다음 실행에서 이어서 진행
+            try:
+                success_count = sum(pipeline.run(extract_chunks()))
+            except IndexingCancelled:
+                success_count = counters["uploaded"]
+            finally:
+                generator.close()  # 파일 핸들 해제
 
-            logger.info("Generating embeddings...")
-            embeddings = embed_texts(texts_to_embed, self.openai_client)
+            # 취소/예산 초과: 체크포인트와 워터마크를 그대로 두어 다음 실행이 이어서 진행
+            if cancel_token and cancel_token.cancelled:
+                logger.warning(f"⏹️ Indexing stopped ({cancel_token.reason}): {success_count} documents indexed, "
+                               f"{counters['queued'] - success_count} left for the next run")
+                progress.finish("cancelled", f"{cancel_token.reason} ({success_count}개 인덱싱됨)")
+                raise IndexingCancelled(cancel_token.reason, indexed=success_count)
+            progress.finish("done", f"{success_count}/{counters['queued']}개 문서 인덱싱")
+            # 소속 merge는 읽고-쓰기라 동시 인덱싱에 덮어써질 수 있으므로 매니페스트와 대조해 복구
+            self._restore_memberships(manifest, written_ids)
 
-            # 임베딩을 문서에 추가
-            for doc, embedding in zip(documents, embeddings):
-                doc["content_vector"] = embedding
+            if checkpoints:
+                remaining = checkpoints.finish(self.index_name, repo_id)
+                if remaining:
+                    logger.warning(f"{remaining} embedded documents failed to upload; kept in checkpoint for the next run")
+            if counters["embed_failed"]:
+                logger.warning(f"⚠️ {counters['embed_failed']} commits were left unindexed because embedding failed")
+            if counters["resumed"]:
+                logger.info(f"♻️ Uploaded {counters['resumed']} documents from checkpoint without re-embedding")
 
-            # 업로드
-            if progress_callback:
-                try:
-                    progress_callback(total_commits, total_commits, "업로드 중")
-                except:
-                    pass
+            # 모든 문서가 업로드된 경우에만 워터마크 전진 (실패한 커밋은 다음 실행에서 같은 범위로 재시도)
+            # shallow 경계에서 잘린 범위는 경계 아래 frontier를 알 수 없으므로 저장하지 않음 (다음 실행에서 다시 계산)
+            if plan and plan["truncated"]:
+                logger.warning("Shallow history; indexing watermark not saved so older commits are backfilled later")
+            elif plan and not counters["embed_failed"] and success_count == counters["queued"]:
+                manifest.set_watermark(self.index_name, repo_id, plan["tips"], plan["frontier"], plan["covered"])
+
+            if counters["extracted"] == 0 and counters["queued"] == 0:
+                if plan:
+                    logger.info("Repository is up to date with its indexing watermark")
+                elif skip_offset > 0:
+                    logger.warning(f"No commits found with skip_offset={skip_offset}. Shallow clone may not have enough commits.")
+                    logger.warning(f"Try with smaller skip_offset or ensure repository is fully fetched.")
+                else:
+                    logger.warning("No commits found")
+                return 0
+
+            if counters["skipped"] > 0:
+                logger.info(f"Skipped {counters['skipped']} already indexed commits")
+            if counters["linked"] > 0:
+                logger.info(f"🔗 Linked {counters['linked']} commits shared with other repositories (no re-embedding)")
 
-            logger.info(f"Uploading {len(documents)} documents to Azure AI Search...")
-            result = self.search_client.upload_documents(documents=documents)
+            if counters["queued"] == 0:
+                logger.info("All commits are already indexed")
+                return 0
 
-            success_count = sum(1 for r in result if r.succeeded)
+            stats = pipeline.stats
 
             logger.info("=" * 80)
             logger.info(f"✅ INDEXING COMPLETED")
-            logger.info(f"  📊 Successfully indexed: {success_count}/{len(documents)} documents")
+            logger.info(f"  📊 Successfully indexed: {success_count}/{counters['queued']} documents")
+            logger.info(f"  🧱 Chunks: {stats['completed']} x {PIPELINE_CHUNK_SIZE} commits, "
+                        f"first searchable after {stats['first_result_seconds']}s, total {stats['elapsed_seconds']}s")
+            throughput = uploader.throughput()
+            logger.info(f"  🚚 Upload: {throughput['docs_per_second']} docs/s, {throughput['mb_per_second']} MB/s "
+                        f"({uploader.stats['requests']} requests, {uploader.stats['retries']} retries, "
+                        f"{uploader.stats['failed_documents']} failed)")
             logger.info(f"  📁 Repository: {repo_path}")
             logger.info(f"  🔑 Repo ID: {repo_id}")
             logger.info("=" * 80)
 
             return success_count
 
+        except IndexingCancelled as e:
+            if e.indexed is None:
+                # 커밋 추출 전(클론 중) 중단
+                logger.warning(f"⏹️ Indexing stopped before extraction ({e.reason})")
+                progress.finish("cancelled", e.reason)
+                raise IndexingCancelled(e.reason, indexed=0) from e
+            raise
         except Exception as e:
             logger.error(f"Failed to index repository: {e}")
+            progress.finish("error", str(e))
             raise
 
+    def re_enrich_repository(
+        self,
+        repo_path: str,
+        reanalyze: bool = False,
+        batch_size: Optional[int] = None,
+        progress_callback: Optional[callable] = None,
+        on_progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        인덱싱된 커밋의 메타데이터 필드만 다시 계산해 merge로 갱신합니다 (재보강).
+        문서 구성/분석 로직이 개선되었을 때 전체 재인덱싱 없이 적용하며, 벡터는 임베딩 텍스트가 바뀐 문서
+        (content_hash 불일치)만 다시 임베딩합니다. content_hash가 없는 이전 문서는 저장된 필드로 복원한 텍스트
+        (stored_fields_text)가 새 텍스트와 완전히 같을 때만 임베딩 없이 해시를 채우고(hash_backfilled),
+        복원할 수 없는 부분(추가된 함수 목록 등)까지 포함해 조금이라도 다르면 다시 임베딩합니다.
+
+        Args:
+            repo_path: Git 저장소 경로 또는 URL
+            reanalyze: 커밋 캐시를 쓰지 않고 커밋을 다시 분석 (분석 로직이 바뀐 경우, 캐시도 새 결과로 교체)
+            batch_size: 한 번에 조회/merge할 커밋 수 (기본값: INDEX_REENRICH_BATCH_SIZE)
+            progress_callback: 이전 형식의 진행 콜백 (current, total, message)
+            on_progress: 진행 이벤트 수신 함수 (re_enrich 단계, 조회한 커밋 수 기준)
+
+        Returns:
+            Dict: {"scanned", "matched", "updated", "re_embedded", "hash_backfilled", "embed_failed",
+                   "missing", "failed"} (hash_backfilled: 해시가 없던 이전 문서 중 텍스트가 같아 벡터를 유지하고
+                   content_hash만 채운 수)
+        """
+        repo_id = normalize_repo_identifier(repo_path)
+        batch_size = max(1, batch_size or REENRICH_BATCH_SIZE)
+        stats = {"scanned": 0, "matched": 0, "updated": 0, "re_embedded": 0, "hash_backfilled": 0,
+                 "embed_failed": 0, "missing": 0, "failed": 0}
+        self._ensure_content_hash_field()
+        merger = DocumentUploader(self.search_client, action="merge")
+        self.upload_stats = merger.stats
+        progress = IndexProgress(
+            [on_progress, legacy_progress_sink(progress_callback) if progress_callback else None],
+            stages=("re_enrich",),
+        )
+
+        logger.info(f"🧬 Re-enriching indexed commits of {repo_id} (reanalyze: {reanalyze})")
+        generator = DocumentGenerator(repo_path)
+        try:
+            # 인덱싱된 커밋 목록은 매니페스트(인덱스와 대조됨)에서, 없으면 현재 히스토리 전체를 후보로 사용
+            indexed_ids = self._load_indexed_ids(repo_id)
+            shas = sorted(indexed_ids) if indexed_ids else generator.repo.git.rev_list("HEAD").split()
+            progress.set_total("re_enrich", len(shas))
+
+            for start in range(0, len(shas), batch_size):
+                chunk = shas[start:start + batch_size]
+                stats["scanned"] += len(chunk)
+                stored = self._get_stored_texts(repo_id, chunk)
+                stats["matched"] += len(stored)
+
+                documents = self._re_enrich_documents(generator, repo_id, repo_path, stored, reanalyze, stats)
+                if documents:
+                    succeeded = merger.upload(documents)
+                    stats["updated"] += len(succeeded)
+                    stats["failed"] += len(documents) - len(succeeded)
+
+                progress.advance("re_enrich", len(chunk),
+                                 f"재보강 중 (갱신 {stats['updated']}, 재임베딩 {stats['re_embedded']})")
+        finally:
+            generator.close()
+        progress.finish("done", f"{stats['updated']}/{stats['matched']}개 문서 갱신")
+
+        logger.info(f"✅ Re-enriched {stats['updated']}/{stats['matched']} documents of {repo_id} "
+                    f"({stats['re_embedded']} re-embedded, {stats['hash_backfilled']} hash backfilled, "
+                    f"{stats['embed_failed']} kept previous vectors, "
+                    f"{stats['missing']} not extractable, {stats['failed']} failed)")
+        return stats
+
+    def _get_stored_texts(self, repo_id: str, ids: List[str], chunk_size: int = 800) -> Dict[str, Dict]:
+        """저장소에 속한 문서의 {id: content_hash와 임베딩 텍스트 원본 필드} (이전 문서는 content_hash가 None)"""
+        stored: Dict[str, Dict] = {}
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            results = self.search_client.search(
+                search_text="*",
+                filter=f"{repo_filter(repo_id)} and search.in(id, '{','.join(chunk)}', ',')",
+                select=["id", CONTENT_HASH_FIELD, *_TEXT_SOURCE_FIELDS],
+                top=len(chunk),
+            )
+            for r in results:
+                stored[r["id"]] = r
+        return stored
+
+    @staticmethod
+    def _text_changed(doc: Dict, stored: Dict) -> bool:
+        """재보강 문서의 임베딩 텍스트가 인덱스 문서와 다른지 (해시가 없으면 저장된 필드로 복원한 텍스트의 해시와 비교)"""
+        stored_hash = stored.get(CONTENT_HASH_FIELD) or text_key(stored_fields_text(stored))
+        return doc[CONTENT_HASH_FIELD] != stored_hash
+
+    def _re_enrich_documents(
+        self,
+        generator: DocumentGenerator,
+        repo_id: str,
+        repo_path: str,
+        stored: Dict[str, Dict],
+        reanalyze: bool,
+        stats: Dict
+    ) -> List[Dict]:
+        """
+        인덱스 문서들의 merge 문서 (메타데이터 + 텍스트가 바뀐 문서만 새 벡터).
+        content_hash가 없는 이전 문서는 텍스트가 그대로면 다시 임베딩하지 않고 해시만 채웁니다.
+        """
+        commits = generator.extract_commits_by_sha(stored, reanalyze=reanalyze)
+        stats["missing"] += len(stored) - len(commits)
+
+        documents, doc_texts, texts, changed = [], [], [], []
+        for sha, commit_data in commits.items():
+            doc, text = self._build_document(commit_data, repo_id, repo_path)
+            for field in _IDENTITY_FIELDS:
+                doc.pop(field, None)
+            if self._text_changed(doc, stored[sha]):
+                changed.append(len(documents))
+                texts.append(text)
+            elif not stored[sha].get(CONTENT_HASH_FIELD):
+                stats["hash_backfilled"] += 1
+            documents.append(doc)
+            doc_texts.append(text)
+
+        if texts:
+            embeddings = embed_texts(texts, self.openai_client)
+            for position, embedding in zip(changed, embeddings):
+                if embedding:
+                    documents[position]["content_vector"] = embedding
+                    stats["re_embedded"] += 1
+                else:
+                    # 임베딩 실패: 메타데이터만 갱신하고 기존 벡터/해시는 유지 (다음 재보강에서 다시 시도)
+                    documents[position].pop(CONTENT_HASH_FIELD)
+                    stats["embed_failed"] += 1
+        self._remember_texts({doc[CONTENT_HASH_FIELD]: text for doc, text in zip(documents, doc_texts)
+                              if CONTENT_HASH_FIELD in doc})
+        return documents
+
     def delete_index(self) -> None:
         """인덱스를 삭제합니다."""
         try:
             logger.info(f"Deleting index '{self.index_name}'...")
             self.index_client.delete_index(self.index_name)
+            manifest = self._get_manifest()
+            if manifest:
+                manifest.clear(self.index_name)
             logger.info(f"✓ Index '{self.index_name}' deleted")
         except Exception as e:
             logger.error(f"Failed to delete index: {e}")
@@ -0,0 +1,194 @@
+"""
+프로세스 간 공유 임베딩 할당량 저장소
+TPM/RPM 토큰 버킷 상태, 저장소(테넌트)별 몫, 429 대기 시각을 SQLite(WAL 모드)에 보관하여
+같은 배포를 쓰는 여러 프로세스(예: 여러 개의 `index_scheduler.py run`)가 하나의 할당량을 함께 지키도록 합니다.
+기본 위치는 인덱싱 작업 큐와 같은 DB입니다 (INDEX_SCHEDULER_DB).
+버킷 시각은 프로세스 간에 비교해야 하므로 단조 시계 대신 벽시계(time.time)를 씁니다.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from src.index_checkpoint import default_cache_root
+
+# 이 시간 동안 요청이 없던 테넌트 등록은 몫 계산에서 제외 (비정상 종료한 프로세스의 등록 정리)
+TENANT_TTL_SECONDS = float(os.getenv("EMBEDDING_QUOTA_TENANT_TTL_SECONDS", "120"))
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS quota_buckets (
+        name TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated REAL NOT NULL
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quota_tenants (
+        tenant TEXT NOT NULL,
+        holder TEXT NOT NULL,
+        refs INTEGER NOT NULL DEFAULT 1,
+        seen_at REAL NOT NULL,
+        PRIMARY KEY (tenant, holder)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quota_state (
+        key TEXT PRIMARY KEY,
+        value REAL NOT NULL
+    ) WITHOUT ROWID
+    """,
+)
+
+
+def default_quota_path() -> str:
+    """공유 할당량 DB 기본 경로 (EMBEDDING_QUOTA_DB, 없으면 인덱싱 작업 큐 DB)"""
+    if os.getenv('EMBEDDING_QUOTA_DB'):
+        return os.environ['EMBEDDING_QUOTA_DB']
+    if os.getenv('INDEX_SCHEDULER_DB'):
+        return os.environ['INDEX_SCHEDULER_DB']
+    return str(default_cache_root() / 'index_jobs.db')
+
+
+class QuotaStore:
+    """공유 토큰 버킷 SQLite 저장소 (프로세스/스레드 안전)"""
+
+    def __init__(self, db_path: Optional[str] = None, busy_timeout: float = 30.0,
+                 tenant_ttl: Optional[float] = None):
+        """
+        Args:
+            db_path: SQLite 데이터베이스 파일 경로 (기본값: default_quota_path())
+            busy_timeout: 다른 프로세스가 쓰기 잠금을 잡고 있을 때 대기할 최대 시간 (초)
+            tenant_ttl: 마지막 요청 후 테넌트를 활성으로 볼 시간 (초, 기본값: TENANT_TTL_SECONDS)
+        """
+        self.db_path = db_path or default_quota_path()
+        self.busy_timeout = busy_timeout
+        self.tenant_ttl = tenant_ttl if tenant_ttl is not None else TENANT_TTL_SECONDS
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._transaction() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    # ------------------------------------------------------------------ 연결
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 SQLite 연결 반환 (WAL 모드)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """쓰기 트랜잭션"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    # ------------------------------------------------------------------ 테넌트
+
+    def register_tenant(self, tenant: str, holder: str):
+        """holder(프로세스)의 테넌트 등록 (참조 수 증가)"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM quota_tenants WHERE seen_at < ?', (now - self.tenant_ttl,))
+            conn.execute(
+                'INSERT INTO quota_tenants (tenant, holder, refs, seen_at) VALUES (?, ?, 1, ?) '
+                'ON CONFLICT (tenant, holder) DO UPDATE SET refs = refs + 1, seen_at = excluded.seen_at',
+                (tenant, holder, now)
+            )
+
+    def release_tenant(self, tenant: str, holder: str):
+        """holder의 테넌트 등록 해제 (참조 수가 0이 되면 삭제)"""
+        with self._transaction() as conn:
+            conn.execute('UPDATE quota_tenants SET refs = refs - 1 WHERE tenant = ? AND holder = ?', (tenant, holder))
+            conn.execute('DELETE FROM quota_tenants WHERE refs <= 0')
+
+    def _active_tenants(self, conn: sqlite3.Connection, now: float) -> int:
+        row = conn.execute(
+            'SELECT COUNT(DISTINCT tenant) FROM quota_tenants WHERE seen_at >= ?', (now - self.tenant_ttl,)
+        ).fetchone()
+        return max(1, row[0])
+
+    def tenant_share(self, tenant: str, tokens_per_minute: float,
+                     requests_per_minute: float) -> Optional[Dict[str, float]]:
+        """테넌트의 현재 분당 몫 (활성 등록이 없으면 None)"""
+        now = time.time()
+        conn = self._connect()
+        registered = conn.execute(
+            'SELECT 1 FROM quota_tenants WHERE tenant = ? AND seen_at >= ?', (tenant, now - self.tenant_ttl)
+        ).fetchone()
+        if not registered:
+            return None
+        count = self._active_tenants(conn, now)
+        return {"tokens_per_minute": tokens_per_minute / count, "requests_per_minute": requests_per_minute / count}
+
+    # ------------------------------------------------------------------ 버킷
+
+    @staticmethod
+    def _take(conn: sqlite3.Connection, name: str, rate_per_minute: float, amount: float, now: float) -> float:
+        """버킷에서 amount 예약 후 대기해야 하는 시간(초) 반환 (TokenBucket.reserve와 같은 규칙)"""
+        if rate_per_minute <= 0:
+            return 0.0
+        rate = rate_per_minute / 60.0
+        capacity = rate_per_minute
+        row = conn.execute('SELECT tokens, updated FROM quota_buckets WHERE name = ?', (name,)).fetchone()
+        tokens = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+        tokens -= min(amount, capacity)
+        conn.execute(
+            'INSERT INTO quota_buckets (name, tokens, updated) VALUES (?, ?, ?) '
+            'ON CONFLICT (name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+            (name, tokens, now)
+        )
+        return 0.0 if tokens >= 0 else -tokens / rate
+
+    def reserve(self, tokens: float, tokens_per_minute: float, requests_per_minute: float,
+                tenant: Optional[str] = None, holder: Optional[str] = None) -> float:
+        """
+        요청 1건과 tokens 만큼을 전체 버킷(과 tenant 몫)에서 한 트랜잭션으로 예약하고 대기 시간(초)을 반환합니다.
+        429로 요청된 대기 시각도 반영합니다.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            wait = max(self._take(conn, 'requests', requests_per_minute, 1, now),
+                       self._take(conn, 'tokens', tokens_per_minute, tokens, now))
+            if tenant:
+                if holder:
+                    conn.execute(
+                        'INSERT INTO quota_tenants (tenant, holder, refs, seen_at) VALUES (?, ?, 1, ?) '
+                        'ON CONFLICT (tenant, holder) DO UPDATE SET seen_at = excluded.seen_at',
+                        (tenant, holder, now)
+                    )
+                count = self._active_tenants(conn, now)
+                wait = max(wait,
+                           self._take(conn, f'tenant:{tenant}:requests', requests_per_minute / count, 1, now),
+                           self._take(conn, f'tenant:{tenant}:tokens', tokens_per_minute / count, tokens, now))
+            row = conn.execute("SELECT value FROM quota_state WHERE key = 'pause_until'").fetchone()
+            if row:
+                wait = max(wait, row[0] - now)
+        return wait
+
+    def pause(self, seconds: float):
+        """모든 프로세스의 요청을 seconds 동안 보류"""
+        until = time.time() + seconds
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO quota_state (key, value) VALUES ('pause_until', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = MAX(value, excluded.value)",
+                (until,)
+            )
@@ -1,21 +1,34 @@
 """
 원격 저장소 클론 캐시 관리자
 세션 내에서 동일 원격 저장소의 로컬 클론을 재사용합니다.
-캐시는 JSON 파일로 영구 저장되며, 만료 시간은 1일입니다.
+캐시 메타데이터는 SQLite(WAL) 저장소에 영구 저장되며, 만료 시간은 1일입니다.
 """
 
 import os
+import asyncio
+import inspect
+import functools
 import tempfile
 import shutil
 import hashlib
 import logging
-import json
 import time
-from typing import Optional, Dict
+import threading
+import re
+from typing import Optional, Dict, Callable, List
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
 import git
 
+from src.cache_metadata_store import CacheMetadataStore
+from src.cancellation import CancellationToken, IndexingCancelled
+from src.git_safe_directory import SafeDirectoryRegistry
+from src.repo_family import SharedObjectStore, resolve_configured_family, detect_root_family
+from src.clone_progress import CoalescingCloneProgress, CloneProgressStream, make_event
+from src.repo_refresher import AccessTracker, RefreshScheduler
+from src.repo_maintenance import MaintenanceScheduler, maintain_repository, count_packs, child_cpu_seconds
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,29 +36,99 @@ class RepoCloneCache:
     """원격 저장소 클론 캐시 싱글톤"""
 
     _instance = None
+    _instance_lock = threading.Lock()
     _cache: Dict[str, Dict] = {}  # {cache_key: {url, path, created_at, last_accessed}}
     _cache_dir: Optional[str] = None
     _cache_file: Optional[str] = None
+    _store: Optional[CacheMetadataStore] = None
     _expire_days: int = 1  # 캐시 만료 기간 (일)
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialize()
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialize()
+                    cls._instance = instance
         return cls._instance
 
     @classmethod
     def reset_instance(cls):
         """싱글톤 인스턴스를 강제로 리셋 (테스트/디버깅 용)"""
+        if cls._instance is not None:
+            for scheduler in ('_maintenance_scheduler', '_refresh_scheduler'):
+                if getattr(cls._instance, scheduler, None):
+                    getattr(cls._instance, scheduler).stop()
         cls._instance = None
         logger.info("Singleton instance reset")
 
     def _initialize(self):
-        """캐시 디렉토리 및 메타데이터 초기화"""
+        """
+        캐시 디렉토리 및 메타데이터 초기화
+        - 항목 검증은 첫 접근 시 지연 수행 (_ensure_entry_validated)
+        - 전체 검증은 시간 예산 내에서 백그라운드 스레드로 수행
+        """
+        init_start = time.perf_counter()
+
         # Azure 환경 감지 및 적절한 캐시 디렉토리 설정
         cache_root = self._get_cache_root()
         self._cache_dir = str(cache_root / 'repos')
-        self._cache_file = str(cache_root / 'cache_metadata.json')
+        self._cache_file = str(cache_root / 'cache_metadata.db')
+        self._cache = {}
+        self._lock = threading.RLock()
+        self._validated_keys = set()
+        self._key_locks: Dict[str, threading.Lock] = {}  # 같은 저장소 동시 클론 방지
+        self._clone_executor = None  # get_or_clone_async 전용 워커 스레드 풀
+        self._git_configured = False
+        self._sweep_thread = None
+        # 포크 패밀리 공유 객체 저장소 (repos/_shared/<family>.git)
+        self._shared_objects_enabled = os.getenv("REPO_CACHE_SHARED_OBJECTS", "true").lower() in ("1", "true", "yes")
+        self._shared_store = SharedObjectStore(self._cache_dir)
+        # fetch 정책: default_branch(기본 브랜치만, 태그 제외) | all(원격 기본 refspec 그대로)
+        self._fetch_policy = os.getenv("REPO_CACHE_FETCH_POLICY", "default_branch").lower()
+        self._policy_applied = set()  # 정책이 적용된 저장소 경로
+        # 신선도 창: 마지막 fetch 후 이 시간 내의 캐시 히트는 fetch 생략
+        self._fresh_seconds = float(os.getenv("REPO_CACHE_FRESH_SECONDS", "300"))
+        # 자주 쓰는 저장소 백그라운드 갱신 (접근 빈도 상위 N개)
+        self._access_tracker = AccessTracker(float(os.getenv("REPO_CACHE_ACCESS_HALF_LIFE_SECONDS", "3600")))
+        self._refresh_top = int(os.getenv("REPO_CACHE_REFRESH_TOP", "20"))
+        self._refresh_min_score = float(os.getenv("REPO_CACHE_REFRESH_MIN_SCORE", "2"))
+        self._refresh_warm_limit = int(os.getenv("REPO_CACHE_REFRESH_WARM_LIMIT", "50"))
+        self._background = threading.local()  # 백그라운드 작업의 접근은 빈도에 반영하지 않음
+        self._refresh_scheduler = RefreshScheduler(
+            self._select_refresh_candidates,
+            self.refresh_entry,
+            interval=float(os.getenv("REPO_CACHE_REFRESH_INTERVAL_SECONDS", "300")),
+            concurrency=int(os.getenv("REPO_CACHE_REFRESH_CONCURRENCY", "2")),
+        )
+        # 백그라운드 유지보수 (유휴 저장소 대상, 사이클당 CPU 예산)
+        self._maintenance_scheduler = None
+        self._maintenance_idle_seconds = float(os.getenv("REPO_CACHE_MAINTENANCE_IDLE_SECONDS", "300"))
+        self._maintenance_interval = timedelta(hours=float(os.getenv("REPO_CACHE_MAINTENANCE_INTERVAL_HOURS", "24")))
+        self._maintenance_pack_threshold = int(os.getenv("REPO_CACHE_MAINTENANCE_PACK_THRESHOLD", "10"))
+        self._maintenance_metrics = {
+            "status": "idle",
+            "cpu_budget_seconds": float(os.getenv("REPO_CACHE_MAINTENANCE_CPU_BUDGET_SECONDS", "30")),
+            "last_run": None,
+            "repos_maintained": 0,
+            "repos_busy": 0,
+            "cpu_seconds": 0.0,
+            "seconds": None,
+        }
+        self._startup_metrics = {
+            "init_seconds": None,
+            "metadata_load_seconds": None,
+            "first_access_seconds": None,
+            "lazy_validations": 0,
+            "lazy_validation_seconds": 0.0,
+            "sweep": {
+                "status": "not_started",
+                "budget_seconds": float(os.getenv("REPO_CACHE_SWEEP_BUDGET_SECONDS", "10")),
+                "checked": 0,
+                "removed": 0,
+                "seconds": None,
+            },
+        }
 
         # 디렉토리 생성
         os.makedirs(self._cache_dir, exist_ok=True)
@@ -54,14 +137,222 @@ class RepoCloneCache:
         logger.info(f"Cache root: {cache_root}")
         logger.info(f"Initialized repository cache at: {self._cache_dir}")
 
-        # Azure 환경에서 Git safe.directory 설정
-        self._configure_git_safe_directory()
-
         # 기존 캐시 메타데이터 로드
+        load_start = time.perf_counter()
         self._load_cache_metadata()
+        self._startup_metrics["metadata_load_seconds"] = time.perf_counter() - load_start
+
+        self._startup_metrics["init_seconds"] = time.perf_counter() - init_start
+        logger.info(
+            f"Repository cache ready in {self._startup_metrics['init_seconds'] * 1000:.1f}ms "
+            f"({len(self._cache)} entries, validation deferred)"
+        )
+
+        # 만료/손상된 캐시 정리는 백그라운드에서 수행
+        if os.getenv("REPO_CACHE_BACKGROUND_SWEEP", "true").lower() in ("1", "true", "yes"):
+            self._start_background_sweep()
+
+        if os.getenv("REPO_CACHE_MAINTENANCE", "true").lower() in ("1", "true", "yes"):
+            self._maintenance_scheduler = MaintenanceScheduler(
+                self.run_maintenance,
+                check_interval=float(os.getenv("REPO_CACHE_MAINTENANCE_CHECK_SECONDS", "600"))
+            )
+            self._maintenance_scheduler.start()
+
+        if os.getenv("REPO_CACHE_REFRESH", "true").lower() in ("1", "true", "yes"):
+            self._refresh_scheduler.start()
+
+    def _ensure_git_configured(self):
+        """Git 전역 설정(safe.directory 등)을 첫 Git 작업 직전에 한 번만 수행"""
+        if self._git_configured:
+            return
+        with self._lock:
+            if self._git_configured:
+                return
+            # Azure 환경에서 Git safe.directory 설정
+            self._configure_git_safe_directory()
+            self._git_configured = True
+
+    def _start_background_sweep(self):
+        """시간 예산이 있는 전체 캐시 검증을 데몬 스레드로 시작"""
+        budget = self._startup_metrics["sweep"]["budget_seconds"]
+        self._sweep_thread = threading.Thread(
+            target=self._quick_validate_cache,
+            kwargs={"time_budget": budget},
+            name="repo-cache-sweep",
+            daemon=True
+        )
+        self._startup_metrics["sweep"]["status"] = "running"
+        self._sweep_thread.start()
+
+    def get_startup_metrics(self) -> Dict:
+        """캐시 초기화/지연 검증/백그라운드 검증 지연 시간 지표 반환"""
+        with self._lock:
+            metrics = dict(self._startup_metrics)
+            metrics["sweep"] = dict(self._startup_metrics["sweep"])
+        return metrics
+
+    def _needs_maintenance(self, entry: Dict, now: datetime, force: bool) -> bool:
+        """유휴 상태이고 유지보수 주기가 지났거나 팩이 많이 쌓인 항목인지"""
+        if force:
+            return True
+
+        last_accessed = entry.get('last_accessed') or entry.get('created_at')
+        if last_accessed and (now - datetime.fromisoformat(last_accessed)).total_seconds() < self._maintenance_idle_seconds:
+            return False  # 사용 중인 저장소는 건너뜀
+
+        last_maintenance = entry.get('last_maintenance')
+        if not last_maintenance or now - datetime.fromisoformat(last_maintenance) >= self._maintenance_interval:
+            return True
+        return count_packs(entry['path']) >= self._maintenance_pack_threshold
+
+    def run_maintenance(self, cpu_budget: Optional[float] = None, force: bool = False) -> Dict:
+        """
+        유휴 캐시 저장소 유지보수 사이클 (repack / loose 객체 정리 / commit-graph / multi-pack-index)
+        유지보수가 오래된 항목부터 수행하며, git 프로세스 CPU 사용량이 예산을 넘으면 중단합니다.
+        클론/fetch가 진행 중인 저장소(저장소별 잠금 사용 중)는 gc/repack과 겹치지 않도록 이번 사이클에서 건너뜁니다.
+
+        Args:
+            cpu_budget: 사이클당 CPU 예산 (초, 기본값: REPO_CACHE_MAINTENANCE_CPU_BUDGET_SECONDS)
+            force: 유휴/주기 조건을 무시하고 모든 항목 수행
+
+        Returns:
+            Dict: 사이클 지표
+        """
+        budget = self._maintenance_metrics["cpu_budget_seconds"] if cpu_budget is None else cpu_budget
+        start = time.perf_counter()
+        cpu_start = child_cpu_seconds()
+        now = datetime.now()
+
+        with self._lock:
+            candidates = [
+                (key, dict(entry)) for key, entry in self._cache.items()
+                if os.path.exists(entry['path']) and self._needs_maintenance(entry, now, force)
+            ]
+            self._maintenance_metrics["status"] = "running"
+        candidates.sort(key=lambda item: item[1].get('last_maintenance') or '')
+
+        maintained = 0
+        busy = 0
+        families = set()
+        budget_exhausted = False
+        for cache_key, entry in candidates:
+            if child_cpu_seconds() - cpu_start >= budget:
+                budget_exhausted = True
+                break
+            key_lock = self._get_key_lock(cache_key)
+            if not key_lock.acquire(blocking=False):
+                busy += 1  # 사용자 요청/갱신이 처리 중인 저장소는 다음 사이클에서
+                continue
+            try:
+                report = maintain_repository(entry['path'])
+            except Exception as e:
+                logger.warning(f"Maintenance failed for {entry['url']}: {e}")
+                continue
+            finally:
+                key_lock.release()
+
+            fields = {
+                'last_maintenance': datetime.now().isoformat(),
+                'pack_count': report['pack_count'],
+            }
+            with self._lock:
+                if cache_key in self._cache:
+                    self._cache[cache_key].update(fields)
+            if self._store:
+                self._store.update(cache_key, **fields)
+            maintained += 1
+            if entry.get('family'):
+                families.add(entry['family'])
+
+        # 이번 사이클에서 정리한 포크의 공유 객체 저장소도 예산 내에서 정리
+        for family in sorted(families):
+            if child_cpu_seconds() - cpu_start >= budget:
+                budget_exhausted = True
+                break
+            if self._shared_store.exists(family):
+                maintain_repository(self._shared_store.path_for(family))
+
+        with self._lock:
+            self._maintenance_metrics.update({
+                "status": "budget_exhausted" if budget_exhausted else "completed",
+                "last_run": datetime.now().isoformat(),
+                "repos_maintained": maintained,
+                "repos_busy": busy,
+                "cpu_seconds": child_cpu_seconds() - cpu_start,
+                "seconds": time.perf_counter() - start,
+            })
+            metrics = dict(self._maintenance_metrics)
+
+        if maintained:
+            logger.info(f"🧹 Maintenance cycle: {maintained} repos in {metrics['seconds']:.1f}s")
+        return metrics
+
+    def _check_entry(self, cache_key: str, entry: Dict, now: datetime) -> Optional[str]:
+        """
+        단일 캐시 항목 빠른 검증 (만료 및 경로/Git 저장소 존재만 확인, fetch는 안함)
+
+        Returns:
+            Optional[str]: 문제가 있으면 'expired' 또는 'invalid', 정상이면 None
+        """
+        try:
+            cache_path = self._normalize_cache_path(entry['path'], cache_key)
+            if cache_path != entry['path']:
+                entry['path'] = cache_path
+                self._persist_entry(cache_key, 'path')
+
+            created_at = datetime.fromisoformat(entry['created_at'])
+            repo_url = entry['url']
+
+            # 만료 확인
+            if now - created_at > timedelta(days=self._expire_days):
+                logger.info(f"Cache expired: {repo_url}")
+                return 'expired'
 
-        # 간단한 유효성 검사만 수행 (만료/손상된 캐시만 제거)
-        self._quick_validate_cache()
+            # 경로 존재 확인
+            if not os.path.exists(cache_path):
+                logger.warning(f"Cache path not found: {cache_path}")
+                return 'invalid'
+
+            # Git 저장소 유효성만 확인 (fetch는 안함)
+            try:
+                repo = git.Repo(cache_path)
+                repo.close()
+                logger.debug(f"✓ Valid cache entry: {repo_url}")
+            except Exception as e:
+                logger.warning(f"Invalid git repository: {cache_path} - {e}")
+                return 'invalid'
+
+        except Exception as e:
+            logger.warning(f"Failed to validate cache entry {cache_key}: {e}")
+            return 'invalid'
+
+        return None
+
+    def _ensure_entry_validated(self, cache_key: str) -> bool:
+        """
+        첫 접근 시 해당 항목만 검증 (지연 검증). 손상/만료 항목은 제거합니다.
+
+        Returns:
+            bool: 항목이 유효하면 True (없거나 제거되었으면 False)
+        """
+        with self._lock:
+            if cache_key not in self._cache:
+                return False
+            if cache_key in self._validated_keys:
+                return True
+
+            start = time.perf_counter()
+            problem = self._check_entry(cache_key, self._cache[cache_key], datetime.now())
+            self._startup_metrics["lazy_validations"] += 1
+            self._startup_metrics["lazy_validation_seconds"] += time.perf_counter() - start
+
+            if problem:
+                self._invalidate_cache(cache_key)
+                return False
+
+            self._validated_keys.add(cache_key)
+            return True
 
     def _get_cache_root(self) -> Path:
         """
@@ -105,135 +396,152 @@ class RepoCloneCache:
     def _configure_git_safe_directory(self):
         """
         Git safe.directory 설정 (Azure 환경 등에서 소유권 문제 방지)
-        - 이미 존재하는 항목은 중복 추가하지 않음
-        - '*'가 없으면 한 번만 추가
-        - 기존 중복 항목이 있다면 정리
+        - 프로세스 단위 레지스트리에 등록 (기존 목록은 1회만 로드)
+        - global 모드에서는 기존처럼 '*'를 ~/.gitconfig 에 한 번만 추가
+        - command_line 모드(기본)에서는 전역 설정을 건드리지 않고 저장소별로 등록
         """
-        try:
-            import subprocess
-
-            existing = self._get_safe_directories()
-            if '*' not in existing:
-                subprocess.run(
-                    ['git', 'config', '--global', '--add', 'safe.directory', '*'],
-                    capture_output=True,
-                    timeout=5,
-                    text=True,
-                    check=False,
-                )
-                logger.info("✓ Configured Git safe.directory: *")
-            else:
-                logger.debug("safe.directory already contains '*'")
-
-            # 중복 정리 (모든 항목 대상, 순서 유지)
-            self._cleanup_safe_directory_duplicates()
+        registry = SafeDirectoryRegistry.get()
+        wildcard = os.getenv(
+            "GIT_SAFE_DIRECTORY_WILDCARD",
+            "true" if registry.mode == 'global' else "false"
+        ).lower() in ("1", "true", "yes")
 
-        except FileNotFoundError:
-            logger.warning("Git command not found, skipping safe.directory configuration")
+        try:
+            if wildcard and registry.register('*'):
+                logger.info(f"✓ Configured Git safe.directory: * (mode={registry.mode})")
+            registry.flush()
         except Exception as e:
             logger.warning(f"Failed to configure safe.directory (non-critical): {e}")
 
-    def _get_safe_directories(self) -> list[str]:
-        """현재 설정된 safe.directory 목록을 반환"""
+    def _add_safe_directory(self, repo_path: str):
+        """
+        특정 저장소 경로를 Git safe.directory에 추가
+        - 메모리 레지스트리 조회만으로 판단 (git config 실행 없음)
+        - global 모드의 실제 기록은 get_or_clone 종료 시 모아서 수행
+        Args:
+            repo_path: 저장소 경로
+        """
         try:
-            import subprocess
-            result = subprocess.run(
-                ['git', 'config', '--global', '--get-all', 'safe.directory'],
-                capture_output=True,
-                timeout=5,
-                text=True,
-                check=False,
-            )
-            if result.returncode == 0 and result.stdout:
-                entries = [line.strip() for line in result.stdout.splitlines() if line.strip()]
-                return entries
+            SafeDirectoryRegistry.get().register(repo_path)
         except Exception as e:
-            logger.debug(f"Failed to read safe.directory: {e}")
-        return []
+            logger.debug(f"Failed to add safe.directory (non-critical): {e}")
 
-    def _cleanup_safe_directory_duplicates(self):
-        """safe.directory 항목 중복을 제거하고 유일 항목만 보존"""
+    @staticmethod
+    def _remote_default_branch(repo: git.Repo) -> Optional[str]:
+        """origin의 기본 브랜치 이름 (refs/remotes/origin/HEAD → 현재 브랜치 순)"""
         try:
-            import subprocess
-            entries = self._get_safe_directories()
-            if not entries:
-                return
+            return repo.git.symbolic_ref('--short', 'refs/remotes/origin/HEAD').split('/', 1)[1]
+        except Exception:
+            pass
+        try:
+            return repo.active_branch.name
+        except Exception:
+            return None
 
-            unique = []
-            seen = set()
-            for e in entries:
-                key = os.path.normcase(os.path.normpath(e)) if e != '*' else '*'
-                if key not in seen:
-                    seen.add(key)
-                    unique.append(e)
-
-            if unique == entries:
-                return  # 이미 중복 없음
-
-            # 전체 항목 제거 후 유니크 항목만 재등록
-            subprocess.run(
-                ['git', 'config', '--global', '--unset-all', 'safe.directory'],
-                capture_output=True,
-                timeout=5,
-                text=True,
-                check=False,
-            )
+    def _apply_fetch_policy(self, repo: git.Repo):
+        """
+        origin 원격 설정을 fetch 정책에 맞게 조정합니다 (저장소당 1회).
+        default_branch 정책: 기본 브랜치 refspec만, 태그 제외(tagOpt=--no-tags), protocol v2(ref 광고를 요청 prefix로 제한)
+        이후 모든 `origin.fetch()` 호출이 정책을 따릅니다.
+        """
+        policy_key = os.path.normpath(repo.working_dir)
+        if self._fetch_policy != 'default_branch' or policy_key in self._policy_applied:
+            return
 
-            for e in unique:
-                subprocess.run(
-                    ['git', 'config', '--global', '--add', 'safe.directory', e],
-                    capture_output=True,
-                    timeout=5,
-                    text=True,
-                    check=False,
-                )
-            logger.info(f"✓ Deduplicated safe.directory entries: {len(entries)} -> {len(unique)}")
-        except FileNotFoundError:
-            logger.debug("Git not found while deduplicating safe.directory")
-        except Exception as e:
-            logger.debug(f"Failed to deduplicate safe.directory: {e}")
+        try:
+            branch = self._remote_default_branch(repo)
+            if not branch:
+                return
 
-    def _add_safe_directory(self, repo_path: str):
+            refspec = f'+refs/heads/{branch}:refs/remotes/origin/{branch}'
+            current = repo.git.config('--get-all', 'remote.origin.fetch', with_exceptions=False).split()
+            if current != [refspec]:
+                repo.git.config('--replace-all', 'remote.origin.fetch', refspec)
+                logger.info(f"✓ Fetch policy applied: {branch} only, no tags")
+            if repo.git.config('--get', 'remote.origin.tagOpt', with_exceptions=False) != '--no-tags':
+                repo.git.config('remote.origin.tagOpt', '--no-tags')
+            if repo.git.config('--get', 'protocol.version', with_exceptions=False) != '2':
+                repo.git.config('protocol.version', '2')
+            self._policy_applied.add(policy_key)
+        except Exception as e:
+            logger.debug(f"Failed to apply fetch policy (non-critical): {e}")
+
+    @staticmethod
+    def _extra_refspec(ref: str) -> str:
+        """추가 요청 ref를 refspec으로 변환 (브랜치 / refs/tags/<t> 또는 tag:<t> / 커밋 SHA)"""
+        if re.fullmatch(r'[0-9a-f]{40}', ref):
+            return ref
+        if ref.startswith('tag:'):
+            ref = 'refs/tags/' + ref[len('tag:'):]
+        if ref.startswith('refs/tags/'):
+            return f'+{ref}:{ref}'
+        branch = ref[len('refs/heads/'):] if ref.startswith('refs/heads/') else ref
+        return f'+refs/heads/{branch}:refs/remotes/origin/{branch}'
+
+    def _fetch_extra_refs(self, cache_key: str, extra_refs: List[str]):
         """
-        특정 저장소 경로를 Git safe.directory에 추가
-        - '*'가 이미 있으면 개별 경로 추가 불필요
-        - 동일 경로가 이미 있으면 중복 추가하지 않음
-        Args:
-            repo_path: 저장소 경로
+        도구가 명시적으로 요청한 브랜치/태그/커밋만 추가로 fetch (shallow 클론은 같은 depth 유지)
+        이미 존재하는 ref는 다시 가져오지 않습니다.
         """
+        entry = self._cache[cache_key]
+        repo = git.Repo(entry['path'])
         try:
-            import subprocess
+            refspecs = []
+            for ref in extra_refs:
+                refspec = self._extra_refspec(ref)
+                local_ref = refspec.split(':', 1)[1] if ':' in refspec else refspec
+                try:
+                    repo.git.rev_parse('--verify', '--quiet', local_ref + '^{commit}')
+                    continue  # 이미 있음
+                except git.exc.GitCommandError:
+                    refspecs.append(refspec)
 
-            entries = self._get_safe_directories()
-            # '*'가 있으면 모든 디렉토리 허용됨 → 스킵
-            if '*' in entries:
-                logger.debug("'*' present in safe.directory; skipping per-repo add")
+            if not refspecs:
                 return
 
-            # 경로 정규화로 중복 방지 (Windows 대소문자/슬래시 차이 보정)
-            target = os.path.normcase(os.path.normpath(repo_path))
-            normalized_set = {os.path.normcase(os.path.normpath(e)) for e in entries}
+            fetch_kwargs = {'no_tags': True}
+            if repo.git.rev_parse('--is-shallow-repository').strip() == 'true':
+                fetch_kwargs['depth'] = entry.get('clone_depth') or 50
+            logger.info(f"Fetching extra refs: {', '.join(refspecs)}")
+            repo.remotes.origin.fetch(refspecs, **fetch_kwargs)
+        finally:
+            repo.close()
 
-            if target in normalized_set:
-                logger.debug(f"safe.directory already contains: {repo_path}")
-                return
+    def deepen(self, repo_url: str, commits: int, cancel_token: Optional[CancellationToken] = None) -> bool:
+        """
+        shallow 캐시 클론의 히스토리를 shallow 경계에서 commits개만큼 더 받습니다 (git fetch --deepen).
+        필요한 만큼만 받으므로 전체 히스토리를 받는 get_or_clone(depth=0)보다 가볍습니다.
 
-            result = subprocess.run(
-                ['git', 'config', '--global', '--add', 'safe.directory', repo_path],
-                capture_output=True,
-                timeout=5,
-                text=True,
-                check=False,
-            )
+        Args:
+            repo_url: 원격 저장소 URL
+            commits: 경계 아래로 더 받을 커밋 수
+            cancel_token: 취소 토큰 (시작 전 확인)
 
-            if result.returncode == 0:
-                logger.info(f"✓ Added safe.directory: {repo_path}")
-            else:
-                logger.debug(f"Failed to add safe.directory (non-critical): {result.stderr}")
-        except FileNotFoundError:
-            logger.debug("Git command not found")
-        except Exception as e:
-            logger.debug(f"Failed to add safe.directory (non-critical): {e}")
+        Returns:
+            bool: 히스토리를 더 받았으면 True (캐시에 없거나 이미 전체 클론이면 False)
+        """
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        cache_key = self._get_cache_key(repo_url)
+        with self._get_key_lock(cache_key):
+            self._sync_entry(cache_key)
+            entry = self._cache.get(cache_key)
+            if not entry or not os.path.exists(entry['path']):
+                return False
+            self._add_safe_directory(entry['path'])
+            repo = git.Repo(entry['path'])
+            try:
+                if repo.git.rev_parse('--is-shallow-repository').strip() != 'true':
+                    return False
+                self._apply_fetch_policy(repo)
+                logger.info(f"Deepening shallow clone by {commits} commits: {repo_url}")
+                repo.remotes.origin.fetch(deepen=commits)
+                entry['clone_depth'] = (entry.get('clone_depth') or 50) + commits
+                self._persist_entry(cache_key, 'clone_depth')
+                return True
+            finally:
+                repo.close()
+                SafeDirectoryRegistry.get().flush()
 
     def _ensure_commit_exists(self, repo_path: str, repo_url: str, commit_sha: str) -> bool:
         """
@@ -259,6 +567,7 @@ class RepoCloneCache:
                 # 커밋이 없으면 fetch 시도
                 logger.info(f"Commit {commit_sha[:8]} not found, fetching...")
 
+                self._apply_fetch_policy(repo)
                 origin = repo.remotes.origin
 
                 # 특정 커밋을 포함하도록 더 깊게 fetch
@@ -274,9 +583,15 @@ class RepoCloneCache:
                     except:
                         # 여전히 없으면 전체 히스토리 fetch
                         logger.info(f"Fetching full history for commit {commit_sha[:8]}...")
-                        origin.fetch(unshallow=True)
+                        if repo.git.rev_parse('--is-shallow-repository').strip() == 'true':
+                            origin.fetch(unshallow=True)
 
-                        repo.commit(commit_sha)
+                        try:
+                            repo.commit(commit_sha)
+                        except (git.exc.BadName, ValueError):
+                            # 기본 브랜치 밖의 커밋: 해당 커밋만 명시적으로 요청
+                            origin.fetch(commit_sha, no_tags=True)
+                            repo.commit(commit_sha)
                         logger.info(f"✓ Fetched commit {commit_sha[:8]} (full history)")
                         return True
 
@@ -289,81 +604,214 @@ class RepoCloneCache:
             return False
 
     def _load_cache_metadata(self):
-        """캐시 메타데이터를 JSON 파일에서 로드"""
-        if os.path.exists(self._cache_file):
-            try:
-                with open(self._cache_file, 'r', encoding='utf-8') as f:
-                    self._cache = json.load(f)
-                logger.info(f"Loaded cache metadata: {len(self._cache)} entries")
-            except Exception as e:
-                logger.warning(f"Failed to load cache metadata: {e}")
-                self._cache = {}
-        else:
-            logger.info("No existing cache metadata found")
+        """캐시 메타데이터를 SQLite 저장소에서 로드 (기존 JSON 파일은 1회 마이그레이션)"""
+        legacy_json = os.path.join(os.path.dirname(self._cache_file), 'cache_metadata.json')
+        flush_interval = float(os.getenv("REPO_CACHE_ACCESS_FLUSH_SECONDS", "60"))
+
+        try:
+            self._store = CacheMetadataStore(
+                self._cache_file,
+                legacy_json_path=legacy_json,
+                access_flush_interval=flush_interval
+            )
+            self._cache = self._store.load_all()
+            logger.info(f"Loaded cache metadata: {len(self._cache)} entries")
+        except Exception as e:
+            logger.warning(f"Failed to load cache metadata: {e}")
             self._cache = {}
 
-    def _save_cache_metadata(self):
-        """캐시 메타데이터를 JSON 파일에 저장"""
+    def _persist_entry(self, cache_key: str, *fields: str):
+        """
+        단일 캐시 항목을 저장소에 기록 (다른 항목에는 영향 없음)
+
+        fields를 주면 그 필드만 원자적으로 갱신하여, 다른 워커가 그 사이 기록한 필드(last_fetched 등)를
+        메모리의 오래된 값으로 덮어쓰지 않습니다. 새로 만든 항목(클론 직후)은 fields 없이 전체를 기록합니다.
+        """
+        if not self._store or cache_key not in self._cache:
+            return
+        entry = self._cache[cache_key]
         try:
-            with open(self._cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self._cache, f, indent=2, ensure_ascii=False)
-            logger.debug("Saved cache metadata")
+            if fields and self._store.update(cache_key, **{field: entry.get(field) for field in fields}) is not None:
+                logger.debug(f"Updated cache metadata {', '.join(fields)}: {cache_key}")
+                return
+            self._store.put(cache_key, entry)
+            logger.debug(f"Saved cache metadata: {cache_key}")
         except Exception as e:
             logger.error(f"Failed to save cache metadata: {e}")
 
-    def _quick_validate_cache(self):
-        """빠른 캐시 검증 (만료 및 경로 존재만 체크, fetch는 안함)"""
-        logger.info("Quick validating cache entries...")
+    def _touch_entry(self, cache_key: str):
+        """마지막 접근 시간 갱신 (저장소 기록은 주기적으로 모아서 수행)"""
+        now = datetime.now().isoformat()
+        if cache_key in self._cache:
+            self._cache[cache_key]['last_accessed'] = now
+        if self._store:
+            try:
+                self._store.touch(cache_key, now)
+            except Exception as e:
+                logger.debug(f"Failed to record access time: {e}")
 
-        invalid_keys = []
-        expired_keys = []
-        now = datetime.now()
+    def _mark_fetched(self, cache_key: str):
+        """원격 fetch 완료 시각 기록 (다른 워커도 신선도 창을 공유하도록 저장소에 즉시 기록)"""
+        now = datetime.now().isoformat()
+        if cache_key in self._cache:
+            self._cache[cache_key]['last_fetched'] = now
+        if self._store:
+            try:
+                self._store.update(cache_key, last_fetched=now)
+            except Exception as e:
+                logger.debug(f"Failed to record fetch time: {e}")
 
-        for cache_key, entry in self._cache.items():
+    def _is_fresh(self, entry: Dict, window: Optional[float] = None) -> bool:
+        """마지막 fetch가 신선도 창 이내인지"""
+        window = self._fresh_seconds if window is None else window
+        last_fetched = entry.get('last_fetched')
+        if not last_fetched or window <= 0:
+            return False
+        return (datetime.now() - datetime.fromisoformat(last_fetched)).total_seconds() < window
+
+    def _select_refresh_candidates(self) -> list:
+        """
+        갱신 대상 선택: 접근 빈도 상위 저장소 중 신선도 창의 절반이 지난 항목
+        (사용자 요청 시점에 창이 만료되어 있지 않도록 미리 갱신)
+        """
+        candidates = []
+        for cache_key in self._access_tracker.top(self._refresh_top, self._refresh_min_score):
+            entry = self._cache.get(cache_key)
+            if entry and not self._is_fresh(entry, self._fresh_seconds / 2):
+                candidates.append(cache_key)
+        return candidates
+
+    def refresh_entry(self, cache_key: str) -> Optional[bool]:
+        """
+        캐시된 저장소를 원격과 동기화하고 새 커밋의 메타데이터 캐시를 미리 채웁니다.
+
+        Returns:
+            Optional[bool]: 성공 True, 실패 False, 사용 중이거나 항목이 없어 건너뛰면 None
+        """
+        entry = self._cache.get(cache_key)
+        if not entry:
+            return None
+
+        key_lock = self._get_key_lock(cache_key)
+        if not key_lock.acquire(blocking=False):
+            return None  # 사용자 요청이 처리 중인 저장소는 건너뜀
+
+        try:
+            self._ensure_git_configured()
+            self._add_safe_directory(entry['path'])
+            repo = git.Repo(entry['path'])
             try:
-                cache_path = entry['path']
-                cache_path = self._normalize_cache_path(cache_path, cache_key)
-                entry['path'] = cache_path
+                self._apply_fetch_policy(repo)
+                old_head = repo.head.commit.hexsha
+                repo.remotes.origin.fetch()
+                repo.git.reset('--hard', 'origin/HEAD')
+                new_head = repo.head.commit.hexsha
+                new_commits = 0
+                if new_head != old_head:
+                    new_commits = int(repo.git.rev_list('--count', f'{old_head}..{new_head}'))
+            finally:
+                repo.close()
+            self._mark_fetched(cache_key)
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {entry['url']}: {e}")
+            return False
+        finally:
+            key_lock.release()
 
-                created_at = datetime.fromisoformat(entry['created_at'])
-                repo_url = entry['url']
+        if new_commits:
+            logger.info(f"🔁 Refreshed {entry['url']}: {new_commits} new commits")
+            self._warm_commit_cache(entry['url'], new_commits)
+        return True
 
-                # 만료 확인
-                if now - created_at > timedelta(days=self._expire_days):
-                    logger.info(f"Cache expired: {repo_url}")
-                    expired_keys.append(cache_key)
-                    continue
+    def _warm_commit_cache(self, repo_url: str, new_commits: int):
+        """새로 가져온 커밋의 메타데이터(변경 파일/문맥/함수 분석)를 커밋 캐시에 미리 저장"""
+        from src.document_generator import DocumentGenerator
 
-                # 경로 존재 확인만
-                if not os.path.exists(cache_path):
-                    logger.warning(f"Cache path not found: {cache_path}")
-                    invalid_keys.append(cache_key)
-                    continue
+        self._background.active = True
+        generator = None
+        try:
+            generator = DocumentGenerator(repo_url)
+            generator.get_commits(limit=min(new_commits, self._refresh_warm_limit))
+        except Exception as e:
+            logger.debug(f"Failed to warm commit cache for {repo_url}: {e}")
+        finally:
+            if generator:
+                generator.close()
+            self._background.active = False
+
+    def _sync_entry(self, cache_key: str):
+        """다른 워커가 변경했을 수 있는 항목을 저장소에서 다시 읽어 메모리 캐시에 반영"""
+        if not self._store:
+            return
+        try:
+            entry = self._store.get(cache_key)
+        except Exception as e:
+            logger.debug(f"Failed to read cache entry {cache_key}: {e}")
+            return
+
+        with self._lock:
+            previous = self._cache.get(cache_key)
+            if entry is None:
+                self._cache.pop(cache_key, None)
+                self._validated_keys.discard(cache_key)
+            else:
+                # 다른 워커가 재클론한 항목은 다시 검증
+                if previous is None or previous.get('created_at') != entry.get('created_at'):
+                    self._validated_keys.discard(cache_key)
+                self._cache[cache_key] = entry
 
-                # Git 저장소 유효성만 확인 (fetch는 안함)
-                try:
-                    repo = git.Repo(cache_path)
-                    repo.close()
-                    logger.debug(f"✓ Valid cache entry: {repo_url}")
-                except Exception as e:
-                    logger.warning(f"Invalid git repository: {cache_path} - {e}")
-                    invalid_keys.append(cache_key)
+    def _quick_validate_cache(self, time_budget: Optional[float] = None):
+        """
+        빠른 캐시 검증 (만료 및 경로 존재만 체크, fetch는 안함)
 
-            except Exception as e:
-                logger.warning(f"Failed to validate cache entry {cache_key}: {e}")
-                invalid_keys.append(cache_key)
+        Args:
+            time_budget: 최대 수행 시간 (초). 초과 시 남은 항목은 첫 접근 시 지연 검증됩니다.
+        """
+        logger.info("Quick validating cache entries...")
 
-        # 만료/손상된 캐시만 정리
+        start = time.perf_counter()
+        sweep_metrics = self._startup_metrics["sweep"]
+        checked = 0
         removed_count = 0
-        for cache_key in expired_keys + invalid_keys:
-            self._invalidate_cache(cache_key)
-            removed_count += 1
+        budget_exhausted = False
 
-        if removed_count > 0:
+        for cache_key in list(self._cache.keys()):
+            if time_budget is not None and time.perf_counter() - start > time_budget:
+                budget_exhausted = True
+                break
+
+            with self._lock:
+                entry = self._cache.get(cache_key)
+                if entry is None or cache_key in self._validated_keys:
+                    continue
+
+                problem = self._check_entry(cache_key, entry, datetime.now())
+                checked += 1
+                # 만료/손상된 캐시만 정리
+                if problem:
+                    self._invalidate_cache(cache_key)
+                    removed_count += 1
+                else:
+                    self._validated_keys.add(cache_key)
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            sweep_metrics.update({
+                "status": "budget_exhausted" if budget_exhausted else "completed",
+                "checked": checked,
+                "removed": removed_count,
+                "seconds": elapsed,
+            })
+
+        if budget_exhausted:
+            logger.info(
+                f"Cache sweep stopped after {elapsed:.1f}s budget "
+                f"({checked} checked, remaining entries validated on first access)"
+            )
+        elif removed_count > 0:
             logger.info(f"Cleaned up {removed_count} invalid/expired cache entries")
-            self._save_cache_metadata()
         else:
-            logger.info("All cache entries are valid")
+            logger.info(f"All cache entries are valid ({checked} checked in {elapsed * 1000:.1f}ms)")
 
     def _validate_single_repo(self, cache_key: str) -> bool:
         """
@@ -383,19 +831,27 @@ class RepoCloneCache:
             cache_path = entry['path']
             repo_url = entry['url']
 
+            # 신선도 창 이내면 fetch 생략 (백그라운드 갱신이 최신 상태 유지)
+            if self._is_fresh(entry) and os.path.exists(cache_path):
+                self._touch_entry(cache_key)
+                logger.info(f"✓ Cache hit (fresh, fetch skipped): {repo_url}")
+                return True
+
             # safe.directory 설정
             self._add_safe_directory(cache_path)
 
             # Git 저장소 유효성 확인 및 업데이트
             repo = git.Repo(cache_path)
+            self._apply_fetch_policy(repo)
             logger.info(f"Fetching latest changes for: {repo_url}")
             origin = repo.remotes.origin
             origin.fetch()
             repo.git.reset('--hard', 'origin/HEAD')
+            repo.close()
 
-            # 마지막 접근 시간 업데이트
-            entry['last_accessed'] = datetime.now().isoformat()
-            self._save_cache_metadata()
+            # 마지막 접근/fetch 시간 업데이트
+            self._touch_entry(cache_key)
+            self._mark_fetched(cache_key)
 
             logger.info(f"✓ Updated cache entry: {repo_url}")
             return True
@@ -414,10 +870,11 @@ class RepoCloneCache:
 
         for cache_key, entry in self._cache.items():
             try:
-                cache_path = entry['path']
                 # 경로 정규화
-                cache_path = self._normalize_cache_path(cache_path, cache_key)
-                entry['path'] = cache_path  # 정규화된 경로로 업데이트
+                cache_path = self._normalize_cache_path(entry['path'], cache_key)
+                if cache_path != entry['path']:
+                    entry['path'] = cache_path  # 정규화된 경로로 업데이트
+                    self._persist_entry(cache_key, 'path')
 
                 created_at = datetime.fromisoformat(entry['created_at'])
                 repo_url = entry['url']
@@ -445,7 +902,7 @@ class RepoCloneCache:
                     repo.git.reset('--hard', 'origin/HEAD')
 
                     # 마지막 접근 시간 업데이트
-                    entry['last_accessed'] = now.isoformat()
+                    self._touch_entry(cache_key)
 
                     logger.info(f"✓ Valid cache entry: {repo_url}")
 
@@ -468,7 +925,6 @@ class RepoCloneCache:
 
         if removed_count > 0:
             logger.info(f"Cleaned up {removed_count} invalid/expired cache entries")
-            self._save_cache_metadata()
         else:
             logger.info("All cache entries are valid")
 
@@ -638,7 +1094,18 @@ class RepoCloneCache:
         logger.error(f"⚠️ Manual cleanup required!")
         raise Exception(f"Cannot remove directory: {path}")
 
-    def get_or_clone(self, repo_url: str, depth: Optional[int] = None, ensure_commit: Optional[str] = None) -> str:
+    def _get_key_lock(self, cache_key: str) -> threading.Lock:
+        """저장소별 잠금 (여러 스레드가 같은 저장소를 동시에 클론/fetch하지 않도록)"""
+        with self._lock:
+            if cache_key not in self._key_locks:
+                self._key_locks[cache_key] = threading.Lock()
+            return self._key_locks[cache_key]
+
+    def get_or_clone(self, repo_url: str, depth: Optional[int] = None, ensure_commit: Optional[str] = None,
+                     progress_sink: Optional[Callable[[Dict], None]] = None,
+                     max_events_per_second: Optional[float] = None,
+                     extra_refs: Optional[List[str]] = None,
+                     cancel_token: Optional[CancellationToken] = None) -> str:
         """
         캐시된 클론을 반환하거나 새로 클론합니다.
 
@@ -646,15 +1113,64 @@ class RepoCloneCache:
             repo_url: 원격 저장소 URL
             depth: clone depth (None=shallow clone with depth=50, 0=full history)
             ensure_commit: 특정 커밋이 필요한 경우 (없으면 fetch)
+            progress_sink: 클론 진행 이벤트 수신 함수 (clone_progress 참고, 워커 스레드에서 호출됨)
+            max_events_per_second: 초당 최대 진행 이벤트 수
+            extra_refs: 기본 브랜치 외에 필요한 브랜치/태그(refs/tags/<t>)/커밋 SHA (명시적 opt-in)
+            cancel_token: 취소 토큰 (클론 진행 중 취소되면 git 프로세스를 중단하고 부분 클론을 정리)
 
         Returns:
             str: 로컬 저장소 경로
+
+        Raises:
+            IndexingCancelled: 시작 전 또는 클론 중 취소된 경우
         """
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        first_access = self._startup_metrics["first_access_seconds"] is None
+        access_start = time.perf_counter()
+        cache_key = self._get_cache_key(repo_url)
+        if not getattr(self._background, 'active', False):
+            self._access_tracker.record(cache_key)
+        try:
+            with self._get_key_lock(cache_key):
+                try:
+                    path = self._get_or_clone(
+                        repo_url, depth=depth, ensure_commit=ensure_commit,
+                        progress_sink=progress_sink, max_events_per_second=max_events_per_second,
+                        cancel_token=cancel_token
+                    )
+                except Exception as e:
+                    # 진행 틱에서 중단된 git은 일반 명령 실패로 보이므로 취소로 바꿔 알림
+                    if cancel_token is not None and cancel_token.cancelled and not isinstance(e, IndexingCancelled):
+                        raise IndexingCancelled(cancel_token.reason) from e
+                    raise
+                if extra_refs:
+                    self._fetch_extra_refs(cache_key, extra_refs)
+                return path
+        finally:
+            # global 모드에서 이번 호출 중 추가된 safe.directory를 한 번에 기록
+            SafeDirectoryRegistry.get().flush()
+            if first_access and self._startup_metrics["first_access_seconds"] is None:
+                elapsed = time.perf_counter() - access_start
+                self._startup_metrics["first_access_seconds"] = elapsed
+                logger.info(f"First repository cache access took {elapsed:.2f}s")
+
+    def _get_or_clone(self, repo_url: str, depth: Optional[int] = None, ensure_commit: Optional[str] = None,
+                      progress_sink: Optional[Callable[[Dict], None]] = None,
+                      max_events_per_second: Optional[float] = None,
+                      cancel_token: Optional[CancellationToken] = None) -> str:
+        """get_or_clone 본체 (지연 검증 → 캐시 히트 시 갱신 → 미스 시 클론)"""
         cache_key = self._get_cache_key(repo_url)
         now = datetime.now()
 
-        # 이미 캐시된 경우
-        if cache_key in self._cache:
+        # Git 전역 설정은 첫 Git 작업 직전에 한 번만
+        self._ensure_git_configured()
+
+        # 다른 워커가 클론/무효화했을 수 있으므로 저장소에서 최신 항목 반영
+        self._sync_entry(cache_key)
+
+        # 이미 캐시된 경우 (첫 접근 시 이 항목만 검증)
+        if self._ensure_entry_validated(cache_key):
             entry = self._cache[cache_key]
             cached_path = entry['path']
             created_at = datetime.fromisoformat(entry['created_at'])
@@ -667,16 +1183,25 @@ class RepoCloneCache:
                 # 캐시된 경로가 유효한지 확인
                 if os.path.exists(cached_path):
                     try:
-                        # depth 요청이 있고 기존보다 깊게 필요한 경우
-                        if depth and depth > 50:  # 기본 shallow depth보다 크면
-                            logger.info(f"Fetching more commits (depth={depth})...")
+                        # depth 요청이 있고 기존보다 깊게 필요한 경우 (shallow 클론만, 전체 클론을 다시 자르지 않음)
+                        if depth == 0 or (depth and depth > 50):  # 전체 히스토리 또는 기본 shallow depth보다 크면
                             self._add_safe_directory(cached_path)
                             repo = git.Repo(cached_path)
-                            origin = repo.remotes.origin
-                            # deepen fetch
-                            origin.fetch(depth=depth)
-                            repo.close()
-                            logger.info(f"✓ Fetched more commits: {cached_path}")
+                            try:
+                                if repo.git.rev_parse('--is-shallow-repository').strip() == 'true':
+                                    self._apply_fetch_policy(repo)
+                                    origin = repo.remotes.origin
+                                    if depth == 0:
+                                        logger.info("Fetching full history (unshallow)...")
+                                        origin.fetch(unshallow=True)
+                                    else:
+                                        logger.info(f"Fetching more commits (depth={depth})...")
+                                        origin.fetch(depth=depth)  # deepen fetch
+                                    entry['clone_depth'] = depth
+                                    self._persist_entry(cache_key, 'clone_depth')
+                                    logger.info(f"✓ Fetched more commits: {cached_path}")
+                            finally:
+                                repo.close()
 
                         # 특정 커밋이 필요한 경우 확인
                         if ensure_commit:
@@ -702,6 +1227,8 @@ class RepoCloneCache:
                         self._invalidate_cache(cache_key)
 
         # 새로 클론
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
         logger.info(f"Cache miss, cloning: {repo_url}")
         local_path = os.path.join(self._cache_dir, cache_key)
 
@@ -721,6 +1248,7 @@ class RepoCloneCache:
 
                     # remote origin 확인
                     if 'origin' in [remote.name for remote in existing_repo.remotes]:
+                        self._apply_fetch_policy(existing_repo)
                         origin = existing_repo.remotes.origin
 
                         # fetch 및 reset (전체 히스토리)
@@ -737,9 +1265,10 @@ class RepoCloneCache:
                             'path': local_path,
                             'created_at': now.isoformat(),
                             'last_accessed': now.isoformat(),
+                            'last_fetched': now.isoformat(),
                             'clone_depth': depth
                         }
-                        self._save_cache_metadata()
+                        self._persist_entry(cache_key)
 
                         return local_path
                     else:
@@ -787,102 +1316,8 @@ class RepoCloneCache:
             except Exception as e:
                 logger.debug(f"Could not set git longpaths: {e}")
 
-            # 진행 상황 콜백
-            class CloneProgress(git.RemoteProgress):
-                def __init__(self):
-                    super().__init__()
-                    self.last_log_time = time.time()
-                    self.message_obj = None
-                    self.current_stage = None
-                    self.stage_start_time = time.time()
-
-                    # Chainlit 사용 가능한지 확인
-                    try:
-                        import chainlit as cl
-                        self.cl = cl
-                        # 현재 Chainlit 컨텍스트가 있는지 확인
-                        if hasattr(cl.context, 'session') and cl.context.session:
-                            self.use_chainlit = True
-                        else:
-                            self.use_chainlit = False
-                    except:
-                        self.cl = None
-                        self.use_chainlit = False
-
-                def _get_stage_name(self, op_code):
-                    """작업 코드에서 단계 이름 추출"""
-                    if op_code & self.COUNTING:
-                        return "Counting objects"
-                    elif op_code & self.COMPRESSING:
-                        return "Compressing objects"
-                    elif op_code & self.RECEIVING:
-                        return "Receiving objects"
-                    elif op_code & self.RESOLVING:
-                        return "Resolving deltas"
-                    elif op_code & self.FINDING_SOURCES:
-                        return "Finding sources"
-                    elif op_code & self.CHECKING_OUT:
-                        return "Checking out files"
-                    else:
-                        return "Processing"
-
-                def update(self, op_code, cur_count, max_count=None, message=''):
-                    # 현재 단계 확인
-                    stage = self._get_stage_name(op_code)
-
-                    # 단계가 변경되면 로그
-                    if stage != self.current_stage:
-                        if self.current_stage:
-                            elapsed = time.time() - self.stage_start_time
-                            logger.info(f"✓ {self.current_stage} completed in {elapsed:.1f}s")
-                        self.current_stage = stage
-                        self.stage_start_time = time.time()
-                        logger.info(f"▶ {stage}...")
-
-                    # 5초마다 진행 상황 로그
-                    now = time.time()
-                    if now - self.last_log_time >= 5:
-                        if max_count and max_count > 0:
-                            percentage = (cur_count / max_count * 100)
-                            msg = f"  🔄 {stage}: {percentage:.1f}% ({cur_count:,}/{max_count:,})"
-                        else:
-                            msg = f"  🔄 {stage}: {cur_count:,} items"
-
-                        logger.info(msg)
-
-                        # Chainlit UI에도 표시
-                        if self.use_chainlit and self.cl:
-                            try:
-                                import asyncio
-
-                                async def send_or_update():
-                                    if self.message_obj is None:
-                                        # 첫 메시지 생성
-                                        self.message_obj = await self.cl.Message(
-                                            content=msg,
-                                            author="System"
-                                        ).send()
-                                    else:
-                                        # 기존 메시지 업데이트
-                                        self.message_obj.content = msg
-                                        await self.message_obj.update()
-
-                                # 이벤트 루프에서 실행
-                                try:
-                                    loop = asyncio.get_event_loop()
-                                    if loop.is_running():
-                                        # 이미 실행 중인 루프에서는 task 생성
-                                        asyncio.create_task(send_or_update())
-                                    else:
-                                        # 새 루프 실행
-                                        asyncio.run(send_or_update())
-                                except:
-                                    # 동기 방식으로 시도
-                                    pass
-                            except Exception as e:
-                                logger.debug(f"Failed to send Chainlit message: {e}")
-
-                        self.last_log_time = now
+            # 진행 상황 콜백 (틱을 초당 최대 N개 이벤트로 합쳐 progress_sink로 전달)
+            progress = CoalescingCloneProgress(progress_sink, max_events_per_second, cancel_token)
 
             # depth 설정 (기본값: shallow clone)
             if depth is None:
@@ -899,80 +1334,66 @@ class RepoCloneCache:
 
             clone_kwargs = {
                 'single_branch': True,
-                'progress': CloneProgress()  # 진행 상황 추가
+                'progress': progress  # 진행 상황 추가
             }
+            if self._fetch_policy == 'default_branch':
+                # 태그 제외 (protocol v2는 git 2.26+ 기본값, 클론 후 저장소 설정에도 명시)
+                clone_kwargs['no_tags'] = True
 
             if clone_depth:
                 clone_kwargs['depth'] = clone_depth
 
             logger.info(f"Starting clone of {repo_url}...")
 
-            # Chainlit UI에 시작 메시지 전송
-            try:
-                import chainlit as cl
-                if hasattr(cl.context, 'session') and cl.context.session:
-                    import asyncio
-                    async def send_start_msg():
-                        await cl.Message(
-                            content=f"🔄 저장소 클론 시작: {repo_url}\n⚠️ 큰 저장소는 수 분이 소요될 수 있습니다.",
-                            author="System"
-                        ).send()
-
-                    try:
-                        loop = asyncio.get_event_loop()
-                        if loop.is_running():
-                            asyncio.create_task(send_start_msg())
-                        else:
-                            asyncio.run(send_start_msg())
-                    except:
-                        pass
-            except:
-                pass
+            progress.emit(make_event(
+                'start', message=f"🔄 저장소 클론 시작: {repo_url}\n⚠️ 큰 저장소는 수 분이 소요될 수 있습니다."
+            ))
 
             start_time = time.time()
 
-            repo = git.Repo.clone_from(
-                repo_url,
-                local_path,
-                **clone_kwargs
-            )
+            # 같은 패밀리의 포크가 이미 캐시되어 있으면 공유 객체를 참조하여 없는 객체만 전송
+            family = resolve_configured_family(repo_url) if self._shared_objects_enabled else None
+            repo = None
+            if family and self._shared_store.has_objects(family):
+                repo = self._clone_with_shared_objects(repo_url, local_path, family, clone_depth, clone_kwargs['progress'])
+            if repo is None and cancel_token is not None:
+                # 공유 객체 클론이 취소로 중단된 경우 일반 클론으로 다시 시작하지 않음
+                cancel_token.raise_if_cancelled()
+            if repo is None:
+                repo = git.Repo.clone_from(
+                    repo_url,
+                    local_path,
+                    **clone_kwargs
+                )
+            self._apply_fetch_policy(repo)
+            repo.close()
 
             elapsed = time.time() - start_time
             logger.info(f"✓ Clone completed in {elapsed:.1f} seconds")
 
-            # Chainlit UI에 완료 메시지 전송
-            try:
-                import chainlit as cl
-                if hasattr(cl.context, 'session') and cl.context.session:
-                    import asyncio
-                    async def send_complete_msg():
-                        await cl.Message(
-                            content=f"✅ 저장소 클론 완료! ({elapsed:.1f}초)",
-                            author="System"
-                        ).send()
-
-                    try:
-                        loop = asyncio.get_event_loop()
-                        if loop.is_running():
-                            asyncio.create_task(send_complete_msg())
-                        else:
-                            asyncio.run(send_complete_msg())
-                    except:
-                        pass
-            except:
-                pass
+            progress.emit(make_event('done', message=f"✅ 저장소 클론 완료! ({elapsed:.1f}초)", elapsed=elapsed))
 
             # Azure 환경에서 safe.directory 설정 (클론 직후)
             self._add_safe_directory(local_path)
 
+            # 패밀리 공유 저장소에 연결 (전체 히스토리 클론은 루트 커밋으로 패밀리 판별)
+            if self._shared_objects_enabled:
+                if family is None and clone_depth is None:
+                    family = detect_root_family(local_path)
+                if family and not self._shared_store.link(local_path, family, cache_key):
+                    family = None
+
             # 캐시 메타데이터 저장
             self._cache[cache_key] = {
                 'url': repo_url,
                 'path': local_path,
                 'created_at': now.isoformat(),
-                'last_accessed': now.isoformat()
+                'last_accessed': now.isoformat(),
+                'last_fetched': datetime.now().isoformat()
             }
-            self._save_cache_metadata()
+            if family:
+                self._cache[cache_key]['family'] = family
+            self._persist_entry(cache_key)
 
             logger.info(f"✓ Cloned and cached: {local_path}")
 
@@ -1018,14 +1439,137 @@ class RepoCloneCache:
                 shutil.rmtree(local_path, ignore_errors=True)
             raise
 
+    def _get_clone_executor(self) -> ThreadPoolExecutor:
+        """비동기 클론 전용 스레드 풀 (기본 executor를 점유하지 않도록 분리)"""
+        with self._lock:
+            if self._clone_executor is None:
+                self._clone_executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("REPO_CLONE_WORKERS", "4")),
+                    thread_name_prefix="repo-clone"
+                )
+            return self._clone_executor
+
+    async def get_or_clone_async(self, repo_url: str, depth: Optional[int] = None,
+                                 ensure_commit: Optional[str] = None,
+                                 on_progress: Optional[Callable[[Dict], object]] = None,
+                                 max_events_per_second: Optional[float] = None,
+                                 cancel_token: Optional[CancellationToken] = None) -> str:
+        """
+        get_or_clone 비동기 버전. git 작업은 워커 스레드에서 수행되어 이벤트 루프를 막지 않습니다.
+
+        Args:
+            repo_url: 원격 저장소 URL
+            depth: clone depth (get_or_clone과 동일)
+            ensure_commit: 특정 커밋이 필요한 경우
+            on_progress: 진행 이벤트 콜백 (동기 또는 async 함수, 이벤트 루프에서 호출됨)
+            max_events_per_second: 초당 최대 진행 이벤트 수
+            cancel_token: 취소 토큰 (get_or_clone과 동일)
+
+        Returns:
+            str: 로컬 저장소 경로
+        """
+        loop = asyncio.get_running_loop()
+        stream = CloneProgressStream(loop)
+        future = loop.run_in_executor(
+            self._get_clone_executor(),
+            functools.partial(
+                self.get_or_clone, repo_url, depth, ensure_commit,
+                progress_sink=stream.push, max_events_per_second=max_events_per_second,
+                cancel_token=cancel_token
+            )
+        )
+
+        def _finish(f):
+            if not f.cancelled() and f.exception() is not None:
+                stream.push(make_event('error', message=str(f.exception())))
+            stream.close()
+
+        future.add_done_callback(_finish)
+
+        async for event in stream:
+            if on_progress is None:
+                continue
+            try:
+                result = on_progress(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.debug(f"Progress callback failed: {e}")
+
+        return await future
+
+    def _clone_with_shared_objects(self, repo_url: str, local_path: str, family: str,
+                                   depth: Optional[int], progress) -> Optional[git.Repo]:
+        """
+        패밀리 공유 저장소를 alternates로 참조하는 클론 생성
+        (git init → alternates 등록 → 기본 브랜치만 fetch → checkout)
+
+        `git clone --reference` 는 shallow 저장소를 참조로 쓸 수 없으므로 직접 구성합니다.
+
+        Returns:
+            Optional[git.Repo]: 실패 시 None (호출자가 일반 클론으로 대체)
+        """
+        repo = None
+        try:
+            logger.info(f"Cloning with shared objects from family {family}...")
+            repo = git.Repo.init(local_path)
+            self._shared_store.write_alternates(local_path, family)
+            origin = repo.create_remote('origin', repo_url)
+
+            # 원격 기본 브랜치 확인 (ref: refs/heads/<branch>\tHEAD)
+            branch = None
+            for line in repo.git.ls_remote('--symref', repo_url, 'HEAD').splitlines():
+                if line.startswith('ref: refs/heads/'):
+                    branch = line.split('\t')[0][len('ref: refs/heads/'):]
+                    break
+            if not branch:
+                raise git.exc.GitCommandError('ls-remote', 'Cannot resolve remote HEAD')
+
+            # single-branch 클론과 동일한 refspec
+            repo.git.config('remote.origin.fetch', f'+refs/heads/{branch}:refs/remotes/origin/{branch}')
+            fetch_kwargs = {'no_tags': True}
+            if depth:
+                fetch_kwargs['depth'] = depth
+            origin.fetch(progress=progress, **fetch_kwargs)
+
+            repo.git.remote('set-head', 'origin', branch)
+            repo.git.checkout('-B', branch, '--track', f'origin/{branch}')
+            logger.info(f"✓ Cloned using shared objects ({family})")
+            return repo
+        except Exception as e:
+            logger.warning(f"Shared-object clone failed, falling back to regular clone: {e}")
+            if repo is not None:
+                repo.close()
+            shutil.rmtree(local_path, ignore_errors=True)
+            return None
+
+    def get_family_key(self, repo_url: str) -> Optional[str]:
+        """
+        저장소의 포크 패밀리 키 반환 (캐시 항목 → 업스트림 맵 순)
+
+        Returns:
+            Optional[str]: 패밀리 키 (판별 불가 시 None)
+        """
+        entry = self._cache.get(self._get_cache_key(repo_url))
+        if entry and entry.get('family'):
+            return entry['family']
+        return resolve_configured_family(repo_url)
+
     def _invalidate_cache(self, cache_key: str):
         """캐시 무효화"""
+        with self._lock:
+            self._validated_keys.discard(cache_key)
+            self._invalidate_cache_locked(cache_key)
+
+    def _invalidate_cache_locked(self, cache_key: str):
+        """캐시 무효화 본체 (self._lock 보유 상태에서 호출)"""
         if cache_key in self._cache:
             entry = self._cache[cache_key]
             cached_path = entry['path']
 
             # 경로 정규화 및 검증
             cached_path = self._normalize_cache_path(cached_path, cache_key)
+            self._policy_applied.discard(os.path.normpath(cached_path))
 
             if os.path.exists(cached_path):
                 # 1단계: Git 저장소 닫기
@@ -1043,8 +1587,18 @@ class RepoCloneCache:
                 except Exception as e:
                     logger.error(f"Failed to remove cached repo: {e}")
 
+            self._access_tracker.forget(cache_key)
+
+            # 공유 저장소에서 포크 ref 제거 (객체는 다른 포크가 참조할 수 있으므로 유지)
+            if entry.get('family'):
+                self._shared_store.unlink(entry['family'], cache_key)
+
             del self._cache[cache_key]
-            self._save_cache_metadata()
+            if self._store:
+                try:
+                    self._store.delete(cache_key)
+                except Exception as e:
+                    logger.error(f"Failed to delete cache metadata: {e}")
 
     def clear_all(self):
         """모든 캐시 정리"""
@@ -1061,7 +1615,11 @@ class RepoCloneCache:
                 logger.warning(f"Failed to clear cache directory: {e}")
 
         self._cache.clear()
-        self._save_cache_metadata()
+        if self._store:
+            try:
+                self._store.clear()
+            except Exception as e:
+                logger.error(f"Failed to clear cache metadata: {e}")
 
     def get_cache_info(self) -> Dict:
         """캐시 정보 반환"""
@@ -1070,11 +1628,15 @@ class RepoCloneCache:
             "cache_file": self._cache_file or "",
             "cached_repos": len(self._cache),
             "expire_days": self._expire_days,
+            "startup": self.get_startup_metrics(),
+            "shared_families": self._shared_store.list_families(),
+            "maintenance": dict(self._maintenance_metrics),
+            "refresher": dict(self._refresh_scheduler.metrics),
             "repos": []
         }
 
         now = datetime.now()
-        for cache_key, entry in self._cache.items():
+        for cache_key, entry in list(self._cache.items()):
             created_at = datetime.fromisoformat(entry['created_at'])
             age_days = (now - created_at).days
 
@@ -1082,20 +1644,22 @@ class RepoCloneCache:
                 "url": entry['url'],
                 "cache_key": cache_key,
                 "age_days": age_days,
-                "is_expired": age_days > self._expire_days
+                "is_expired": age_days > self._expire_days,
+                "family": entry.get('family'),
+                "last_maintenance": entry.get('last_maintenance'),
+                "pack_count": entry.get('pack_count'),
+                "last_fetched": entry.get('last_fetched'),
+                "hotness": round(self._access_tracker.score(cache_key), 3)
             })
 
         return info
 
     def __del__(self):
-        """소멸자 - 메타데이터 저장 (캐시 디렉토리는 유지)"""
-        # 프로그램 종료 시 메타데이터만 저장, 캐시 디렉토리는 유지
+        """소멸자 - 대기 중인 접근 시간 기록 (캐시 디렉토리는 유지)"""
+        # 프로그램 종료 시 메타데이터만 기록, 캐시 디렉토리는 유지
         try:
-            # json과 open이 아직 사용 가능한지 확인
-            if hasattr(self, '_cache_file') and self._cache_file:
-                import builtins
-                if hasattr(builtins, 'open'):
-                    self._save_cache_metadata()
+            if getattr(self, '_store', None):
+                self._store.flush_access()
         except Exception:
             # 프로그램 종료 시 에러는 무시
             pass
@@ -0,0 +1,234 @@
+"""
+포크 저장소 패밀리와 공유 객체 저장소
+같은 업스트림에서 갈라진 포크들은 하나의 bare 공유 저장소(repos/_shared/<family>.git)에
+객체를 모으고, 각 포크 클론은 objects/info/alternates 로 이를 참조합니다.
+포크를 새로 가져올 때는 공유 저장소에 없는 객체만 전송됩니다.
+
+패밀리 판별:
+1. REPO_CACHE_UPSTREAM_MAP (JSON 문자열 또는 JSON 파일 경로, {"포크 URL": "업스트림 URL"})
+2. 전체 히스토리 클론의 루트 커밋 (shallow 클론은 루트 커밋을 알 수 없으므로 제외)
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Optional, Dict, List
+from urllib.parse import urlparse
+
+import git
+
+logger = logging.getLogger(__name__)
+
+SHARED_DIR_NAME = '_shared'
+
+
+def normalize_repo_url(repo_url: str) -> str:
+    """업스트림 맵 비교용 URL 정규화 (.git/슬래시/대소문자 차이 무시)"""
+    url = repo_url.strip()
+    if url.startswith('git@'):
+        url = 'ssh://' + url[len('git@'):].replace(':', '/', 1)
+    parsed = urlparse(url)
+    if parsed.scheme and parsed.netloc:
+        path = parsed.path.rstrip('/').removesuffix('.git')
+        return f"{parsed.netloc}{path}".lower()
+    return url.rstrip('/').removesuffix('.git').lower()
+
+
+def load_upstream_map() -> Dict[str, str]:
+    """
+    REPO_CACHE_UPSTREAM_MAP 환경 변수에서 포크 → 업스트림 맵 로드
+
+    Returns:
+        Dict[str, str]: {정규화된 포크 URL: 정규화된 업스트림 URL}
+    """
+    raw = os.getenv('REPO_CACHE_UPSTREAM_MAP', '').strip()
+    if not raw:
+        return {}
+
+    try:
+        if os.path.exists(raw):
+            with open(raw, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            data = json.loads(raw)
+    except Exception as e:
+        logger.warning(f"Failed to load REPO_CACHE_UPSTREAM_MAP: {e}")
+        return {}
+
+    return {normalize_repo_url(k): normalize_repo_url(v) for k, v in (data or {}).items()}
+
+
+def family_for_upstream(upstream_url: str) -> str:
+    """업스트림 URL 기반 패밀리 키"""
+    return 'up-' + hashlib.md5(normalize_repo_url(upstream_url).encode()).hexdigest()[:12]
+
+
+def family_for_root(root_sha: str) -> str:
+    """루트 커밋 기반 패밀리 키"""
+    return 'root-' + root_sha[:12]
+
+
+def resolve_configured_family(repo_url: str, upstream_map: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """
+    업스트림 맵으로 패밀리 결정 (클론 전에 알 수 있는 경우)
+
+    Returns:
+        Optional[str]: 패밀리 키 (맵에 없으면 None)
+    """
+    upstream_map = load_upstream_map() if upstream_map is None else upstream_map
+    if not upstream_map:
+        return None
+
+    key = normalize_repo_url(repo_url)
+    if key in upstream_map:
+        return family_for_upstream(upstream_map[key])
+    # 업스트림 자신도 같은 패밀리
+    if key in upstream_map.values():
+        return family_for_upstream(key)
+    return None
+
+
+def detect_root_family(repo_path: str) -> Optional[str]:
+    """
+    전체 히스토리 클론의 루트 커밋으로 패밀리 결정
+
+    Returns:
+        Optional[str]: 패밀리 키 (shallow 클론이거나 실패 시 None)
+    """
+    try:
+        repo = git.Repo(repo_path)
+        try:
+            if repo.git.rev_parse('--is-shallow-repository').strip() == 'true':
+                return None
+            roots = sorted(repo.git.rev_list('--max-parents=0', 'HEAD').split())
+        finally:
+            repo.close()
+    except Exception as e:
+        logger.debug(f"Failed to detect root commit for {repo_path}: {e}")
+        return None
+
+    return family_for_root(roots[0]) if roots else None
+
+
+class SharedObjectStore:
+    """패밀리별 bare 공유 객체 저장소 관리"""
+
+    def __init__(self, cache_dir: str):
+        """
+        Args:
+            cache_dir: 저장소 캐시 디렉토리 (repos/)
+        """
+        self.root = os.path.join(cache_dir, SHARED_DIR_NAME)
+        self._lock = threading.Lock()
+
+    def path_for(self, family: str) -> str:
+        """패밀리 공유 저장소 경로"""
+        return os.path.join(self.root, f"{family}.git")
+
+    def exists(self, family: str) -> bool:
+        return os.path.isdir(os.path.join(self.path_for(family), 'objects'))
+
+    def has_objects(self, family: str) -> bool:
+        """공유 저장소에 포크 ref가 하나라도 있는지 (alternates로 쓸 가치가 있는지)"""
+        if not self.exists(family):
+            return False
+        try:
+            repo = git.Repo(self.path_for(family))
+            try:
+                return bool(repo.git.for_each_ref('refs/forks/', '--count=1').strip())
+            finally:
+                repo.close()
+        except Exception:
+            return False
+
+    def ensure(self, family: str) -> str:
+        """공유 저장소가 없으면 bare 저장소로 생성"""
+        path = self.path_for(family)
+        with self._lock:
+            if not self.exists(family):
+                os.makedirs(self.root, exist_ok=True)
+                repo = git.Repo.init(path, bare=True)
+                with repo.config_writer() as cw:
+                    # 포크들이 참조하는 객체이므로 prune 유예 없이 삭제되지 않도록
+                    cw.set_value('gc', 'pruneExpire', 'never')
+                    cw.set_value('core', 'logAllRefUpdates', 'false')
+                    # 가져온 객체를 항상 팩으로 유지해야 포크의 repack(prune-packed)이 중복을 제거함
+                    cw.set_value('fetch', 'unpackLimit', '1')
+                repo.close()
+                logger.info(f"✓ Created shared object store: {path}")
+        return path
+
+    def write_alternates(self, repo_path: str, family: str):
+        """클론의 objects/info/alternates 에 공유 저장소 등록 (중복 없이)"""
+        shared_objects = os.path.join(self.path_for(family), 'objects')
+        info_dir = os.path.join(repo_path, '.git', 'objects', 'info')
+        os.makedirs(info_dir, exist_ok=True)
+        alternates = os.path.join(info_dir, 'alternates')
+
+        existing: List[str] = []
+        if os.path.exists(alternates):
+            with open(alternates, 'r', encoding='utf-8') as f:
+                existing = [line.strip() for line in f if line.strip()]
+
+        if shared_objects not in existing:
+            with open(alternates, 'a', encoding='utf-8') as f:
+                f.write(shared_objects + '\n')
+
+    def link(self, repo_path: str, family: str, cache_key: str) -> bool:
+        """
+        클론을 패밀리 공유 저장소에 연결합니다.
+        1. 클론의 HEAD 객체를 공유 저장소로 가져옴 (refs/forks/<cache_key>)
+        2. 클론에 alternates 등록
+        3. 공유 저장소에 있는 객체를 클론에서 제거 (repack -l)
+
+        Returns:
+            bool: 성공 시 True
+        """
+        try:
+            shared_path = self.ensure(family)
+            shared = git.Repo(shared_path)
+            try:
+                shared.git.fetch(
+                    '--no-tags', '--update-shallow', '--quiet',
+                    repo_path, f'+HEAD:refs/forks/{cache_key}'
+                )
+            finally:
+                shared.close()
+
+            self.write_alternates(repo_path, family)
+
+            repo = git.Repo(repo_path)
+            try:
+                repo.git.repack('-a', '-d', '-l', '-q')
+            finally:
+                repo.close()
+
+            logger.info(f"✓ Linked {cache_key} to shared object store {family}")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to link {repo_path} to shared store {family} (non-critical): {e}")
+            return False
+
+    def unlink(self, family: str, cache_key: str):
+        """포크 ref 제거 (객체 정리는 공유 저장소 유지보수에서 수행)"""
+        if not self.exists(family):
+            return
+        try:
+            shared = git.Repo(self.path_for(family))
+            try:
+                shared.git.update_ref('-d', f'refs/forks/{cache_key}')
+            finally:
+                shared.close()
+        except Exception as e:
+            logger.debug(f"Failed to remove fork ref {cache_key} from {family}: {e}")
+
+    def list_families(self) -> List[str]:
+        """생성된 공유 저장소(패밀리) 목록"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name[:-len('.git')] for name in os.listdir(self.root)
+            if name.endswith('.git')
+        )
@@ -0,0 +1,143 @@
+"""
+자주 사용되는 저장소 백그라운드 갱신
+저장소별 접근 빈도(지수 감쇠 점수)를 추적하고, 상위 저장소를 주기적으로 미리 fetch하여
+사용자 요청 시에는 네트워크 대기 없이 신선한 캐시를 사용하도록 합니다.
+"""
+
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AccessTracker:
+    """저장소별 접근 빈도 추적 (반감기 기반 지수 감쇠 점수)"""
+
+    def __init__(self, half_life_seconds: float = 3600.0):
+        self.half_life = half_life_seconds
+        self._lock = threading.Lock()
+        self._scores: Dict[str, float] = {}
+        self._updated: Dict[str, float] = {}
+
+    def _decayed(self, key: str, now: float) -> float:
+        score = self._scores.get(key, 0.0)
+        if score and self.half_life > 0:
+            score *= 0.5 ** ((now - self._updated[key]) / self.half_life)
+        return score
+
+    def record(self, key: str, now: Optional[float] = None):
+        """접근 1회 기록"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._scores[key] = self._decayed(key, now) + 1.0
+            self._updated[key] = now
+
+    def score(self, key: str, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._decayed(key, now)
+
+    def forget(self, key: str):
+        with self._lock:
+            self._scores.pop(key, None)
+            self._updated.pop(key, None)
+
+    def top(self, n: int, min_score: float = 0.0, now: Optional[float] = None) -> List[str]:
+        """점수 상위 n개 키 (min_score 미만 제외)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            scored = [(self._decayed(k, now), k) for k in self._scores]
+        scored = [(s, k) for s, k in scored if s >= min_score]
+        scored.sort(reverse=True)
+        return [k for _, k in scored[:n]]
+
+    def snapshot(self) -> Dict[str, float]:
+        now = time.time()
+        with self._lock:
+            return {k: round(self._decayed(k, now), 3) for k in self._scores}
+
+
+class RefreshScheduler:
+    """
+    주기적으로 갱신 대상을 선택하여 동시 실행 수 제한 내에서 갱신하는 데몬 스레드
+    주기와 작업 시작 시점에 지터를 주어 여러 워커가 동시에 원격 저장소에 몰리지 않도록 합니다.
+    """
+
+    def __init__(self, select: Callable[[], List[str]], refresh: Callable[[str], Optional[bool]],
+                 interval: float, concurrency: int = 2, jitter: float = 0.2):
+        """
+        Args:
+            select: 이번 사이클에 갱신할 키 목록을 반환하는 함수
+            refresh: 키 하나를 갱신하는 함수 (성공 True, 실패 False, 건너뜀 None)
+            interval: 사이클 간격 (초)
+            concurrency: 동시 갱신 수 상한
+            jitter: 간격 대비 무작위 편차 비율 (0.2 = ±20%)
+        """
+        self._select = select
+        self._refresh = refresh
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.jitter = jitter
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.metrics = {"cycles": 0, "refreshed": 0, "failed": 0, "last_cycle": None}
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="repo-cache-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _next_delay(self) -> float:
+        return max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def _loop(self):
+        while not self._stop_event.wait(self._next_delay()):
+            try:
+                self.run_cycle()
+            except Exception as e:
+                logger.warning(f"Repository refresh cycle failed: {e}")
+
+    def _refresh_one(self, key: str, delay: float) -> Optional[bool]:
+        if delay and self._stop_event.wait(delay):
+            return None
+        return self._refresh(key)
+
+    def run_cycle(self) -> Dict:
+        """갱신 사이클 1회 실행 (동시 실행 수 제한, 작업별 시작 지터)"""
+        keys = self._select()
+        refreshed = failed = 0
+        if keys:
+            # 작업 시작 시점을 간격의 일부 범위에서 분산
+            spread = self.interval * self.jitter / 2
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="repo-refresh") as pool:
+                futures = [pool.submit(self._refresh_one, key, random.uniform(0, spread)) for key in keys]
+                for future in futures:
+                    try:
+                        result = future.result()
+                        if result:
+                            refreshed += 1
+                        elif result is False:
+                            failed += 1
+                    except Exception as e:
+                        logger.debug(f"Refresh task failed: {e}")
+                        failed += 1
+
+        self.metrics["cycles"] += 1
+        self.metrics["refreshed"] += refreshed
+        self.metrics["failed"] += failed
+        self.metrics["last_cycle"] = {"selected": len(keys), "refreshed": refreshed, "failed": failed,
+                                      "at": time.time()}
+        if keys:
+            logger.info(f"🔁 Refreshed {refreshed}/{len(keys)} hot repositories")
+        return dict(self.metrics["last_cycle"])
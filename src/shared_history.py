@@ -0,0 +1,247 @@
+"""
+포크 간 공유 히스토리
+문서 id는 커밋 SHA이므로 업스트림과 포크가 공유하는 커밋은 인덱스에 한 번만 저장하고(내용/벡터),
+커밋이 속한 저장소는 컬렉션 필드로 기록합니다. 포크를 인덱싱하면 고유 커밋만 임베딩/업로드하고
+공유 커밋은 소속 필드만 merge합니다.
+
+- repo_id / repository_path: 커밋을 처음 인덱싱한 저장소 (기존 문서 호환)
+- repo_ids / repository_paths: 커밋을 포함하는 모든 저장소 (저장소 필터/통계 기준)
+repo_ids가 없는 이전 문서는 repo_id로 판단합니다.
+
+소속 merge는 문서를 읽고 컬렉션 전체를 다시 쓰므로(Azure AI Search 문서에는 조건부 쓰기가 없음)
+같은 커밋을 동시에 연결하면 한쪽 소속이 덮어써질 수 있습니다. 인덱싱이 끝나면 매니페스트에 기록된
+소속과 대조해 빠진 저장소를 다시 merge합니다 (restore_memberships).
+"""
+
+import os
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.search.documents.indexes.models import SimpleField
+
+logger = logging.getLogger(__name__)
+
+REPO_IDS_FIELD = "repo_ids"
+REPO_PATHS_FIELD = "repository_paths"
+
+# 소속 조회 1회에 묶는 커밋 수 (search.in 필터 길이 한도 안)
+LOOKUP_CHUNK_SIZE = 800
+
+# 인덱스 이름별 스키마 확인 결과 (프로세스당 한 번만 확인)
+_schema_checked: Set[str] = set()
+
+
+def shared_history_enabled() -> bool:
+    """INDEX_SHARED_HISTORY (기본값: true)"""
+    return os.getenv("INDEX_SHARED_HISTORY", "true").lower() == "true"
+
+
+def repo_filter(repo_id: str) -> str:
+    """저장소 필터 (repo_ids 소속, repo_ids가 없는 이전 문서는 repo_id)"""
+    return (f"({REPO_IDS_FIELD}/any(r: r eq '{repo_id}') "
+            f"or (repo_id eq '{repo_id}' and not {REPO_IDS_FIELD}/any()))")
+
+
+def membership_fields() -> List[SimpleField]:
+    """인덱스 스키마에 추가할 소속 필드"""
+    return [
+        SimpleField(name=REPO_IDS_FIELD, type="Collection(Edm.String)", filterable=True, facetable=True),
+        SimpleField(name=REPO_PATHS_FIELD, type="Collection(Edm.String)"),
+    ]
+
+
+def ensure_membership_fields(index_client, index_name: str, index=None) -> bool:
+    """
+    기존 인덱스에 소속 필드가 없으면 추가합니다 (필드 추가는 재색인 없이 가능).
+
+    Returns:
+        bool: 필드를 추가했으면 True
+    """
+    if index_name in _schema_checked:
+        return False
+    try:
+        index = index or index_client.get_index(index_name)
+        names = {f.name for f in (index.fields or [])}
+        missing = [f for f in membership_fields() if f.name not in names]
+        if missing:
+            index.fields = list(index.fields) + missing
+            index_client.create_or_update_index(index)
+            logger.info(f"✓ Added {', '.join(f.name for f in missing)} to index '{index_name}'")
+        _schema_checked.add(index_name)
+        return bool(missing)
+    except ResourceNotFoundError:
+        # 아직 없는 인덱스(또는 별칭)는 create_index_if_not_exists가 필드를 포함해 생성
+        return False
+    except Exception as e:
+        logger.warning(f"Failed to check shared history fields of index '{index_name}': {e}")
+        return False
+
+
+def document_membership(doc: Dict) -> Dict[str, Set[str]]:
+    """문서가 속한 저장소 {"repo_ids": set, "repository_paths": set}"""
+    repo_ids = set(doc.get(REPO_IDS_FIELD) or [])
+    paths = set(doc.get(REPO_PATHS_FIELD) or [])
+    if not repo_ids and doc.get("repo_id"):
+        repo_ids.add(doc["repo_id"])
+        if doc.get("repository_path"):
+            paths.add(doc["repository_path"])
+    return {"repo_ids": repo_ids, "repository_paths": paths}
+
+
+def repository_path_for(doc: Dict, repo_id: str) -> Optional[str]:
+    """문서에서 repo_id 저장소의 경로 (이전 문서는 repository_path)"""
+    from src.indexer import normalize_repo_identifier
+
+    for path in doc.get(REPO_PATHS_FIELD) or []:
+        if normalize_repo_identifier(path) == repo_id:
+            return path
+    if not doc.get(REPO_PATHS_FIELD) or doc.get("repo_id") == repo_id:
+        return doc.get("repository_path")
+    return None
+
+
+def lookup_memberships(search_client, ids: List[str], chunk_size: int = LOOKUP_CHUNK_SIZE) -> Optional[Dict[str, Dict[str, Set[str]]]]:
+    """
+    저장소와 관계없이 인덱스에 이미 있는 커밋과 그 소속을 조회합니다.
+
+    Returns:
+        Optional[Dict]: {sha: document_membership} (조회 실패 시 None)
+    """
+    memberships: Dict[str, Dict[str, Set[str]]] = {}
+    try:
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            results = search_client.search(
+                search_text="*",
+                filter=f"search.in(id, '{','.join(chunk)}', ',')",
+                select=["id", "repo_id", "repository_path", REPO_IDS_FIELD, REPO_PATHS_FIELD],
+                top=len(chunk),
+            )
+            for r in results:
+                memberships[r["id"]] = document_membership(r)
+    except Exception as e:
+        logger.warning(f"Failed to look up shared commits: {e}")
+        return None
+    return memberships
+
+
+class MembershipLookup:
+    """
+    파이프라인 청크별 소속 조회를 묶어서 처리합니다.
+    처리할 커밋 목록(upcoming)을 알면 청크마다 조회하지 않고 다음 커밋까지 LOOKUP_CHUNK_SIZE개씩 한 번에 조회합니다.
+    """
+
+    def __init__(self, search_client, upcoming: Optional[List[str]] = None,
+                 skip: Optional[Callable[[str], bool]] = None, batch_size: int = LOOKUP_CHUNK_SIZE):
+        """
+        Args:
+            search_client: Azure AI Search 클라이언트
+            upcoming: 앞으로 조회할 커밋 SHA 순서 (워터마크 계획 등, 없으면 청크마다 조회)
+            skip: 미리 조회하지 않을 SHA 판별 (이미 인덱싱된 커밋 등)
+            batch_size: 조회 1회에 묶는 커밋 수
+        """
+        self.search_client = search_client
+        self.upcoming = upcoming or []
+        self.skip = skip
+        self.batch_size = batch_size
+        self.queries = 0
+        self._cursor = 0
+        self._looked_up: Set[str] = set()
+        self._found: Dict[str, Dict[str, Set[str]]] = {}
+
+    def get(self, ids: List[str]) -> Optional[Dict[str, Dict[str, Set[str]]]]:
+        """ids 중 인덱스에 있는 커밋의 소속 {sha: document_membership} (조회 실패 시 None)"""
+        missing = [sha for sha in ids if sha not in self._looked_up]
+        if missing:
+            fetch = list(dict.fromkeys(missing))
+            pending = set(fetch)
+            while self._cursor < len(self.upcoming) and len(fetch) < self.batch_size:
+                sha = self.upcoming[self._cursor]
+                self._cursor += 1
+                if sha not in pending and sha not in self._looked_up and not (self.skip and self.skip(sha)):
+                    fetch.append(sha)
+                    pending.add(sha)
+            found = lookup_memberships(self.search_client, fetch, chunk_size=max(self.batch_size, len(missing)))
+            if found is None:
+                return None
+            self.queries += 1
+            self._looked_up.update(fetch)
+            self._found.update(found)
+        return {sha: self._found[sha] for sha in ids if sha in self._found}
+
+
+def membership_update(sha: str, membership: Dict[str, Set[str]], repo_id: str, repo_path: str) -> Dict:
+    """기존 문서에 저장소를 추가하는 merge 문서"""
+    return {
+        "id": sha,
+        REPO_IDS_FIELD: sorted(membership["repo_ids"] | {repo_id}),
+        REPO_PATHS_FIELD: sorted(membership["repository_paths"] | {repo_path}),
+    }
+
+
+def restore_memberships(memberships: Dict[str, Dict[str, Set[str]]],
+                        expected: Dict[str, Dict[str, Optional[str]]]) -> List[Dict]:
+    """
+    동시 merge로 빠진 소속을 되살리는 merge 문서 (현재 소속에 기대 소속을 합침)
+
+    Args:
+        memberships: 인덱스의 현재 소속 {sha: document_membership}
+        expected: 매니페스트 기준 소속 {sha: {repo_id: repo_path}}
+
+    Returns:
+        List[Dict]: 빠진 저장소가 있는 문서의 merge 문서 (인덱스에 없는 커밋은 제외)
+    """
+    updates = []
+    for sha, repos in expected.items():
+        membership = memberships.get(sha)
+        if membership is None:
+            continue
+        lost = {repo_id: path for repo_id, path in repos.items() if repo_id not in membership["repo_ids"]}
+        if not lost:
+            continue
+        updates.append({
+            "id": sha,
+            REPO_IDS_FIELD: sorted(membership["repo_ids"] | set(lost)),
+            REPO_PATHS_FIELD: sorted(membership["repository_paths"] | {p for p in lost.values() if p}),
+        })
+    return updates
+
+
+def repository_document_counts(search_client, limit: int = 10000) -> Dict[str, int]:
+    """저장소별 문서 수 (공유 커밋은 소속 저장소마다 집계, repo_ids가 없는 이전 문서는 repo_id로 집계)"""
+    counts: Dict[str, int] = {}
+    shared = search_client.search(search_text="*", facets=[f"{REPO_IDS_FIELD},count:{limit}"], top=0)
+    for facet in (shared.get_facets() or {}).get(REPO_IDS_FIELD, []):
+        counts[facet["value"]] = counts.get(facet["value"], 0) + facet["count"]
+    legacy = search_client.search(search_text="*", filter=f"not {REPO_IDS_FIELD}/any()",
+                                  facets=[f"repo_id,count:{limit}"], top=0)
+    for facet in (legacy.get_facets() or {}).get("repo_id", []):
+        counts[facet["value"]] = counts.get(facet["value"], 0) + facet["count"]
+    return counts
+
+
+def detach_repository(documents: Iterable[Dict], repo_id: str) -> Dict[str, List]:
+    """
+    저장소 삭제 계획: 이 저장소에만 속한 문서는 삭제, 다른 저장소와 공유하는 문서는 소속에서만 제거
+
+    Returns:
+        Dict: {"delete": [sha], "merge": [merge 문서]}
+    """
+    from src.indexer import normalize_repo_identifier
+
+    plan = {"delete": [], "merge": []}
+    for doc in documents:
+        membership = document_membership(doc)
+        remaining = sorted(membership["repo_ids"] - {repo_id})
+        if not remaining:
+            plan["delete"].append(doc["id"])
+            continue
+        paths = sorted(p for p in membership["repository_paths"] if normalize_repo_identifier(p) != repo_id)
+        update = {"id": doc["id"], REPO_IDS_FIELD: remaining, REPO_PATHS_FIELD: paths}
+        if doc.get("repo_id") == repo_id:
+            # 대표 저장소를 남은 저장소로 교체
+            update["repo_id"] = remaining[0]
+            update["repository_path"] = repository_path_for({REPO_PATHS_FIELD: paths}, remaining[0])
+        plan["merge"].append(update)
+    return plan
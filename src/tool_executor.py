@@ -4,6 +4,8 @@ This module imports the concrete tool implementations from project modules (src.
 and provides functions used by chat_app.
 """
 import json
+import asyncio
+import functools
 import logging
 from typing import Dict, Any, Optional
 
@@ -11,8 +13,15 @@ import chainlit as cl
 from azure.search.documents import SearchClient
 from azure.search.documents.indexes import SearchIndexClient
 
+from src.cancellation import CancellationToken, IndexingCancelled
+from src.clone_progress import CloneProgressStream
+from src.index_progress import format_stages
 from src.index_manager import IndexManager
-from src.indexer import CommitIndexer
+from src.index_alias import resolve_index_name
+from src.shared_history import ensure_membership_fields
+from src.indexer import CommitIndexer, TIME_BUDGET_SECONDS, TOKEN_BUDGET
+from src.index_estimator import estimate_indexing
+from src.repo_cache import RepoCloneCache
 from src.online_reader import (
     OnlineRepoReader,
     read_file_from_commit,
@@ -39,6 +48,111 @@ DEFAULT_INDEX_LIMIT = int(os.getenv("DEFAULT_INDEX_LIMIT", "500"))
 MAX_TOOL_RESULT_DISPLAY = 500
 MAX_TOOL_RESULT_TO_LLM = 10000
 
+REMOTE_REPO_PREFIXES = ('http://', 'https://', 'git@', 'ssh://')
+
+# 실행 중인 인덱싱의 취소 토큰을 보관하는 세션 키 (채팅 중지 버튼에서 취소)
+INDEXING_CANCEL_TOKEN_KEY = "indexing_cancel_token"
+
+# 원격 저장소 클론이 필요한 도구 (실행 전 비동기로 미리 클론)
+CLONE_TOOLS = {
+    "get_commit_count", "get_commit_summary", "analyze_contributors",
+    "find_bug_commits", "find_frequent_bug_commits", "read_file_from_commit",
+    "get_file_context", "get_commit_diff", "get_readme", "index_repository",
+    "estimate_indexing",
+}
+
+
+def _has_chainlit_session() -> bool:
+    try:
+        return bool(cl.context.session)
+    except Exception:
+        return False
+
+
+def cancel_indexing(reason: str = "stopped by user") -> bool:
+    """현재 세션에서 실행 중인 인덱싱을 취소합니다. 취소할 작업이 있었으면 True"""
+    if not _has_chainlit_session():
+        return False
+    token = cl.user_session.get(INDEXING_CANCEL_TOKEN_KEY)
+    if token is None or token.cancelled:
+        return False
+    token.cancel(reason)
+    return True
+
+
+def _clear_cancel_token(token: CancellationToken) -> None:
+    """끝난 인덱싱의 취소 토큰을 세션에서 제거 (그 사이 다른 인덱싱이 등록한 토큰은 유지)"""
+    if _has_chainlit_session() and cl.user_session.get(INDEXING_CANCEL_TOKEN_KEY) is token:
+        cl.user_session.set(INDEXING_CANCEL_TOKEN_KEY, None)
+
+
+async def prefetch_repository(repo_path: Optional[str], cancel_token: Optional[CancellationToken] = None) -> None:
+    """
+    원격 저장소를 워커 스레드에서 미리 클론합니다 (이벤트 루프를 막지 않음).
+    진행 상황은 Chainlit 메시지 하나를 갱신하며 표시합니다.
+    실패하거나 취소되어도 예외를 올리지 않고, 이후 도구 실행에서 오류가 보고됩니다.
+    """
+    if not repo_path or not repo_path.startswith(REMOTE_REPO_PREFIXES):
+        return
+
+    message = None
+
+    async def on_progress(event: Dict[str, Any]):
+        nonlocal message
+        if not _has_chainlit_session():
+            return
+        if event["stage"] in ("start", "done", "error"):
+            content = event["message"]
+        elif event["percent"] is not None:
+            content = f"🔄 {event['stage']}: {event['percent']:.1f}% ({int(event['current']):,}/{int(event['total']):,})"
+        else:
+            content = f"🔄 {event['stage']}: {int(event['current'] or 0):,} items"
+
+        if message is None:
+            message = await cl.Message(content=content, author="System").send()
+        else:
+            message.content = content
+            await message.update()
+
+    try:
+        await RepoCloneCache().get_or_clone_async(repo_path, on_progress=on_progress, cancel_token=cancel_token)
+    except IndexingCancelled as e:
+        logger.info(f"Prefetch cancelled for {repo_path}: {e.reason}")
+    except Exception as e:
+        logger.warning(f"Prefetch failed for {repo_path}: {e}")
+
+
+async def run_indexing_with_progress(func, **kwargs):
+    """
+    인덱싱 함수를 워커 스레드에서 실행하며 진행 이벤트를 Chainlit 스텝 하나에 단계별로 표시합니다.
+    이벤트 빈도는 인덱서가 제한하고(INDEX_PROGRESS_EVENTS_PER_SECOND), 표시 실패는 인덱싱에 영향 주지 않습니다.
+
+    Args:
+        func: on_progress 인자를 받는 인덱싱 함수 (CommitIndexer.index_repository 등)
+        **kwargs: func 인자
+
+    Returns:
+        func의 반환값 (예외는 그대로 전달)
+    """
+    loop = asyncio.get_running_loop()
+    stream = CloneProgressStream(loop)
+    future = loop.run_in_executor(None, functools.partial(func, on_progress=stream.push, **kwargs))
+    future.add_done_callback(lambda _: stream.close())
+
+    step = None
+    async for event in stream:
+        if not _has_chainlit_session():
+            continue
+        try:
+            if step is None:
+                step = cl.Step(name="📈 인덱싱 진행", type="run", show_input=False)
+                await step.send()
+            step.output = format_stages(event)
+            await step.update()
+        except Exception as e:
+            logger.debug(f"Failed to show indexing progress: {e}")
+    return await future
+
 
 async def resolve_repository_ambiguity(
     repo_hint: str,
@@ -48,7 +162,7 @@ async def resolve_repository_ambiguity(
     index_manager = IndexManager(
         search_client=search_client,
         index_client=index_client,
-        index_name=os.getenv("AZURE_SEARCH_INDEX_NAME", "git-commits")
+        index_name=resolve_index_name()
     )
 
     repos = index_manager.list_indexed_repositories()
@@ -106,6 +220,7 @@ async def execute_tool(
     This keeps the implementation small and avoids embedding the full original
     long code here. It calls into src.tools, IndexManager, and CommitIndexer as needed.
     """
+    cancel_token = None
     try:
         logger.info("Executing tool: %s args=%s", tool_name, arguments)
 
@@ -113,58 +228,85 @@ async def execute_tool(
         def a(k, default=None):
             return arguments.get(k, default)
 
-        # Simple mappings
+        # 인덱싱은 클론부터 업로드까지 하나의 취소 토큰을 공유 (중지 버튼/예산 초과 시 협조적으로 중단)
+        if tool_name == "index_repository":
+            cancel_token = CancellationToken(max_seconds=a("max_seconds") or TIME_BUDGET_SECONDS,
+                                             max_tokens=a("max_tokens") or TOKEN_BUDGET)
+            if _has_chainlit_session():
+                cl.user_session.set(INDEXING_CANCEL_TOKEN_KEY, cancel_token)
+
+        # 원격 저장소는 워커 스레드에서 미리 클론 (다른 세션의 이벤트 처리가 멈추지 않도록)
+        if tool_name in CLONE_TOOLS:
+            await prefetch_repository(a("repo_path"), cancel_token=cancel_token)
+
+        # Simple mappings (동기 도구는 asyncio.to_thread 로 실행)
         if tool_name == "get_commit_count":
-            result = get_commit_count(repo_path=a("repo_path"), since=a("since"), until=a("until"))
+            result = await asyncio.to_thread(get_commit_count, repo_path=a("repo_path"), since=a("since"), until=a("until"))
             return json.dumps(result, ensure_ascii=False, indent=2)
 
         if tool_name == "get_commit_summary":
-            return get_commit_summary(repo_path=a("repo_path"), llm_client=openai_client, limit=a("limit", 50))
+            return await asyncio.to_thread(get_commit_summary, repo_path=a("repo_path"), llm_client=openai_client, limit=a("limit", 50))
 
         if tool_name == "search_commits":
             return json.dumps(
-                search_commits(query=a("query"), search_client=search_client, openai_client=openai_client, top=a("top", 10), repo_path=a("repo_path")),
+                await asyncio.to_thread(search_commits, query=a("query"), search_client=search_client, openai_client=openai_client, top=a("top", 10), repo_path=a("repo_path")),
                 ensure_ascii=False,
                 indent=2
             )
 
         if tool_name == "analyze_contributors":
             return json.dumps(
-                analyze_contributors(repo_path=a("repo_path"), criteria=a("criteria"), limit=a("limit"), since=a("since"), until=a("until")),
+                await asyncio.to_thread(analyze_contributors, repo_path=a("repo_path"), criteria=a("criteria"), limit=a("limit"), since=a("since"), until=a("until")),
                 ensure_ascii=False,
                 indent=2
             )
 
         if tool_name in ("find_bug_commits", "find_frequent_bug_commits"):
             return json.dumps(
-                find_frequent_bug_commits(repo_path=a("repo_path"), llm_client=openai_client, limit=a("limit", 200)),
+                await asyncio.to_thread(find_frequent_bug_commits, repo_path=a("repo_path"), llm_client=openai_client, limit=a("limit", 200)),
                 ensure_ascii=False,
                 indent=2
             )
 
         if tool_name == "search_github_repo":
             reader = OnlineRepoReader()
-            results = reader.search_github_repo(query=a("query"), max_results=a("max_results", 5))
+            results = await asyncio.to_thread(reader.search_github_repo, query=a("query"), max_results=a("max_results", 5))
             return json.dumps(results, ensure_ascii=False, indent=2)
 
         if tool_name == "read_file_from_commit":
-            content = read_file_from_commit(repo_path=a("repo_path"), commit_sha=a("commit_sha"), file_path=a("file_path"))
+            content = await asyncio.to_thread(read_file_from_commit, repo_path=a("repo_path"), commit_sha=a("commit_sha"), file_path=a("file_path"))
             return content or ""
 
         if tool_name == "get_file_context":
-            return json.dumps(get_file_context(repo_path=a("repo_path"), commit_sha=a("commit_sha"), file_path=a("file_path")), ensure_ascii=False, indent=2)
+            return json.dumps(await asyncio.to_thread(get_file_context, repo_path=a("repo_path"), commit_sha=a("commit_sha"), file_path=a("file_path")), ensure_ascii=False, indent=2)
 
         if tool_name == "get_commit_diff":
-            return json.dumps(get_commit_diff(repo_path=a("repo_path"), commit_sha=a("commit_sha"), max_files=a("max_files", 10)), ensure_ascii=False, indent=2)
+            return json.dumps(await asyncio.to_thread(get_commit_diff, repo_path=a("repo_path"), commit_sha=a("commit_sha"), max_files=a("max_files", 10)), ensure_ascii=False, indent=2)
 
         if tool_name == "get_readme":
-            return get_readme_content(a("repo_path")) or ""
+            return await asyncio.to_thread(get_readme_content, a("repo_path")) or ""
 
         if tool_name == "set_current_repository":
             repo_path = a("repo_path")
             cl.user_session.set("current_repository", repo_path)
             return f"현재 저장소를 '{repo_path}'로 설정했습니다."
 
+        if tool_name == "estimate_indexing":
+            estimate = await asyncio.to_thread(
+                estimate_indexing,
+                repo_path=a("repo_path"),
+                limit=a("limit"),
+                since=a("since"),
+                until=a("until"),
+                skip_existing=a("skip_existing", True),
+                skip_offset=a("skip_offset", 0),
+                search_client=search_client,
+                index_name=resolve_index_name(),
+                max_tokens=a("max_tokens"),
+                max_seconds=a("max_seconds")
+            )
+            return json.dumps(estimate, ensure_ascii=False, indent=2)
+
         # Index / management operations via IndexManager / CommitIndexer
         if tool_name == "index_repository":
             try:
@@ -172,16 +314,18 @@ async def execute_tool(
                     search_client=search_client,
                     index_client=index_client,
                     openai_client=openai_client,
-                    index_name=os.getenv("AZURE_SEARCH_INDEX_NAME", "git-commits")
+                    index_name=resolve_index_name()
                 )
-                indexer.create_index_if_not_exists()
-                indexed_count = indexer.index_repository(
+                await asyncio.to_thread(indexer.create_index_if_not_exists)
+                indexed_count = await run_indexing_with_progress(
+                    indexer.index_repository,
                     repo_path=a("repo_path"),
                     limit=a("limit"),
                     since=a("since"),
                     until=a("until"),
                     skip_existing=a("skip_existing", True),
-                    skip_offset=a("skip_offset", 0)
+                    skip_offset=a("skip_offset", 0),
+                    cancel_token=cancel_token
                 )
 
                 repo_path = a("repo_path")
@@ -189,13 +333,16 @@ async def execute_tool(
                     return f"✅ '{repo_path}' 저장소의 모든 커밋이 이미 인덱싱되어 있습니다."
                 else:
                     return f"✅ '{repo_path}' 저장소의 {indexed_count}개 커밋을 성공적으로 인덱싱했습니다."
+            except IndexingCancelled as e:
+                return (f"⏹️ 인덱싱 중단: {e.reason} ({e.indexed or 0}개 커밋 인덱싱됨, "
+                        f"다시 실행하면 중단된 지점부터 이어서 진행합니다.)")
             except Exception as e:
                 error_msg = str(e)
                 logger.error(f"Failed to index repository: {error_msg}")
                 return f"❌ 인덱싱 실패: {error_msg}"
 
         if tool_name in ("get_index_statistics", "list_indexed_repositories", "get_repository_info", "delete_repository_commits", "check_index_health"):
-            manager = IndexManager(search_client=search_client, index_client=index_client, index_name=os.getenv("AZURE_SEARCH_INDEX_NAME", "git-commits"))
+            manager = IndexManager(search_client=search_client, index_client=index_client, index_name=resolve_index_name())
             if tool_name == "get_index_statistics":
                 return json.dumps(manager.get_index_statistics(), ensure_ascii=False, indent=2)
             if tool_name == "list_indexed_repositories":
@@ -216,8 +363,8 @@ async def execute_tool(
             filters = []
             if a("repo_path"):
                 from src.indexer import normalize_repo_identifier
-                repo_id = normalize_repo_identifier(a("repo_path"))
-                filters.append(f"repo_id eq '{repo_id}'")
+                from src.shared_history import repo_filter
+                filters.append(repo_filter(normalize_repo_identifier(a("repo_path"))))
             if since:
                 filters.append(f"date ge {since}T00:00:00Z")
             if until:
@@ -234,6 +381,10 @@ async def execute_tool(
     except Exception as e:
         logger.exception("Tool execution error")
         return f"도구 실행 중 오류 발생: {str(e)}"
+    finally:
+        # 중지 버튼이 이미 끝난 인덱싱을 중지한다고 알리지 않도록 토큰 해제
+        if cancel_token is not None:
+            _clear_cancel_token(cancel_token)
 
 
 def initialize_clients():
@@ -252,10 +403,11 @@ def initialize_clients():
     )
 
     search_credential = AzureKeyCredential(os.getenv("AZURE_SEARCH_API_KEY"))
+    index_name = resolve_index_name()
 
     search_client = _SearchClient(
         endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
-        index_name=os.getenv("AZURE_SEARCH_INDEX_NAME"),
+        index_name=index_name,
         credential=search_credential
     )
 
@@ -264,6 +416,9 @@ def initialize_clients():
         credential=search_credential
     )
 
+    # 저장소 필터가 repo_ids를 사용하므로 이전 인덱스에는 소속 필드 추가
+    ensure_membership_fields(index_client, index_name)
+
     return openai_client, search_client, index_client
 
 
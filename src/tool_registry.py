@@ -128,6 +128,18 @@ if BaseModel:
         until: Optional[str] = None
         skip_existing: Optional[bool] = True
         skip_offset: Optional[int] = 0
+        max_tokens: Optional[int] = None
+        max_seconds: Optional[float] = None
+
+    class EstimateIndexingParams(BaseModel):
+        repo_path: str
+        limit: Optional[int] = None
+        since: Optional[str] = None
+        until: Optional[str] = None
+        skip_existing: Optional[bool] = True
+        skip_offset: Optional[int] = 0
+        max_tokens: Optional[int] = None
+        max_seconds: Optional[float] = None
 
     class EmptyParams(BaseModel):
         pass
@@ -189,10 +201,14 @@ if BaseModel:
     def _set_current_repository_stub(**kwargs):
         return None
 
-    @tool(name="index_repository", description="저장소 인덱싱", parameters=IndexRepositoryParams)
+    @tool(name="index_repository", description="저장소 인덱싱 (max_tokens/max_seconds 예산을 넘으면 중단, 다음 실행에서 이어서 진행)", parameters=IndexRepositoryParams)
     def _index_repository_stub(**kwargs):
         return None
 
+    @tool(name="estimate_indexing", description="인덱싱 전 임베딩 토큰, 추출 시간, 업로드 크기, 예상 소요 시간 추정 (표본 커밋 기반)", parameters=EstimateIndexingParams)
+    def _estimate_indexing_stub(**kwargs):
+        return None
+
     @tool(name="get_index_statistics", description="인덱스 통계 조회", parameters=EmptyParams)
     def _get_index_statistics_stub(**kwargs):
         return None
@@ -9,6 +9,7 @@ from openai import AzureOpenAI
 from azure.search.documents import SearchClient
 from azure.search.documents.models import VectorizedQuery
 from src.embedding import embed_texts
+from src.shared_history import repo_filter
 from collections import defaultdict
 import logging
 
@@ -334,7 +335,7 @@ def search_commits(
         filter_expr = None
         if repo_path:
             repo_id = normalize_repo_identifier(repo_path)
-            filter_expr = f"repo_id eq '{repo_id}'"
+            filter_expr = repo_filter(repo_id)
             logger.info(f"📌 Applying filter: {filter_expr}")
 
         # 하이브리드 검색 (텍스트 + 벡터)
@@ -365,7 +366,8 @@ def search_commits(
                 "changes": f"+{result.get('lines_added', 0)}/-{result.get('lines_deleted', 0)}",
                 "score": result.get("@search.score", 0),
                 "repo_id": result.get("repo_id", ""),
-                "repository": result.get("repository_path", ""),
+                # 공유 커밋의 repository_path는 처음 인덱싱한 저장소이므로 필터한 저장소로 표시
+                "repository": repo_path or result.get("repository_path", ""),
                 # 새로운 메타데이터
                 "context": result.get("change_context_summary", ""),
                 "impact": result.get("impact_scope", ""),
@@ -0,0 +1,232 @@
+"""
+Azure AI Search 문서 업로드 엔진
+문서를 요청당 문서 수와 직렬화 크기(바이트) 한도에 맞춰 배치로 나누고, 여러 배치를 동시에 업로드합니다.
+요청 전체가 실패하면(429/5xx/연결 오류) 지터가 있는 지수 백오프로 재시도하고,
+일부 문서만 실패하면(207 응답의 409/422/503 등) 실패한 키만 다시 보냅니다.
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+
+from src.cancellation import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+# 문서별 결과 중 다시 보내면 성공할 수 있는 상태 코드 (동시 수정 충돌, 일시적 과부하)
+RETRYABLE_DOCUMENT_STATUS = {409, 422, 429, 500, 502, 503, 504}
+
+# 요청 본문에서 문서마다 붙는 "@search.action" 등의 여유분 (바이트)
+_DOCUMENT_OVERHEAD = 64
+
+
+def document_size(document: Dict) -> int:
+    """업로드 요청에서 문서가 차지하는 직렬화 크기 추정 (바이트)"""
+    return len(json.dumps(document, ensure_ascii=False, default=str).encode('utf-8')) + _DOCUMENT_OVERHEAD
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+        return True
+    if isinstance(error, HttpResponseError):
+        return error.status_code in (408, 409, 429) or (error.status_code or 0) >= 500
+    return False
+
+
+def _is_too_large(error: Exception) -> bool:
+    return isinstance(error, HttpResponseError) and error.status_code == 413
+
+
+class DocumentUploader:
+    """크기 기준 배치 분할, 동시 업로드, 실패 키 재시도를 담당하는 업로더"""
+
+    def __init__(
+        self,
+        search_client,
+        max_batch_docs: Optional[int] = None,
+        max_batch_bytes: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        action: str = "upload",
+        cancel_token: Optional[CancellationToken] = None,
+    ):
+        """
+        Args:
+            search_client: Azure AI Search 클라이언트
+            max_batch_docs: 요청당 최대 문서 수 (기본값: UPLOAD_BATCH_MAX_DOCS, 서비스 한도 1000)
+            max_batch_bytes: 요청당 최대 직렬화 크기 (기본값: UPLOAD_BATCH_MAX_MB, 서비스 한도 16MB)
+            concurrency: 동시 업로드 요청 수 (기본값: UPLOAD_CONCURRENCY)
+            max_retries: 재시도 횟수 (기본값: UPLOAD_MAX_RETRIES)
+            backoff_base: 지수 백오프 시작 값 (초)
+            backoff_max: 백오프 상한 (초)
+            action: "upload" (문서 전체 교체) 또는 "merge" (지정한 필드만 갱신, 없는 문서는 실패)
+            cancel_token: 취소 토큰 (취소되면 새 요청과 재시도를 보내지 않고 성공한 id만 반환)
+        """
+        if action not in ("upload", "merge"):
+            raise ValueError(f"Unsupported upload action: {action}")
+        self.client = search_client
+        self.action = action
+        self.cancel_token = cancel_token
+        self.max_batch_docs = max(1, max_batch_docs or int(os.getenv("UPLOAD_BATCH_MAX_DOCS", "1000")))
+        self.max_batch_bytes = max_batch_bytes or int(float(os.getenv("UPLOAD_BATCH_MAX_MB", "12")) * 1024 * 1024)
+        self.concurrency = max(1, concurrency or int(os.getenv("UPLOAD_CONCURRENCY", "4")))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("UPLOAD_MAX_RETRIES", "5"))
+        self.backoff_base = backoff_base if backoff_base is not None else float(os.getenv("UPLOAD_BACKOFF_BASE_SECONDS", "1"))
+        self.backoff_max = backoff_max if backoff_max is not None else float(os.getenv("UPLOAD_BACKOFF_MAX_SECONDS", "30"))
+        self.stats = {"documents": 0, "bytes": 0, "requests": 0, "retries": 0, "retried_documents": 0,
+                      "failed_documents": 0, "bisections": 0, "cancelled_documents": 0, "seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def _backoff(self, attempt: int) -> float:
+        """지수 백오프 (full jitter)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _sleep(self, seconds: float) -> None:
+        """백오프 대기 (취소되면 즉시 반환)"""
+        if self.cancel_token is not None:
+            self.cancel_token.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+    def _make_batches(self, documents: List[Dict]) -> List[List[Tuple[Dict, int]]]:
+        """문서 수와 직렬화 크기 한도를 모두 지키도록 순서대로 묶음"""
+        batches: List[List[Tuple[Dict, int]]] = []
+        current: List[Tuple[Dict, int]] = []
+        current_bytes = 0
+        for doc in documents:
+            size = document_size(doc)
+            if current and (len(current) >= self.max_batch_docs or current_bytes + size > self.max_batch_bytes):
+                batches.append(current)
+                current, current_bytes = [], 0
+            current.append((doc, size))
+            current_bytes += size
+        if current:
+            batches.append(current)
+        return batches
+
+    def _upload_batch(self, batch: List[Tuple[Dict, int]], label: str) -> List[str]:
+        """
+        배치 1건 업로드. 요청 실패는 전체 재시도, 문서별 실패는 해당 키만 재시도합니다.
+
+        Returns:
+            List[str]: 업로드 성공한 문서 id
+
+        Raises:
+            Exception: 재시도할 수 없는 요청 오류 또는 재시도 횟수 초과
+        """
+        pending = batch
+        succeeded: List[str] = []
+        attempt = 0
+        while pending:
+            if self.cancel_token is not None and self.cancel_token.cancelled:
+                # 보내지 않은 문서는 실패로 돌려줌 (호출자의 체크포인트에 남아 다음 실행에서 업로드)
+                self._count(cancelled_documents=len(pending))
+                logger.info(f"Upload batch {label} cancelled: {len(pending)} documents not sent")
+                break
+            try:
+                send = self.client.merge_documents if self.action == "merge" else self.client.upload_documents
+                results = list(send(documents=[doc for doc, _ in pending]))
+                self._count(requests=1, bytes=sum(size for _, size in pending))
+            except Exception as e:
+                self._count(requests=1)
+                if _is_too_large(e) and len(pending) > 1:
+                    # 추정 크기보다 실제 요청이 컸으면 반으로 나눠 다시 보냄
+                    self._count(bisections=1)
+                    mid = len(pending) // 2
+                    return (succeeded + self._upload_batch(pending[:mid], f"{label}a")
+                            + self._upload_batch(pending[mid:], f"{label}b"))
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                retry_after = _retry_after_seconds(e)
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                attempt += 1
+                self._count(retries=1)
+                logger.warning(f"Upload batch {label} failed ({type(e).__name__}), "
+                               f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                self._sleep(delay)
+                continue
+
+            retry: List[Tuple[Dict, int]] = []
+            for index, item in enumerate(pending):
+                result = results[index] if index < len(results) else None
+                if result is not None and result.succeeded:
+                    succeeded.append(item[0]["id"])
+                elif (result is not None and getattr(result, "status_code", None) in RETRYABLE_DOCUMENT_STATUS
+                        and attempt < self.max_retries):
+                    retry.append(item)
+                else:
+                    self._count(failed_documents=1)
+                    logger.warning(f"Failed to upload document {item[0]['id']}: "
+                                   f"{getattr(result, 'error_message', None) or 'no result'}")
+            if retry:
+                delay = self._backoff(attempt)
+                attempt += 1
+                self._count(retries=1, retried_documents=len(retry))
+                logger.info(f"Retrying {len(retry)} failed documents of batch {label} in {delay:.1f}s")
+                self._sleep(delay)
+            pending = retry
+        return succeeded
+
+    def upload(self, documents: List[Dict]) -> List[str]:
+        """
+        문서를 배치로 나눠 동시에 업로드합니다.
+
+        Returns:
+            List[str]: 업로드 성공한 문서 id (입력 순서)
+        """
+        if not documents:
+            return []
+        started = time.perf_counter()
+        batches = self._make_batches(documents)
+        try:
+            if len(batches) == 1 or self.concurrency == 1:
+                results = [self._upload_batch(batch, str(i + 1)) for i, batch in enumerate(batches)]
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches)),
+                                        thread_name_prefix="upload") as pool:
+                    results = list(pool.map(lambda item: self._upload_batch(item[1], str(item[0] + 1)),
+                                            enumerate(batches)))
+        finally:
+            self._count(seconds=time.perf_counter() - started)
+        succeeded = [doc_id for batch_ids in results for doc_id in batch_ids]
+        self._count(documents=len(succeeded))
+        return succeeded
+
+    def throughput(self) -> Dict[str, float]:
+        """누적 업로드 처리량 (업로드에 쓴 시간 기준)"""
+        seconds = self.stats["seconds"] or 0.0
+        if seconds <= 0:
+            return {"docs_per_second": 0.0, "mb_per_second": 0.0}
+        return {
+            "docs_per_second": round(self.stats["documents"] / seconds, 1),
+            "mb_per_second": round(self.stats["bytes"] / seconds / (1024 * 1024), 2),
+        }
@@ -0,0 +1,152 @@
+"""
+벡터 필드 설정
+content_vector 필드의 차원, 인덱스 측 양자화 압축(scalar int8 / binary)과 재채점(rescoring),
+벡터 원본 저장 여부(stored)를 환경 설정으로 구성하고, 기존 인덱스와 설정이 다른지 비교합니다.
+필드 정의는 인덱스 생성 후 바꿀 수 없으므로 설정이 바뀌면 새 인덱스로 이전해야 합니다 (CommitIndexer.migrate_vector_index).
+"""
+
+import os
+import logging
+from typing import Dict, Optional, Tuple
+
+from azure.search.documents.indexes.models import (
+    SearchField,
+    VectorSearch,
+    VectorSearchProfile,
+    HnswAlgorithmConfiguration,
+    ScalarQuantizationCompression,
+    ScalarQuantizationParameters,
+    BinaryQuantizationCompression,
+    RescoringOptions,
+)
+
+from src.embedding import VECTOR_DIMENSIONS
+
+logger = logging.getLogger(__name__)
+
+VECTOR_FIELD = "content_vector"
+VECTOR_PROFILE = "default-vector-profile"
+VECTOR_ALGORITHM = "default-hnsw"
+
+COMPRESSION_KINDS = ("none", "scalar", "binary")
+# 압축 방식별 기본 oversampling (binary는 손실이 커서 후보를 더 많이 가져와 원본 벡터로 재채점)
+_DEFAULT_OVERSAMPLING = {"scalar": 2.0, "binary": 4.0}
+
+
+def vector_settings(dimensions: Optional[int] = None) -> Dict:
+    """
+    환경 설정 기반 벡터 필드 설정
+
+    Returns:
+        Dict: {"dimensions": int, "compression": "none" | "scalar" | "binary",
+               "oversampling": float | None, "stored": bool}
+    """
+    compression = os.getenv("VECTOR_COMPRESSION", "none").lower()
+    if compression not in COMPRESSION_KINDS:
+        raise ValueError(f"Unsupported VECTOR_COMPRESSION: {compression} (expected one of {COMPRESSION_KINDS})")
+    oversampling = None
+    if compression != "none":
+        oversampling = float(os.getenv("VECTOR_RESCORE_OVERSAMPLING", str(_DEFAULT_OVERSAMPLING[compression])))
+    return {
+        "dimensions": dimensions or VECTOR_DIMENSIONS,
+        "compression": compression,
+        "oversampling": oversampling,
+        "stored": os.getenv("VECTOR_STORED", "true").lower() == "true",
+    }
+
+
+def _compression_name(settings: Dict) -> Optional[str]:
+    return None if settings["compression"] == "none" else f"{settings['compression']}-quantization"
+
+
+def build_vector_field(settings: Dict) -> SearchField:
+    """content_vector 필드 정의 (stored=False이면 검색 결과로 반환할 수 없으므로 hidden)"""
+    kwargs = {}
+    if not settings["stored"]:
+        kwargs.update(stored=False, hidden=True)
+    return SearchField(
+        name=VECTOR_FIELD,
+        type="Collection(Edm.Single)",
+        searchable=True,
+        vector_search_dimensions=settings["dimensions"],
+        vector_search_profile_name=VECTOR_PROFILE,
+        **kwargs
+    )
+
+
+def build_vector_search(settings: Dict) -> VectorSearch:
+    """HNSW 알고리즘과 (설정 시) 양자화 압축을 쓰는 벡터 검색 구성"""
+    compression_name = _compression_name(settings)
+    compressions = []
+    if compression_name:
+        # 압축 벡터로 후보를 찾고, 보존한 원본 벡터로 재채점
+        rescoring = RescoringOptions(
+            enable_rescoring=True,
+            default_oversampling=settings["oversampling"],
+            rescore_storage_method="preserveOriginals",
+        )
+        if settings["compression"] == "scalar":
+            compressions.append(ScalarQuantizationCompression(
+                compression_name=compression_name,
+                rescoring_options=rescoring,
+                parameters=ScalarQuantizationParameters(quantized_data_type="int8"),
+            ))
+        else:
+            compressions.append(BinaryQuantizationCompression(
+                compression_name=compression_name,
+                rescoring_options=rescoring,
+            ))
+
+    return VectorSearch(
+        profiles=[
+            VectorSearchProfile(
+                name=VECTOR_PROFILE,
+                algorithm_configuration_name=VECTOR_ALGORITHM,
+                compression_name=compression_name,
+            )
+        ],
+        algorithms=[HnswAlgorithmConfiguration(name=VECTOR_ALGORITHM)],
+        compressions=compressions or None,
+    )
+
+
+def describe_vector_config(index) -> Dict:
+    """
+    기존 인덱스의 벡터 필드 설정 (vector_settings와 같은 키, 알 수 없는 값은 None)
+    """
+    field = next((f for f in (index.fields or []) if f.name == VECTOR_FIELD), None)
+    config = {"dimensions": None, "compression": "none", "stored": True}
+    if field is None:
+        return config
+    config["dimensions"] = field.vector_search_dimensions
+    config["stored"] = field.stored is not False
+
+    vector_search = getattr(index, "vector_search", None)
+    profile = next((p for p in (getattr(vector_search, "profiles", None) or [])
+                    if p.name == field.vector_search_profile_name), None)
+    compression_name = getattr(profile, "compression_name", None)
+    if compression_name:
+        compression = next((c for c in (getattr(vector_search, "compressions", None) or [])
+                            if c.compression_name == compression_name), None)
+        if isinstance(compression, ScalarQuantizationCompression):
+            config["compression"] = "scalar"
+        elif isinstance(compression, BinaryQuantizationCompression):
+            config["compression"] = "binary"
+        else:
+            config["compression"] = None
+    return config
+
+
+def vector_config_diff(index, settings: Dict) -> Dict[str, Tuple]:
+    """
+    기존 인덱스와 설정이 다른 항목
+
+    Returns:
+        Dict[str, Tuple]: {항목: (인덱스 값, 설정 값)} (같으면 빈 dict)
+    """
+    actual = describe_vector_config(index)
+    return {
+        key: (actual[key], settings[key])
+        for key in ("dimensions", "compression", "stored")
+        if actual[key] != settings[key]
+    }
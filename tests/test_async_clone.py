@@ -0,0 +1,104 @@
+"""
+비동기 클론 API 테스트
+- 진행 틱은 초당 최대 N개 이벤트로 합쳐짐
+- 클론 중에도 이벤트 루프가 응답함
+- 같은 저장소 동시 요청은 한 번만 클론
+"""
+import asyncio
+import os
+import subprocess
+
+import pytest
+
+from src.clone_progress import CoalescingCloneProgress
+from src.repo_cache import RepoCloneCache
+
+
+def _git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+@pytest.fixture
+def remote_url(tmp_path):
+    upstream = tmp_path / "upstream"
+    upstream.mkdir()
+    _git("init", "-q", cwd=upstream)
+    for i in range(10):
+        (upstream / f"f{i}.txt").write_text(f"{i}\n" * 100, encoding="utf-8")
+        _git("add", ".", cwd=upstream)
+        _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", f"c{i}", cwd=upstream)
+    return upstream.as_uri()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("REPO_CACHE_BACKGROUND_SWEEP", "false")
+    monkeypatch.setenv("REPO_CACHE_MAINTENANCE", "false")
+    RepoCloneCache.reset_instance()
+    yield RepoCloneCache()
+    RepoCloneCache.reset_instance()
+
+
+def test_progress_ticks_are_coalesced():
+    events = []
+    progress = CoalescingCloneProgress(events.append, max_events_per_second=2)
+
+    for i in range(1000):
+        progress.update(progress.RECEIVING, i, 1000)
+    progress.update(progress.RESOLVING, 1, 10)
+
+    assert progress.ticks == 1001
+    # 단계 시작 이벤트 2개 (+ 간격이 지난 경우 최대 1개)
+    assert 2 <= len(events) <= 3
+    assert events[0]["stage"] == "Receiving objects"
+    assert events[-1]["stage"] == "Resolving deltas"
+    assert events[-1]["percent"] == 10.0
+
+
+@pytest.mark.asyncio
+async def test_async_clone_keeps_event_loop_responsive(cache, remote_url):
+    heartbeats = 0
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        nonlocal heartbeats
+        while not stop.is_set():
+            heartbeats += 1
+            await asyncio.sleep(0.005)
+
+    events = []
+    beat = asyncio.create_task(heartbeat())
+    path = await cache.get_or_clone_async(remote_url, on_progress=events.append)
+    stop.set()
+    await beat
+
+    assert os.path.isdir(os.path.join(path, ".git"))
+    assert heartbeats > 1
+    stages = [e["stage"] for e in events]
+    assert stages[0] == "start"
+    assert stages[-1] == "done"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_clone_once(cache, remote_url):
+    events = []
+
+    async def on_progress(event):
+        events.append(event)
+
+    paths = await asyncio.gather(*[
+        cache.get_or_clone_async(remote_url, on_progress=on_progress) for _ in range(3)
+    ])
+
+    assert len(set(paths)) == 1
+    assert [e["stage"] for e in events].count("start") == 1
+
+
+@pytest.mark.asyncio
+async def test_async_clone_failure_reports_error(cache, tmp_path):
+    events = []
+    with pytest.raises(Exception):
+        await cache.get_or_clone_async((tmp_path / "missing").as_uri(), on_progress=events.append)
+
+    assert events[-1]["stage"] == "error"
@@ -0,0 +1,47 @@
+"""
+오프라인 벤치마크 하네스 스모크 테스트 (작은 합성 저장소, file:// 및 smart HTTP)
+"""
+import importlib.util
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "bench_repo_cache.py"
+
+
+@pytest.fixture(scope="module")
+def bench():
+    spec = importlib.util.spec_from_file_location("bench_repo_cache", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_synthetic_repo_shape(bench, tmp_path):
+    repo = bench.create_synthetic_repo(tmp_path / "r.git", commits=30, files=10, blob_size=64, branches=5)
+    bench.append_commits(repo, 4, files=10, blob_size=64)
+
+    count = subprocess.run(["git", "rev-list", "--count", "main"], cwd=repo,
+                           capture_output=True, text=True, check=True).stdout.strip()
+    branches = subprocess.run(["git", "for-each-ref", "refs/heads/"], cwd=repo,
+                              capture_output=True, text=True, check=True).stdout.splitlines()
+    assert count == "34"
+    assert len(branches) == 6
+
+
+def test_benchmark_emits_json_for_each_scenario(bench, tmp_path, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path / "unused"))
+    output = tmp_path / "bench.json"
+    bench.main([
+        "--commits", "80", "--files", "10", "--blob-size", "64", "--branches", "3",
+        "--new-commits", "3", "--deepen", "60", "--transports", "file,http",
+        "--repeat", "1", "--output", str(output),
+    ])
+
+    report = json.loads(output.read_text(encoding="utf-8"))
+    measured = {(r["transport"], r["scenario"]) for r in report["results"]}
+    assert measured == {(t, s) for t in ("file", "http") for s in bench.SCENARIOS}
+    assert all(r["seconds"]["median"] >= 0 for r in report["results"])
+    assert report["meta"]["params"]["commits"] == 80
@@ -0,0 +1,156 @@
+"""
+캐시 메타데이터 SQLite 저장소 테스트
+- 항목 단위 원자적 갱신
+- 여러 워커(프로세스)가 같은 DB를 공유할 때 항목 보존
+- 접근 시간 coalescing 및 기존 JSON 마이그레이션
+- 클론 캐시의 필드 단위 기록은 다른 워커가 기록한 필드를 보존
+"""
+import json
+import multiprocessing
+import os
+from datetime import datetime
+
+from src.cache_metadata_store import CacheMetadataStore
+
+
+def _entry(url, path="/tmp/x", created_at="2024-01-01T00:00:00"):
+    return {"url": url, "path": path, "created_at": created_at, "last_accessed": created_at}
+
+
+def _worker_put(db_path, worker_id, count):
+    store = CacheMetadataStore(db_path)
+    for i in range(count):
+        store.put(f"w{worker_id}_{i}", _entry(f"https://example.com/{worker_id}/{i}"))
+        store.update("shared", **{f"worker_{worker_id}": i})
+    store.close()
+
+
+def test_put_get_update_delete(tmp_path):
+    store = CacheMetadataStore(str(tmp_path / "meta.db"))
+
+    store.put("abc", dict(_entry("https://example.com/repo"), clone_depth=50))
+    entry = store.get("abc")
+    assert entry["url"] == "https://example.com/repo"
+    assert entry["clone_depth"] == 50
+
+    updated = store.update("abc", clone_depth=None, family="root-1234")
+    assert "clone_depth" not in updated
+    assert store.get("abc")["family"] == "root-1234"
+
+    assert store.update("missing", family="x") is None
+
+    store.delete("abc")
+    assert store.get("abc") is None
+    assert store.load_all() == {}
+
+
+def test_concurrent_workers_do_not_lose_entries(tmp_path):
+    db_path = str(tmp_path / "meta.db")
+    store = CacheMetadataStore(db_path)
+    store.put("shared", _entry("https://example.com/shared"))
+
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_worker_put, args=(db_path, w, 20)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=60)
+        assert p.exitcode == 0
+
+    entries = store.load_all()
+    assert len(entries) == 1 + 4 * 20
+    shared = entries["shared"]
+    for w in range(4):
+        assert shared[f"worker_{w}"] == 19
+
+
+def test_touch_is_coalesced_and_never_moves_backwards(tmp_path):
+    store = CacheMetadataStore(str(tmp_path / "meta.db"), access_flush_interval=3600)
+    store.put("abc", _entry("https://example.com/repo"))
+
+    store.touch("abc", "2024-06-01T00:00:00")
+    store.touch("abc", "2024-05-01T00:00:00")
+
+    # 아직 기록 전이지만 조회 결과에는 반영
+    other = CacheMetadataStore(str(tmp_path / "meta.db"))
+    assert other.get("abc")["last_accessed"] == "2024-01-01T00:00:00"
+    assert store.get("abc")["last_accessed"] == "2024-06-01T00:00:00"
+
+    # 다른 워커가 더 최근 시각을 기록한 경우 덮어쓰지 않음
+    other.touch("abc", "2024-07-01T00:00:00")
+    other.flush_access()
+
+    assert store.flush_access() == 1
+    assert other.get("abc")["last_accessed"] == "2024-07-01T00:00:00"
+
+
+def test_legacy_json_is_migrated_once(tmp_path):
+    legacy = tmp_path / "cache_metadata.json"
+    legacy.write_text(json.dumps({
+        "k1": _entry("https://example.com/a"),
+        "broken": {"url": "https://example.com/b"},
+    }), encoding="utf-8")
+
+    store = CacheMetadataStore(str(tmp_path / "meta.db"), legacy_json_path=str(legacy))
+
+    assert set(store.load_all()) == {"k1"}
+    assert not legacy.exists()
+    assert os.path.exists(str(legacy) + ".migrated")
+
+
+def test_repo_cache_uses_store(tmp_path, monkeypatch):
+    from src.repo_cache import RepoCloneCache
+
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path))
+    RepoCloneCache.reset_instance()
+    try:
+        cache = RepoCloneCache()
+        cache_key = cache._get_cache_key("https://example.com/repo")
+        now = datetime.now().isoformat()
+        cache._cache[cache_key] = {
+            "url": "https://example.com/repo",
+            "path": os.path.join(cache._cache_dir, cache_key),
+            "created_at": now,
+            "last_accessed": now,
+        }
+        cache._persist_entry(cache_key)
+
+        other = CacheMetadataStore(cache._cache_file)
+        assert other.get(cache_key)["url"] == "https://example.com/repo"
+
+        # 다른 워커가 삭제한 항목은 동기화 시 메모리에서도 제거
+        other.delete(cache_key)
+        cache._sync_entry(cache_key)
+        assert cache_key not in cache._cache
+    finally:
+        RepoCloneCache.reset_instance()
+
+
+def test_repo_cache_field_update_keeps_other_workers_changes(tmp_path, monkeypatch):
+    from src.repo_cache import RepoCloneCache
+
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path))
+    RepoCloneCache.reset_instance()
+    try:
+        cache = RepoCloneCache()
+        cache_key = cache._get_cache_key("https://example.com/repo")
+        now = datetime.now().isoformat()
+        cache._cache[cache_key] = {
+            "url": "https://example.com/repo",
+            "path": os.path.join(cache._cache_dir, cache_key),
+            "created_at": now,
+            "last_accessed": now,
+        }
+        cache._persist_entry(cache_key)
+
+        # 다른 워커가 fetch 시각과 패밀리를 기록한 뒤 이 워커가 clone_depth만 변경
+        other = CacheMetadataStore(cache._cache_file)
+        other.update(cache_key, last_fetched="2030-01-01T00:00:00", family="f")
+        cache._cache[cache_key]["clone_depth"] = 100
+        cache._persist_entry(cache_key, "clone_depth")
+
+        stored = other.get(cache_key)
+        assert stored["clone_depth"] == 100
+        assert stored["last_fetched"] == "2030-01-01T00:00:00" and stored["family"] == "f"
+    finally:
+        RepoCloneCache.reset_instance()
@@ -0,0 +1,166 @@
+"""
+협조적 취소/예산 테스트
+- 취소 토큰의 시간/토큰 예산
+- 예산을 넘으면 임베딩 요청을 더 보내지 않고 끝난 배치는 유지
+- 중단된 인덱싱은 업로드된 문서와 체크포인트를 남기고 다음 실행에서 이어서 진행
+- 끝난 인덱싱의 취소 토큰은 세션에서 해제
+- 토큰 예산은 성공한 요청의 보고된 사용량으로만 차감
+"""
+import asyncio
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.cancellation import CancellationToken, IndexingCancelled
+from src.embedding_engine import EmbeddingEngine, RateLimiter
+from src.index_checkpoint import IndexCheckpointStore
+from src.indexer import CommitIndexer, normalize_repo_identifier
+
+
+def test_token_budgets_and_cancel_reason():
+    token = CancellationToken(max_tokens=10)
+    token.spend_tokens(6)
+    with pytest.raises(IndexingCancelled, match="token budget exceeded"):
+        token.spend_tokens(5)
+    assert token.cancelled and token.tokens_used == 6
+    token.cancel("stopped by user")
+    assert token.reason.startswith("token budget exceeded")  # 처음 사유 유지
+
+    timed = CancellationToken(max_seconds=0.05)
+    assert not timed.cancelled
+    started = time.monotonic()
+    assert timed.wait(5) is True
+    assert time.monotonic() - started < 1
+    assert timed.reason == "time budget exceeded"
+    with pytest.raises(IndexingCancelled):
+        timed.raise_if_cancelled()
+
+
+def test_engine_stops_sending_after_token_budget():
+    client = Mock()
+    client.embeddings.create.side_effect = lambda input, model: Mock(
+        data=[Mock(embedding=[float(t.split("_")[1])]) for t in input])
+    token = CancellationToken(max_tokens=10)
+    engine = EmbeddingEngine(client, "m", batch_size=2, concurrency=1, limiter=RateLimiter(), cancel_token=token)
+
+    result = engine.embed([f"t_{i}" for i in range(6)])  # 배치당 추정 4토큰
+
+    assert result == [[0.0], [1.0], [2.0], [3.0], [], []]
+    assert client.embeddings.create.call_count == 2
+    assert engine.stats["cancelled_texts"] == 2 and engine.stats["failed_texts"] == 0
+
+
+def test_cancelled_indexing_keeps_uploaded_documents_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setenv("INDEX_WATERMARK", "false")
+    monkeypatch.setattr("src.indexer.PIPELINE_CHUNK_SIZE", 2)
+    store = IndexCheckpointStore(str(tmp_path / "checkpoints.db"))
+    commits = [
+        {"id": f"commit_{i}", "message": f"m{i}", "author": "t",
+         "date": "2024-01-01T00:00:00Z", "files": [], "parents": []}
+        for i in range(6)
+    ]
+    mock_search = Mock()
+    mock_search.search.side_effect = lambda **kwargs: iter([])
+    indexer = CommitIndexer(mock_search, Mock(), Mock(), "test-index", checkpoint_store=store)
+    token = CancellationToken()
+    uploads = []
+
+    def upload(documents):
+        uploads.append([d["id"] for d in documents])
+        token.cancel("stopped by user")  # 첫 청크 업로드 직후 중지
+        return [Mock(succeeded=True) for _ in documents]
+
+    mock_search.upload_documents.side_effect = upload
+
+    def batches(cancel_token=None, **kwargs):
+        # 실제 추출기처럼 배치마다 토큰 확인
+        for start in range(0, len(commits), 2):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            yield commits[start:start + 2]
+
+    embedded = []
+
+    def fake_embed(texts, client, cancel_token=None, **kwargs):
+        # 엔진처럼 취소 후에는 요청하지 않고 빈 벡터
+        if cancel_token is not None and cancel_token.cancelled:
+            return [[] for _ in texts]
+        embedded.extend(texts)
+        return [[0.5]] * len(texts)
+
+    with patch("src.indexer.DocumentGenerator") as mock_gen_class, \
+            patch("src.indexer.embed_texts", side_effect=fake_embed):
+        mock_gen_class.return_value.iter_commit_batches.side_effect = batches
+        with pytest.raises(IndexingCancelled) as excinfo:
+            indexer.index_repository("test/repo", limit=6, cancel_token=token)
+
+        assert excinfo.value.reason == "stopped by user" and excinfo.value.indexed == 2
+        assert uploads == [["commit_0", "commit_1"]]
+        run = store.get("test-index", normalize_repo_identifier("test/repo"))
+        assert run is not None and run["uploaded_count"] == 2
+
+        mock_search.upload_documents.side_effect = lambda documents: (
+            uploads.append([d["id"] for d in documents]) or [Mock(succeeded=True) for _ in documents]
+        )
+        count = indexer.index_repository("test/repo", limit=6)
+
+    assert count == 4
+    assert sorted(sha for chunk in uploads for sha in chunk) == [c["id"] for c in commits]
+    assert len(embedded) == 6  # 업로드되었거나 임베딩까지 끝난 커밋은 다시 임베딩하지 않음
+    assert store.get("test-index", normalize_repo_identifier("test/repo")) is None
+
+
+def test_stop_button_ignores_finished_indexing():
+    from src import tool_executor
+
+    session = {}
+    chainlit = Mock()
+    chainlit.user_session.get.side_effect = session.get
+    chainlit.user_session.set.side_effect = session.__setitem__
+    seen = {}
+
+    def index_repository(**kwargs):
+        # 실행 중에는 중지 버튼으로 취소 가능
+        seen["token"] = session[tool_executor.INDEXING_CANCEL_TOKEN_KEY]
+        return 3
+
+    indexer = Mock()
+    indexer.index_repository.side_effect = index_repository
+    with patch.object(tool_executor, "cl", chainlit), \
+            patch.object(tool_executor, "_has_chainlit_session", return_value=True), \
+            patch.object(tool_executor, "resolve_index_name", return_value="test-index"), \
+            patch.object(tool_executor, "CommitIndexer", return_value=indexer):
+        result = asyncio.run(tool_executor.execute_tool("index_repository", {"repo_path": "/tmp/repo"}))
+
+        assert "3개 커밋" in result
+        assert seen["token"] is not None
+        assert session[tool_executor.INDEXING_CANCEL_TOKEN_KEY] is None
+        assert tool_executor.cancel_indexing("stopped by user") is False
+
+
+def test_token_budget_charges_only_successful_requests_by_reported_usage():
+    import httpx
+    import openai
+
+    request = httpx.Request("POST", "https://example.invalid/embeddings")
+
+    def create(input, model):
+        if any("POISON" in t for t in input):
+            raise openai.BadRequestError("too long", response=httpx.Response(400, request=request), body=None)
+        return Mock(data=[Mock(embedding=[1.0]) for _ in input], usage=Mock(total_tokens=2 * len(input)))
+
+    client = Mock()
+    client.embeddings.create.side_effect = create
+    token = CancellationToken(max_tokens=1000)
+    engine = EmbeddingEngine(client, "m", batch_size=8, concurrency=1, limiter=RateLimiter(), cancel_token=token)
+
+    texts = [f"t_{i}" for i in range(8)]
+    texts[5] = "POISON"
+    result = engine.embed(texts)
+
+    # 거절된 요청 4건은 차감하지 않고, 성공한 요청(잘라서 다시 보낸 텍스트 포함)의 보고된 사용량만 차감
+    assert all(result)
+    assert engine.stats["bisections"] == 3 and engine.stats["truncated"] == 1
+    assert token.tokens_used == 16 and engine.stats["tokens"] == 16
@@ -36,8 +36,9 @@ def test_embed_texts_success():
     mock_client.embeddings.create.assert_called_once()
 
 
-def test_embed_texts_batch_processing():
+def test_embed_texts_batch_processing(monkeypatch):
     """배치 처리 테스트"""
+    monkeypatch.setattr("src.embedding.BATCH_SIZE", 20)
     mock_client = Mock()
 
     # Mock response - 각 아이템에 대해 개별 임베딩 반환
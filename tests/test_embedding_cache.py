@@ -0,0 +1,62 @@
+"""
+영구 임베딩 캐시 테스트
+- 메모리 맵 벡터 저장/조회 (float32, float16)
+- 다른 인스턴스(워커)가 덧붙인 벡터 조회
+- embed_texts가 캐시에 없는 텍스트만 요청
+"""
+from unittest.mock import Mock
+
+import pytest
+
+import src.embedding_cache as embedding_cache
+from src.embedding import embed_texts
+from src.embedding_cache import EmbeddingCache
+
+
+def test_roundtrip_and_shared_between_instances(tmp_path):
+    writer = EmbeddingCache(str(tmp_path), "text-embedding-3-small", 3)
+    reader = EmbeddingCache(str(tmp_path), "text-embedding-3-small", 3)
+
+    assert writer.put_many(["a", "b", "bad"], [[0.1, 0.2, 0.3], [1.0, -2.0, 0.5], [1.0]]) == 2
+    assert reader.get_many(["b", "missing", "a"]) == [
+        [1.0, -2.0, 0.5], None, pytest.approx([0.1, 0.2, 0.3])
+    ]
+
+    # 다른 인스턴스가 파일을 키운 뒤에도 다시 매핑하여 읽음
+    writer.put_many(["c"], [[3.0, 3.0, 3.0]])
+    assert writer.put_many(["a"], [[9.0, 9.0, 9.0]]) == 0
+    assert reader.get_many(["c", "a"])[0] == [3.0, 3.0, 3.0]
+    assert reader.count() == 3
+    writer.close()
+    reader.close()
+
+
+def test_float16_storage_is_half_size(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "m", 4, dtype="float16")
+    cache.put_many(["x"], [[0.1234, -0.5, 0.75, 1.0]])
+
+    assert cache.get_many(["x"])[0] == pytest.approx([0.1234, -0.5, 0.75, 1.0], abs=1e-3)
+    assert cache.vectors_file.stat().st_size == 8
+    cache.close()
+
+
+def test_embed_texts_only_requests_uncached_texts(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr("src.embedding.VECTOR_DIMENSIONS", 2)
+    monkeypatch.setenv("EMBEDDING_SEND_DIMENSIONS", "false")
+    monkeypatch.setattr(embedding_cache, "_caches", {})
+
+    client = Mock()
+    client.embeddings.create.side_effect = lambda input, model: Mock(
+        data=[Mock(embedding=[float(len(t)), 1.0]) for t in input]
+    )
+
+    assert embed_texts(["aa", "bbb", "aa"], client) == [[2.0, 1.0], [3.0, 1.0], [2.0, 1.0]]
+    assert client.embeddings.create.call_args.kwargs["input"] == ["aa", "bbb"]
+
+    assert embed_texts(["bbb", "cccc"], client) == [[3.0, 1.0], [4.0, 1.0]]
+    assert client.embeddings.create.call_args.kwargs["input"] == ["cccc"]
+
+    client.embeddings.create.reset_mock()
+    assert embed_texts(["aa", "cccc"], client) == [[2.0, 1.0], [4.0, 1.0]]
+    client.embeddings.create.assert_not_called()
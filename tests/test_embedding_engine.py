@@ -0,0 +1,156 @@
+"""
+동시 실행 임베딩 엔진 테스트
+- 동시 요청과 입력 순서 유지
+- 429 Retry-After 준수 및 재시도
+- 토큰 버킷 대기 시간 계산
+- 프로세스 간 공유 할당량 (QuotaStore)
+"""
+import random
+import threading
+import time
+from unittest.mock import Mock
+
+import httpx
+import openai
+import pytest
+
+from src.embedding_engine import EmbeddingEngine, RateLimiter, SharedRateLimiter, TokenBucket
+from src.quota_store import QuotaStore
+
+
+def _response(texts):
+    return Mock(data=[Mock(embedding=[float(t.split("_")[1])]) for t in texts])
+
+
+def test_concurrent_batches_keep_input_order():
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def create(input, model):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(random.uniform(0.01, 0.05))
+        with lock:
+            active["now"] -= 1
+        return _response(input)
+
+    client = Mock()
+    client.embeddings.create.side_effect = create
+    engine = EmbeddingEngine(client, "m", batch_size=3, concurrency=4, limiter=RateLimiter())
+
+    texts = [f"t_{i}" for i in range(30)]
+    result = engine.embed(texts)
+
+    assert result == [[float(i)] for i in range(30)]
+    assert active["peak"] > 1
+    assert engine.stats["requests"] == 10
+
+
+def test_rate_limit_retry_after_is_honoured():
+    request = httpx.Request("POST", "https://example.invalid/embeddings")
+    throttled = openai.RateLimitError(
+        "rate limited", response=httpx.Response(429, headers={"retry-after-ms": "200"}, request=request), body=None
+    )
+    calls = []
+
+    def create(input, model):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise throttled
+        return _response(input)
+
+    client = Mock()
+    client.embeddings.create.side_effect = create
+    limiter = RateLimiter()
+    engine = EmbeddingEngine(client, "m", batch_size=5, concurrency=1, limiter=limiter, backoff_base=0.01)
+
+    assert engine.embed(["t_1", "t_2"]) == [[1.0], [2.0]]
+    assert calls[1] - calls[0] >= 0.2
+    assert limiter.metrics["throttled"] == 1
+    assert engine.stats["retries"] == 1
+
+
+def test_non_retryable_error_is_not_retried():
+    client = Mock()
+    client.embeddings.create.side_effect = ValueError("bad input")
+    engine = EmbeddingEngine(client, "m", batch_size=2, concurrency=2, limiter=RateLimiter())
+
+    assert engine.embed(["a", "b", "c"]) == [[], [], []]
+    assert client.embeddings.create.call_count == 2
+    assert engine.stats["failed_batches"] == 2
+
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+    assert TokenBucket(0).reserve(10 ** 6) == 0
+
+
+def test_batches_follow_token_budget_and_truncate_long_texts():
+    from src.embedding_engine import estimate_tokens
+
+    sent = []
+
+    def create(input, model):
+        sent.append(list(input))
+        return Mock(data=[Mock(embedding=[float(len(t))]) for t in input])
+
+    client = Mock()
+    client.embeddings.create.side_effect = create
+    engine = EmbeddingEngine(client, "m", batch_size=100, max_batch_tokens=60, max_input_tokens=40,
+                             concurrency=1, limiter=RateLimiter())
+
+    texts = ["x" * 30] * 10 + ["커밋" * 500] + ["y" * 60] * 3
+    result = engine.embed(texts)
+
+    assert len(result) == len(texts) and all(result)
+    assert all(sum(estimate_tokens(t) for t in batch) <= 60 for batch in sent)
+    assert max(len(batch) for batch in sent) > 1
+    assert all(estimate_tokens(t) <= 40 for batch in sent for t in batch)
+    assert engine.stats["truncated"] == 1
+
+
+def test_rejected_batch_is_bisected_to_isolate_bad_input():
+    request = httpx.Request("POST", "https://example.invalid/embeddings")
+
+    def create(input, model):
+        if any("POISON" in t for t in input):
+            raise openai.BadRequestError("invalid input", response=httpx.Response(400, request=request), body=None)
+        return _response(input)
+
+    client = Mock()
+    client.embeddings.create.side_effect = create
+    engine = EmbeddingEngine(client, "m", batch_size=8, concurrency=1, limiter=RateLimiter())
+
+    texts = [f"t_{i}" for i in range(8)]
+    texts[5] = "POISON" * 10
+    result = engine.embed(texts)
+
+    assert [bool(v) for v in result] == [True] * 5 + [False] + [True] * 2
+    assert result[7] == [7.0]
+    assert engine.stats["bisections"] == 3
+    assert engine.stats["failed_texts"] == 1
+
+
+def test_shared_limiter_enforces_quota_across_processes(tmp_path):
+    db_path = str(tmp_path / "quota.db")
+    # 프로세스별 제한기 (각자 QuotaStore 연결을 가짐)
+    first = SharedRateLimiter(tokens_per_minute=600, requests_per_minute=60, store=QuotaStore(db_path))
+    second = SharedRateLimiter(tokens_per_minute=600, requests_per_minute=60, store=QuotaStore(db_path))
+
+    assert first.store.reserve(600, 600, 60) == 0
+    # 다른 프로세스가 전체 할당량을 이미 썼으므로 대기 (초당 10토큰)
+    assert second.store.reserve(300, 600, 60) == pytest.approx(30, abs=1)
+
+    first.register_tenant("a")
+    second.register_tenant("b")
+    assert first.tenant_share("a") == {"tokens_per_minute": 300, "requests_per_minute": 30}
+    second.release_tenant("b")
+    assert first.tenant_share("a") == {"tokens_per_minute": 600, "requests_per_minute": 60}
+    assert second.tenant_share("b") is None
+
+    second.pause(5)
+    assert first.store.reserve(0, 0, 0) == pytest.approx(5, abs=1)
@@ -0,0 +1,118 @@
+"""
+캐시 클론 fetch 정책 테스트
+- 기본 브랜치만, 태그 제외, protocol v2
+- 기존 클론도 첫 fetch 전에 정책 적용
+- 도구가 요청한 브랜치/태그만 추가로 fetch
+"""
+import subprocess
+
+import git
+import pytest
+
+from src.document_generator import DocumentGenerator
+from src.repo_cache import RepoCloneCache
+
+
+def _git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+def _commit(repo_dir, name):
+    (repo_dir / f"{name}.txt").write_text(name, encoding="utf-8")
+    _git("add", ".", cwd=repo_dir)
+    _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", name, cwd=repo_dir)
+    return _git("rev-parse", "HEAD", cwd=repo_dir).strip()
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    """main + 브랜치 20개 + 태그 5개"""
+    repo_dir = tmp_path / "upstream"
+    repo_dir.mkdir()
+    _git("init", "-q", "-b", "main", cwd=repo_dir)
+    for i in range(3):
+        _commit(repo_dir, f"main{i}")
+    for i in range(20):
+        _git("checkout", "-q", "-b", f"feature-{i}", "main", cwd=repo_dir)
+        _commit(repo_dir, f"feature{i}")
+    _git("checkout", "-q", "main", cwd=repo_dir)
+    for i in range(5):
+        _git("tag", f"v{i}", f"feature-{i}", cwd=repo_dir)
+    return repo_dir
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("REPO_CACHE_BACKGROUND_SWEEP", "false")
+    monkeypatch.setenv("REPO_CACHE_MAINTENANCE", "false")
+    monkeypatch.setenv("REPO_CACHE_REFRESH", "false")
+    monkeypatch.setenv("REPO_CACHE_FRESH_SECONDS", "0")
+    RepoCloneCache.reset_instance()
+    yield RepoCloneCache()
+    RepoCloneCache.reset_instance()
+
+
+def _refs(path):
+    return set(_git("for-each-ref", "--format=%(refname)", cwd=path).split())
+
+
+def test_clone_and_fetch_default_branch_only(cache, upstream):
+    url = upstream.as_uri()
+    path = cache.get_or_clone(url)
+
+    refs = _refs(path)
+    assert "refs/remotes/origin/main" in refs
+    assert not any(r.startswith("refs/tags/") for r in refs)
+    assert not any("feature" in r for r in refs)
+    assert _git("config", "remote.origin.tagOpt", cwd=path).strip() == "--no-tags"
+    assert _git("config", "protocol.version", cwd=path).strip() == "2"
+
+    # 원격에 새 브랜치/태그/커밋이 생겨도 기본 브랜치만 가져옴
+    _git("tag", "v-new", "main", cwd=upstream)
+    _git("branch", "feature-new", "main", cwd=upstream)
+    new_sha = _commit(upstream, "main-new")
+
+    cache.get_or_clone(url)
+    assert _refs(path) == refs
+    assert _git("rev-parse", "HEAD", cwd=path).strip() == new_sha
+
+
+def test_policy_applied_to_existing_clone(cache, upstream):
+    url = upstream.as_uri()
+    path = cache.get_or_clone(url)
+    # 정책 도입 전 클론 상태 재현
+    _git("config", "--replace-all", "remote.origin.fetch", "+refs/heads/*:refs/remotes/origin/*", cwd=path)
+    _git("config", "--unset", "remote.origin.tagOpt", cwd=path)
+    cache._policy_applied.clear()
+
+    cache.get_or_clone(url)
+
+    assert _git("config", "--get-all", "remote.origin.fetch", cwd=path).split() == [
+        "+refs/heads/main:refs/remotes/origin/main"
+    ]
+    assert not any("feature" in r for r in _refs(path))
+
+
+def test_extra_refs_are_opt_in(cache, upstream):
+    url = upstream.as_uri()
+    path = cache.get_or_clone(url, extra_refs=["feature-3", "refs/tags/v1"])
+
+    refs = _refs(path)
+    assert "refs/remotes/origin/feature-3" in refs
+    assert "refs/tags/v1" in refs
+    assert "refs/remotes/origin/feature-4" not in refs
+    assert "refs/tags/v2" not in refs
+
+
+def test_document_generator_requests_branch(cache, upstream):
+    generator = DocumentGenerator(upstream.as_uri())
+    try:
+        commits = generator.get_commits(limit=1, branch="feature-7")
+    finally:
+        generator.close()
+
+    assert commits[0]["message"] == "feature7"
+    repo = git.Repo(generator.cached_path)
+    assert "origin/feature-8" not in [r.name for r in repo.remotes.origin.refs]
+    repo.close()
@@ -0,0 +1,94 @@
+"""
+safe.directory 레지스트리 테스트
+- command_line 모드: 전역 gitconfig 미사용, 프로세스 환경으로 git에 전달
+- global 모드: 기존 목록 1회 로드, 추가분은 flush 시 일괄 기록
+"""
+import os
+import subprocess
+
+import pytest
+
+from src.git_safe_directory import SafeDirectoryRegistry
+
+
+@pytest.fixture(autouse=True)
+def isolated_environ():
+    saved = dict(os.environ)
+    os.environ.pop("GIT_CONFIG_COUNT", None)
+    yield
+    os.environ.clear()
+    os.environ.update(saved)
+
+
+def test_command_line_mode_never_shells_out(tmp_path):
+    registry = SafeDirectoryRegistry(mode="command_line")
+
+    assert registry.register(str(tmp_path / "a")) is True
+    assert registry.register(str(tmp_path / "a")) is False
+    assert registry.register(str(tmp_path / "b")) is True
+    assert registry.is_registered(str(tmp_path / "a"))
+    assert registry.flush() == 0
+    assert registry.shell_outs == 0
+
+    # git 명령이 command-line 설정으로 인식하는지 확인
+    result = subprocess.run(
+        ["git", "config", "--get-all", "safe.directory"],
+        capture_output=True, text=True, check=False
+    )
+    values = result.stdout.split()
+    assert str(tmp_path / "a") in values
+    assert str(tmp_path / "b") in values
+
+
+def test_command_line_mode_preserves_existing_entries(tmp_path):
+    os.environ["GIT_CONFIG_COUNT"] = "1"
+    os.environ["GIT_CONFIG_KEY_0"] = "safe.directory"
+    os.environ["GIT_CONFIG_VALUE_0"] = str(tmp_path / "existing")
+
+    registry = SafeDirectoryRegistry(mode="command_line")
+    assert registry.register(str(tmp_path / "existing")) is False
+    assert registry.register(str(tmp_path / "new")) is True
+
+    assert os.environ["GIT_CONFIG_COUNT"] == "2"
+    assert os.environ["GIT_CONFIG_VALUE_0"] == str(tmp_path / "existing")
+    assert os.environ["GIT_CONFIG_VALUE_1"] == str(tmp_path / "new")
+
+
+def test_global_mode_loads_once_and_batches(monkeypatch):
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        stdout = "/already/safe\n" if "--get-all" in cmd else ""
+        return subprocess.CompletedProcess(cmd, 0, stdout=stdout, stderr="")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    registry = SafeDirectoryRegistry(mode="global")
+
+    for _ in range(10):
+        registry.register("/already/safe")
+        registry.register("/repo/one")
+        registry.register("/repo/two")
+
+    # 목록 조회는 1회, 기록은 아직 없음
+    assert len(calls) == 1
+    assert registry.flush() == 2
+    assert [c[-1] for c in calls[1:]] == ["/repo/one", "/repo/two"]
+
+    # 이후 캐시 히트는 subprocess 없이 처리
+    registry.register("/repo/one")
+    assert registry.flush() == 0
+    assert len(calls) == 3
+
+
+def test_wildcard_short_circuits(monkeypatch):
+    registry = SafeDirectoryRegistry(mode="command_line")
+    assert registry.register("*") is True
+    assert registry.register("/any/path") is False
+    assert registry.is_registered("/any/other")
+
+
+def test_off_mode_does_nothing():
+    registry = SafeDirectoryRegistry(mode="off")
+    assert registry.register("/repo") is False
+    assert "GIT_CONFIG_COUNT" not in os.environ
@@ -102,12 +102,15 @@ def test_get_existing_ids_for_candidates_chunking():
     assert len(result) == 500  # 400 + 100
 
 
-def test_incremental_indexing_skips_existing():
+def test_incremental_indexing_skips_existing(monkeypatch, tmp_path):
     """
     증분 인덱싱이 기존 커밋을 제대로 스킵하는지 통합 확인
     """
     from unittest.mock import patch
 
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setenv("INDEX_WATERMARK", "false")  # DocumentGenerator가 mock이므로 히스토리 나열 방식
+
     mock_search = Mock()
     mock_index = Mock()
     mock_openai = Mock()
@@ -128,7 +131,7 @@ def test_incremental_indexing_skips_existing():
 
     with patch('src.indexer.DocumentGenerator') as mock_gen_class:
         mock_gen = Mock()
-        mock_gen.get_commits.return_value = mock_commits
+        mock_gen.iter_commit_batches.return_value = iter([mock_commits])
         mock_gen.close.return_value = None
         mock_gen_class.return_value = mock_gen
 
@@ -0,0 +1,167 @@
+"""
+인덱싱 체크포인트 테스트
+- 커밋 상태(추출/임베딩/업로드) 기록과 벡터 보관
+- 중단된 실행을 이어받을 때 업로드된 커밋은 건너뛰고 임베딩은 재사용
+- 체크포인트는 인덱스별로 분리되고, 임베딩 모델/범위가 바뀌면 이어받지 않음
+"""
+import sqlite3
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.index_checkpoint import IndexCheckpointStore, STATE_EMBEDDED, STATE_PENDING, STATE_UPLOADED
+from src.indexer import CommitIndexer, normalize_repo_identifier
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IndexCheckpointStore(str(tmp_path / "checkpoints.db"))
+
+
+def test_checkpoint_states_and_vectors(store):
+    run = store.begin("idx", "repo", {"limit": 10})
+    assert run["resumed"] is False and run["next_seq"] == 0
+
+    store.mark_pending("idx", "repo", 0, ["a", "b"])
+    store.save_embedded("idx", "repo", 0, [{"id": "a", "message": "m", "content_vector": [0.5, -1.25]}])
+    store.mark_pending("idx", "repo", 1, ["a", "c"])  # 이미 임베딩된 커밋은 pending으로 되돌리지 않음
+
+    assert store.shas_in_state("idx", "repo", STATE_PENDING) == {"b", "c"}
+    (seq, docs), = store.load_embedded("idx", "repo")
+    assert seq == 0 and docs == [{"id": "a", "message": "m", "content_vector": [0.5, -1.25]}]
+
+    store.mark_uploaded("idx", "repo", 0, ["a"])
+    resumed = store.begin("idx", "repo")
+    assert resumed["resumed"] is True
+    assert resumed["uploaded_count"] == 1 and resumed["next_seq"] == 2
+    assert store.shas_in_state("idx", "repo", STATE_UPLOADED) == {"a"}
+
+    assert store.finish("idx", "repo") == 0
+    assert store.get("idx", "repo") is None
+
+
+def test_interrupted_run_resumes_without_reembedding(store, monkeypatch, tmp_path):
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setenv("INDEX_WATERMARK", "false")  # DocumentGenerator가 mock이므로 히스토리 나열 방식
+    monkeypatch.setattr("src.indexer.PIPELINE_CHUNK_SIZE", 2)
+    commits = [
+        {"id": f"commit_{i}", "message": f"m{i}", "author": "t",
+         "date": "2024-01-01T00:00:00Z", "files": [], "parents": []}
+        for i in range(6)
+    ]
+    mock_search = Mock()
+    mock_search.search.side_effect = lambda **kwargs: iter([])
+    indexer = CommitIndexer(mock_search, Mock(), Mock(), "test-index", checkpoint_store=store)
+
+    embedded = []
+
+    def fake_embed(texts, client, **kwargs):
+        embedded.extend(texts)
+        return [[0.25, 0.5]] * len(texts)
+
+    uploads = []
+
+    def crash_on_second_chunk(documents):
+        if len(uploads) == 1:
+            raise RuntimeError("worker recycled")
+        uploads.append([d["id"] for d in documents])
+        return [Mock(succeeded=True) for _ in documents]
+
+    with patch("src.indexer.DocumentGenerator") as mock_gen_class, \
+            patch("src.indexer.embed_texts", side_effect=fake_embed):
+        mock_gen_class.return_value.iter_commit_batches.side_effect = \
+            lambda **kwargs: iter([commits[0:2], commits[2:4], commits[4:6]])
+
+        mock_search.upload_documents.side_effect = crash_on_second_chunk
+        with pytest.raises(RuntimeError):
+            indexer.index_repository("test/repo", limit=6)
+        assert uploads == [["commit_0", "commit_1"]]
+
+        mock_search.upload_documents.side_effect = lambda documents: (
+            uploads.append([d["id"] for d in documents]) or [Mock(succeeded=True) for _ in documents]
+        )
+        count = indexer.index_repository("test/repo", limit=6)
+
+    uploaded_ids = [sha for chunk in uploads for sha in chunk]
+    assert count == 4
+    assert sorted(uploaded_ids) == [c["id"] for c in commits]
+    # 임베딩은 커밋당 한 번만 (재시작 후 재임베딩 없음)
+    assert len(embedded) == 6
+    # 재개 시 보관된 벡터가 그대로 업로드됨
+    resumed_docs = mock_search.upload_documents.call_args_list[1].kwargs["documents"]
+    assert resumed_docs[0]["content_vector"] == [0.25, 0.5]
+    assert store.get("test-index", normalize_repo_identifier("test/repo")) is None
+
+
+def test_run_is_discarded_when_embedding_params_change(store):
+    params = {"embedding_model": "m1", "vector_dimensions": 1536, "since": None, "until": None, "skip_offset": 0}
+    store.begin("idx", "repo", params)
+    store.save_embedded("idx", "repo", 0, [{"id": "a", "content_vector": [0.5]}])
+
+    assert store.begin("idx", "repo", {**params, "limit": 50})["resumed"] is True  # limit 변경은 이어받음
+
+    run = store.begin("idx", "repo", {**params, "vector_dimensions": 256})
+    assert run["resumed"] is False and run["discarded"] == ["vector_dimensions"]
+    assert run["embedded_count"] == 0 and store.load_embedded("idx", "repo") == []
+
+    store.mark_pending("idx", "repo", 0, ["b"])
+    run = store.begin("idx", "repo", {**params, "vector_dimensions": 256, "since": "2024-01-01"})
+    assert run["discarded"] == ["since"] and store.shas_in_state("idx", "repo", STATE_PENDING) == set()
+
+
+def test_legacy_repo_keyed_schema_is_dropped(tmp_path):
+    db_path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE runs (repo_id TEXT PRIMARY KEY, params TEXT, started_at TEXT, updated_at TEXT, "
+                 "last_uploaded_seq INTEGER, uploaded_count INTEGER)")
+    conn.execute("INSERT INTO runs VALUES ('repo', '{}', 'x', 'x', NULL, 0)")
+    conn.commit()
+    conn.close()
+
+    store = IndexCheckpointStore(str(db_path))
+
+    assert store.get("idx", "repo") is None
+    assert store.begin("idx", "repo")["resumed"] is False
+
+
+def test_interrupted_run_into_other_index_does_not_skip_commits(store, monkeypatch, tmp_path):
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setenv("INDEX_WATERMARK", "false")
+    monkeypatch.setattr("src.indexer.PIPELINE_CHUNK_SIZE", 2)
+    commits = [
+        {"id": f"commit_{i}", "message": f"m{i}", "author": "t",
+         "date": "2024-01-01T00:00:00Z", "files": [], "parents": []}
+        for i in range(4)
+    ]
+    uploads = {"index-a": [], "index-b": []}
+
+    def make_indexer(index_name, fail_second_chunk=False):
+        search = Mock()
+        search.search.side_effect = lambda **kwargs: iter([])
+
+        def upload(documents):
+            if fail_second_chunk and uploads[index_name]:
+                raise RuntimeError("worker recycled")
+            uploads[index_name].extend(d["id"] for d in documents)
+            return [Mock(succeeded=True) for _ in documents]
+
+        search.upload_documents.side_effect = upload
+        return CommitIndexer(search, Mock(), Mock(), index_name, checkpoint_store=store)
+
+    with patch("src.indexer.DocumentGenerator") as mock_gen_class, \
+            patch("src.indexer.embed_texts", side_effect=lambda texts, client, **kwargs: [[0.5]] * len(texts)):
+        mock_gen_class.return_value.iter_commit_batches.side_effect = \
+            lambda **kwargs: iter([commits[0:2], commits[2:4]])
+
+        with pytest.raises(RuntimeError):
+            make_indexer("index-a", fail_second_chunk=True).index_repository("test/repo", limit=4)
+        count = make_indexer("index-b").index_repository("test/repo", limit=4)
+
+    repo_id = normalize_repo_identifier("test/repo")
+    assert count == 4
+    assert uploads["index-b"] == [c["id"] for c in commits]  # index-a에 업로드된 커밋도 건너뛰지 않음
+    assert store.get("test-index", repo_id) is None and store.get("index-b", repo_id) is None
+    # index-a의 중단된 실행은 그대로 남아 다음 실행에서 이어받음
+    assert store.shas_in_state("index-a", repo_id, STATE_UPLOADED) == {"commit_0", "commit_1"}
+    assert store.shas_in_state("index-a", repo_id, STATE_EMBEDDED) == {"commit_2", "commit_3"}
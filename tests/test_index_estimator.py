@@ -0,0 +1,73 @@
+"""
+인덱싱 사전 추정 테스트
+- 대상 범위/기존 커밋 제외와 표본 외삽
+- 예산 초과 판정
+- 다른 저장소에서 인덱싱된 공유 커밋은 임베딩 대상에서 제외
+"""
+import subprocess
+from unittest.mock import Mock
+
+import pytest
+
+from src.index_estimator import estimate_indexing
+from src.index_manifest import IndexManifest
+from src.indexer import normalize_repo_identifier
+
+
+def _git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    monkeypatch.setenv("EMBEDDING_CACHE_DIR", str(tmp_path / "embeddings"))
+    path = tmp_path / "repo"
+    path.mkdir()
+    _git("init", "-q", cwd=path)
+    shas = []
+    for i in range(10):
+        (path / f"m{i}.py").write_text(f"def f{i}(x):\n    return x + {i}\n", encoding="utf-8")
+        _git("add", ".", cwd=path)
+        _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", f"add f{i}", cwd=path)
+        shas.append(_git("rev-parse", "HEAD", cwd=path))
+    return str(path), shas
+
+
+def test_estimate_excludes_indexed_commits_and_checks_budget(repo):
+    path, shas = repo
+    IndexManifest().add("idx", normalize_repo_identifier(path), shas[-2:])
+
+    estimate = estimate_indexing(path, index_name="idx", sample_size=4)
+
+    assert estimate["range"]["mode"] == "watermark"
+    assert estimate["commits"] == {"in_range": 10, "skipped_existing": 2, "linked_shared": 0, "to_embed": 8}
+    assert estimate["sample"]["extracted"] == 4
+    assert estimate["embedding"]["tokens"] > 0 and estimate["embedding"]["texts"] == 8
+    assert estimate["upload"]["documents"] == 8 and estimate["upload"]["bytes"] > 8 * 1536 * 10
+    assert estimate["wall_clock_seconds"] >= estimate["upload"]["seconds"]
+    assert estimate["within_budget"]
+
+    over = estimate_indexing(path, index_name="idx", sample_size=4, max_tokens=1, max_seconds=1e9)
+    assert over["exceeds"] == ["tokens"] and not over["within_budget"]
+
+    # 날짜/skip_offset 범위는 히스토리 나열, skip_existing=False면 기존 커밋도 다시 임베딩
+    full = estimate_indexing(path, index_name="idx", skip_existing=False, skip_offset=3, sample_size=4)
+    assert full["range"]["mode"] == "history"
+    assert full["commits"]["in_range"] == 7 and full["commits"]["to_embed"] == 7
+
+
+def test_estimate_links_commits_shared_with_other_repositories(repo):
+    path, shas = repo
+    search = Mock()
+    search.search.side_effect = lambda **kwargs: [
+        {"id": sha, "repo_id": "github.com/upstream/repo", "repository_path": "https://github.com/upstream/repo"}
+        for sha in kwargs["filter"].split("'")[1].split(",")
+    ]
+
+    estimate = estimate_indexing(path, index_name="idx", search_client=search, sample_size=5)
+
+    assert estimate["commits"]["linked_shared"] == 10
+    assert estimate["commits"]["to_embed"] == 0 and estimate["embedding"]["tokens"] == 0
+    assert 0 < estimate["upload"]["bytes"] < 10 * 1024
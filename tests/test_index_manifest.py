@@ -0,0 +1,74 @@
+"""
+인덱싱된 커밋 매니페스트 테스트
+- 대조된 매니페스트로 증분 스킵 (search.in 조회 없음)
+- 업로드 성공 시 매니페스트 갱신
+- 문서 수 비교로 인덱스와의 차이 감지 후 전체 대조
+"""
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.index_manifest import IndexManifest
+from src.indexer import CommitIndexer, normalize_repo_identifier
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return IndexManifest(str(tmp_path / "manifest.db"))
+
+
+def _commits(n):
+    return [
+        {"id": f"commit_{i}", "message": f"m{i}", "author": "t",
+         "date": "2024-01-01T00:00:00Z", "files": [], "parents": []}
+        for i in range(n)
+    ]
+
+
+def test_skip_existing_uses_manifest_without_index_queries(manifest, monkeypatch, tmp_path):
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setenv("INDEX_WATERMARK", "false")  # DocumentGenerator가 mock이므로 히스토리 나열 방식
+    monkeypatch.setenv("INDEX_SHARED_HISTORY", "false")  # 포크 간 공유 커밋 조회 없이 매니페스트만 사용
+    repo_id = normalize_repo_identifier("test/repo")
+    manifest.replace("test-index", repo_id, ["commit_1", "commit_3"])
+
+    mock_search = Mock()
+    mock_search.upload_documents.side_effect = lambda documents: [Mock(succeeded=True) for _ in documents]
+    indexer = CommitIndexer(mock_search, Mock(), Mock(), "test-index", manifest=manifest)
+
+    with patch("src.indexer.DocumentGenerator") as mock_gen_class, \
+            patch("src.indexer.embed_texts", side_effect=lambda texts, client, **kwargs: [[0.5]] * len(texts)):
+        mock_gen_class.return_value.iter_commit_batches.return_value = iter([_commits(5)])
+        count = indexer.index_repository("test/repo", limit=5, skip_existing=True)
+
+    assert count == 3
+    mock_search.search.assert_not_called()
+    assert manifest.load("test-index", repo_id) == {f"commit_{i}" for i in range(5)}
+
+
+def test_reconcile_detects_drift(manifest):
+    manifest.replace("test-index", "repo", ["a", "b", "c"])
+    mock_search = Mock()
+    indexer = CommitIndexer(mock_search, Mock(), Mock(), "test-index", manifest=manifest)
+
+    # 문서 수가 같으면 전체 목록을 읽지 않음
+    mock_search.search.return_value = Mock(get_count=Mock(return_value=3))
+    assert indexer.reconcile_manifest("repo")["mode"] == "count"
+    assert mock_search.search.call_count == 1
+
+    # 인덱스에서 외부 삭제/추가가 있으면 전체 id 목록으로 교체
+    count_result = Mock(get_count=Mock(return_value=2))
+    mock_search.search.side_effect = [count_result, iter([{"id": "a"}, {"id": "d"}])]
+    result = indexer.reconcile_manifest("repo")
+
+    assert result == {"mode": "full", "indexed": 2, "added": 1, "removed": 2}
+    assert manifest.load("test-index", "repo") == {"a", "d"}
+
+
+def test_unreconciled_manifest_falls_back_to_index_queries(manifest):
+    mock_search = Mock()
+    mock_search.search.side_effect = RuntimeError("search unavailable")
+    indexer = CommitIndexer(mock_search, Mock(), Mock(), "test-index", manifest=manifest)
+
+    assert indexer._load_indexed_ids("repo") is None
+    assert manifest.reconciled_at("test-index", "repo") is None
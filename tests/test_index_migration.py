@@ -0,0 +1,173 @@
+"""
+백그라운드 인덱스 이전 테스트
+- id 접두사 범위 분할 읽기와 재임베딩 복사
+- 문서 수 검증 실패 시 전환하지 않음
+- 서비스 별칭을 쓸 수 없으면 로컬 포인터로 전환
+- 재임베딩 텍스트가 인덱싱 시점의 임베딩 텍스트와 같음
+"""
+import re
+from unittest.mock import Mock, patch
+
+import pytest
+from azure.search.documents.indexes.models import SearchField, SearchIndex
+
+from src.index_alias import MODE_POINTER, get_alias, resolve_index_name, swap_index_alias
+from src.index_migration import IndexMigration, document_text
+from src.index_manifest import IndexManifest
+from src.indexer import CommitIndexer, CONTENT_HASH_FIELD
+
+
+class _Results(list):
+    def __init__(self, docs, count):
+        super().__init__(docs)
+        self._count = count
+
+    def get_count(self):
+        return self._count
+
+
+def _source_client(ids):
+    def search(search_text="*", filter=None, top=None, **kwargs):
+        if filter is None:
+            return _Results([], len(ids))
+        low, high = re.findall(r"'([^']*)'", filter)
+        matched = [{"id": i, "message": f"msg {i}", "author": "dev", "@search.score": 1.0}
+                   for i in ids if low <= i < high]
+        return _Results(matched[:top], len(matched))
+
+    client = Mock()
+    client.search.side_effect = search
+    return client
+
+
+def _target_client(store):
+    def upload(documents):
+        store.extend(documents)
+        return [Mock(succeeded=True, key=d["id"], status_code=201) for d in documents]
+
+    client = Mock()
+    client.upload_documents.side_effect = upload
+    client.search.side_effect = lambda **kwargs: _Results([], len(store))
+    return client
+
+
+def _index_client(source, target):
+    index_client = Mock()
+    index_client.get_search_client.side_effect = lambda name: source if name == "old" else target
+    index_client.get_index.side_effect = lambda name: (
+        SearchIndex(name="old", fields=[SearchField(name="id", type="Edm.String", key=True),
+                                        SearchField(name="message", type="Edm.String"),
+                                        SearchField(name="content_vector", type="Collection(Edm.Single)")])
+        if name == "old" else (_ for _ in ()).throw(Exception("not found"))
+    )
+    return index_client
+
+
+@pytest.fixture(autouse=True)
+def _isolated_state(tmp_path, monkeypatch):
+    monkeypatch.setenv("INDEX_ALIAS_FILE", str(tmp_path / "aliases.json"))
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path / "state"))
+
+
+def test_copy_splits_prefixes_and_re_embeds(monkeypatch):
+    ids = [f"a{i:02x}" + "0" * 37 for i in range(6)] + ["b" + "1" * 39, "c" + "2" * 39]
+    store = []
+    index_client = _index_client(_source_client(ids), _target_client(store))
+    index_client.create_or_update_alias.side_effect = Exception("index exists with this name")
+
+    with patch("src.index_migration.embed_texts", side_effect=lambda texts, client: [[0.5] * 4 for _ in texts]) as embed:
+        migration = IndexMigration(index_client, Mock(), "old", "new", logical_name="git-commits",
+                                   page_size=4, read_concurrency=2, verify_timeout=0)
+        migration.start()
+        status = migration.wait(timeout=10)
+
+    assert status["state"] == "completed"
+    assert sorted(d["id"] for d in store) == sorted(ids)
+    assert all(d["content_vector"] == [0.5] * 4 and "@search.score" not in d for d in store)
+    assert "msg" in embed.call_args[0][0][0]
+    assert status["read"] == status["uploaded"] == len(ids)
+    # 'a' 범위(6건)가 page_size를 넘어 하위 접두사로 분할됨
+    filters = [c.kwargs.get("filter") for c in index_client.get_search_client("old").search.call_args_list]
+    assert "id ge 'a0' and id lt 'a0g'" in filters
+    assert resolve_index_name("git-commits") == "new"
+
+
+def test_count_mismatch_fails_without_swap():
+    ids = ["a" + "0" * 39, "b" + "0" * 39]
+    store = []
+    target = _target_client(store)
+
+    def upload(documents):
+        # 'b' 문서는 매번 거부 (재시도 불가 400)
+        accepted = [d for d in documents if d["id"].startswith("a")]
+        store.extend(accepted)
+        return [Mock(succeeded=d in accepted, key=d["id"], status_code=201 if d in accepted else 400,
+                     error_message="invalid") for d in documents]
+
+    target.upload_documents.side_effect = upload
+    index_client = _index_client(_source_client(ids), target)
+
+    migration = IndexMigration(index_client, Mock(), "old", "new", logical_name="git-commits",
+                               re_embed=False, verify_timeout=0)
+    with pytest.raises(RuntimeError, match="count mismatch"):
+        migration.run()
+
+    assert migration.status["state"] == "failed"
+    assert migration.status["target_count"] == 1
+    index_client.create_or_update_alias.assert_not_called()
+    assert resolve_index_name("git-commits") == "git-commits"
+
+
+def test_swap_prefers_service_alias():
+    index_client = Mock()
+    entry = swap_index_alias(index_client, "git-commits", "git-commits-v2")
+
+    alias = index_client.create_or_update_alias.call_args[0][0]
+    assert alias.name == "git-commits" and alias.indexes == ["git-commits-v2"]
+    assert entry["mode"] == "alias" and entry["previous"] == "git-commits"
+    # 서비스 별칭이면 클라이언트는 논리 이름을 그대로 사용
+    assert resolve_index_name("git-commits") == "git-commits"
+
+    index_client.create_or_update_alias.side_effect = Exception("unsupported")
+    entry = swap_index_alias(index_client, "git-commits", "git-commits-v3")
+    assert entry["mode"] == MODE_POINTER and entry["previous"] == "git-commits-v2"
+    assert get_alias("git-commits")["index"] == "git-commits-v3"
+    assert resolve_index_name("git-commits") == "git-commits-v3"
+
+
+def _analyzed_commit(modified, added):
+    return {
+        "id": "a" * 40, "message": "Refactor parser", "author": "dev", "date": "2024-01-01T00:00:00Z",
+        "files": [{"file": "src/parser.py", "change_type": "M", "lines_added": 3, "lines_deleted": 1}],
+        "parents": [], "change_context": {"summary": "parser cleanup"},
+        "function_analysis": {
+            "modified_functions": [{"name": name, "file": "src/parser.py"} for name in modified],
+            "added_functions": [{"name": name, "file": "src/parser.py"} for name in added],
+        },
+    }
+
+
+def test_re_embeds_with_text_stored_at_index_time(tmp_path):
+    commit = _analyzed_commit(["parse", "tokenize", "emit", "flush"], ["parse_header"])
+    doc, text = CommitIndexer._build_document(commit, "repo", "/repo")
+    assert "Added: parse_header" in text
+    assert text not in doc.values()  # 임베딩 텍스트 원문은 인덱스 문서에 저장하지 않음
+
+    manifest = IndexManifest(str(tmp_path / "manifest.db"))
+    manifest.put_texts({doc[CONTENT_HASH_FIELD]: text})
+    migration = IndexMigration(_index_client(_source_client([]), _target_client([])), Mock(), "old", "new")
+    migration.manifest = manifest
+
+    with patch("src.index_migration.embed_texts", side_effect=lambda texts, client: [[0.5]] * len(texts)) as embed:
+        (migrated,) = migration._embed_page([doc])
+
+    assert embed.call_args.args[0] == [text]
+    assert migrated[CONTENT_HASH_FIELD] == doc[CONTENT_HASH_FIELD]
+
+
+def test_document_text_rebuilds_documents_without_stored_text():
+    doc, text = CommitIndexer._build_document(_analyzed_commit(["parse", "tokenize", "emit", "flush"], []),
+                                              "repo", "/repo")
+
+    assert document_text(doc) == text
+    assert document_text(doc, {}) == text
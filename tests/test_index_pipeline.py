@@ -0,0 +1,140 @@
+"""
+스트리밍 인덱싱 파이프라인 테스트
+- 청크 단위 추출 → 임베딩 → 업로드 동시 처리와 순서 유지
+- 큐 크기 제한에 의한 backpressure
+- 단계 실패 전파
+"""
+import subprocess
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.document_generator import DocumentGenerator
+from src.index_pipeline import StreamingPipeline
+from src.indexer import CommitIndexer
+
+
+def _git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+@pytest.fixture
+def local_repo(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path / "cache"))
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    _git("init", "-q", cwd=repo_dir)
+    for i in range(7):
+        (repo_dir / f"f{i}.py").write_text(f"def func_{i}():\n    return {i}\n", encoding="utf-8")
+        _git("add", ".", cwd=repo_dir)
+        _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", f"c{i}", cwd=repo_dir)
+    return repo_dir
+
+
+def test_iter_commit_batches_matches_get_commits(local_repo):
+    generator = DocumentGenerator(str(local_repo))
+    try:
+        batches = list(generator.iter_commit_batches(batch_size=3, limit=6))
+        generator._commit_cache.clear()
+        commits = generator.get_commits(limit=6)
+    finally:
+        generator.close()
+
+    assert [len(b) for b in batches] == [3, 3]
+    streamed = [c for b in batches for c in b]
+    assert [c["id"] for c in streamed] == [c["id"] for c in commits]
+    # 청크 경계에서도 이전 커밋과의 관계가 유지됨
+    assert streamed[2]["relation_to_previous"] is not None
+    assert streamed[-1]["relation_to_previous"] is None
+
+
+def test_pipeline_backpressure_and_order():
+    release = threading.Event()
+    produced = []
+
+    def slow_upload(chunk):
+        release.wait(5)
+        return chunk
+
+    pipeline = StreamingPipeline([("embed", lambda c: c), ("upload", slow_upload)], queue_size=1)
+
+    def source():
+        for i in range(10):
+            produced.append(i)
+            yield i
+
+    runner = threading.Thread(target=lambda: produced.append(("result", pipeline.run(source()))))
+    runner.start()
+    time.sleep(0.3)
+    # 업로드가 막혀 있으면 추출도 큐 크기 만큼만 앞서 나감
+    assert len(produced) <= 5
+    release.set()
+    runner.join(5)
+
+    assert produced[-1] == ("result", list(range(10)))
+    assert pipeline.stats["completed"] == 10
+    assert pipeline.stats["first_result_seconds"] is not None
+
+
+def test_pipeline_stage_error_propagates():
+    def failing(chunk):
+        if chunk == 2:
+            raise RuntimeError("embedding failed")
+        return chunk
+
+    pipeline = StreamingPipeline([("embed", failing), ("upload", lambda c: c)], queue_size=1)
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        pipeline.run(iter(range(50)))
+    assert pipeline.stats["produced"] < 50
+
+
+def test_index_repository_uploads_per_chunk(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.indexer.PIPELINE_CHUNK_SIZE", 2)
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path))
+    mock_search = Mock()
+    mock_search.search.return_value = iter([])
+    mock_search.upload_documents.side_effect = lambda documents: [Mock(succeeded=True) for _ in documents]
+    indexer = CommitIndexer(mock_search, Mock(), Mock(), "test-index")
+
+    commits = [
+        {"id": f"commit_{i}", "message": f"m{i}", "author": "t",
+         "date": "2024-01-01T00:00:00Z", "files": [], "parents": []}
+        for i in range(5)
+    ]
+    progress = []
+
+    with patch("src.indexer.DocumentGenerator") as mock_gen_class, \
+            patch("src.indexer.embed_texts", side_effect=lambda texts, client, **kwargs: [[0.1]] * len(texts)):
+        mock_gen_class.return_value.iter_commit_batches.return_value = iter([commits[0:2], commits[2:4], commits[4:]])
+        count = indexer.index_repository("test/repo", limit=5, skip_existing=False,
+                                         progress_callback=lambda *args: progress.append(args))
+
+    assert count == 5
+    assert mock_search.upload_documents.call_count == 3
+    uploaded = [d["id"] for call in mock_search.upload_documents.call_args_list for d in call.kwargs["documents"]]
+    assert uploaded == [c["id"] for c in commits]
+    assert progress and progress[-1][0] == 5
+
+
+def test_documents_without_vectors_are_not_uploaded(monkeypatch, tmp_path):
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path))
+    mock_search = Mock()
+    mock_search.upload_documents.side_effect = lambda documents: [Mock(succeeded=True) for _ in documents]
+    indexer = CommitIndexer(mock_search, Mock(), Mock(), "test-index")
+    commits = [
+        {"id": f"commit_{i}", "message": f"m{i}", "author": "t",
+         "date": "2024-01-01T00:00:00Z", "files": [], "parents": []}
+        for i in range(3)
+    ]
+
+    with patch("src.indexer.DocumentGenerator") as mock_gen_class, \
+            patch("src.indexer.embed_texts", return_value=[[0.1], [], [0.3]]):
+        mock_gen_class.return_value.iter_commit_batches.return_value = iter([commits])
+        count = indexer.index_repository("test/repo", skip_existing=False)
+
+    uploaded = mock_search.upload_documents.call_args.kwargs["documents"]
+    assert count == 2
+    assert [d["id"] for d in uploaded] == ["commit_0", "commit_2"]
+    assert all(d["content_vector"] for d in uploaded)
@@ -0,0 +1,80 @@
+"""
+인덱싱 진행 이벤트 테스트
+- 초당 이벤트 수 제한과 종료 이벤트
+- 처리 속도/ETA 계산
+- 인덱싱 실행 중 추출/임베딩/업로드 단계 이벤트
+"""
+from unittest.mock import Mock, patch
+
+from src.index_progress import IndexProgress, format_progress, legacy_progress_sink
+from src.indexer import CommitIndexer
+
+
+def test_events_are_throttled_and_finish_is_always_sent():
+    events = []
+
+    def failing_sink(event):
+        raise RuntimeError("ui gone")
+
+    progress = IndexProgress([events.append, failing_sink], max_events_per_second=0.001)
+    progress.set_total("extract", 1000)
+    for _ in range(1000):
+        progress.advance("extract")
+    progress.advance("embed", 10)
+    final = progress.finish("done", "1000개 인덱싱")
+
+    # 단계별 첫 보고 + 종료 이벤트만 전달 (수신 오류는 무시)
+    assert [e["stage"] for e in events] == ["extract", "embed", "done"]
+    assert events[0]["done"] == 1 and events[0]["total"] == 1000
+    assert final["stages"]["extract"]["done"] == 1000 and final["stages"]["extract"]["percent"] == 100.0
+    assert final["message"] == "1000개 인덱싱"
+
+
+def test_rate_and_eta(monkeypatch):
+    clock = iter([0.0, 10.0, 10.0])
+    monkeypatch.setattr("src.index_progress.time.monotonic", lambda: next(clock))
+    events = []
+    progress = IndexProgress([events.append], max_events_per_second=0)
+    progress.set_total("embed", 400)
+    progress.advance("embed", 100)
+
+    event = events[-1]
+    assert (event["rate"], event["eta_seconds"], event["percent"]) == (10.0, 30.0, 25.0)
+    assert format_progress(event) == "임베딩 100/400 (25.0%, 10.0/s, 약 30초 남음)"
+
+    legacy = []
+    legacy_progress_sink(lambda *args: legacy.append(args))(event)
+    assert legacy == [(100, 400, event["message"])]
+
+
+def test_index_repository_reports_every_stage(monkeypatch, tmp_path):
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setenv("INDEX_WATERMARK", "false")
+    monkeypatch.setattr("src.indexer.PIPELINE_CHUNK_SIZE", 2)
+    mock_search = Mock()
+    mock_search.search.return_value = iter([])
+    mock_search.upload_documents.side_effect = lambda documents: [Mock(succeeded=True) for _ in documents]
+    indexer = CommitIndexer(mock_search, Mock(), Mock(), "test-index")
+    commits = [
+        {"id": f"commit_{i}", "message": f"m{i}", "author": "t",
+         "date": "2024-01-01T00:00:00Z", "files": [], "parents": []}
+        for i in range(5)
+    ]
+
+    def fake_embed(texts, client, on_progress=None, **kwargs):
+        on_progress(len(texts) - 1)  # 중복 텍스트는 한 번만 요청된 것처럼
+        return [[0.1]] * len(texts)
+
+    events = []
+    with patch("src.indexer.DocumentGenerator") as mock_gen_class, \
+            patch("src.indexer.embed_texts", side_effect=fake_embed):
+        mock_gen_class.return_value.iter_commit_batches.return_value = iter([commits[0:2], commits[2:4], commits[4:]])
+        count = indexer.index_repository("test/repo", limit=5, skip_existing=False,
+                                         on_progress=events.append, progress_events_per_second=0)
+
+    assert count == 5
+    assert {"extract", "embed", "upload"} <= {e["stage"] for e in events}
+    final = events[-1]
+    assert final["stage"] == "done" and (final["done"], final["total"]) == (5, 5)
+    assert all(final["stages"][stage]["done"] == 5 for stage in ("extract", "embed", "upload"))
+    assert all(final["stages"][stage]["total"] == 5 for stage in ("extract", "embed", "upload"))
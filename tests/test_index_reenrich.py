@@ -0,0 +1,175 @@
+"""
+재보강(메타데이터 merge) 테스트
+- 커밋 캐시로 메타데이터 필드만 다시 계산해 merge
+- 임베딩 텍스트가 바뀐 문서(content_hash 불일치)만 다시 임베딩
+- 해시가 없는 이전 문서는 텍스트 원본 필드가 같으면 해시만 채우고, 다르면 다시 임베딩
+- 문서 식별/소속 필드와 다른 저장소 문서는 그대로 유지
+"""
+import re
+import subprocess
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.document_generator import DocumentGenerator
+from src.embedding_cache import text_key
+from src.index_manifest import IndexManifest
+from src.indexer import CommitIndexer, CONTENT_HASH_FIELD, normalize_repo_identifier
+
+
+class _Results(list):
+    def get_count(self):
+        return len(self)
+
+
+class _MemoryIndex:
+    """search.in / repo_id 필터와 upload/merge만 흉내 내는 메모리 인덱스"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def search(self, search_text="*", filter=None, select=None, top=None, **kwargs):
+        ids = re.search(r"search\.in\(id, '([^']*)'", filter or "")
+        repo = re.search(r"repo_id eq '([^']+)'", filter or "")
+        matched = [d for d in self.docs.values()
+                   if (not ids or d["id"] in ids.group(1).split(","))
+                   and (not repo or d.get("repo_id") == repo.group(1))]
+        docs = [{k: v for k, v in d.items() if not select or k in select} for d in matched]
+        return _Results(docs[:top] if top is not None else docs)
+
+    def upload_documents(self, documents):
+        for doc in documents:
+            self.docs[doc["id"]] = dict(doc)
+        return [Mock(succeeded=True, key=d["id"], status_code=201) for d in documents]
+
+    def merge_documents(self, documents):
+        for doc in documents:
+            self.docs[doc["id"]].update(doc)
+        return [Mock(succeeded=True, key=d["id"], status_code=200) for d in documents]
+
+
+def _git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("EMBEDDING_CACHE", "false")
+    monkeypatch.setenv("INDEX_SHARED_HISTORY", "false")
+    path = tmp_path / "repo"
+    path.mkdir()
+    _git("init", "-q", cwd=path)
+    shas = []
+    # 함수 추가 2개 + 기존 함수 수정 1개 (수정만 있는 커밋은 저장된 필드로 임베딩 텍스트를 그대로 복원 가능)
+    for name, source, message in [("m0.py", "def f0():\n    return 0\n", "add f0"),
+                                  ("m1.py", "def f1():\n    return 1\n", "add f1"),
+                                  ("m0.py", "def f0():\n    return 10\n", "change f0")]:
+        (path / name).write_text(source, encoding="utf-8")
+        _git("add", ".", cwd=path)
+        _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", message, cwd=path)
+        shas.append(_git("rev-parse", "HEAD", cwd=path))
+    return str(path), shas
+
+
+def test_re_enrich_merges_metadata_and_re_embeds_only_changed_text(repo):
+    path, shas = repo
+    index = _MemoryIndex()
+    embedded = []
+
+    def fake_embed(texts, client, **kwargs):
+        embedded.append(list(texts))
+        return [[float(len(embedded))]] * len(texts)
+
+    indexer = CommitIndexer(index, Mock(), Mock(), "test-index")
+    with patch("src.indexer.embed_texts", side_effect=fake_embed):
+        assert indexer.index_repository(path) == 3
+        assert all(index.docs[sha][CONTENT_HASH_FIELD] for sha in shas)
+        # 임베딩 텍스트는 인덱스가 아니라 로컬 매니페스트에 해시 키로 보관
+        stored_texts = IndexManifest().get_texts(index.docs[sha][CONTENT_HASH_FIELD] for sha in shas)
+        assert sorted(stored_texts.values()) == sorted(embedded[0])
+        index.docs["other"] = {"id": "other", "repo_id": "github.com/other/repo", "message": "x"}
+
+        # 분석 개선을 커밋 캐시로 흉내: 임베딩 텍스트에 들어가지 않는 필드 / 들어가는 필드 / 해시 없는 이전 문서
+        generator = DocumentGenerator(path)
+        generator._commit_cache[shas[0]]["change_context"]["impact_scope"] = ["api", "db"]
+        generator._commit_cache[shas[1]]["message"] = "add f1 (reworded)"
+        generator._save_commit_cache()
+        generator.close()
+        indexed_hash = index.docs[shas[2]].pop(CONTENT_HASH_FIELD)
+        before = {sha: index.docs[sha]["content_vector"] for sha in shas}
+
+        stats = indexer.re_enrich_repository(path, batch_size=2)
+
+    assert stats == {"scanned": 3, "matched": 3, "updated": 3, "re_embedded": 1, "hash_backfilled": 1,
+                     "embed_failed": 0, "missing": 0, "failed": 0}
+    assert len(embedded[1:]) == 1 and "add f1 (reworded)" in embedded[1][0]
+    assert index.docs[shas[1]][CONTENT_HASH_FIELD] == text_key(embedded[1][0])
+    calls = len(embedded)
+
+    assert index.docs[shas[0]]["impact_scope"] == "api; db"
+    assert index.docs[shas[0]]["content_vector"] == before[shas[0]]
+    assert index.docs[shas[1]]["message"] == "add f1 (reworded)"
+    assert index.docs[shas[1]]["content_vector"] != before[shas[1]]
+    # 해시가 없던 이전 문서: 텍스트가 그대로이므로 벡터는 유지하고 해시만 채움
+    assert index.docs[shas[2]][CONTENT_HASH_FIELD] == indexed_hash
+    assert index.docs[shas[2]]["content_vector"] == before[shas[2]]
+    for sha in shas:
+        assert index.docs[sha]["repo_id"] == normalize_repo_identifier(path)
+        assert index.docs[sha]["repository_path"] == path
+    assert index.docs["other"] == {"id": "other", "repo_id": "github.com/other/repo", "message": "x"}
+
+    # 바뀐 것이 없으면 메타데이터 merge만 하고 임베딩하지 않음
+    with patch("src.indexer.embed_texts", side_effect=fake_embed):
+        again = indexer.re_enrich_repository(path)
+    assert (again["updated"], again["re_embedded"], again["hash_backfilled"]) == (3, 0, 0)
+    assert len(embedded) == calls
+
+    # 해시가 없는 이전 문서: 저장 필드가 다르거나, 복원할 수 없는 추가된 함수 목록이 텍스트에 있으면 다시 임베딩
+    del index.docs[shas[0]][CONTENT_HASH_FIELD]
+    index.docs[shas[0]]["message"] = "stale message"
+    del index.docs[shas[1]][CONTENT_HASH_FIELD]
+    with patch("src.indexer.embed_texts", side_effect=fake_embed):
+        legacy = indexer.re_enrich_repository(path)
+    assert (legacy["re_embedded"], legacy["hash_backfilled"]) == (2, 0)
+    assert index.docs[shas[0]]["message"] == "add f0"
+    assert sorted(index.docs[sha][CONTENT_HASH_FIELD] for sha in shas[:2]) == sorted(map(text_key, embedded[-1]))
+    assert index.docs[shas[0]]["content_vector"] != before[shas[0]]
+
+
+def test_reanalyze_keeps_relation_to_previous_commit_of_merges(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("EMBEDDING_CACHE", "false")
+    monkeypatch.setenv("INDEX_SHARED_HISTORY", "false")
+    path = tmp_path / "merges"
+    path.mkdir()
+    _git("init", "-q", "-b", "main", cwd=path)
+
+    def commit(author, name, *args):
+        (path / name).write_text(f"{name}\n", encoding="utf-8")
+        _git("add", ".", cwd=path)
+        _git("-c", f"user.name={author}", "-c", f"user.email={author}@t", "commit", "-q", "-m", name, *args,
+             cwd=path)
+
+    commit("m", "c0")
+    _git("checkout", "-q", "-b", "side", cwd=path)
+    commit("b", "b1")
+    _git("checkout", "-q", "main", cwd=path)
+    commit("m", "m1")
+    _git("-c", "user.name=m", "-c", "user.email=m@t", "merge", "-q", "--no-ff", "side", "-m", "merge", cwd=path)
+    merge_sha = _git("rev-parse", "HEAD", cwd=path)
+
+    index = _MemoryIndex()
+    indexer = CommitIndexer(index, Mock(), Mock(), "test-index")
+    with patch("src.indexer.embed_texts", side_effect=lambda texts, client, **kwargs: [[0.5]] * len(texts)):
+        assert indexer.index_repository(str(path)) == 4
+        indexed = dict(index.docs[merge_sha])
+        # 인덱싱은 topo 순서의 다음 커밋(side 브랜치의 b1)을 이전 커밋으로 분석
+        assert indexed["same_author_as_prev"] is False
+
+        stats = indexer.re_enrich_repository(str(path), reanalyze=True)
+
+    assert stats["re_embedded"] == 0 and stats["missing"] == 0
+    assert index.docs[merge_sha] == indexed
@@ -0,0 +1,153 @@
+"""
+인덱싱 스케줄러 테스트
+- 우선순위와 저장소 간 공정한 순서
+- 전체/저장소별 동시 실행 제한
+- 실패 재시도와 끊긴 작업 복구
+- 실행 중인 저장소끼리 임베딩 할당량 분배
+- 실행 중인 작업의 협조적 취소
+"""
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from src.cancellation import IndexingCancelled
+from src.embedding_engine import EmbeddingEngine, RateLimiter, quota_tenant
+from src.index_scheduler import (
+    JOB_CANCELLED, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, IndexJobQueue, IndexScheduler,
+)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return IndexJobQueue(str(tmp_path / "jobs.db"))
+
+
+def test_priority_then_least_recently_run_repository(queue):
+    a = queue.enqueue("https://github.com/org/a")
+    b = queue.enqueue("https://github.com/org/b")
+    c = queue.enqueue("https://github.com/org/c", priority=5)
+    assert queue.enqueue("https://github.com/org/a", priority=1) == a  # 대기 중 작업은 중복 등록하지 않음
+
+    first = queue.claim("w", max_running=1)
+    assert first["id"] == c
+    assert queue.claim("w", max_running=1) is None  # 전체 동시 실행 제한
+    queue.complete(c, {"indexed": 3})
+
+    assert queue.claim("w", max_running=1)["id"] == a
+    queue.complete(a)
+    # a를 다시 등록해도 최근에 실행된 적 없는 b가 먼저
+    queue.enqueue("https://github.com/org/a", priority=1)
+    assert queue.enqueue("https://github.com/org/b", priority=1) == b
+    assert queue.claim("w", max_running=1)["id"] == b
+    assert queue.get(c)["result"] == {"indexed": 3}
+
+
+def test_per_repository_limit(queue):
+    first = queue.enqueue("https://github.com/org/a", params={"limit": 10})
+    second = queue.enqueue("https://github.com/org/a", params={"limit": 20})
+    other = queue.enqueue("https://github.com/org/b")
+
+    assert queue.claim("w", max_running=5, per_repo_limit=1)["id"] == first
+    assert queue.claim("w", max_running=5, per_repo_limit=1)["id"] == other
+    assert queue.claim("w", max_running=5, per_repo_limit=1) is None
+    queue.complete(first)
+    assert queue.claim("w", max_running=5, per_repo_limit=1)["id"] == second
+    assert queue.summary()[JOB_RUNNING] == 2
+
+
+def test_retry_failure_and_stale_recovery(queue):
+    job_id = queue.enqueue("https://github.com/org/a", max_attempts=2)
+    queue.claim("w", max_running=1)
+    assert queue.fail(job_id, "boom", retry_delay=60) is True
+    assert queue.claim("w", max_running=1) is None  # 재시도 지연 중
+
+    queue._connect().execute("UPDATE jobs SET not_before = 0 WHERE id = ?", (job_id,))
+    queue.claim("w", max_running=1)
+    assert queue.fail(job_id, "boom again") is False
+    assert queue.get(job_id)["state"] == JOB_FAILED
+
+    stale = queue.enqueue("https://github.com/org/b")
+    queue.claim("w", max_running=1)
+    queue._connect().execute("UPDATE jobs SET heartbeat_at = 0 WHERE id = ?", (stale,))
+    assert queue.recover_stale(stale_after=60) == 1
+    assert queue.get(stale)["state"] == JOB_QUEUED
+    assert queue.cancel(stale) is True
+
+
+def test_scheduler_runs_jobs_concurrently_within_quota_tenants(queue):
+    repos = [f"https://github.com/org/r{i}" for i in range(4)]
+    for repo in repos:
+        queue.enqueue(repo, params={"limit": 5})
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+    attempts = {}
+    tenants = []
+
+    def index_repository(repo_path, limit=None, on_progress=None, cancel_token=None, progress_events_per_second=None):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            attempts[repo_path] = attempts.get(repo_path, 0) + 1
+        tenants.append(EmbeddingEngine(Mock(), "m", limiter=RateLimiter()).tenant)
+        on_progress({"stage": "done", "done": limit, "total": limit, "message": "done"})
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        if repo_path == repos[0] and attempts[repo_path] == 1:
+            raise RuntimeError("transient")
+        return limit
+
+    scheduler = IndexScheduler(queue, lambda: Mock(index_repository=index_repository),
+                               max_concurrent=2, poll_interval=0.01, retry_delay=0)
+    stats = scheduler.run(until_idle=True)
+
+    assert stats == {"succeeded": 4, "failed": 0, "retried": 1, "cancelled": 0, "documents": 20}
+    assert active["peak"] == 2
+    assert all(job["state"] == JOB_SUCCEEDED for job in queue.list_jobs())
+    assert queue.list_jobs(repo_path=repos[1])[0]["progress"]["message"] == "done"
+    assert len(set(tenants)) == 4 and None not in tenants
+
+
+def test_quota_is_split_between_active_tenants():
+    limiter = RateLimiter(tokens_per_minute=600, requests_per_minute=60)
+    with quota_tenant("a", limiter):
+        assert limiter.tenant_share("a") == {"tokens_per_minute": 600, "requests_per_minute": 60}
+        with quota_tenant("b", limiter):
+            assert limiter.tenant_share("a") == {"tokens_per_minute": 300, "requests_per_minute": 30}
+            engine = EmbeddingEngine(Mock(), "m", limiter=limiter)
+            assert engine.tenant == "b"
+        assert limiter.tenant_share("b") is None
+        assert limiter.tenant_share("a")["tokens_per_minute"] == 600
+    assert EmbeddingEngine(Mock(), "m", limiter=limiter).tenant is None
+
+
+def test_running_job_is_cancelled_cooperatively(queue):
+    job_id = queue.enqueue("https://github.com/org/a", params={"limit": 5, "max_seconds": 60})
+    started = threading.Event()
+    budgets = {}
+
+    def index_repository(repo_path, limit=None, on_progress=None, cancel_token=None, progress_events_per_second=None):
+        budgets["deadline"] = cancel_token.deadline
+        started.set()
+        while not cancel_token.wait(0.01):
+            pass
+        raise IndexingCancelled(cancel_token.reason, indexed=2)
+
+    def cancel_when_running():
+        started.wait(5)
+        assert queue.cancel(job_id) is True
+
+    canceller = threading.Thread(target=cancel_when_running)
+    canceller.start()
+    scheduler = IndexScheduler(queue, lambda: Mock(index_repository=index_repository),
+                               max_concurrent=1, poll_interval=0.01, retry_delay=0)
+    stats = scheduler.run(until_idle=True)
+    canceller.join()
+
+    job = queue.get(job_id)
+    assert stats["cancelled"] == 1 and stats["retried"] == 0
+    assert job["state"] == JOB_CANCELLED and job["error"] == "cancelled by request"
+    assert job["result"]["indexed"] == 2
+    assert budgets["deadline"] is not None
@@ -0,0 +1,165 @@
+"""
+워터마크 기반 증분 인덱싱 테스트
+- 새 커밋(old_tip..new_tip)과 과거 보강 범위 계산
+- 강제 푸시 감지와 고아 커밋
+- 두 번째 실행은 새 커밋만 추출/임베딩
+- shallow 클론된 원격 저장소도 두 번째 실행에서 과거 커밋을 보강
+"""
+import subprocess
+from unittest.mock import Mock, patch
+
+import git
+import pytest
+
+from src.index_manifest import IndexManifest
+from src.index_watermark import plan_watermark_range
+from src.indexer import CommitIndexer, normalize_repo_identifier
+from src.repo_cache import RepoCloneCache
+
+
+def _git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _commit(repo_dir, name):
+    (repo_dir / f"{name}.py").write_text(f"def {name}():\n    return '{name}'\n", encoding="utf-8")
+    _git("add", ".", cwd=repo_dir)
+    _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", name, cwd=repo_dir)
+    return _git("rev-parse", "HEAD", cwd=repo_dir)
+
+
+@pytest.fixture
+def repo_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "repo"
+    path.mkdir()
+    _git("init", "-q", cwd=path)
+    return path
+
+
+def test_forward_range_and_backfill(repo_dir):
+    shas = [_commit(repo_dir, f"c{i}") for i in range(8)]
+    repo = git.Repo(repo_dir)
+
+    first = plan_watermark_range(repo, shas[-1], None, 3)
+    assert first["shas"] == shas[:-4:-1]
+    assert first["tips"] == [shas[-1]] and first["frontier"] == [shas[4]]
+
+    new = [_commit(repo_dir, f"n{i}") for i in range(2)]
+    second = plan_watermark_range(repo, new[-1], first, 3)
+    assert second["shas"] == new[::-1]
+    assert (second["forward"], second["backfill"], second["covered"]) == (2, 0, 5)
+
+    # 범위를 넓히면 frontier부터 부족한 만큼만 과거로 확장
+    third = plan_watermark_range(repo, new[-1], second, 7)
+    assert third["shas"] == [shas[4], shas[3]]
+    assert third["frontier"] == [shas[2]]
+
+    assert plan_watermark_range(repo, new[-1], third, 7)["shas"] == []
+    full = plan_watermark_range(repo, new[-1], third, None)
+    assert full["shas"] == shas[2::-1] and full["frontier"] == []
+
+
+def test_forward_range_larger_than_limit_resumes_next_run(repo_dir):
+    base = _commit(repo_dir, "base")
+    repo = git.Repo(repo_dir)
+    watermark = plan_watermark_range(repo, base, None, 5)
+    new = [_commit(repo_dir, f"n{i}") for i in range(5)]
+
+    partial = plan_watermark_range(repo, new[-1], watermark, 2)
+    assert partial["shas"] == [new[1], new[0]]
+    rest = plan_watermark_range(repo, new[-1], partial, 2)
+    assert rest["shas"] == [new[3], new[2]]
+    final = plan_watermark_range(repo, new[-1], rest, 2)
+    assert final["shas"] == [new[4]]
+    assert final["tips"] == [new[-1]]
+
+
+def test_force_push_reports_orphans(repo_dir):
+    shas = [_commit(repo_dir, f"c{i}") for i in range(5)]
+    repo = git.Repo(repo_dir)
+    watermark = plan_watermark_range(repo, shas[-1], None, None)
+
+    _git("reset", "-q", "--hard", shas[2], cwd=repo_dir)
+    rewritten = _commit(repo_dir, "rewritten")
+    plan = plan_watermark_range(repo, rewritten, watermark, None)
+
+    assert plan["rewritten"]
+    assert set(plan["orphans"]) == {shas[3], shas[4]}
+    assert plan["shas"] == [rewritten]
+    assert plan["covered"] == 4
+
+
+def test_second_run_extracts_only_new_commits(repo_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("INDEX_SHARED_HISTORY", "false")  # 포크 간 공유 커밋 조회 없이 매니페스트만 사용
+    for i in range(4):
+        _commit(repo_dir, f"c{i}")
+
+    manifest = IndexManifest(str(tmp_path / "manifest.db"))
+    manifest.mark_reconciled("test-index", normalize_repo_identifier(str(repo_dir)))
+    mock_search = Mock()
+    mock_search.upload_documents.side_effect = lambda documents: [Mock(succeeded=True) for _ in documents]
+    indexer = CommitIndexer(mock_search, Mock(), Mock(), "test-index", manifest=manifest)
+    embedded = []
+
+    def fake_embed(texts, client, **kwargs):
+        embedded.append(len(texts))
+        return [[0.5]] * len(texts)
+
+    with patch("src.indexer.embed_texts", side_effect=fake_embed), \
+            patch("src.document_generator.DocumentGenerator._extract_commit", autospec=True,
+                  side_effect=lambda self, commit, previous: (
+                      {"id": commit.hexsha, "message": commit.message, "author": "t",
+                       "date": "2024-01-01T00:00:00+00:00", "files": [], "parents": []}, False)) as extract:
+        assert indexer.index_repository(str(repo_dir), limit=10) == 4
+        new_sha = _commit(repo_dir, "new")
+        extract.reset_mock()
+        assert indexer.index_repository(str(repo_dir), limit=10) == 1
+
+    assert [call.args[1].hexsha for call in extract.call_args_list] == [new_sha]
+    assert embedded == [4, 1]
+    mock_search.search.assert_not_called()
+
+
+def test_shallow_remote_deepens_only_as_needed_and_backfills_on_second_run(repo_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("INDEX_SHARED_HISTORY", "false")
+    monkeypatch.setenv("EMBEDDING_CACHE", "false")
+    for i in range(150):
+        _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "--allow-empty", "-m", f"c{i}",
+             cwd=repo_dir)
+    shas = _git("rev-list", "--reverse", "HEAD", cwd=repo_dir).split()
+    url = f"file://{repo_dir}"
+    cached_path = RepoCloneCache().get_or_clone(url)  # 기본 depth=50 shallow 클론
+
+    def cloned_count():
+        return int(_git("rev-list", "--count", "HEAD", cwd=cached_path))
+
+    assert cloned_count() == 50
+
+    manifest = IndexManifest(str(tmp_path / "manifest.db"))
+    repo_id = normalize_repo_identifier(url)
+    manifest.mark_reconciled("test-index", repo_id)
+    mock_search = Mock()
+    mock_search.upload_documents.side_effect = lambda documents: [Mock(succeeded=True) for _ in documents]
+    indexer = CommitIndexer(mock_search, Mock(), Mock(), "test-index", manifest=manifest)
+
+    with patch("src.indexer.embed_texts", side_effect=lambda texts, client, **kwargs: [[0.5]] * len(texts)), \
+            patch("src.document_generator.DocumentGenerator._extract_commit", autospec=True,
+                  side_effect=lambda self, commit, previous: (
+                      {"id": commit.hexsha, "message": commit.message, "author": "t",
+                       "date": "2024-01-01T00:00:00+00:00", "files": [], "parents": []}, False)) as extract:
+        assert indexer.index_repository(url, limit=50) == 50
+        # 범위가 shallow 경계에 걸리면 전체 히스토리가 아니라 limit개만 더 받아 경계 아래 frontier를 기록
+        assert _git("rev-parse", "--is-shallow-repository", cwd=cached_path) == "true"
+        assert cloned_count() == 100
+        watermark = manifest.get_watermark("test-index", repo_id)
+        assert watermark["covered"] == 50 and watermark["frontier"] == [shas[99]]
+
+        extract.reset_mock()
+        assert indexer.index_repository(url, limit=80) == 30
+
+    assert [call.args[1].hexsha for call in extract.call_args_list] == shas[99:69:-1]
+    assert manifest.get_watermark("test-index", repo_id)["frontier"] == [shas[69]]
+    assert cloned_count() == 100
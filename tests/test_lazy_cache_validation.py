@@ -0,0 +1,106 @@
+"""
+RepoCloneCache 지연 검증 테스트
+- 초기화 시 git.Repo / git config 호출 없음
+- 첫 접근 시 해당 항목만 검증
+- 백그라운드 전체 검증은 시간 예산을 지킴
+"""
+import os
+from datetime import datetime, timedelta
+
+import git
+import pytest
+
+from src.cache_metadata_store import CacheMetadataStore
+from src.repo_cache import RepoCloneCache
+
+
+def _seed(cache_root, entries):
+    store = CacheMetadataStore(str(cache_root / "cache_metadata.db"))
+    for key, entry in entries.items():
+        store.put(key, entry)
+    store.close()
+
+
+@pytest.fixture
+def seeded_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("REPO_CACHE_BACKGROUND_SWEEP", "false")
+
+    repos_dir = tmp_path / "repos"
+    valid_path = repos_dir / "valid0000000"
+    git.Repo.init(str(valid_path)).close()
+
+    now = datetime.now()
+    fresh = now.isoformat()
+    old = (now - timedelta(days=30)).isoformat()
+    _seed(tmp_path, {
+        "valid0000000": {"url": "https://example.com/valid", "path": str(valid_path),
+                         "created_at": fresh, "last_accessed": fresh},
+        "missing00000": {"url": "https://example.com/missing", "path": str(repos_dir / "missing00000"),
+                         "created_at": fresh, "last_accessed": fresh},
+        "expired00000": {"url": "https://example.com/expired", "path": str(repos_dir / "expired00000"),
+                         "created_at": old, "last_accessed": old},
+    })
+
+    RepoCloneCache.reset_instance()
+    yield tmp_path
+    RepoCloneCache.reset_instance()
+
+
+def test_initialize_does_not_touch_git(seeded_cache, monkeypatch):
+    opened = []
+    monkeypatch.setattr(git, "Repo", lambda *a, **k: opened.append(a))
+    monkeypatch.setattr(
+        RepoCloneCache, "_configure_git_safe_directory",
+        lambda self: pytest.fail("git config must not run during initialization")
+    )
+
+    cache = RepoCloneCache()
+
+    assert opened == []
+    assert len(cache._cache) == 3
+    metrics = cache.get_startup_metrics()
+    assert metrics["init_seconds"] is not None
+    assert metrics["sweep"]["status"] == "not_started"
+
+
+def test_entries_validated_lazily_on_first_access(seeded_cache):
+    cache = RepoCloneCache()
+
+    assert cache._ensure_entry_validated("valid0000000") is True
+    assert cache._ensure_entry_validated("missing00000") is False
+    assert cache._ensure_entry_validated("expired00000") is False
+
+    assert set(cache._cache) == {"valid0000000"}
+    assert cache.get_startup_metrics()["lazy_validations"] == 3
+
+    # 두 번째 접근은 재검증하지 않음
+    cache._ensure_entry_validated("valid0000000")
+    assert cache.get_startup_metrics()["lazy_validations"] == 3
+
+
+def test_background_sweep_respects_time_budget(seeded_cache):
+    cache = RepoCloneCache()
+
+    cache._quick_validate_cache(time_budget=-1)
+    sweep = cache.get_startup_metrics()["sweep"]
+    assert sweep["status"] == "budget_exhausted"
+    assert sweep["checked"] == 0
+    assert len(cache._cache) == 3
+
+    cache._quick_validate_cache(time_budget=60)
+    sweep = cache.get_startup_metrics()["sweep"]
+    assert sweep["status"] == "completed"
+    assert sweep["removed"] == 2
+    assert set(cache._cache) == {"valid0000000"}
+    assert "valid0000000" in cache._validated_keys
+
+
+def test_background_sweep_thread_runs(seeded_cache, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_BACKGROUND_SWEEP", "true")
+    cache = RepoCloneCache()
+    cache._sweep_thread.join(timeout=30)
+
+    assert cache.get_startup_metrics()["sweep"]["status"] == "completed"
+    assert set(cache._cache) == {"valid0000000"}
+    assert not os.path.exists(seeded_cache / "repos" / "missing00000")
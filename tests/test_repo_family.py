@@ -0,0 +1,133 @@
+"""
+포크 패밀리 공유 객체 저장소 테스트
+- 업스트림 맵 / 루트 커밋으로 패밀리 판별
+- 두 번째 포크는 공유 저장소에 없는 객체만 가져옴 (alternates)
+- 무효화 시 공유 저장소의 포크 ref 제거
+"""
+import json
+import os
+import subprocess
+
+import git
+import pytest
+
+from src.repo_cache import RepoCloneCache
+from src.repo_family import (
+    family_for_upstream,
+    normalize_repo_url,
+    resolve_configured_family,
+)
+
+
+def _git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+def _commit(repo_dir, name, content):
+    with open(os.path.join(repo_dir, name), "w", encoding="utf-8") as f:
+        f.write(content)
+    _git("add", name, cwd=repo_dir)
+    _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", f"update {name}", cwd=repo_dir)
+
+
+def _local_object_count(repo_path):
+    out = _git("count-objects", "-v", cwd=repo_path)
+    stats = dict(line.split(": ") for line in out.splitlines())
+    return int(stats["count"]) + int(stats["in-pack"])
+
+
+@pytest.fixture
+def forks(tmp_path):
+    """업스트림(20커밋)과 각자 1커밋씩 추가한 포크 2개"""
+    upstream = tmp_path / "src" / "upstream"
+    upstream.mkdir(parents=True)
+    _git("init", "-q", "-b", "main", cwd=upstream)
+    for i in range(20):
+        _commit(upstream, f"file{i}.txt", f"content {i}\n" * 50)
+
+    urls = {}
+    for name in ("fork_a", "fork_b"):
+        work = tmp_path / "src" / name
+        _git("clone", "-q", str(upstream), str(work))
+        _commit(work, f"{name}.txt", f"{name} only\n")
+        bare = tmp_path / "src" / f"{name}.git"
+        _git("clone", "-q", "--bare", str(work), str(bare))
+        urls[name] = bare.as_uri()
+    urls["upstream"] = upstream.as_uri()
+    return urls
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("REPO_CACHE_BACKGROUND_SWEEP", "false")
+    RepoCloneCache.reset_instance()
+    yield RepoCloneCache()
+    RepoCloneCache.reset_instance()
+
+
+def test_upstream_map_resolution(monkeypatch, tmp_path):
+    mapping = {"https://github.com/me/proj.git": "https://github.com/org/proj"}
+    map_file = tmp_path / "upstreams.json"
+    map_file.write_text(json.dumps(mapping), encoding="utf-8")
+    monkeypatch.setenv("REPO_CACHE_UPSTREAM_MAP", str(map_file))
+
+    family = family_for_upstream("https://github.com/org/proj")
+    assert normalize_repo_url("git@github.com:Me/proj.git") == "github.com/me/proj"
+    assert resolve_configured_family("git@github.com:me/proj.git") == family
+    assert resolve_configured_family("https://github.com/org/proj/") == family
+    assert resolve_configured_family("https://github.com/other/proj") is None
+
+
+def test_second_fork_reuses_shared_objects(forks, cache, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_UPSTREAM_MAP", json.dumps({
+        forks["fork_a"]: forks["upstream"],
+        forks["fork_b"]: forks["upstream"],
+    }))
+    family = family_for_upstream(forks["upstream"])
+
+    path_a = cache.get_or_clone(forks["fork_a"])
+    path_b = cache.get_or_clone(forks["fork_b"])
+
+    # 두 포크 모두 공유 저장소를 참조하고 로컬 객체는 중복 보관하지 않음
+    shared_objects = os.path.join(cache._shared_store.path_for(family), "objects")
+    for path in (path_a, path_b):
+        with open(os.path.join(path, ".git", "objects", "info", "alternates"), encoding="utf-8") as f:
+            assert shared_objects in f.read()
+        assert _local_object_count(path) == 0
+        _git("fsck", "--connectivity-only", cwd=path)
+
+    assert "update fork_b.txt" in _git("log", "-1", "--format=%s", cwd=path_b)
+    assert os.path.exists(os.path.join(path_b, "file0.txt"))
+
+    info = cache.get_cache_info()
+    assert info["shared_families"] == [family]
+    assert {r["family"] for r in info["repos"]} == {family}
+    assert cache.get_family_key(forks["fork_b"]) == family
+
+
+def test_full_clone_detects_root_family(forks, cache, monkeypatch):
+    monkeypatch.delenv("REPO_CACHE_UPSTREAM_MAP", raising=False)
+
+    path_a = cache.get_or_clone(forks["fork_a"], depth=0)
+    path_b = cache.get_or_clone(forks["fork_b"], depth=0)
+
+    family_a = cache.get_family_key(forks["fork_a"])
+    assert family_a and family_a.startswith("root-")
+    assert cache.get_family_key(forks["fork_b"]) == family_a
+    assert _local_object_count(path_b) == 0
+    _git("fsck", "--connectivity-only", cwd=path_a)
+
+
+def test_invalidation_removes_fork_ref(forks, cache, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_UPSTREAM_MAP", json.dumps({forks["fork_a"]: forks["upstream"]}))
+    family = family_for_upstream(forks["upstream"])
+    cache.get_or_clone(forks["fork_a"])
+
+    cache_key = cache._get_cache_key(forks["fork_a"])
+    shared = git.Repo(cache._shared_store.path_for(family))
+    assert shared.git.for_each_ref("refs/forks/").strip()
+
+    cache._invalidate_cache(cache_key)
+    assert not shared.git.for_each_ref("refs/forks/").strip()
+    shared.close()
@@ -0,0 +1,116 @@
+"""
+캐시 저장소 백그라운드 유지보수 테스트
+- loose 객체 정리 및 commit-graph 생성
+- 유휴 저장소만 대상, CPU 예산 준수
+- 클론/fetch 중인(저장소 잠금 사용 중) 저장소는 건너뜀
+- 항목별 last_maintenance / pack_count 노출
+"""
+import os
+import subprocess
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.cache_metadata_store import CacheMetadataStore
+from src.repo_cache import RepoCloneCache
+from src.repo_maintenance import maintain_repository, objects_dir
+
+
+def _git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+def _loose_count(repo_path):
+    out = _git("count-objects", "-v", cwd=repo_path)
+    return int(dict(line.split(": ") for line in out.splitlines())["count"])
+
+
+@pytest.fixture
+def fragmented_clone(tmp_path):
+    """커밋 30개 원격을 shallow 클론 후 depth를 늘려가며 fetch한 저장소"""
+    upstream = tmp_path / "upstream"
+    upstream.mkdir()
+    _git("init", "-q", cwd=upstream)
+    for i in range(30):
+        (upstream / f"f{i}.txt").write_text(f"{i}\n", encoding="utf-8")
+        _git("add", ".", cwd=upstream)
+        _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", f"c{i}", cwd=upstream)
+
+    clone = tmp_path / "clone"
+    _git("clone", "-q", "--depth", "5", upstream.as_uri(), str(clone))
+    for depth in (10, 15, 20, 30):
+        _git("fetch", "-q", "--depth", str(depth), cwd=clone)
+    return clone
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch, fragmented_clone):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("REPO_CACHE_BACKGROUND_SWEEP", "false")
+    monkeypatch.setenv("REPO_CACHE_MAINTENANCE", "false")
+
+    now = datetime.now()
+    store = CacheMetadataStore(str(tmp_path / "cache" / "cache_metadata.db"))
+    store.put("idle00000000", {
+        "url": "https://example.com/idle", "path": str(fragmented_clone),
+        "created_at": now.isoformat(), "last_accessed": (now - timedelta(hours=1)).isoformat(),
+    })
+    store.put("busy00000000", {
+        "url": "https://example.com/busy", "path": str(fragmented_clone),
+        "created_at": now.isoformat(), "last_accessed": now.isoformat(),
+    })
+    store.close()
+
+    RepoCloneCache.reset_instance()
+    yield RepoCloneCache()
+    RepoCloneCache.reset_instance()
+
+
+def test_maintain_repository_packs_loose_objects(fragmented_clone):
+    assert _loose_count(fragmented_clone) > 0
+
+    report = maintain_repository(str(fragmented_clone))
+    # loose-objects 작업은 팩 생성 → 다음 실행에서 loose 제거
+    maintain_repository(str(fragmented_clone))
+
+    assert report["ok"]
+    assert _loose_count(fragmented_clone) == 0
+    assert os.path.exists(os.path.join(objects_dir(str(fragmented_clone)), "pack", "multi-pack-index"))
+    _git("fsck", "--connectivity-only", cwd=fragmented_clone)
+
+
+def test_only_idle_repos_are_maintained(cache, tmp_path):
+    metrics = cache.run_maintenance(cpu_budget=60)
+
+    assert metrics["status"] == "completed"
+    assert metrics["repos_maintained"] == 1
+    assert "last_maintenance" in cache._cache["idle00000000"]
+    assert "last_maintenance" not in cache._cache["busy00000000"]
+
+    # 메타데이터 저장소와 get_cache_info 에 반영
+    stored = CacheMetadataStore(cache._cache_file).get("idle00000000")
+    assert stored["pack_count"] >= 1
+    repos = {r["cache_key"]: r for r in cache.get_cache_info()["repos"]}
+    assert repos["idle00000000"]["pack_count"] == stored["pack_count"]
+    assert repos["busy00000000"]["last_maintenance"] is None
+
+    # 주기가 지나지 않은 저장소는 다시 수행하지 않음
+    assert cache.run_maintenance(cpu_budget=60)["repos_maintained"] == 0
+
+
+def test_cpu_budget_stops_cycle(cache):
+    metrics = cache.run_maintenance(cpu_budget=0, force=True)
+
+    assert metrics["status"] == "budget_exhausted"
+    assert metrics["repos_maintained"] == 0
+    assert cache.get_cache_info()["maintenance"]["status"] == "budget_exhausted"
+
+
+def test_repo_locked_by_clone_or_fetch_is_skipped(cache):
+    key_lock = cache._get_key_lock("idle00000000")
+    with key_lock:
+        metrics = cache.run_maintenance(cpu_budget=60)
+
+    assert metrics["repos_maintained"] == 0 and metrics["repos_busy"] == 1
+    assert "last_maintenance" not in cache._cache["idle00000000"]
+    assert cache.run_maintenance(cpu_budget=60)["repos_maintained"] == 1
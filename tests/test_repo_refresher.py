@@ -0,0 +1,118 @@
+"""
+자주 사용되는 저장소 백그라운드 갱신 테스트
+- 접근 빈도 점수(지수 감쇠)와 상위 저장소 선택
+- 신선도 창 이내 캐시 히트는 fetch 생략
+- 갱신 시 새 커밋의 메타데이터 캐시 준비
+"""
+import hashlib
+import json
+import subprocess
+
+import git
+import pytest
+
+from src.repo_cache import RepoCloneCache
+from src.repo_refresher import AccessTracker
+
+
+def _git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+def _commit(repo_dir, i):
+    (repo_dir / f"f{i}.py").write_text(f"def func_{i}():\n    return {i}\n", encoding="utf-8")
+    _git("add", ".", cwd=repo_dir)
+    _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", f"c{i}", cwd=repo_dir)
+    return _git("rev-parse", "HEAD", cwd=repo_dir).strip()
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    repo_dir = tmp_path / "upstream"
+    repo_dir.mkdir()
+    _git("init", "-q", cwd=repo_dir)
+    for i in range(5):
+        _commit(repo_dir, i)
+    return repo_dir
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("REPO_CACHE_BACKGROUND_SWEEP", "false")
+    monkeypatch.setenv("REPO_CACHE_MAINTENANCE", "false")
+    monkeypatch.setenv("REPO_CACHE_REFRESH", "false")
+    monkeypatch.setenv("REPO_CACHE_REFRESH_INTERVAL_SECONDS", "0.1")
+    RepoCloneCache.reset_instance()
+    yield RepoCloneCache()
+    RepoCloneCache.reset_instance()
+
+
+def _head(path):
+    repo = git.Repo(path)
+    try:
+        return repo.head.commit.hexsha
+    finally:
+        repo.close()
+
+
+def test_access_tracker_decay_and_top():
+    tracker = AccessTracker(half_life_seconds=100)
+    for _ in range(3):
+        tracker.record("hot", now=0)
+    tracker.record("cold", now=0)
+
+    assert tracker.top(5, min_score=2, now=0) == ["hot"]
+    assert tracker.score("hot", now=100) == pytest.approx(1.5)
+    assert tracker.top(5, now=0) == ["hot", "cold"]
+
+
+def test_fresh_hit_skips_fetch(cache, upstream):
+    url = upstream.as_uri()
+    path = cache.get_or_clone(url)
+    first_head = _head(path)
+
+    new_sha = _commit(upstream, 99)
+
+    # 신선도 창 이내: fetch 없이 기존 클론 사용
+    assert cache.get_or_clone(url) == path
+    assert _head(path) == first_head
+
+    # 창이 지나면 fetch 후 갱신
+    cache._fresh_seconds = 0
+    cache.get_or_clone(url)
+    assert _head(path) == new_sha
+
+
+def test_refresh_cycle_updates_hot_repo_and_warms_commit_cache(cache, upstream, tmp_path):
+    url = upstream.as_uri()
+    for _ in range(3):
+        path = cache.get_or_clone(url)
+    cache_key = cache._get_cache_key(url)
+    score_before = cache._access_tracker.score(cache_key)
+
+    new_sha = _commit(upstream, 100)
+    cache._fresh_seconds = 0
+
+    result = cache._refresh_scheduler.run_cycle()
+
+    assert result["refreshed"] == 1
+    assert _head(path) == new_sha
+    assert cache._cache[cache_key]["last_fetched"]
+
+    # 새 커밋 메타데이터가 커밋 캐시에 미리 저장됨
+    commits_file = tmp_path / "cache" / "commits" / hashlib.md5(url.encode()).hexdigest()[:12] / "commits.json"
+    assert new_sha in json.loads(commits_file.read_text(encoding="utf-8"))
+
+    # 백그라운드 작업은 접근 빈도에 반영되지 않음
+    assert cache._access_tracker.score(cache_key) <= score_before
+
+
+def test_refresh_skips_repo_in_use(cache, upstream):
+    url = upstream.as_uri()
+    cache.get_or_clone(url)
+    cache_key = cache._get_cache_key(url)
+
+    with cache._get_key_lock(cache_key):
+        assert cache.refresh_entry(cache_key) is None
+    assert cache.refresh_entry(cache_key) is True
@@ -0,0 +1,206 @@
+"""
+포크 간 공유 히스토리 테스트
+- 업스트림이 인덱싱한 커밋은 포크 인덱싱 시 임베딩 없이 소속(repo_ids)만 추가
+- repo_ids 기준 저장소 필터/통계 (repo_ids가 없는 이전 문서는 repo_id)
+- 저장소 삭제 시 공유 커밋은 소속에서만 제거
+- 동시 연결로 덮어써진 소속은 매니페스트 기준으로 복구, 소속 조회는 청크를 묶어서 처리
+"""
+import re
+import subprocess
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.index_manager import IndexManager
+from src.indexer import CommitIndexer, normalize_repo_identifier
+from src.shared_history import repo_filter, repository_document_counts
+
+
+class _Results(list):
+    def __init__(self, docs, count=None, facets=None):
+        super().__init__(docs)
+        self._count = len(docs) if count is None else count
+        self._facets = facets or {}
+
+    def get_count(self):
+        return self._count
+
+    def get_facets(self):
+        return self._facets
+
+
+class _MemoryIndex:
+    """search.in / 저장소 필터 / 패싯만 흉내 내는 메모리 인덱스"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def _matches(self, doc, filter_expr):
+        if not filter_expr:
+            return True
+        ids = re.search(r"search\.in\(id, '([^']*)'", filter_expr)
+        if ids and doc["id"] not in ids.group(1).split(","):
+            return False
+        repo = re.search(r"repo_ids/any\(r: r eq '([^']+)'\)", filter_expr)
+        if repo:
+            repo_id = repo.group(1)
+            if not (repo_id in (doc.get("repo_ids") or [])
+                    or (doc.get("repo_id") == repo_id and not doc.get("repo_ids"))):
+                return False
+        if filter_expr.startswith("not repo_ids/any()") and doc.get("repo_ids"):
+            return False
+        return True
+
+    def search(self, search_text="*", filter=None, select=None, top=None, facets=None, **kwargs):
+        matched = [d for d in self.docs.values() if self._matches(d, filter)]
+        facet_results = {}
+        for facet in facets or []:
+            field = facet.split(",")[0]
+            counts = {}
+            for d in matched:
+                values = d.get(field) if isinstance(d.get(field), list) else [d.get(field)]
+                for value in values or []:
+                    if value is not None:
+                        counts[value] = counts.get(value, 0) + 1
+            facet_results[field] = [{"value": v, "count": c} for v, c in counts.items()]
+        docs = [{k: v for k, v in d.items() if not select or k in select} for d in matched]
+        return _Results(docs[:top] if top is not None else docs, len(matched), facet_results)
+
+    def upload_documents(self, documents):
+        for doc in documents:
+            self.docs[doc["id"]] = dict(doc)
+        return [Mock(succeeded=True, key=d["id"], status_code=201) for d in documents]
+
+    def merge_documents(self, documents):
+        results = []
+        for doc in documents:
+            if doc["id"] in self.docs:
+                self.docs[doc["id"]].update(doc)
+                results.append(Mock(succeeded=True, key=doc["id"], status_code=200))
+            else:
+                results.append(Mock(succeeded=False, key=doc["id"], status_code=404, error_message="not found"))
+        return results
+
+    def delete_documents(self, documents):
+        for doc in documents:
+            self.docs.pop(doc["id"], None)
+        return [Mock(succeeded=True) for _ in documents]
+
+
+def _git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _commit(repo_dir, name):
+    (repo_dir / f"{name}.py").write_text(f"def {name}():\n    return '{name}'\n", encoding="utf-8")
+    _git("add", ".", cwd=repo_dir)
+    _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", name, cwd=repo_dir)
+    return _git("rev-parse", "HEAD", cwd=repo_dir)
+
+
+@pytest.fixture
+def repos(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("INDEX_CHECKPOINT_DIR", str(tmp_path / "state"))
+    upstream = tmp_path / "upstream"
+    upstream.mkdir()
+    _git("init", "-q", cwd=upstream)
+    shared = [_commit(upstream, f"c{i}") for i in range(3)]
+    fork = tmp_path / "fork"
+    _git("clone", "-q", str(upstream), str(fork))
+    unique = [_commit(fork, f"f{i}") for i in range(2)]
+    return {"upstream": str(upstream), "fork": str(fork), "shared": shared, "unique": unique}
+
+
+def _index(index, repo_path, embedded):
+    def fake_embed(texts, client, **kwargs):
+        embedded.append(len(texts))
+        return [[0.5]] * len(texts)
+
+    indexer = CommitIndexer(index, Mock(), Mock(), "test-index")
+    with patch("src.indexer.embed_texts", side_effect=fake_embed), \
+            patch("src.document_generator.DocumentGenerator._extract_commit", autospec=True,
+                  side_effect=lambda self, commit, previous: (
+                      {"id": commit.hexsha, "message": commit.message, "author": "t",
+                       "date": "2024-01-01T00:00:00+00:00", "files": [], "parents": []}, False)):
+        return indexer.index_repository(repo_path, limit=10)
+
+
+def test_fork_reuses_upstream_documents(repos):
+    index = _MemoryIndex()
+    embedded = []
+    upstream_id = normalize_repo_identifier(repos["upstream"])
+    fork_id = normalize_repo_identifier(repos["fork"])
+
+    assert _index(index, repos["upstream"], embedded) == 3
+    assert _index(index, repos["fork"], embedded) == 5
+    assert embedded == [3, 2]  # 공유 커밋은 다시 임베딩하지 않음
+
+    for sha in repos["shared"]:
+        doc = index.docs[sha]
+        assert doc["repo_ids"] == sorted([upstream_id, fork_id])
+        assert doc["repo_id"] == upstream_id and doc["repository_path"] == repos["upstream"]
+        assert doc["content_vector"] == [0.5]
+    assert index.docs[repos["unique"][0]]["repo_ids"] == [fork_id]
+
+    assert len(index.search(filter=repo_filter(fork_id))) == 5
+    assert len(index.search(filter=repo_filter(upstream_id))) == 3
+    assert repository_document_counts(index) == {upstream_id: 3, fork_id: 5}
+
+    # 이미 소속된 커밋은 다시 연결하지 않음
+    assert _index(index, repos["fork"], embedded) == 0
+    assert embedded == [3, 2]
+
+
+def test_delete_repository_detaches_shared_commits(repos):
+    index = _MemoryIndex()
+    _index(index, repos["upstream"], [])
+    _index(index, repos["fork"], [])
+    upstream_id = normalize_repo_identifier(repos["upstream"])
+    fork_id = normalize_repo_identifier(repos["fork"])
+    # repo_ids가 없는 이전 문서
+    index.docs["legacy"] = {"id": "legacy", "repo_id": upstream_id, "repository_path": repos["upstream"]}
+    manager = IndexManager(index, Mock(), "test-index")
+
+    assert manager._get_repository_statistics() == {upstream_id: 4, fork_id: 5}
+    repos_listed = {r["repo_id"]: r for r in manager.list_indexed_repositories()}
+    assert repos_listed[fork_id]["repository_path"] == repos["fork"]
+
+    # 업스트림 삭제: 공유 커밋은 포크에 남고 대표 저장소가 포크로 바뀜
+    assert manager.delete_repository_commits(upstream_id) == 1
+    assert "legacy" not in index.docs
+    for sha in repos["shared"]:
+        doc = index.docs[sha]
+        assert doc["repo_ids"] == [fork_id]
+        assert doc["repo_id"] == fork_id and doc["repository_path"] == repos["fork"]
+
+    assert manager.delete_repository_commits(fork_id) == 5
+    assert index.docs == {}
+
+
+def test_memberships_lost_to_concurrent_linking_are_restored(repos, tmp_path):
+    index = _MemoryIndex()
+    _index(index, repos["upstream"], [])
+    _index(index, repos["fork"], [])
+    other = tmp_path / "other"
+    _git("clone", "-q", repos["upstream"], str(other))
+    ids = {name: normalize_repo_identifier(path) for name, path in
+           (("upstream", repos["upstream"]), ("fork", repos["fork"]), ("other", str(other)))}
+
+    calls = []
+
+    def stale_lookup(search_client, shas, **kwargs):
+        # 포크가 연결하기 전에 읽은 소속 (동시 실행에서 포크 소속을 덮어쓰게 됨)
+        calls.append(list(shas))
+        return {sha: {"repo_ids": {ids["upstream"]}, "repository_paths": {repos["upstream"]}}
+                for sha in shas if sha in index.docs}
+
+    with patch("src.shared_history.lookup_memberships", side_effect=stale_lookup), \
+            patch("src.indexer.PIPELINE_CHUNK_SIZE", 1):
+        assert _index(index, str(other), []) == 3
+
+    # 청크(커밋 1개)마다가 아니라 계획된 커밋을 한 번에 조회
+    assert len(calls) == 1 and sorted(calls[0]) == sorted(repos["shared"])
+    for sha in repos["shared"]:
+        assert index.docs[sha]["repo_ids"] == sorted(ids.values())
+        assert index.docs[sha]["repository_paths"] == sorted([repos["upstream"], repos["fork"], str(other)])
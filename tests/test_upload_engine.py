@@ -0,0 +1,104 @@
+"""
+문서 업로드 엔진 테스트
+- 문서 수/직렬화 크기 기준 배치 분할과 동시 업로드
+- 실패한 키만 재시도
+- 요청 오류 재시도와 413 분할
+"""
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+from src.upload_engine import DocumentUploader, document_size
+
+
+def _docs(n, dims=64):
+    return [{"id": f"d{i}", "message": f"m{i}", "content_vector": [0.125] * dims} for i in range(n)]
+
+
+def _ok(documents):
+    return [Mock(succeeded=True, key=d["id"], status_code=201) for d in documents]
+
+
+def _http_error(status):
+    error = HttpResponseError(message=f"status {status}")
+    error.status_code = status
+    return error
+
+
+def test_batches_respect_count_and_byte_limits():
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+    sent = []
+
+    def upload(documents):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            sent.append(list(documents))
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return _ok(documents)
+
+    client = Mock()
+    client.upload_documents.side_effect = upload
+    docs = _docs(20)
+    max_bytes = document_size(docs[0]) * 3 + 10
+    uploader = DocumentUploader(client, max_batch_docs=4, max_batch_bytes=max_bytes, concurrency=3)
+
+    assert uploader.upload(docs) == [d["id"] for d in docs]
+    assert all(len(batch) <= 3 for batch in sent)
+    assert sum(len(batch) for batch in sent) == 20
+    assert active["peak"] > 1
+    assert uploader.stats["bytes"] == sum(document_size(d) for d in docs)
+    assert uploader.throughput()["docs_per_second"] > 0
+
+
+def test_only_failed_keys_are_retried():
+    calls = []
+
+    def upload(documents):
+        calls.append([d["id"] for d in documents])
+        if len(calls) == 1:
+            return [Mock(succeeded=True), Mock(succeeded=False, status_code=503, error_message="busy"),
+                    Mock(succeeded=False, status_code=400, error_message="invalid"), Mock(succeeded=True)]
+        return _ok(documents)
+
+    client = Mock()
+    client.upload_documents.side_effect = upload
+    uploader = DocumentUploader(client, concurrency=1, backoff_base=0.01)
+
+    assert uploader.upload(_docs(4)) == ["d0", "d3", "d1"]
+    assert calls == [["d0", "d1", "d2", "d3"], ["d1"]]
+    assert uploader.stats["failed_documents"] == 1
+    assert uploader.stats["retried_documents"] == 1
+
+
+def test_request_errors_are_retried_and_oversized_batches_split():
+    calls = []
+
+    def upload(documents):
+        calls.append(len(documents))
+        if len(calls) == 1:
+            raise _http_error(503)
+        if len(documents) > 2:
+            raise _http_error(413)
+        return _ok(documents)
+
+    client = Mock()
+    client.upload_documents.side_effect = upload
+    uploader = DocumentUploader(client, concurrency=1, backoff_base=0.01)
+
+    assert uploader.upload(_docs(4)) == ["d0", "d1", "d2", "d3"]
+    assert calls == [4, 4, 2, 2]
+    assert uploader.stats["retries"] == 1 and uploader.stats["bisections"] == 1
+
+
+def test_non_retryable_error_propagates():
+    client = Mock()
+    client.upload_documents.side_effect = RuntimeError("boom")
+    with pytest.raises(RuntimeError):
+        DocumentUploader(client, concurrency=1).upload(_docs(2))
@@ -0,0 +1,87 @@
+"""
+벡터 압축/차원 설정 테스트
+- 양자화 압축, 재채점, stored=False 필드 구성
+- 기존 인덱스와 설정 차이 감지
+- 축소 차원 요청과 새 인덱스로의 이전
+"""
+from unittest.mock import Mock, patch
+
+from azure.search.documents.indexes.models import BinaryQuantizationCompression, SearchIndex
+
+from src.embedding import request_dimensions
+from src.embedding_engine import EmbeddingEngine, RateLimiter
+from src.indexer import CommitIndexer
+from src.vector_config import build_vector_field, build_vector_search, vector_config_diff, vector_settings
+
+
+def _index(settings):
+    return SearchIndex(name="idx", fields=[build_vector_field(settings)], vector_search=build_vector_search(settings))
+
+
+def test_binary_quantization_with_rescoring_and_unstored_vectors(monkeypatch):
+    monkeypatch.setenv("VECTOR_COMPRESSION", "binary")
+    monkeypatch.setenv("VECTOR_STORED", "false")
+    settings = vector_settings(512)
+
+    field = build_vector_field(settings)
+    vector_search = build_vector_search(settings)
+
+    assert field.vector_search_dimensions == 512
+    assert field.stored is False and field.hidden is True
+    compression = vector_search.compressions[0]
+    assert isinstance(compression, BinaryQuantizationCompression)
+    assert compression.rescoring_options.enable_rescoring
+    assert compression.rescoring_options.default_oversampling == 4.0
+    assert vector_search.profiles[0].compression_name == compression.compression_name
+
+
+def test_config_diff_against_existing_index(monkeypatch):
+    monkeypatch.delenv("VECTOR_COMPRESSION", raising=False)
+    monkeypatch.delenv("VECTOR_STORED", raising=False)
+    existing = _index(vector_settings(1536))
+    assert vector_config_diff(existing, vector_settings(1536)) == {}
+
+    monkeypatch.setenv("VECTOR_COMPRESSION", "scalar")
+    diff = vector_config_diff(existing, vector_settings(512))
+    assert diff == {"dimensions": (1536, 512), "compression": ("none", "scalar")}
+
+    index_client = Mock()
+    index_client.get_index.return_value = existing
+    indexer = CommitIndexer(Mock(), index_client, Mock(), "idx")
+    with patch("src.indexer.logger") as log:
+        indexer.create_index_if_not_exists(vector_dimensions=512)
+    index_client.create_index.assert_not_called()
+    assert "migrate_vector_index" in log.warning.call_args[0][0]
+
+
+def test_reduced_dimensions_are_requested(monkeypatch):
+    monkeypatch.delenv("EMBEDDING_SEND_DIMENSIONS", raising=False)
+    assert request_dimensions("text-embedding-3-small", 512) == 512
+    assert request_dimensions("text-embedding-3-small", 1536) is None
+    assert request_dimensions("text-embedding-ada-002", 512) is None
+
+    client = Mock()
+    client.embeddings.create.side_effect = lambda input, model, dimensions: Mock(
+        data=[Mock(embedding=[0.0] * dimensions) for _ in input]
+    )
+    engine = EmbeddingEngine(client, "text-embedding-3-small", concurrency=1, limiter=RateLimiter(), dimensions=256)
+    assert [len(v) for v in engine.embed(["a", "b"])] == [256, 256]
+
+
+def test_migrate_vector_index_reindexes_each_repository():
+    source = Mock()
+    source.search.side_effect = lambda **kwargs: (
+        Mock(get_facets=Mock(return_value={"repo_id": [{"value": "github.com/a/b", "count": 42}]}))
+        if "facets" in kwargs else iter([{"repository_path": "https://github.com/a/b"}])
+    )
+    index_client = Mock()
+    index_client.get_index.side_effect = Exception("not found")
+    indexer = CommitIndexer(source, index_client, Mock(), "old-index")
+
+    with patch.object(CommitIndexer, "index_repository", return_value=42) as index_repository:
+        result = indexer.migrate_vector_index("new-index")
+
+    index_client.get_search_client.assert_called_once_with("new-index")
+    assert index_client.create_index.call_args[0][0].name == "new-index"
+    index_repository.assert_called_once_with("https://github.com/a/b", limit=42)
+    assert result == {"index_name": "new-index", "repositories": 1, "documents": 42, "failed": []}